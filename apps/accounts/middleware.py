@@ -1,3 +1,6 @@
+import time
+
+from django.conf import settings
 from django.shortcuts import redirect
 from django.urls import reverse
 from django.contrib.auth import logout
@@ -54,4 +57,36 @@ class UserActivityMiddleware(MiddlewareMixin):
             # 可以在这里记录用户的最后活动时间等信息
             pass
         
-        return None
\ No newline at end of file
+        return None
+
+
+class SessionRefreshMiddleware(MiddlewareMixin):
+    """
+    会话保存节流中间件
+
+    关闭 SESSION_SAVE_EVERY_REQUEST 后，会话只在被修改时写入。为保持滑动过期，
+    会话中记录最近一次保存时间，剩余有效期低于 SESSION_REFRESH_THRESHOLD 秒时标记为已修改，
+    由 SessionMiddleware 重新保存并续期 Cookie。需放在 SessionMiddleware 之后。
+    """
+
+    REFRESHED_AT_KEY = '_session_refreshed_at'
+
+    def process_response(self, request, response):
+        session = getattr(request, 'session', None)
+        # 未读取过的会话（如 Token 认证的请求）不加载，空会话不创建
+        if session is None or not session.accessed or session.is_empty():
+            return response
+        if settings.SESSION_SAVE_EVERY_REQUEST:
+            return response
+
+        now = int(time.time())
+        if session.modified:
+            # 本次请求已需要保存，顺带记录保存时间
+            session[self.REFRESHED_AT_KEY] = now
+            return response
+
+        refreshed_at = session.get(self.REFRESHED_AT_KEY)
+        threshold = getattr(settings, 'SESSION_REFRESH_THRESHOLD', settings.SESSION_COOKIE_AGE // 4)
+        if refreshed_at is None or now - refreshed_at >= session.get_expiry_age() - threshold:
+            session[self.REFRESHED_AT_KEY] = now
+        return response
@@ -55,7 +55,65 @@ class UserRole(models.TextChoices):
         return manager_level < target_level
 
 
-class CustomUser(AbstractUser):
+class FieldTrackerMixin:
+    """字段变更跟踪
+
+    在从数据库加载实例时记录各字段的原始值，保存信号中可以通过
+    get_dirty_fields() 判断哪些字段真正发生了变化，而无需重新查询数据库。
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def _snapshot_loaded_values(self, field_names=None):
+        """将当前字段值记录为已加载值"""
+        deferred = self.get_deferred_fields()
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is None or field_names is None:
+            loaded = {}
+            field_names = [f.attname for f in self._meta.concrete_fields]
+        for name in field_names:
+            if name not in deferred:
+                loaded[name] = getattr(self, name)
+        self._loaded_values = loaded
+
+    def get_loaded_value(self, field_name, default=None):
+        """获取字段加载时的值"""
+        return getattr(self, '_loaded_values', {}).get(field_name, default)
+
+    def get_dirty_fields(self):
+        """获取自加载（或上次保存）以来发生变化的字段名集合
+
+        新建且未保存过的实例视为所有字段均已变化。
+        """
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is None:
+            return {f.attname for f in self._meta.concrete_fields}
+        return {name for name, value in loaded.items() if getattr(self, name) != value}
+
+    def has_field_changed(self, field_name):
+        """判断指定字段是否发生变化"""
+        return field_name in self.get_dirty_fields()
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # 信号处理器在 super().save() 内执行，此时仍可读取变更前的值
+        update_fields = kwargs.get('update_fields')
+        self._snapshot_loaded_values(
+            [self._meta.get_field(name).attname for name in update_fields] if update_fields else None
+        )
+
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using=using, fields=fields)
+        self._snapshot_loaded_values(
+            [self._meta.get_field(name).attname for name in fields] if fields else None
+        )
+
+
+class CustomUser(FieldTrackerMixin, AbstractUser):
     """英语学习平台用户模型"""
     
     # 基础信息
@@ -119,11 +177,13 @@ class CustomUser(AbstractUser):
             # 获取或创建对应的组
             group, created = Group.objects.get_or_create(name=group_name)
             
-            # 清除用户现有的所有组
-            self.groups.clear()
-            
-            # 添加用户到对应组
-            self.groups.add(group)
+            # 仅移除多余的组、补充缺失的组，避免 clear() + add() 的整表重写
+            current_group_ids = set(self.groups.values_list('id', flat=True))
+            stale_group_ids = current_group_ids - {group.id}
+            if stale_group_ids:
+                self.groups.remove(*stale_group_ids)
+            if group.id not in current_group_ids:
+                self.groups.add(group)
             
             if created:
                 print(f"创建新用户组: {group_name}")
@@ -132,8 +192,14 @@ class CustomUser(AbstractUser):
 
 @receiver(post_save, sender=CustomUser)
 def auto_assign_user_group(sender, instance, created, **kwargs):
-    """用户保存后自动分配组"""
-    if created or kwargs.get('update_fields'):
+    """用户保存后自动分配组
+
+    仅在创建用户或角色真正变化时执行，last_login 等字段的更新不再触发组重分配。
+    """
+    update_fields = kwargs.get('update_fields')
+    if update_fields is not None and 'role' not in update_fields:
+        return
+    if created or instance.has_field_changed('role'):
         # 使用基础的组分配方法
         instance.auto_assign_group()
 
@@ -3,7 +3,7 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.db import transaction
-from django.core.cache import cache
+from django.core.cache import cache, caches
 from django.conf import settings
 from .models import (
     CustomUser, UserRole, RoleExtension, RoleTemplate,
@@ -119,13 +119,30 @@ class SystemConfigManagementViewSet(viewsets.ViewSet):
         return 5  # 模拟数据
     
     def _get_cache_status(self):
-        """获取缓存状态"""
+        """获取缓存状态及命中统计"""
+        cache_status = {
+            'backend': type(caches['default']).__name__,
+            'session_engine': settings.SESSION_ENGINE.split('.')[-1],
+        }
+        # 先读取统计，避免探测请求计入命中
+        if hasattr(cache, 'get_metrics'):
+            cache_status['metrics'] = cache.get_metrics()
+
         try:
-            cache.set('test_key', 'test_value', 10)
-            test_value = cache.get('test_key')
-            return 'active' if test_value == 'test_value' else 'inactive'
-        except Exception:
-            return 'error'
+            cache.set('system_config:cache_probe', 'ok', 10)
+            probe_value = cache.get('system_config:cache_probe')
+            cache_status['status'] = 'active' if probe_value == 'ok' else 'inactive'
+        except Exception as e:
+            cache_status['status'] = 'error'
+            cache_status['error'] = str(e)
+            return cache_status
+
+        if hasattr(cache, 'get_server_stats'):
+            try:
+                cache_status['server'] = cache.get_server_stats()
+            except Exception as e:
+                cache_status['server'] = {'error': str(e)}
+        return cache_status
     
     @action(detail=False, methods=['get', 'post'])
     def role_templates(self, request):
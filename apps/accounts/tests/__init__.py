@@ -0,0 +1 @@
+# Accounts Tests package
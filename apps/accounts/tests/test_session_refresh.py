@@ -0,0 +1,98 @@
+"""
+会话保存节流测试
+
+SessionRefreshMiddleware 只在会话被修改或剩余有效期不足 SESSION_REFRESH_THRESHOLD 秒时让会话重新保存，
+未读取的会话和剩余有效期充足的会话不写入，也不重新下发 Cookie。
+"""
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+from apps.accounts.middleware import SessionRefreshMiddleware
+
+REFRESHED_AT_KEY = SessionRefreshMiddleware.REFRESHED_AT_KEY
+
+
+@override_settings(
+    SESSION_ENGINE='django.contrib.sessions.backends.cached_db',
+    SESSION_SAVE_EVERY_REQUEST=False,
+    SESSION_COOKIE_AGE=3600,
+    SESSION_REFRESH_THRESHOLD=900,
+)
+class SessionRefreshMiddlewareTest(TestCase):
+    """滑动过期只在接近过期时续期"""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def make_session(self, refreshed_ago=None):
+        store = import_module(settings.SESSION_ENGINE).SessionStore()
+        store['user'] = 'someone'
+        if refreshed_ago is not None:
+            store[REFRESHED_AT_KEY] = int(time.time()) - refreshed_ago
+        store.save()
+        return store.session_key
+
+    def request(self, session_key=None, view=None):
+        request = self.factory.get('/')
+        if session_key:
+            request.COOKIES[settings.SESSION_COOKIE_NAME] = session_key
+
+        def default_view(request):
+            request.session.get('user')
+            return HttpResponse()
+
+        handler = SessionMiddleware(SessionRefreshMiddleware(view or default_view))
+        response = handler(request)
+        return request, response
+
+    def load(self, session_key):
+        return import_module(settings.SESSION_ENGINE).SessionStore(session_key)
+
+    def test_unaccessed_session_is_not_saved(self):
+        session_key = self.make_session(refreshed_ago=3000)
+        request, response = self.request(session_key, view=lambda request: HttpResponse())
+        self.assertFalse(request.session.modified)
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, response.cookies)
+
+    def test_recently_refreshed_session_is_not_saved(self):
+        session_key = self.make_session(refreshed_ago=60)
+        request, response = self.request(session_key)
+        self.assertFalse(request.session.modified)
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, response.cookies)
+
+    def test_session_near_expiry_is_refreshed(self):
+        # 3600 - 2800 = 800 秒剩余，低于 900 秒阈值
+        session_key = self.make_session(refreshed_ago=2800)
+        request, response = self.request(session_key)
+        self.assertTrue(request.session.modified)
+        self.assertIn(settings.SESSION_COOKIE_NAME, response.cookies)
+        self.assertGreaterEqual(self.load(session_key)[REFRESHED_AT_KEY], int(time.time()) - 1)
+
+    def test_session_without_refresh_time_is_refreshed(self):
+        session_key = self.make_session()
+        request, response = self.request(session_key)
+        self.assertIn(settings.SESSION_COOKIE_NAME, response.cookies)
+        self.assertIn(REFRESHED_AT_KEY, self.load(session_key))
+
+    def test_modified_session_records_refresh_time(self):
+        session_key = self.make_session(refreshed_ago=60)
+
+        def view(request):
+            request.session['step'] = 2
+            return HttpResponse()
+
+        _, response = self.request(session_key, view=view)
+        self.assertIn(settings.SESSION_COOKIE_NAME, response.cookies)
+        session = self.load(session_key)
+        self.assertEqual(session['step'], 2)
+        self.assertGreaterEqual(session[REFRESHED_AT_KEY], int(time.time()) - 1)
+
+    def test_empty_session_is_not_created(self):
+        request, response = self.request()
+        self.assertTrue(request.session.is_empty())
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, response.cookies)
@@ -12,6 +12,7 @@ from io import StringIO
 
 from apps.words.models import Word
 from apps.teaching.models import LearningGoal, LearningSession, WordLearningRecord, GoalWord
+from apps.teaching.dashboard_cache import dashboard_snapshot_cache
 from .models import (
     UserEngagementMetrics, UserRetentionData, ABTestExperiment, ABTestParticipant,
     UserBehaviorPattern, GameElementEffectiveness
@@ -25,6 +26,294 @@ from .serializers import (
 )
 
 
+def overview_data(user_id, params):
+    """分析概览"""
+    # 基础统计
+    total_words = Word.objects.filter(goalword__goal__user_id=user_id).distinct().count()
+
+    # 学习记录统计
+    learning_records = WordLearningRecord.objects.filter(user_id=user_id)
+    learned_words = learning_records.values('word').distinct().count()
+
+    # 掌握率计算
+    mastery_rate = (learned_words / total_words * 100) if total_words > 0 else 0
+
+    # 学习连续天数（暂时设为0，可后续实现）
+    study_streak = 0
+
+    # 总学习时间
+    sessions = LearningSession.objects.filter(user_id=user_id, end_time__isnull=False)
+    total_study_time = 0
+    for session in sessions:
+        if session.end_time and session.start_time:
+            duration = session.end_time - session.start_time
+            total_study_time += duration.total_seconds() / 60
+
+    # 平均正确率
+    avg_accuracy = learning_records.aggregate(
+        avg=Avg('is_correct')
+    )['avg'] or 0
+    avg_accuracy = avg_accuracy * 100 if avg_accuracy else 0
+
+    # 本周统计
+    week_start = timezone.now().date() - timedelta(days=timezone.now().weekday())
+    week_end = week_start + timedelta(days=6)
+
+    words_this_week = learning_records.filter(
+        created_at__date__range=[week_start, week_end]
+    ).values('word').distinct().count()
+
+    sessions_this_week = LearningSession.objects.filter(
+        user_id=user_id,
+        start_time__date__range=[week_start, week_end]
+    ).count()
+
+    data = {
+        'total_words': total_words,
+        'learned_words': learned_words,
+        'mastery_rate': round(mastery_rate, 2),
+        'study_streak': study_streak,
+        'total_study_time': round(total_study_time, 2),
+        'average_accuracy': round(avg_accuracy, 2),
+        'words_this_week': words_this_week,
+        'sessions_this_week': sessions_this_week
+    }
+
+    return AnalyticsOverviewSerializer(data).data
+
+
+def weekly_progress_data(user_id, params):
+    """周进度数据"""
+    weeks = int(params.get('weeks', 12))
+
+    weekly_data = []
+    for i in range(weeks):
+        # 计算周的开始和结束日期
+        week_start = timezone.now().date() - timedelta(days=timezone.now().weekday() + i * 7)
+        week_end = week_start + timedelta(days=6)
+
+        # 周内学习记录
+        week_records = WordLearningRecord.objects.filter(
+            user_id=user_id,
+            created_at__date__range=[week_start, week_end]
+        )
+
+        # 周内学习会话
+        week_sessions = LearningSession.objects.filter(
+            user_id=user_id,
+            start_time__date__range=[week_start, week_end]
+        )
+
+        # 统计数据
+        total_words = week_records.values('word').distinct().count()
+        total_sessions = week_sessions.count()
+
+        # 总学习时间
+        total_time = 0
+        for session in week_sessions.filter(end_time__isnull=False):
+            if session.end_time and session.start_time:
+                duration = session.end_time - session.start_time
+                total_time += duration.total_seconds() / 60
+
+        # 平均正确率
+        total_records = week_records.count()
+        correct_records = week_records.filter(is_correct=True).count()
+        average_accuracy = (correct_records / total_records * 100) if total_records > 0 else 0
+
+        # 每日活动
+        daily_activities = []
+        for j in range(7):
+            day_date = week_start + timedelta(days=j)
+            day_records = week_records.filter(created_at__date=day_date)
+            day_sessions = week_sessions.filter(start_time__date=day_date)
+
+            day_words = day_records.values('word').distinct().count()
+            day_session_count = day_sessions.count()
+
+            day_time = 0
+            for session in day_sessions.filter(end_time__isnull=False):
+                if session.end_time and session.start_time:
+                    duration = session.end_time - session.start_time
+                    day_time += duration.total_seconds() / 60
+
+            day_total = day_records.count()
+            day_correct = day_records.filter(is_correct=True).count()
+            day_accuracy = (day_correct / day_total * 100) if day_total > 0 else 0
+
+            daily_activities.append({
+                'date': day_date,
+                'words_learned': day_words,
+                'study_sessions': day_session_count,
+                'study_time': round(day_time, 2),
+                'accuracy_rate': round(day_accuracy, 2)
+            })
+
+        weekly_data.append({
+            'week_start': week_start,
+            'week_end': week_end,
+            'total_words': total_words,
+            'total_sessions': total_sessions,
+            'total_time': round(total_time, 2),
+            'average_accuracy': round(average_accuracy, 2),
+            'daily_activities': daily_activities
+        })
+
+    weekly_data.reverse()  # 按时间正序排列
+    return WeeklyProgressSerializer(weekly_data, many=True).data
+
+
+def monthly_statistics_data(user_id, params):
+    """月度统计"""
+    months = int(params.get('months', 6))
+
+    monthly_data = []
+    for i in range(months):
+        # 计算月份
+        target_date = timezone.now().date().replace(day=1) - timedelta(days=i * 30)
+        month_start = target_date.replace(day=1)
+
+        # 计算月末
+        if month_start.month == 12:
+            month_end = month_start.replace(year=month_start.year + 1, month=1) - timedelta(days=1)
+        else:
+            month_end = month_start.replace(month=month_start.month + 1) - timedelta(days=1)
+
+        # 月内学习记录
+        month_records = WordLearningRecord.objects.filter(
+            user_id=user_id,
+            created_at__date__range=[month_start, month_end]
+        )
+
+        # 月内学习会话
+        month_sessions = LearningSession.objects.filter(
+            user_id=user_id,
+            start_time__date__range=[month_start, month_end]
+        )
+
+        # 统计数据
+        total_words = month_records.values('word').distinct().count()
+        total_sessions = month_sessions.count()
+
+        # 总学习时间
+        total_time = 0
+        for session in month_sessions.filter(end_time__isnull=False):
+            if session.end_time and session.start_time:
+                duration = session.end_time - session.start_time
+                total_time += duration.total_seconds() / 60
+
+        # 平均正确率
+        total_records = month_records.count()
+        correct_records = month_records.filter(is_correct=True).count()
+        average_accuracy = (correct_records / total_records * 100) if total_records > 0 else 0
+
+        # 活跃天数
+        active_days = month_records.values('created_at__date').distinct().count()
+
+        monthly_data.append({
+            'month': month_start.strftime('%Y-%m'),
+            'total_words': total_words,
+            'total_sessions': total_sessions,
+            'total_time': round(total_time, 2),
+            'average_accuracy': round(average_accuracy, 2),
+            'active_days': active_days
+        })
+
+    monthly_data.reverse()  # 按时间正序排列
+    return MonthlyStatisticsSerializer(monthly_data, many=True).data
+
+
+def mastery_distribution_data(user_id, params):
+    """单词掌握分布"""
+    # 获取用户所有单词
+    user_words = Word.objects.filter(goalword__goal__user_id=user_id).distinct()
+    total_words = user_words.count()
+
+    if total_words == 0:
+        return []
+
+    # 统计各掌握级别的单词数量
+    distribution = {
+        '未学习': 0,
+        '初学': 0,
+        '熟悉': 0,
+        '掌握': 0,
+        '精通': 0
+    }
+
+    # 根据学习记录统计掌握程度
+    for word in user_words:
+        records = WordLearningRecord.objects.filter(
+            user_id=user_id,
+            word=word
+        )
+
+        if not records.exists():
+            distribution['未学习'] += 1
+        else:
+            correct_count = records.filter(is_correct=True).count()
+            total_count = records.count()
+
+            if correct_count == 0:
+                distribution['初学'] += 1
+            elif correct_count < 3:
+                distribution['初学'] += 1
+            elif correct_count < 6:
+                distribution['熟悉'] += 1
+            elif correct_count < 10:
+                distribution['掌握'] += 1
+            else:
+                distribution['精通'] += 1
+
+    # 转换为序列化器格式
+    result = []
+    for level, count in distribution.items():
+        percentage = (count / total_words * 100) if total_words > 0 else 0
+        result.append({
+            'mastery_level': level,
+            'word_count': count,
+            'percentage': round(percentage, 2)
+        })
+
+    return WordMasteryDistributionSerializer(result, many=True).data
+
+
+def goal_progress_data(user_id, params):
+    """学习目标进度"""
+    goals = LearningGoal.objects.filter(user_id=user_id, is_active=True)
+
+    progress_data = []
+    for goal in goals:
+        # 目标单词数
+        target_words = goal.target_words_count
+        current_words = GoalWord.objects.filter(goal=goal).count()
+
+        # 完成率
+        completion_rate = (current_words / target_words * 100) if target_words > 0 else 0
+
+        # 剩余天数
+        today = timezone.now().date()
+        days_remaining = (goal.end_date - today).days if goal.end_date > today else 0
+
+        # 是否按计划进行
+        total_days = (goal.end_date - goal.start_date).days
+        elapsed_days = (today - goal.start_date).days
+        expected_progress = (elapsed_days / total_days * 100) if total_days > 0 else 0
+        is_on_track = completion_rate >= expected_progress
+
+        progress_data.append({
+            'goal_id': goal.pk,
+            'goal_name': goal.name,
+            'target_words': target_words,
+            'current_words': current_words,
+            'completion_rate': round(completion_rate, 2),
+            'days_remaining': days_remaining,
+            'is_on_track': is_on_track
+        })
+
+    return LearningGoalProgressSerializer(progress_data, many=True).data
+
+
+
 class AnalyticsViewSet(viewsets.GenericViewSet):
     """分析数据视图集"""
     permission_classes = [IsAuthenticated]
@@ -32,61 +321,7 @@ class AnalyticsViewSet(viewsets.GenericViewSet):
     @action(detail=False, methods=['get'])
     def overview(self, request):
         """获取分析概览"""
-        user = request.user
-        
-        # 基础统计
-        total_words = Word.objects.filter(user=user).count()
-        
-        # 学习记录统计
-        learning_records = WordLearningRecord.objects.filter(session__user=user)
-        learned_words = learning_records.values('word').distinct().count()
-        
-        # 掌握率计算
-        mastery_rate = (learned_words / total_words * 100) if total_words > 0 else 0
-        
-        # 学习连续天数（暂时设为0，可后续实现）
-        study_streak = 0
-        
-        # 总学习时间
-        sessions = LearningSession.objects.filter(user=user, end_time__isnull=False)
-        total_study_time = 0
-        for session in sessions:
-            if session.end_time and session.start_time:
-                duration = session.end_time - session.start_time
-                total_study_time += duration.total_seconds() / 60
-        
-        # 平均正确率
-        avg_accuracy = learning_records.aggregate(
-            avg=Avg('is_correct')
-        )['avg'] or 0
-        avg_accuracy = avg_accuracy * 100 if avg_accuracy else 0
-        
-        # 本周统计
-        week_start = timezone.now().date() - timedelta(days=timezone.now().weekday())
-        week_end = week_start + timedelta(days=6)
-        
-        words_this_week = learning_records.filter(
-            created_at__date__range=[week_start, week_end]
-        ).values('word').distinct().count()
-        
-        sessions_this_week = LearningSession.objects.filter(
-            user=user,
-            start_time__date__range=[week_start, week_end]
-        ).count()
-        
-        data = {
-            'total_words': total_words,
-            'learned_words': learned_words,
-            'mastery_rate': round(mastery_rate, 2),
-            'study_streak': study_streak,
-            'total_study_time': round(total_study_time, 2),
-            'average_accuracy': round(avg_accuracy, 2),
-            'words_this_week': words_this_week,
-            'sessions_this_week': sessions_this_week
-        }
-        
-        serializer = AnalyticsOverviewSerializer(data)
-        return Response(serializer.data)
+        return Response(overview_data(request.user.pk, request.query_params))
     
     @action(detail=False, methods=['get'])
     def daily_activity(self, request):
@@ -100,7 +335,7 @@ class AnalyticsViewSet(viewsets.GenericViewSet):
             
             # 当日学习记录
             day_records = WordLearningRecord.objects.filter(
-                session__user=user,
+                user=user,
                 created_at__date=target_date
             )
             
@@ -141,242 +376,22 @@ class AnalyticsViewSet(viewsets.GenericViewSet):
     @action(detail=False, methods=['get'])
     def weekly_progress(self, request):
         """获取周进度数据"""
-        user = request.user
-        weeks = int(request.query_params.get('weeks', 12))
-        
-        weekly_data = []
-        for i in range(weeks):
-            # 计算周的开始和结束日期
-            week_start = timezone.now().date() - timedelta(days=timezone.now().weekday() + i * 7)
-            week_end = week_start + timedelta(days=6)
-            
-            # 周内学习记录
-            week_records = WordLearningRecord.objects.filter(
-                session__user=user,
-                created_at__date__range=[week_start, week_end]
-            )
-            
-            # 周内学习会话
-            week_sessions = LearningSession.objects.filter(
-                user=user,
-                start_time__date__range=[week_start, week_end]
-            )
-            
-            # 统计数据
-            total_words = week_records.values('word').distinct().count()
-            total_sessions = week_sessions.count()
-            
-            # 总学习时间
-            total_time = 0
-            for session in week_sessions.filter(end_time__isnull=False):
-                if session.end_time and session.start_time:
-                    duration = session.end_time - session.start_time
-                    total_time += duration.total_seconds() / 60
-            
-            # 平均正确率
-            total_records = week_records.count()
-            correct_records = week_records.filter(is_correct=True).count()
-            average_accuracy = (correct_records / total_records * 100) if total_records > 0 else 0
-            
-            # 每日活动
-            daily_activities = []
-            for j in range(7):
-                day_date = week_start + timedelta(days=j)
-                day_records = week_records.filter(created_at__date=day_date)
-                day_sessions = week_sessions.filter(start_time__date=day_date)
-                
-                day_words = day_records.values('word').distinct().count()
-                day_session_count = day_sessions.count()
-                
-                day_time = 0
-                for session in day_sessions.filter(end_time__isnull=False):
-                    if session.end_time and session.start_time:
-                        duration = session.end_time - session.start_time
-                        day_time += duration.total_seconds() / 60
-                
-                day_total = day_records.count()
-                day_correct = day_records.filter(is_correct=True).count()
-                day_accuracy = (day_correct / day_total * 100) if day_total > 0 else 0
-                
-                daily_activities.append({
-                    'date': day_date,
-                    'words_learned': day_words,
-                    'study_sessions': day_session_count,
-                    'study_time': round(day_time, 2),
-                    'accuracy_rate': round(day_accuracy, 2)
-                })
-            
-            weekly_data.append({
-                'week_start': week_start,
-                'week_end': week_end,
-                'total_words': total_words,
-                'total_sessions': total_sessions,
-                'total_time': round(total_time, 2),
-                'average_accuracy': round(average_accuracy, 2),
-                'daily_activities': daily_activities
-            })
-        
-        weekly_data.reverse()  # 按时间正序排列
-        serializer = WeeklyProgressSerializer(weekly_data, many=True)
-        return Response(serializer.data)
+        return Response(weekly_progress_data(request.user.pk, request.query_params))
     
     @action(detail=False, methods=['get'])
     def monthly_statistics(self, request):
         """获取月度统计"""
-        user = request.user
-        months = int(request.query_params.get('months', 6))
-        
-        monthly_data = []
-        for i in range(months):
-            # 计算月份
-            target_date = timezone.now().date().replace(day=1) - timedelta(days=i * 30)
-            month_start = target_date.replace(day=1)
-            
-            # 计算月末
-            if month_start.month == 12:
-                month_end = month_start.replace(year=month_start.year + 1, month=1) - timedelta(days=1)
-            else:
-                month_end = month_start.replace(month=month_start.month + 1) - timedelta(days=1)
-            
-            # 月内学习记录
-            month_records = WordLearningRecord.objects.filter(
-                session__user=user,
-                created_at__date__range=[month_start, month_end]
-            )
-            
-            # 月内学习会话
-            month_sessions = LearningSession.objects.filter(
-                user=user,
-                start_time__date__range=[month_start, month_end]
-            )
-            
-            # 统计数据
-            total_words = month_records.values('word').distinct().count()
-            total_sessions = month_sessions.count()
-            
-            # 总学习时间
-            total_time = 0
-            for session in month_sessions.filter(end_time__isnull=False):
-                if session.end_time and session.start_time:
-                    duration = session.end_time - session.start_time
-                    total_time += duration.total_seconds() / 60
-            
-            # 平均正确率
-            total_records = month_records.count()
-            correct_records = month_records.filter(is_correct=True).count()
-            average_accuracy = (correct_records / total_records * 100) if total_records > 0 else 0
-            
-            # 活跃天数
-            active_days = month_records.values('created_at__date').distinct().count()
-            
-            monthly_data.append({
-                'month': month_start.strftime('%Y-%m'),
-                'total_words': total_words,
-                'total_sessions': total_sessions,
-                'total_time': round(total_time, 2),
-                'average_accuracy': round(average_accuracy, 2),
-                'active_days': active_days
-            })
-        
-        monthly_data.reverse()  # 按时间正序排列
-        serializer = MonthlyStatisticsSerializer(monthly_data, many=True)
-        return Response(serializer.data)
+        return Response(monthly_statistics_data(request.user.pk, request.query_params))
     
     @action(detail=False, methods=['get'])
     def mastery_distribution(self, request):
         """获取单词掌握分布"""
-        user = request.user
-        
-        # 获取用户所有单词
-        user_words = Word.objects.filter(user=user)
-        total_words = user_words.count()
-        
-        if total_words == 0:
-            return Response([])
-        
-        # 统计各掌握级别的单词数量
-        distribution = {
-            '未学习': 0,
-            '初学': 0,
-            '熟悉': 0,
-            '掌握': 0,
-            '精通': 0
-        }
-        
-        # 根据学习记录统计掌握程度
-        for word in user_words:
-            records = WordLearningRecord.objects.filter(
-                session__user=user,
-                word=word
-            )
-            
-            if not records.exists():
-                distribution['未学习'] += 1
-            else:
-                correct_count = records.filter(is_correct=True).count()
-                total_count = records.count()
-                
-                if correct_count == 0:
-                    distribution['初学'] += 1
-                elif correct_count < 3:
-                    distribution['初学'] += 1
-                elif correct_count < 6:
-                    distribution['熟悉'] += 1
-                elif correct_count < 10:
-                    distribution['掌握'] += 1
-                else:
-                    distribution['精通'] += 1
-        
-        # 转换为序列化器格式
-        result = []
-        for level, count in distribution.items():
-            percentage = (count / total_words * 100) if total_words > 0 else 0
-            result.append({
-                'mastery_level': level,
-                'word_count': count,
-                'percentage': round(percentage, 2)
-            })
-        
-        serializer = WordMasteryDistributionSerializer(result, many=True)
-        return Response(serializer.data)
+        return Response(mastery_distribution_data(request.user.pk, request.query_params))
     
     @action(detail=False, methods=['get'])
     def goal_progress(self, request):
         """获取学习目标进度"""
-        user = request.user
-        goals = LearningGoal.objects.filter(user=user, is_active=True)
-        
-        progress_data = []
-        for goal in goals:
-            # 目标单词数
-            target_words = goal.target_words_count
-            current_words = GoalWord.objects.filter(goal=goal).count()
-            
-            # 完成率
-            completion_rate = (current_words / target_words * 100) if target_words > 0 else 0
-            
-            # 剩余天数
-            today = timezone.now().date()
-            days_remaining = (goal.end_date - today).days if goal.end_date > today else 0
-            
-            # 是否按计划进行
-            total_days = (goal.end_date - goal.start_date).days
-            elapsed_days = (today - goal.start_date).days
-            expected_progress = (elapsed_days / total_days * 100) if total_days > 0 else 0
-            is_on_track = completion_rate >= expected_progress
-            
-            progress_data.append({
-                'goal_id': goal.pk,
-                'goal_name': goal.name,
-                'target_words': target_words,
-                'current_words': current_words,
-                'completion_rate': round(completion_rate, 2),
-                'days_remaining': days_remaining,
-                'is_on_track': is_on_track
-            })
-        
-        serializer = LearningGoalProgressSerializer(progress_data, many=True)
-        return Response(serializer.data)
+        return Response(goal_progress_data(request.user.pk, request.query_params))
     
     @action(detail=False, methods=['post'])
     def export_data(self, request):
@@ -393,7 +408,7 @@ class AnalyticsViewSet(viewsets.GenericViewSet):
         
         # 根据数据类型获取数据
         if data_type == 'words':
-            queryset = Word.objects.filter(user=user)
+            queryset = Word.objects.filter(goalword__goal__user=user).distinct()
             if date_from:
                 queryset = queryset.filter(created_at__date__gte=date_from)
             if date_to:
@@ -417,7 +432,7 @@ class AnalyticsViewSet(viewsets.GenericViewSet):
             ))
             
         elif data_type == 'records':
-            queryset = WordLearningRecord.objects.filter(session__user=user)
+            queryset = WordLearningRecord.objects.filter(user=user)
             if date_from:
                 queryset = queryset.filter(created_at__date__gte=date_from)
             if date_to:
@@ -462,28 +477,35 @@ class AnalyticsViewSet(viewsets.GenericViewSet):
     
     @action(detail=False, methods=['get'])
     def comprehensive(self, request):
-        """获取综合分析数据"""
-        # 调用其他方法获取各部分数据
-        overview_response = self.overview(request)
-        weekly_response = self.weekly_progress(request)
-        monthly_response = self.monthly_statistics(request)
-        mastery_response = self.mastery_distribution(request)
-        goal_response = self.goal_progress(request)
-        
-        # 组合数据
-        comprehensive_data = {
-            'overview': overview_response.data,
-            'weekly_progress': weekly_response.data,
-            'monthly_statistics': monthly_response.data,
-            'mastery_distribution': mastery_response.data,
-            'goal_progress': goal_response.data,
+        """获取综合分析数据（按用户数据版本缓存快照）"""
+        user_id = request.user.pk
+        params = request.query_params.dict()
+        data = dashboard_snapshot_cache.get_or_build(
+            'analytics_comprehensive',
+            user_id,
+            lambda: AnalyticsViewSet._build_comprehensive_data(user_id, params),
+            variant=params
+        )
+        return Response(data)
+    
+    @staticmethod
+    def _build_comprehensive_data(user_id, params):
+        """
+        计算综合分析数据
+
+        可能在后台线程中执行（响应已返回之后），因此只依赖用户ID和查询参数。
+        """
+        return {
+            'overview': overview_data(user_id, params),
+            'weekly_progress': weekly_progress_data(user_id, params),
+            'monthly_statistics': monthly_statistics_data(user_id, params),
+            'mastery_distribution': mastery_distribution_data(user_id, params),
+            'goal_progress': goal_progress_data(user_id, params),
             'study_patterns': [],  # 可以后续扩展
             'weekday_activity': [],  # 可以后续扩展
             'difficulty_analysis': [],  # 可以后续扩展
             'learning_trends': []  # 可以后续扩展
         }
-        
-        return Response(comprehensive_data)
 
     @action(detail=False, methods=['get'])
     def user_engagement_metrics(self, request):
@@ -583,7 +605,7 @@ class AnalyticsViewSet(viewsets.GenericViewSet):
                     preferred_time = '晚上'
                 
                 # 计算正确率
-                records = WordLearningRecord.objects.filter(session__user=user)
+                records = WordLearningRecord.objects.filter(user=user)
                 if records.exists():
                     correct_rate = records.filter(is_correct=True).count() / records.count()
                 else:
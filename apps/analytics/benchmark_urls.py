@@ -0,0 +1,20 @@
+"""
+基准测试使用的 URL 配置
+
+只挂载基准用例涉及的接口，教学和菜单接口的路径与正式路由一致；
+权限菜单视图直接挂载，不依赖 permissions 的 URL 模块能否完整导入。
+"""
+from django.urls import include, path
+
+from apps.permissions.api.menu_api import check_menu_permission, get_user_navigation_menus
+from apps.permissions.api_views import get_frontend_menus_for_user, get_menu_version
+
+urlpatterns = [
+    path('api/teaching/', include('apps.teaching.urls')),
+    path('api/analytics/', include('apps.analytics.urls')),
+    path('api/article-factory/', include('apps.article_factory.urls')),
+    path('api/menu/version/', get_menu_version, name='menu_version'),
+    path('api/permissions/api/navigation-menus/', get_user_navigation_menus, name='navigation_menus'),
+    path('api/permissions/api/frontend-menus/', get_frontend_menus_for_user, name='get_frontend_menus_for_user'),
+    path('api/permissions/api/check-menu-permission/', check_menu_permission, name='check_menu_permission'),
+]
@@ -0,0 +1,176 @@
+"""
+热点接口基准用例与数据集生成
+
+seed_dataset 按 学生数 × 单词数 × 每个学生的学习记录数 生成可复现的数据集（相同 seed 得到相同数据），
+下方用 @benchmark 登记推荐、统计分析、掌握分布、菜单、权限检查和文章解析等接口的基准用例。
+"""
+import random
+from datetime import timedelta
+from typing import Any, Dict
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.utils import timezone
+
+from apps.accounts.models import UserRole
+from apps.article_factory.models import Article
+from apps.permissions.models import MenuModuleConfig, MenuValidity
+from apps.teaching.models import GoalWord, LearningGoal, LearningSession, WordLearningRecord
+from apps.words.models import Word
+from utils.benchmarking import BenchmarkContext, benchmark
+
+User = get_user_model()
+
+BATCH_SIZE = 1000
+RECORDS_PER_SESSION = 20
+
+
+def seed_dataset(students: int, words: int, records: int, seed: int = 42) -> Dict[str, Any]:
+    """生成基准数据集，返回学生和相关对象ID"""
+    rng = random.Random(seed)
+    now = timezone.now()
+    prefix = f'bench{seed}'
+
+    word_objects = Word.objects.bulk_create(
+        [Word(word=f'{prefix}_word_{index}', tags='benchmark') for index in range(words)],
+        batch_size=BATCH_SIZE,
+    )
+
+    password = make_password(None)
+    users = User.objects.bulk_create([
+        User(username=f'{prefix}_student_{index}', password=password, role=UserRole.STUDENT)
+        for index in range(students)
+    ], batch_size=BATCH_SIZE)
+
+    goals = LearningGoal.objects.bulk_create([
+        LearningGoal(
+            user=user, name=f'{prefix} 目标', is_current=True,
+            total_words=words, target_words_count=words,
+            start_date=(now - timedelta(days=30)).date(), end_date=(now + timedelta(days=60)).date(),
+        )
+        for user in users
+    ], batch_size=BATCH_SIZE)
+
+    GoalWord.objects.bulk_create(
+        (GoalWord(goal=goal, word=word) for goal in goals for word in word_objects),
+        batch_size=BATCH_SIZE,
+    )
+
+    # 会话和记录时间分布在最近 30 天内，auto_now_add 字段在创建后批量回写
+    session_count = max(1, records // RECORDS_PER_SESSION)
+    sessions = LearningSession.objects.bulk_create([
+        LearningSession(user=user, goal=goal)
+        for user, goal in zip(users, goals)
+        for _ in range(session_count)
+    ], batch_size=BATCH_SIZE)
+    for session in sessions:
+        session.start_time = now - timedelta(minutes=rng.randint(0, 30 * 24 * 60))
+        session.end_time = session.start_time + timedelta(minutes=rng.randint(5, 40))
+    LearningSession.objects.bulk_update(sessions, ['start_time', 'end_time'], batch_size=BATCH_SIZE)
+
+    learning_records = []
+    for index, user in enumerate(users):
+        user_sessions = sessions[index * session_count:(index + 1) * session_count]
+        for _ in range(records):
+            session = rng.choice(user_sessions)
+            learning_records.append(WordLearningRecord(
+                session=session, user=user, goal_id=session.goal_id,
+                word=rng.choice(word_objects),
+                user_answer='answer', is_correct=rng.random() < 0.7,
+                response_time=round(rng.uniform(0.5, 8.0), 2),
+            ))
+    learning_records = WordLearningRecord.objects.bulk_create(learning_records, batch_size=BATCH_SIZE)
+    for record in learning_records:
+        record.created_at = record.session.start_time + timedelta(seconds=rng.randint(0, 600))
+    WordLearningRecord.objects.bulk_update(learning_records, ['created_at'], batch_size=BATCH_SIZE)
+
+    sample_words = ' '.join(word.word for word in word_objects[:50])
+    articles = Article.objects.bulk_create([
+        Article(
+            user=user, title=f'{prefix} article',
+            content='\n\n'.join(f'Paragraph {index}: {sample_words}.' for index in range(5)),
+        )
+        for user in users
+    ], batch_size=BATCH_SIZE)
+
+    # 菜单权限检查需要一个有效菜单，没有启用的菜单时创建一个并对学生角色开放
+    menu_key = MenuModuleConfig.objects.filter(is_active=True).values_list('key', flat=True).first()
+    if menu_key is None:
+        menu = MenuModuleConfig.objects.create(key=f'{prefix}_menu', name=f'{prefix} 菜单', url=f'/{prefix}/')
+        MenuValidity.objects.create(role=UserRole.STUDENT, menu_module=menu, is_valid=True)
+        menu_key = menu.key
+
+    return {
+        'users': users,
+        'articles': {article.user_id: article.pk for article in articles},
+        'menu_key': menu_key,
+        'counts': {
+            'students': len(users),
+            'words': len(word_objects),
+            'goal_words': len(goals) * len(word_objects),
+            'sessions': len(sessions),
+            'records': len(learning_records),
+        },
+    }
+
+
+@benchmark(
+    'recommendation', '个性化单词推荐（推荐服务）',
+    skip='推荐服务导入了不存在的 WordLearningProgress 模型，模块无法导入',
+)
+def recommendation(ctx: BenchmarkContext):
+    # 推荐服务尚未暴露接口，直接调用服务层
+    from apps.teaching.services.recommendation_service import SmartWordRecommendationService
+    return SmartWordRecommendationService(ctx.user).get_personalized_recommendations(count=20)
+
+
+@benchmark('teaching_statistics_overview', '教学统计概览')
+def teaching_statistics_overview(ctx: BenchmarkContext):
+    return ctx.client.get('/api/teaching/statistics/overview/')
+
+
+@benchmark('analytics_comprehensive', '综合学习分析')
+def analytics_comprehensive(ctx: BenchmarkContext):
+    return ctx.client.get('/api/analytics/api/analytics/comprehensive/')
+
+
+@benchmark('analytics_mastery_distribution', '单词掌握分布')
+def analytics_mastery_distribution(ctx: BenchmarkContext):
+    return ctx.client.get('/api/analytics/api/analytics/mastery_distribution/')
+
+
+@benchmark('menu_version', '菜单版本')
+def menu_version(ctx: BenchmarkContext):
+    return ctx.client.get('/api/menu/version/')
+
+
+@benchmark('navigation_menus', '用户导航菜单')
+def navigation_menus(ctx: BenchmarkContext):
+    return ctx.client.get('/api/permissions/api/navigation-menus/')
+
+
+@benchmark('frontend_menus', '前端菜单配置')
+def frontend_menus(ctx: BenchmarkContext):
+    return ctx.client.get('/api/permissions/api/frontend-menus/')
+
+
+@benchmark('check_menu_permission', '菜单权限检查')
+def check_menu_permission(ctx: BenchmarkContext):
+    return ctx.client.post(
+        '/api/permissions/api/check-menu-permission/',
+        {'menu_key': ctx.data['menu_key']},
+        content_type='application/json',
+    )
+
+
+@benchmark(
+    'article_parse', '文章解析',
+    skip='解析流程读取 Word 上已不存在的 part_of_speech 等字段，并依赖本地 NLTK 词性标注数据',
+)
+def article_parse(ctx: BenchmarkContext):
+    article_id = ctx.data['articles'][ctx.user.pk]
+    return ctx.client.post(
+        f'/api/article-factory/api/articles/{article_id}/parse_article/',
+        {'enable_paragraph_analysis': True, 'enable_tooltips': True},
+        content_type='application/json',
+    )
@@ -0,0 +1,64 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.analytics.query_plans import HOT_QUERIES, audit_hot_queries
+
+
+class Command(BaseCommand):
+    help = '对登记的热点查询执行 EXPLAIN，标记全表扫描和临时排序'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--query',
+            action='append',
+            dest='queries',
+            help='只审计指定名称的查询，可重复使用'
+        )
+        parser.add_argument(
+            '--show-plan',
+            action='store_true',
+            help='输出完整执行计划'
+        )
+        parser.add_argument(
+            '--fail-on-scan',
+            action='store_true',
+            help='存在全表扫描时以错误退出（用于 CI）'
+        )
+        parser.add_argument(
+            '--list',
+            action='store_true',
+            help='列出登记的热点查询'
+        )
+
+    def handle(self, *args, **options):
+        if options['list']:
+            for query in HOT_QUERIES:
+                self.stdout.write(f'{query.name}: {query.description}')
+            return
+
+        results = audit_hot_queries(options['queries'])
+        if not results:
+            raise CommandError('没有匹配的热点查询，使用 --list 查看登记的查询')
+
+        flagged = 0
+        for result in results:
+            if result['full_scans']:
+                flagged += 1
+                self.stdout.write(self.style.ERROR(
+                    f"❌ {result['name']}: 全表扫描 {', '.join(result['full_scans'])}"
+                ))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"✅ {result['name']}: 命中索引"))
+
+            if result['temp_sort']:
+                self.stdout.write(self.style.WARNING('   ⚠️ 排序未命中索引，使用临时排序'))
+
+            if options['show_plan']:
+                self.stdout.write(f"   {result['description']}")
+                self.stdout.write(f"   SQL: {result['sql']}")
+                for line in result['plan'].splitlines():
+                    self.stdout.write(f'   {line}')
+
+        self.stdout.write(f'\n📊 共审计 {len(results)} 条查询，{flagged} 条存在全表扫描')
+
+        if flagged and options['fail_on_scan']:
+            raise CommandError(f'{flagged} 条热点查询存在全表扫描')
@@ -0,0 +1,117 @@
+import json
+from collections import Counter, defaultdict
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from utils.query_profiling import get_config
+
+
+def percentile(values, pct):
+    """最近秩法百分位数"""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = '汇总查询剖析日志，列出查询次数或耗时最差的端点'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--file',
+            help='剖析日志路径，默认使用 QUERY_PROFILING["LOG_FILE"]'
+        )
+        parser.add_argument(
+            '--sort',
+            choices=['queries', 'wall', 'db', 'violations'],
+            default='queries',
+            help='排序依据：p95 查询次数、p95 总耗时、p95 数据库耗时或超预算次数'
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=20,
+            help='输出的端点数量'
+        )
+        parser.add_argument(
+            '--since',
+            type=float,
+            default=None,
+            help='只统计该 Unix 时间戳之后的记录'
+        )
+
+    def handle(self, *args, **options):
+        path = options['file'] or get_config()['LOG_FILE']
+        if not path or not Path(path).exists():
+            raise CommandError(f'剖析日志不存在: {path}')
+
+        endpoints = defaultdict(lambda: {
+            'queries': [], 'wall_ms': [], 'db_ms': [], 'violations': 0,
+            'budget': None, 'duplicates': Counter(),
+        })
+        skipped = 0
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    skipped += 1
+                    continue
+                if options['since'] and record.get('ts', 0) < options['since']:
+                    continue
+
+                stats = endpoints[record['endpoint']]
+                stats['queries'].append(record['queries'])
+                stats['wall_ms'].append(record['wall_ms'])
+                stats['db_ms'].append(record['db_ms'])
+                stats['violations'] += 1 if record.get('over_budget') else 0
+                stats['budget'] = record.get('budget')
+                for duplicate in record.get('duplicates', []):
+                    stats['duplicates'][duplicate['fingerprint']] += duplicate['count']
+
+        if not endpoints:
+            self.stdout.write(self.style.WARNING('⚠️ 剖析日志中没有记录'))
+            return
+
+        rows = []
+        for endpoint, stats in endpoints.items():
+            rows.append({
+                'endpoint': endpoint,
+                'requests': len(stats['queries']),
+                'avg_queries': sum(stats['queries']) / len(stats['queries']),
+                'p95_queries': percentile(stats['queries'], 95),
+                'max_queries': max(stats['queries']),
+                'p95_wall': percentile(stats['wall_ms'], 95),
+                'p95_db': percentile(stats['db_ms'], 95),
+                'violations': stats['violations'],
+                'budget': stats['budget'],
+                'top_duplicate': stats['duplicates'].most_common(1),
+            })
+
+        sort_key = {
+            'queries': 'p95_queries',
+            'wall': 'p95_wall',
+            'db': 'p95_db',
+            'violations': 'violations',
+        }[options['sort']]
+        rows.sort(key=lambda row: row[sort_key], reverse=True)
+
+        total = sum(row['requests'] for row in rows)
+        self.stdout.write(f'📊 共 {total} 条采样记录，{len(rows)} 个端点（按 {options["sort"]} 排序）\n')
+        header = f'{"端点":<50} {"请求":>6} {"平均查询":>8} {"P95查询":>8} {"最大":>6} {"预算":>6} {"超预算":>6} {"P95耗时ms":>10} {"P95DBms":>9}'
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for row in rows[:options['limit']]:
+            line = (
+                f'{row["endpoint"][:50]:<50} {row["requests"]:>6} {row["avg_queries"]:>8.1f} '
+                f'{row["p95_queries"]:>8} {row["max_queries"]:>6} {str(row["budget"] or "-"):>6} '
+                f'{row["violations"]:>6} {row["p95_wall"]:>10.1f} {row["p95_db"]:>9.1f}'
+            )
+            self.stdout.write(self.style.ERROR(line) if row['violations'] else line)
+            if row['top_duplicate']:
+                sql, count = row['top_duplicate'][0]
+                self.stdout.write(f'    ↳ 重复查询 {count} 次: {sql[:120]}')
+
+        if skipped:
+            self.stdout.write(self.style.WARNING(f'\n⚠️ 跳过 {skipped} 行无法解析的记录'))
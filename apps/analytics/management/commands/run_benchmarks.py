@@ -0,0 +1,138 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client, override_settings
+
+from apps.analytics.benchmarks import seed_dataset
+from utils.benchmarking import (
+    BENCHMARKS, BenchmarkContext, BenchmarkRunner,
+    build_baseline, compare_results, load_baseline, save_baseline,
+)
+
+
+class Command(BaseCommand):
+    help = '生成基准数据集并测量热点接口的延迟和查询次数，可保存基线并与历史基线对比（会清空缓存，勿在生产环境运行）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=20, help='学生数量')
+        parser.add_argument('--words', type=int, default=200, help='单词数量（每个学生的目标都包含全部单词）')
+        parser.add_argument('--records', type=int, default=200, help='每个学生的学习记录数量')
+        parser.add_argument('--seed', type=int, default=42, help='随机种子，相同参数生成相同数据集')
+        parser.add_argument('--iterations', type=int, default=20, help='每个用例的测量次数')
+        parser.add_argument('--warmup', type=int, default=2, help='每个用例的预热次数（不计入结果）')
+        parser.add_argument('--cold-cache', action='store_true', help='每次迭代前清空缓存，测量缓存未命中的情况')
+        parser.add_argument(
+            '--benchmark',
+            action='append',
+            dest='benchmarks',
+            help='只运行指定用例，可重复使用'
+        )
+        parser.add_argument('--output', help='把结果保存为 JSON 基线')
+        parser.add_argument('--compare', help='与指定的 JSON 基线对比')
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=0.2,
+            help='p95 延迟增幅超过该比例视为回退（默认 0.2）'
+        )
+        parser.add_argument(
+            '--min-delta-ms',
+            type=float,
+            default=2.0,
+            help='p95 延迟绝对增量低于该值时不视为回退（过滤测量抖动）'
+        )
+        parser.add_argument('--fail-on-regression', action='store_true', help='存在回退时以错误退出（用于 CI）')
+        parser.add_argument('--keep-data', action='store_true', help='保留生成的数据集（默认运行结束后回滚）')
+        parser.add_argument('--list', action='store_true', help='列出登记的基准用例')
+
+    def handle(self, *args, **options):
+        if options['list']:
+            for bench in BENCHMARKS.values():
+                self.stdout.write(f'{bench.name}: {bench.description}')
+            return
+
+        unknown = set(options['benchmarks'] or []) - set(BENCHMARKS)
+        if unknown:
+            raise CommandError(f'未知的基准用例: {", ".join(sorted(unknown))}，使用 --list 查看')
+
+        baseline = load_baseline(options['compare']) if options['compare'] else None
+
+        with transaction.atomic():
+            started = time.perf_counter()
+            dataset = seed_dataset(options['students'], options['words'], options['records'], options['seed'])
+            counts = dataset['counts']
+            self.stdout.write(
+                f"🌱 数据集: {counts['students']} 学生 × {counts['words']} 单词，"
+                f"{counts['sessions']} 个会话，{counts['records']} 条学习记录 "
+                f"（{time.perf_counter() - started:.1f}s）"
+            )
+
+            # 回滚后主键会被复用，清空缓存避免命中上一次运行留下的快照
+            cache.clear()
+
+            context = BenchmarkContext(client=Client(), users=dataset['users'], data=dataset)
+            runner = BenchmarkRunner(options['iterations'], options['warmup'], options['cold_cache'])
+            # 测试客户端以 testserver 作为 Host 发起请求，需加入允许的主机
+            with override_settings(
+                ROOT_URLCONF='apps.analytics.benchmark_urls',
+                ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+            ):
+                results = runner.run_all(context, options['benchmarks'], on_result=self._print_result)
+
+            if not options['keep_data']:
+                transaction.set_rollback(True)
+
+        current = build_baseline(results, {
+            'dataset': {key: options[key] for key in ('students', 'words', 'records', 'seed')},
+            'iterations': options['iterations'],
+            'warmup': options['warmup'],
+            'cold_cache': options['cold_cache'],
+        })
+
+        if options['output']:
+            save_baseline(options['output'], current)
+            self.stdout.write(self.style.SUCCESS(f"💾 基线已保存: {options['output']}"))
+
+        if baseline:
+            self._print_comparison(baseline, current, options)
+
+    def _print_result(self, result):
+        if result['status'] == 'skipped':
+            self.stdout.write(self.style.WARNING(f"⏭️ {result['name']}: 跳过（{result['reason']}）"))
+            return
+        if result['status'] != 'ok':
+            self.stdout.write(self.style.ERROR(f"❌ {result['name']}: {result['error']}"))
+            return
+        self.stdout.write(
+            f"✅ {result['name']:<32} p50 {result['p50_ms']:>9.2f}ms  p95 {result['p95_ms']:>9.2f}ms  "
+            f"查询 {result['queries_p50']}（最多 {result['queries_max']}）"
+        )
+
+    def _print_comparison(self, baseline, current, options):
+        meta = baseline.get('meta', {})
+        self.stdout.write(f"\n📊 对比基线 {options['compare']}（提交 {meta.get('git_revision') or '未知'}）")
+        if meta.get('dataset') != current['meta']['dataset']:
+            self.stdout.write(self.style.WARNING('⚠️ 两次运行的数据集参数不同，结果仅供参考'))
+
+        changes = compare_results(baseline, current, options['threshold'], options['min_delta_ms'])
+        regressions = [change for change in changes if change['regression']]
+        for change in changes:
+            if change['status'] != 'ok':
+                self.stdout.write(f"   {change['name']}: 无可比较的结果（{change['status']}）")
+                continue
+            line = (
+                f"   {change['name']:<32} p95 {change['p95_before']:.2f} → {change['p95_after']:.2f}ms "
+                f"({change['p95_change']:+.1%})  查询 {change['queries_before']} → {change['queries_after']}"
+            )
+            self.stdout.write(self.style.ERROR(line) if change['regression'] else line)
+
+        if regressions:
+            message = f'{len(regressions)} 个用例出现性能回退'
+            if options['fail_on_regression']:
+                raise CommandError(message)
+            self.stdout.write(self.style.WARNING(f'⚠️ {message}'))
+        else:
+            self.stdout.write(self.style.SUCCESS('✅ 未发现性能回退'))
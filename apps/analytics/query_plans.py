@@ -0,0 +1,128 @@
+"""
+热点查询执行计划审计
+
+登记教学、统计、资源授权模块中的高频查询，用 EXPLAIN 检查是否命中索引，
+全表扫描（SQLite 的 SCAN <表>、PostgreSQL 的 Seq Scan）会被标记出来。
+新增高频查询时在 HOT_QUERIES 中登记，由 audit_query_plans 命令统一审计。
+"""
+import re
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Callable, Dict, List
+
+from django.db import connections
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from apps.analytics.models import UserEngagementMetrics
+from apps.resource_authorization.models import ResourceAuthorization, ResourceUsageAnalytics
+from apps.teaching.models import LearningGoal, LearningSession, WordLearningRecord
+from apps.words.models import Word
+
+# SQLite: "SCAN teaching_wordlearningrecord"，带 USING INDEX 的是索引扫描
+SQLITE_FULL_SCAN = re.compile(r'\bSCAN (?:TABLE )?(\w+)(?! USING)(?:\s|$)')
+POSTGRES_FULL_SCAN = re.compile(r'Seq Scan on (\w+)')
+TEMP_SORT = re.compile(r'USE TEMP B-TREE FOR ORDER BY|Sort Method: external', re.IGNORECASE)
+
+
+@dataclass
+class HotQuery:
+    """登记的热点查询"""
+    name: str
+    description: str
+    build: Callable[[Dict[str, int]], QuerySet]
+
+
+def _since(days: int):
+    return timezone.now() - timedelta(days=days)
+
+
+HOT_QUERIES: List[HotQuery] = [
+    HotQuery(
+        'records_by_user_recent',
+        '用户近 30 天学习记录（推荐服务、统计接口）',
+        lambda ids: WordLearningRecord.objects.filter(user_id=ids['user'], created_at__gte=_since(30)),
+    ),
+    HotQuery(
+        'records_by_user_wrong',
+        '用户答错的学习记录（弱点分析）',
+        lambda ids: WordLearningRecord.objects.filter(user_id=ids['user'], is_correct=False),
+    ),
+    HotQuery(
+        'records_by_goal_word',
+        '目标内单个单词的学习记录',
+        lambda ids: WordLearningRecord.objects.filter(goal_id=ids['goal'], word_id=ids['word']),
+    ),
+    HotQuery(
+        'sessions_by_user_started',
+        '用户时间段内开始的学习会话',
+        lambda ids: LearningSession.objects.filter(user_id=ids['user'], start_time__gte=_since(7)),
+    ),
+    HotQuery(
+        'sessions_by_user_finished',
+        '用户已结束的学习会话',
+        lambda ids: LearningSession.objects.filter(user_id=ids['user'], end_time__gte=_since(30)),
+    ),
+    HotQuery(
+        'engagement_by_user_date',
+        '用户粘性指标按日期查询',
+        lambda ids: UserEngagementMetrics.objects.filter(user_id=ids['user'], date__gte=_since(30).date()),
+    ),
+    HotQuery(
+        'usage_by_authorization_recent',
+        '资源授权近 30 天使用记录',
+        lambda ids: ResourceUsageAnalytics.objects.filter(
+            authorization_id=ids['authorization'], timestamp__gte=_since(30)
+        ),
+    ),
+]
+
+
+def sample_ids() -> Dict[str, int]:
+    """取真实存在的主键作为查询参数，表为空时用占位值（执行计划不依赖数据）"""
+    def first_pk(model):
+        return model.objects.order_by('pk').values_list('pk', flat=True).first() or 1
+
+    goal = LearningGoal.objects.order_by('pk').values('pk', 'user_id').first()
+    return {
+        'user': goal['user_id'] if goal else 1,
+        'goal': goal['pk'] if goal else 1,
+        'word': first_pk(Word),
+        'authorization': first_pk(ResourceAuthorization),
+    }
+
+
+def explain_query(queryset: QuerySet) -> Dict[str, object]:
+    """执行 EXPLAIN，返回执行计划文本、全表扫描的表和是否使用临时排序"""
+    vendor = connections[queryset.db].vendor
+    plan = queryset.explain()
+
+    if vendor == 'sqlite':
+        full_scans = SQLITE_FULL_SCAN.findall(plan)
+    elif vendor == 'postgresql':
+        full_scans = POSTGRES_FULL_SCAN.findall(plan)
+    else:
+        full_scans = []
+
+    return {
+        'plan': plan,
+        'full_scans': sorted(set(full_scans)),
+        'temp_sort': bool(TEMP_SORT.search(plan)),
+    }
+
+
+def audit_hot_queries(names: List[str] = None) -> List[Dict[str, object]]:
+    """审计登记的热点查询"""
+    ids = sample_ids()
+    results = []
+    for query in HOT_QUERIES:
+        if names and query.name not in names:
+            continue
+        queryset = query.build(ids)
+        results.append({
+            'name': query.name,
+            'description': query.description,
+            'sql': str(queryset.query),
+            **explain_query(queryset),
+        })
+    return results
@@ -0,0 +1 @@
+# Analytics Tests package
@@ -0,0 +1,60 @@
+"""
+综合分析数据测试
+
+综合分析快照可能在后台线程中重建，只依赖用户ID和查询参数；
+各部分结果与对应统计接口的响应一致。
+"""
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from apps.analytics.api_views import AnalyticsViewSet
+from apps.teaching.models import GoalWord, LearningGoal, LearningSession, WordLearningRecord
+from apps.words.models import Word
+
+User = get_user_model()
+
+
+class ComprehensiveDataTest(TestCase):
+    """综合分析数据与各统计接口"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='analytics_student')
+        today = timezone.now().date()
+        goal = LearningGoal.objects.create(
+            user=cls.user, name='四级词汇', target_words_count=4,
+            start_date=today - timedelta(days=2), end_date=today + timedelta(days=5),
+        )
+        words = Word.objects.bulk_create([Word(word=f'analytics_{index}') for index in range(3)])
+        GoalWord.objects.bulk_create([GoalWord(goal=goal, word=word) for word in words])
+        session = LearningSession.objects.create(user=cls.user, goal=goal)
+        WordLearningRecord.objects.bulk_create([
+            WordLearningRecord(session=session, user=cls.user, goal=goal, word=words[0], user_answer='a', is_correct=True, response_time=1.0),
+            WordLearningRecord(session=session, user=cls.user, goal=goal, word=words[1], user_answer='b', is_correct=False, response_time=2.0),
+        ])
+
+    def call_action(self, name, params):
+        request = APIRequestFactory().get('/', params)
+        force_authenticate(request, user=self.user)
+        response = AnalyticsViewSet.as_view({'get': name})(request)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_sections_match_actions(self):
+        params = {'weeks': '2', 'months': '1'}
+        data = AnalyticsViewSet._build_comprehensive_data(self.user.pk, params)
+        for name in ('overview', 'weekly_progress', 'monthly_statistics', 'mastery_distribution', 'goal_progress'):
+            with self.subTest(section=name):
+                self.assertEqual(data[name], self.call_action(name, params))
+        self.assertEqual(data['overview']['learned_words'], 2)
+        self.assertEqual(len(data['weekly_progress']), 2)
+        self.assertEqual(data['goal_progress'][0]['current_words'], 3)
+
+    def test_comprehensive_action(self):
+        data = self.call_action('comprehensive', {'weeks': '1', 'months': '1'})
+        self.assertEqual(data['overview']['total_words'], 3)
+        self.assertEqual(len(data['weekly_progress']), 1)
@@ -9,6 +9,7 @@ from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from apps.permissions.models import MenuModuleConfig, MenuValidity, RoleSlotMenuAssignment, RoleManagement
 from apps.accounts.models import UserRole
+from apps.permissions.menu_artifacts import MenuArtifactService
 import logging
 import json
 
@@ -22,41 +23,13 @@ User = get_user_model()
 def get_user_menu_permissions(request):
     """
     获取当前用户的菜单权限
-    返回用户可访问的菜单列表
+    返回用户可访问的菜单列表，使用预编译的角色菜单产物并支持 ETag/304
     """
     user = request.user
     
     try:
-        # 超级管理员获取所有菜单
-        if user.is_superuser:
-            menus = MenuModuleConfig.objects.filter(is_active=True).order_by('sort_order')
-            menu_list = []
-            all_permissions = {}
-            
-            for menu in menus:
-                menu_list.append({
-                    'key': menu.key,
-                    'name': menu.name,
-                    'menu_level': menu.menu_level,
-                    'icon': menu.icon,
-                    'url': menu.url,
-                    'sort_order': menu.sort_order,
-                    'can_access': True
-                })
-                # 超级管理员拥有所有权限
-                all_permissions[menu.key] = True
-            
-            return Response({
-                'success': True,
-                'menus': menu_list,
-                'all_permissions': all_permissions,
-                'user_role': 'admin',
-                'is_superuser': True
-            })
-        
-        # 普通用户根据角色权限获取菜单
         user_role = getattr(user, 'role', None)
-        if not user_role:
+        if not user.is_superuser and not user_role:
             return Response({
                 'success': False,
                 'message': '用户角色未设置',
@@ -64,47 +37,30 @@ def get_user_menu_permissions(request):
                 'user_role': None
             })
         
-        # 获取用户可访问的菜单 - 使用 MenuValidity 和 RoleSlotMenuAssignment
-        
-        try:
-            role_management = RoleManagement.objects.get(role_name=user_role)
-        except RoleManagement.DoesNotExist:
-            return Response({
-                'success': False,
-                'message': f'角色 {user_role} 未找到',
-                'menus': [],
-                'user_role': user_role
-            })
-        
-        # 获取角色可访问的菜单
-        valid_menus = MenuModuleConfig.objects.filter(
-            is_active=True,
-            menuvalidity__role=role_management,
-            menuvalidity__is_valid=True
-        ).order_by('sort_order')
+        # 超级管理员获取所有菜单，普通用户根据 MenuValidity 获取角色菜单
+        artifact = MenuArtifactService.get_role_artifact(None if user.is_superuser else user_role)
         
-        menu_list = []
-        all_permissions = {}
-        
-        for menu in valid_menus:
-            menu_list.append({
-                'key': menu.module_name,
-                'name': menu.display_name,
-                'menu_level': 1,
-                'icon': menu.icon,
-                'url': menu.url_pattern,
-                'sort_order': menu.sort_order,
+        def build_payload():
+            menu_list = [{
+                'key': menu['key'],
+                'name': menu['name'],
+                'menu_level': menu['menu_level'],
+                'icon': menu['icon'],
+                'url': menu['url'],
+                'sort_order': menu['sort_order'],
                 'can_access': True
-            })
-            all_permissions[menu.module_name] = True
+            } for menu in artifact['menus']]
+            
+            return {
+                'success': True,
+                'menus': menu_list,
+                'all_permissions': {menu['key']: True for menu in artifact['menus']},
+                'user_role': 'admin' if user.is_superuser else user_role,
+                'is_superuser': user.is_superuser
+            }
         
-        return Response({
-            'success': True,
-            'menus': menu_list,
-            'all_permissions': all_permissions,
-            'user_role': user_role,
-            'is_superuser': False
-        })
+        etag = MenuArtifactService.build_etag(artifact['checksum'], user.is_superuser, user_role)
+        return MenuArtifactService.conditional_response(request, etag, build_payload)
         
     except Exception as e:
         logger.error(f"获取用户菜单权限失败: {e}")
@@ -121,73 +77,26 @@ def get_user_menu_permissions(request):
 def get_user_navigation_menus(request):
     """
     获取用户导航菜单数据
-    返回适合前端导航栏渲染的菜单结构
+    返回适合前端导航栏渲染的菜单结构，使用预编译的角色菜单产物并支持 ETag/304
     """
     try:
         user = request.user
+        user_role = getattr(user, 'role', None)
         
-        # 获取用户可访问的菜单
+        # 超级管理员获取所有活跃菜单，普通用户根据MenuValidity获取菜单
         if user.is_superuser:
-            # 超级管理员获取所有活跃菜单
-            menus = MenuModuleConfig.objects.filter(is_active=True)
+            menus = MenuArtifactService.get_role_artifact(None)
+        elif user_role:
+            menus = MenuArtifactService.get_role_artifact(user_role)
         else:
-            # 普通用户根据MenuValidity获取菜单
-            user_role = getattr(user, 'role', None)
-            if user_role:
-                valid_menu_keys = MenuValidity.objects.filter(
-                    role=user_role,
-                    is_valid=True
-                ).values_list('menu_key', flat=True)
-                
-                menus = MenuModuleConfig.objects.filter(
-                    key__in=valid_menu_keys,
-                    is_active=True
-                )
-            else:
-                menus = MenuModuleConfig.objects.none()
-        
-        # 按菜单级别分组并构建层级结构
-        menu_data = {
-            'root_menus': [],
-            'level1_menus': [],
-            'level2_menus': []
-        }
+            menus = {'menus': [], 'checksum': ''}
         
-        # 分别获取不同级别的菜单
-        for menu in menus.order_by('sort_order', 'name'):
-            menu_item = {
-                'key': menu.key,
-                'name': menu.name,
-                'icon': menu.icon,
-                'url': menu.url,
-                'sort_order': menu.sort_order,
-                'menu_level': menu.menu_level,
-                'description': menu.description
-            }
-            
-            if menu.menu_level == 'root':
-                menu_data['root_menus'].append(menu_item)
-            elif menu.menu_level == 'level1':
-                menu_data['level1_menus'].append(menu_item)
-            elif menu.menu_level == 'level2':
-                menu_data['level2_menus'].append(menu_item)
-        
-        # 构建导航栏结构
-        navigation_structure = _build_navigation_structure(menu_data)
-        
-        return Response({
-            'success': True,
-            'data': {
-                'navigation': navigation_structure,
-                'user_info': {
-                    'username': user.username,
-                    'is_authenticated': True,
-                    'is_superuser': user.is_superuser,
-                    'role': getattr(user, 'role', None)
-                }
-            },
-            'message': '菜单数据获取成功'
-        })
+        etag = MenuArtifactService.build_etag(
+            menus['checksum'], user.username, user.is_superuser, user_role
+        )
+        return MenuArtifactService.conditional_response(
+            request, etag, lambda: _build_navigation_payload(user, menus['menus'])
+        )
         
     except Exception as e:
         logger.error(f"获取用户导航菜单失败: {str(e)}")
@@ -198,6 +107,49 @@ def get_user_navigation_menus(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+def _build_navigation_payload(user, menus):
+    """由菜单产物构建导航菜单响应体"""
+    # 按菜单级别分组并构建层级结构
+    menu_data = {
+        'root_menus': [],
+        'level1_menus': [],
+        'level2_menus': []
+    }
+    
+    for menu in menus:
+        menu_item = {
+            'key': menu['key'],
+            'name': menu['name'],
+            'icon': menu['icon'],
+            'url': menu['url'],
+            'sort_order': menu['sort_order'],
+            'menu_level': menu['menu_level'],
+            'description': menu['description']
+        }
+        
+        if menu['menu_level'] == 'root':
+            menu_data['root_menus'].append(menu_item)
+        elif menu['menu_level'] == 'level1':
+            menu_data['level1_menus'].append(menu_item)
+        elif menu['menu_level'] == 'level2':
+            menu_data['level2_menus'].append(menu_item)
+    
+    # 构建导航栏结构
+    return {
+        'success': True,
+        'data': {
+            'navigation': _build_navigation_structure(menu_data),
+            'user_info': {
+                'username': user.username,
+                'is_authenticated': True,
+                'is_superuser': user.is_superuser,
+                'role': getattr(user, 'role', None)
+            }
+        },
+        'message': '菜单数据获取成功'
+    }
+
+
 def _build_navigation_structure(menu_data):
     """
     构建导航栏结构
@@ -407,23 +359,18 @@ def check_menu_permission(request):
                 'has_permission': False
             })
         
-        # 使用 MenuValidity 检查权限
-        
-        try:
-            role_management = RoleManagement.objects.get(role_name=user_role)
-            has_permission = MenuValidity.objects.filter(
-                menu=menu,
-                role=role_management,
-                is_valid=True
-            ).exists()
-        except RoleManagement.DoesNotExist:
-            has_permission = False
+        # 使用 MenuValidity 检查权限（按角色标识与菜单关联）
+        has_permission = MenuValidity.objects.filter(
+            menu_module=menu,
+            role=user_role,
+            is_valid=True
+        ).exists()
         
         return Response({
             'success': True,
             'has_permission': has_permission,
             'menu_key': menu_key,
-            'menu_name': menu.display_name
+            'menu_name': menu.name
         })
             
     except Exception as e:
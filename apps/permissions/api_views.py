@@ -1,7 +1,7 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from django.contrib.auth.models import Group, Permission
 from django.db import transaction
 from django.shortcuts import get_object_or_404
@@ -10,6 +10,7 @@ import logging
 
 from .models import MenuModuleConfig, RoleGroupMapping, RoleManagement
 from .models_optimized import PermissionSyncLog
+from .menu_artifacts import MenuArtifactService
 from .serializers import (
     MenuModuleConfigSerializer, GroupSerializer,
     PermissionSerializer, RoleGroupMappingSerializer, PermissionSyncLogSerializer,
@@ -140,68 +141,15 @@ class PermissionViewSet(viewsets.ReadOnlyModelViewSet):
 def get_menu_version(request):
     """
     获取菜单版本信息
-    用于前端版本控制和同步检查
+    用于前端版本控制和同步检查，支持 If-None-Match 条件请求
     """
     try:
-        # 获取最新的菜单配置更新时间
-        from django.db.models import Max
-        from django.utils import timezone
-        import hashlib
-        import json
-        
-        # 获取菜单模块的最后更新时间
-        last_updated = MenuModuleConfig.objects.aggregate(
-            max_updated=Max('updated_at')
-        )['max_updated']
-        
-        if not last_updated:
-            last_updated = timezone.now()
-        
-        # 生成版本号（基于时间戳）
-        version = int(last_updated.timestamp())
-        
-        # 获取所有菜单配置用于生成校验和
-        menus = MenuModuleConfig.objects.filter(is_active=True).values(
-            'key', 'name', 'icon', 'url', 'sort_order', 'updated_at'
-        )
-        
-        # 生成配置校验和
-        menu_data = json.dumps(list(menus), sort_keys=True, default=str)
-        checksum = hashlib.md5(menu_data.encode()).hexdigest()
-        
-        # 获取最近的变更记录（如果有的话）
-        changes = []
-        try:
-            # 获取最近10条同步日志作为变更记录
-            sync_logs = PermissionSyncLog.objects.filter(
-                operation_type__in=['menu_sync', 'menu_update']
-            ).order_by('-created_at')[:10]
-            
-            for log in sync_logs:
-                changes.append({
-                    'type': 'update',
-                    'target': 'menu',
-                    'targetId': log.target_id or 'unknown',
-                    'targetName': log.description or '菜单更新',
-                    'timestamp': int(log.created_at.timestamp()),
-                    'author': log.user.username if log.user else 'system',
-                    'reason': log.description or '菜单配置更新'
-                })
-        except Exception as e:
-            logger.warning(f"获取变更记录失败: {str(e)}")
-        
-        version_info = {
-            'version': version,
-            'timestamp': int(last_updated.timestamp()),
-            'checksum': checksum,
-            'changes': changes,
-            'author': 'system',
-            'description': '菜单配置版本信息'
-        }
-        
-        return Response(version_info)
+        version_info = MenuArtifactService.get_version_artifact()
+        etag = MenuArtifactService.build_etag(version_info['version'], version_info['checksum'])
+        return MenuArtifactService.conditional_response(request, etag, lambda: version_info)
         
     except Exception as e:
+        from django.utils import timezone
         logger.error(f"获取菜单版本信息失败: {str(e)}")
         return Response({
             'version': 1,
@@ -213,12 +161,27 @@ def get_menu_version(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def get_websocket_stats(request):
+    """
+    获取当前进程的WebSocket连接与通知分发统计
+    包括连接数、用户数、消息速率及通知投递/合并/丢弃计数
+    """
+    from .websocket_service import connection_manager, notification_service
+    
+    return Response({
+        'connections': connection_manager.get_connection_stats(),
+        'notifications': notification_service.get_stats()
+    })
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_frontend_menus_for_user(request):
     """
     获取当前用户可访问的前台菜单列表
-    基于 MenuModuleConfig 和 MenuValidity 模型
+    基于 MenuModuleConfig 和 MenuValidity 模型，使用预编译的角色菜单产物
     """
     try:
         user = request.user
@@ -231,90 +194,28 @@ def get_frontend_menus_for_user(request):
                 'menus': []
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # 获取该角色已分配且有效的菜单
-        from .models import MenuValidity
-        
-        # 获取用户角色有效的菜单
-        valid_menus = MenuValidity.objects.filter(
-            role=user_role,
-            is_valid=True
-        ).select_related('menu_module').order_by('menu_module__sort_order')
-        
-        # 按菜单级别分组
-        menus_by_level = {
-            'root': [],
-            'level1': [],
-            'level2': []
-        }
+        artifact = MenuArtifactService.get_role_artifact(user_role)
         
-        for validity in valid_menus:
-            menu = validity.menu_module
-            if not menu.is_active:
-                continue
-                
-            menu_data = {
-                'id': menu.id,
-                'key': menu.key,
-                'name': menu.name,
-                'icon': menu.icon,
-                'url': menu.url,
-                'menu_level': menu.menu_level,
-                'sort_order': menu.sort_order,
-                'description': menu.description,
-                'is_active': menu.is_active
+        def build_payload():
+            # 按菜单级别分组
+            menus_by_level = {
+                'root': [],
+                'level1': [],
+                'level2': []
             }
-            
-            menus_by_level[menu.menu_level].append(menu_data)
-        
-        # 构建层级结构
-        def build_menu_tree(root_menus, level1_menus, level2_menus):
-            """构建菜单树结构"""
-            # 创建菜单字典便于查找
-            level1_dict = {}
-            level2_dict = {}
-            
-            for menu in level1_menus:
-                level1_dict[menu['key']] = menu
-                menu['children'] = []
-            
-            for menu in level2_menus:
-                level2_dict[menu['key']] = menu
-                menu['children'] = []
-            
-            # 将level2菜单添加到对应的level1菜单下
-            for menu in level2_menus:
-                # 根据命名约定推断父菜单（如果有的话）
-                # 这里可以根据实际业务逻辑调整
-                pass
-            
-            # 将level1菜单添加到对应的root菜单下
-            for menu in level1_menus:
-                # 根据命名约定推断父菜单（如果有的话）
-                # 这里可以根据实际业务逻辑调整
-                pass
-            
-            # 为root菜单添加children
-            for menu in root_menus:
-                menu['children'] = []
+            for menu in artifact['menus']:
+                menu_data = dict(menu, is_active=True, children=[])
+                menus_by_level[menu['menu_level']].append(menu_data)
             
             return {
-                'root': root_menus,
-                'level1': level1_menus,
-                'level2': level2_menus
+                'success': True,
+                'user_role': user_role,
+                'menus': menus_by_level,
+                'total_count': len(artifact['menus'])
             }
         
-        structured_menus = build_menu_tree(
-            menus_by_level['root'],
-            menus_by_level['level1'],
-            menus_by_level['level2']
-        )
-        
-        return Response({
-            'success': True,
-            'user_role': user_role,
-            'menus': structured_menus,
-            'total_count': sum(len(menus) for menus in menus_by_level.values())
-        })
+        etag = MenuArtifactService.build_etag(artifact['checksum'], user_role)
+        return MenuArtifactService.conditional_response(request, etag, build_payload)
         
     except Exception as e:
         logger.error(f"获取前台菜单失败: {str(e)}")
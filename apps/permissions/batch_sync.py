@@ -8,26 +8,29 @@ import json
 import logging
 import asyncio
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any, Union, Tuple
+from typing import Dict, List, Optional, Any, Union, Tuple, Callable
 from collections import defaultdict
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, Future, wait as wait_futures
 import threading
 import time
+import uuid
 from dataclasses import dataclass
 from enum import Enum
 
 from django.db import transaction, connection
-from django.db.models import Q, Prefetch
+from django.db.models import Q, Prefetch, F, Count
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Group, Permission
 from django.core.cache import cache
 from django.utils import timezone
 from django.conf import settings
 from django.core.serializers.json import DjangoJSONEncoder
+from asgiref.sync import async_to_sync
 
+from .menu_artifacts import MenuArtifactService
 from .cache_optimization import cache_manager
 from .audit import audit_service, AuditActionType
-from .websocket_service import PermissionNotificationService
+from .websocket_service import notification_service
 
 User = get_user_model()
 logger = logging.getLogger(__name__)
@@ -78,23 +81,63 @@ class BatchSyncTask:
             self.errors = []
         if self.total == 0:
             self.total = len(self.user_ids)
+    
+    @classmethod
+    def from_record(cls, record, chunks) -> 'BatchSyncTask':
+        """由持久化的任务记录及其分块构建任务快照"""
+        user_ids = []
+        errors = list(record.errors or [])
+        for chunk in chunks:
+            user_ids.extend(chunk.user_ids)
+            errors.extend(chunk.errors or [])
+        
+        return cls(
+            id=record.task_id,
+            operation=SyncOperation(record.operation),
+            user_ids=user_ids,
+            data=record.data,
+            status=SyncStatus(record.status),
+            created_at=record.created_at,
+            started_at=record.started_at,
+            completed_at=record.completed_at,
+            progress=record.progress,
+            total=record.total,
+            success_count=record.success_count,
+            error_count=record.error_count,
+            errors=errors
+        )
+
+
+@dataclass
+class ChunkResult:
+    """单个分块的执行结果"""
+    success_ids: List[int]
+    error_count: int = 0
+    errors: List[str] = None
+    summary: Dict[str, Any] = None
 
 
 class BatchPermissionSyncManager:
-    """批量权限同步管理器"""
+    """批量权限同步管理器
+
+    任务与分块持久化在数据库中（BatchSyncTaskRecord / BatchSyncChunkRecord），
+    分块由共享线程池并行执行，每个分块在独立事务中运行并按 max_retries 重试。
+    PERMISSION_SYNC_MAX_WORKERS 设为 0 时在调用线程内顺序执行分块。
+    """
     
     def __init__(self):
-        self.tasks = {}  # 任务存储
         self.task_lock = threading.RLock()
-        self.notification_service = PermissionNotificationService()
+        self.notification_service = notification_service
+        self._executor = None
         
         # 配置参数
         self.max_workers = getattr(settings, 'PERMISSION_SYNC_MAX_WORKERS', 4)
         self.batch_size = getattr(settings, 'PERMISSION_SYNC_BATCH_SIZE', 100)
         self.chunk_size = getattr(settings, 'PERMISSION_SYNC_CHUNK_SIZE', 20)
         self.max_retries = getattr(settings, 'PERMISSION_SYNC_MAX_RETRIES', 3)
+        self.retry_delay = getattr(settings, 'PERMISSION_SYNC_RETRY_DELAY', 0.5)
         
-        # 性能统计
+        # 性能统计（进程内）
         self.stats = {
             'total_tasks': 0,
             'completed_tasks': 0,
@@ -104,332 +147,377 @@ class BatchPermissionSyncManager:
             'peak_concurrent_tasks': 0
         }
     
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """共享的分块执行线程池"""
+        with self.task_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix='permission-sync'
+                )
+            return self._executor
+    
     def create_batch_task(self, 
                          operation: SyncOperation,
                          user_ids: List[int],
                          data: Dict[str, Any],
                          task_id: str = None) -> BatchSyncTask:
         """创建批量同步任务"""
+        from .models_optimized import BatchSyncTaskRecord, BatchSyncChunkRecord
         
         if not task_id:
-            task_id = f"{operation.value}_{int(time.time())}_{len(user_ids)}"
-        
-        task = BatchSyncTask(
-            id=task_id,
-            operation=operation,
-            user_ids=user_ids,
-            data=data
-        )
+            task_id = f"{operation.value}_{int(time.time())}_{len(user_ids)}_{uuid.uuid4().hex[:8]}"
+        
+        with transaction.atomic():
+            record = BatchSyncTaskRecord.objects.create(
+                task_id=task_id,
+                operation=operation.value,
+                data=data,
+                total=len(user_ids)
+            )
+            chunks = BatchSyncChunkRecord.objects.bulk_create([
+                BatchSyncChunkRecord(task=record, chunk_index=index, user_ids=list(chunk))
+                for index, chunk in enumerate(self._chunk_list(list(user_ids), self.chunk_size))
+            ])
         
         with self.task_lock:
-            self.tasks[task_id] = task
             self.stats['total_tasks'] += 1
         
         logger.info(f"创建批量同步任务: {task_id}, 操作: {operation.value}, 用户数: {len(user_ids)}")
-        return task
+        return BatchSyncTask.from_record(record, chunks)
     
-    def execute_batch_task(self, task_id: str) -> BatchSyncTask:
-        """执行批量同步任务"""
+    def execute_batch_task(self, task_id: str, wait: bool = True) -> BatchSyncTask:
+        """执行批量同步任务
+
+        分块提交到线程池并行执行；wait=False 时立即返回，由最后完成的分块收尾任务。
+        """
+        from .models_optimized import BatchSyncTaskRecord
         
-        with self.task_lock:
-            task = self.tasks.get(task_id)
-            if not task:
+        claimed = BatchSyncTaskRecord.objects.filter(task_id=task_id, status=SyncStatus.PENDING.value).update(
+            status=SyncStatus.PROCESSING.value,
+            started_at=timezone.now()
+        )
+        if not claimed:
+            record = BatchSyncTaskRecord.objects.filter(task_id=task_id).first()
+            if not record:
                 raise ValueError(f"任务不存在: {task_id}")
-            
-            if task.status != SyncStatus.PENDING:
-                raise ValueError(f"任务状态不正确: {task.status}")
-            
-            task.status = SyncStatus.PROCESSING
-            task.started_at = timezone.now()
+            raise ValueError(f"任务状态不正确: {record.status}")
         
+        record = BatchSyncTaskRecord.objects.get(task_id=task_id)
         try:
-            # 根据操作类型执行相应的同步逻辑
-            if task.operation == SyncOperation.BATCH_ROLE_ASSIGN:
-                self._execute_batch_role_assign(task)
-            elif task.operation == SyncOperation.BATCH_PERMISSION_GRANT:
-                self._execute_batch_permission_grant(task)
-            elif task.operation == SyncOperation.SYNC_MENU_PERMISSIONS:
-                self._execute_sync_menu_permissions(task)
-            else:
-                self._execute_generic_batch_operation(task)
-            
-            # 任务完成
-            with self.task_lock:
-                task.status = SyncStatus.COMPLETED if task.error_count == 0 else SyncStatus.PARTIAL
-                task.completed_at = timezone.now()
-                self.stats['completed_tasks'] += 1
-                self.stats['total_users_processed'] += task.success_count
-            
-            # 记录审计日志
-            audit_service.log_batch_operation(
-                user=None,  # 系统操作
-                operation_type=task.operation.value,
-                affected_users=task.user_ids,
-                operation_details={
-                    'task_id': task_id,
-                    'success_count': task.success_count,
-                    'error_count': task.error_count,
-                    'processing_time': (task.completed_at - task.started_at).total_seconds()
-                }
-            )
-            
-            logger.info(f"批量同步任务完成: {task_id}, 成功: {task.success_count}, 失败: {task.error_count}")
-            
+            handler, context = self._resolve_operation(record)
         except Exception as e:
+            BatchSyncTaskRecord.objects.filter(pk=record.pk).update(
+                status=SyncStatus.FAILED.value,
+                completed_at=timezone.now(),
+                errors=list(record.errors or []) + [str(e)]
+            )
             with self.task_lock:
-                task.status = SyncStatus.FAILED
-                task.completed_at = timezone.now()
-                task.errors.append(str(e))
                 self.stats['failed_tasks'] += 1
-            
             logger.error(f"批量同步任务失败: {task_id}, 错误: {e}")
             raise
         
-        return task
+        futures = self._dispatch_chunks(record, handler, context)
+        if wait and futures:
+            wait_futures(futures)
+        
+        return self.get_task_status(task_id)
+    
+    def resume_interrupted_tasks(self, wait: bool = False) -> List[str]:
+        """恢复因进程重启而中断的任务，返回恢复的任务ID"""
+        from .models_optimized import BatchSyncTaskRecord, BatchSyncChunkRecord
+        
+        resumed = []
+        for record in BatchSyncTaskRecord.objects.filter(status=SyncStatus.PROCESSING.value):
+            BatchSyncChunkRecord.objects.filter(task=record, status='processing').update(status='pending')
+            try:
+                handler, context = self._resolve_operation(record)
+            except Exception as e:
+                logger.error(f"恢复批量同步任务失败: {record.task_id}, 错误: {e}")
+                continue
+            
+            futures = self._dispatch_chunks(record, handler, context)
+            if not futures:
+                self._finalize_if_done(record.pk)
+            elif wait:
+                wait_futures(futures)
+            resumed.append(record.task_id)
+        
+        if resumed:
+            logger.info(f"恢复了 {len(resumed)} 个中断的批量同步任务")
+        return resumed
     
-    def _execute_batch_role_assign(self, task: BatchSyncTask):
-        """执行批量角色分配"""
-        role_id = task.data.get('role_id')
-        if not role_id:
-            raise ValueError("缺少role_id参数")
+    def _resolve_operation(self, record) -> Tuple[Callable, Dict[str, Any]]:
+        """校验任务参数，返回分块处理函数及其上下文"""
+        operation = SyncOperation(record.operation)
+        data = record.data or {}
+        
+        if operation == SyncOperation.BATCH_ROLE_ASSIGN:
+            role_id = data.get('role_id')
+            if not role_id:
+                raise ValueError("缺少role_id参数")
+            role = Group.objects.filter(id=role_id).first()
+            if not role:
+                raise ValueError(f"角色不存在: {role_id}")
+            return self._assign_role_to_users, {'role_id': role.id, 'role_name': role.name}
+        
+        if operation == SyncOperation.BATCH_PERMISSION_GRANT:
+            permission_ids = data.get('permission_ids', [])
+            if not permission_ids:
+                raise ValueError("缺少permission_ids参数")
+            permissions = dict(Permission.objects.filter(id__in=permission_ids).values_list('id', 'name'))
+            missing_ids = set(permission_ids) - set(permissions)
+            if missing_ids:
+                raise ValueError(f"权限不存在: {list(missing_ids)}")
+            return self._grant_permissions_to_users, {
+                'permission_ids': list(permissions),
+                'permission_names': list(permissions.values())
+            }
         
-        try:
-            role = Group.objects.get(id=role_id)
-        except Group.DoesNotExist:
-            raise ValueError(f"角色不存在: {role_id}")
+        if operation == SyncOperation.SYNC_MENU_PERMISSIONS:
+            menu_permissions = data.get('menu_permissions', {})
+            if not menu_permissions:
+                raise ValueError("缺少menu_permissions参数")
+            return self._sync_menu_permissions_for_users, {'menu_permissions': menu_permissions}
         
-        # 分块处理用户
-        user_chunks = self._chunk_list(task.user_ids, self.chunk_size)
+        return self._execute_generic_batch_operation, {}
+    
+    def _dispatch_chunks(self, record, handler: Callable, context: Dict[str, Any]) -> List[Future]:
+        """将待执行的分块提交到线程池"""
+        from .models_optimized import BatchSyncChunkRecord
         
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            futures = []
-            
-            for chunk in user_chunks:
-                future = executor.submit(self._assign_role_to_users, role, chunk, task)
-                futures.append(future)
-            
-            # 等待所有任务完成
-            for future in as_completed(futures):
-                try:
-                    success_count, error_count, errors = future.result()
-                    with self.task_lock:
-                        task.success_count += success_count
-                        task.error_count += error_count
-                        task.errors.extend(errors)
-                        task.progress = min(100, int((task.success_count + task.error_count) / task.total * 100))
-                except Exception as e:
-                    with self.task_lock:
-                        task.error_count += len(chunk)
-                        task.errors.append(f"处理块失败: {str(e)}")
+        chunk_ids = list(
+            BatchSyncChunkRecord.objects.filter(task=record, status='pending').values_list('id', flat=True)
+        )
+        if not chunk_ids:
+            self._finalize_if_done(record.pk)
+            return []
+        
+        if self.max_workers <= 0:
+            for chunk_id in chunk_ids:
+                self._run_chunk(chunk_id, record.pk, handler, context)
+            return []
+        
+        return [
+            self.executor.submit(self._run_chunk, chunk_id, record.pk, handler, context, True)
+            for chunk_id in chunk_ids
+        ]
     
-    def _assign_role_to_users(self, role: Group, user_ids: List[int], task: BatchSyncTask) -> Tuple[int, int, List[str]]:
-        """为用户分配角色"""
-        success_count = 0
-        error_count = 0
-        errors = []
+    def _run_chunk(self, chunk_id: int, task_pk: int, handler: Callable, context: Dict[str, Any],
+                   in_worker: bool = False):
+        """在独立事务中执行单个分块，失败时重试"""
+        from .models_optimized import BatchSyncTaskRecord, BatchSyncChunkRecord
         
         try:
-            with transaction.atomic():
-                # 批量获取用户
-                users = User.objects.filter(id__in=user_ids)
-                existing_user_ids = set(users.values_list('id', flat=True))
-                
-                # 检查不存在的用户
-                missing_user_ids = set(user_ids) - existing_user_ids
-                if missing_user_ids:
-                    error_count += len(missing_user_ids)
-                    errors.append(f"用户不存在: {list(missing_user_ids)}")
-                
-                # 批量分配角色
-                for user in users:
-                    try:
-                        user.groups.add(role)
-                        success_count += 1
-                        
-                        # 失效用户缓存
-                        cache_manager.invalidate_user_cache(user.id)
-                        
-                        # 发送通知
-                        self.notification_service.send_role_change_notification(
-                            user.id,
-                            {'role_name': role.name, 'action': 'assigned'}
-                        )
-                        
-                    except Exception as e:
-                        error_count += 1
-                        errors.append(f"用户 {user.id} 角色分配失败: {str(e)}")
-                        
-        except Exception as e:
-            error_count += len(user_ids)
-            errors.append(f"批量角色分配失败: {str(e)}")
-        
-        return success_count, error_count, errors
-    
-    def _execute_batch_permission_grant(self, task: BatchSyncTask):
-        """执行批量权限授予"""
-        permission_ids = task.data.get('permission_ids', [])
-        if not permission_ids:
-            raise ValueError("缺少permission_ids参数")
-        
-        # 验证权限存在
-        permissions = Permission.objects.filter(id__in=permission_ids)
-        if len(permissions) != len(permission_ids):
-            existing_ids = set(permissions.values_list('id', flat=True))
-            missing_ids = set(permission_ids) - existing_ids
-            raise ValueError(f"权限不存在: {list(missing_ids)}")
-        
-        # 分块处理用户
-        user_chunks = self._chunk_list(task.user_ids, self.chunk_size)
-        
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            futures = []
+            claimed = BatchSyncChunkRecord.objects.filter(id=chunk_id, status='pending').update(status='processing')
+            if not claimed:
+                return
             
-            for chunk in user_chunks:
-                future = executor.submit(self._grant_permissions_to_users, permissions, chunk, task)
-                futures.append(future)
+            user_ids = BatchSyncChunkRecord.objects.values_list('user_ids', flat=True).get(id=chunk_id)
+            attempt_errors = []
+            result = None
+            attempts = 0
             
-            # 等待所有任务完成
-            for future in as_completed(futures):
+            for attempts in range(1, max(1, self.max_retries) + 1):
                 try:
-                    success_count, error_count, errors = future.result()
-                    with self.task_lock:
-                        task.success_count += success_count
-                        task.error_count += error_count
-                        task.errors.extend(errors)
-                        task.progress = min(100, int((task.success_count + task.error_count) / task.total * 100))
+                    with transaction.atomic():
+                        result = handler(context, user_ids)
+                    break
                 except Exception as e:
-                    with self.task_lock:
-                        task.error_count += len(chunk)
-                        task.errors.append(f"处理块失败: {str(e)}")
+                    attempt_errors.append(f"第{attempts}次执行失败: {str(e)}")
+                    if attempts < self.max_retries:
+                        time.sleep(self.retry_delay * attempts)
+            
+            if result is not None:
+                success_count = len(result.success_ids)
+                error_count = result.error_count
+                errors = result.errors or []
+                status = 'completed'
+            else:
+                success_count = 0
+                error_count = len(user_ids)
+                errors = attempt_errors
+                status = 'failed'
+            
+            # 计数与分块状态同一事务提交，保证收尾时读取到完整计数
+            with transaction.atomic():
+                BatchSyncTaskRecord.objects.filter(pk=task_pk).update(
+                    success_count=F('success_count') + success_count,
+                    error_count=F('error_count') + error_count
+                )
+                BatchSyncChunkRecord.objects.filter(id=chunk_id).update(
+                    status=status,
+                    attempts=attempts,
+                    success_count=success_count,
+                    error_count=error_count,
+                    errors=errors
+                )
+            
+            if result is not None and result.success_ids:
+                self._after_chunk_commit(result)
+        
+        except Exception as e:
+            logger.error(f"批量同步分块执行失败: {chunk_id}, 错误: {e}")
+            try:
+                with transaction.atomic():
+                    chunk_user_ids = BatchSyncChunkRecord.objects.values_list('user_ids', flat=True).get(id=chunk_id)
+                    failed = BatchSyncChunkRecord.objects.filter(id=chunk_id, status='processing').update(
+                        status='failed', error_count=len(chunk_user_ids), errors=[str(e)]
+                    )
+                    if failed:
+                        BatchSyncTaskRecord.objects.filter(pk=task_pk).update(
+                            error_count=F('error_count') + len(chunk_user_ids)
+                        )
+            except Exception as inner:
+                logger.error(f"记录分块失败状态失败: {chunk_id}, 错误: {inner}")
+        
+        finally:
+            self._finalize_if_done(task_pk)
+            if in_worker:
+                # 工作线程持有独立的数据库连接，执行完毕后释放
+                connection.close()
     
-    def _grant_permissions_to_users(self, permissions: List[Permission], user_ids: List[int], task: BatchSyncTask) -> Tuple[int, int, List[str]]:
-        """为用户授予权限"""
-        success_count = 0
-        error_count = 0
-        errors = []
+    def _after_chunk_commit(self, result: ChunkResult):
+        """分块提交后统一失效缓存并合并发送一次通知"""
+        cache_manager.invalidate_users_cache(result.success_ids)
         
         try:
-            with transaction.atomic():
-                # 批量获取用户
-                users = User.objects.filter(id__in=user_ids)
-                existing_user_ids = set(users.values_list('id', flat=True))
-                
-                # 检查不存在的用户
-                missing_user_ids = set(user_ids) - existing_user_ids
-                if missing_user_ids:
-                    error_count += len(missing_user_ids)
-                    errors.append(f"用户不存在: {list(missing_user_ids)}")
-                
-                # 批量授予权限
-                for user in users:
-                    try:
-                        user.user_permissions.add(*permissions)
-                        success_count += 1
-                        
-                        # 失效用户缓存
-                        cache_manager.invalidate_user_cache(user.id)
-                        
-                        # 发送通知
-                        permission_names = [p.name for p in permissions]
-                        self.notification_service.send_permission_change_notification(
-                            user.id,
-                            {
-                                'permissions': permission_names,
-                                'action': 'granted'
-                            }
-                        )
-                        
-                    except Exception as e:
-                        error_count += 1
-                        errors.append(f"用户 {user.id} 权限授予失败: {str(e)}")
-                        
+            async_to_sync(self.notification_service.notify_batch_permission_update)(
+                result.success_ids, result.summary or {}
+            )
         except Exception as e:
-            error_count += len(user_ids)
-            errors.append(f"批量权限授予失败: {str(e)}")
-        
-        return success_count, error_count, errors
+            logger.error(f"发送批量同步通知失败: {e}")
     
-    def _execute_sync_menu_permissions(self, task: BatchSyncTask):
-        """执行菜单权限同步"""
-        menu_permissions = task.data.get('menu_permissions', {})
-        if not menu_permissions:
-            raise ValueError("缺少menu_permissions参数")
+    def _finalize_if_done(self, task_pk: int):
+        """所有分块结束后收尾任务，仅由一个线程成功执行"""
+        from .models_optimized import BatchSyncTaskRecord, BatchSyncChunkRecord
+        
+        if BatchSyncChunkRecord.objects.filter(task_id=task_pk, status__in=['pending', 'processing']).exists():
+            return
+        
+        record = BatchSyncTaskRecord.objects.get(pk=task_pk)
+        status = SyncStatus.COMPLETED if record.error_count == 0 else SyncStatus.PARTIAL
+        completed_at = timezone.now()
+        finalized = BatchSyncTaskRecord.objects.filter(pk=task_pk, status=SyncStatus.PROCESSING.value).update(
+            status=status.value,
+            completed_at=completed_at
+        )
+        if not finalized:
+            return
         
-        # 分块处理用户
-        user_chunks = self._chunk_list(task.user_ids, self.chunk_size)
+        with self.task_lock:
+            self.stats['completed_tasks'] += 1
+            self.stats['total_users_processed'] += record.success_count
         
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            futures = []
-            
-            for chunk in user_chunks:
-                future = executor.submit(self._sync_menu_permissions_for_users, menu_permissions, chunk, task)
-                futures.append(future)
-            
-            # 等待所有任务完成
-            for future in as_completed(futures):
-                try:
-                    success_count, error_count, errors = future.result()
-                    with self.task_lock:
-                        task.success_count += success_count
-                        task.error_count += error_count
-                        task.errors.extend(errors)
-                        task.progress = min(100, int((task.success_count + task.error_count) / task.total * 100))
-                except Exception as e:
-                    with self.task_lock:
-                        task.error_count += len(chunk)
-                        task.errors.append(f"处理块失败: {str(e)}")
-    
-    def _sync_menu_permissions_for_users(self, menu_permissions: Dict, user_ids: List[int], task: BatchSyncTask) -> Tuple[int, int, List[str]]:
-        """为用户同步菜单权限 - 使用 MenuValidity"""
-        from .models import MenuModuleConfig, MenuValidity, RoleManagement
-        from django.contrib.auth import get_user_model
-        
-        User = get_user_model()
-        success_count = 0
-        error_count = 0
-        errors = []
+        processing_time = (completed_at - record.started_at).total_seconds() if record.started_at else 0
         
+        # 记录审计日志
         try:
-            with transaction.atomic():
-                for user_id in user_ids:
-                    try:
-                        user = User.objects.get(id=user_id)
-                        if hasattr(user, 'role'):
-                            role_obj = RoleManagement.objects.filter(role_name=user.role).first()
-                            if role_obj:
-                                # 更新用户角色的菜单权限
-                                for menu_key, is_valid in menu_permissions.items():
-                                    menu = MenuModuleConfig.objects.filter(module_name=menu_key).first()
-                                    if menu:
-                                        MenuValidity.objects.update_or_create(
-                                            menu=menu,
-                                            role=role_obj,
-                                            defaults={'is_valid': is_valid}
-                                        )
-                                success_count += 1
-                            else:
-                                errors.append(f"用户 {user_id} 的角色未找到")
-                                error_count += 1
-                        else:
-                            errors.append(f"用户 {user_id} 没有角色信息")
-                            error_count += 1
-                    except User.DoesNotExist:
-                        errors.append(f"用户 {user_id} 不存在")
-                        error_count += 1
-                    except Exception as e:
-                        errors.append(f"用户 {user_id} 权限同步失败: {str(e)}")
-                        error_count += 1
+            audit_service.log_batch_operation(
+                user=None,  # 系统操作
+                operation_type=record.operation,
+                affected_users=list(
+                    BatchSyncChunkRecord.objects.filter(task_id=task_pk).values_list('user_ids', flat=True)
+                ),
+                operation_details={
+                    'task_id': record.task_id,
+                    'success_count': record.success_count,
+                    'error_count': record.error_count,
+                    'processing_time': processing_time
+                }
+            )
         except Exception as e:
-            logger.error(f"菜单权限同步失败: {e}")
-            errors.append(f"批量同步失败: {str(e)}")
-            error_count = len(user_ids)
+            logger.error(f"记录批量同步审计日志失败: {e}")
         
-        return success_count, error_count, errors
+        logger.info(f"批量同步任务完成: {record.task_id}, 成功: {record.success_count}, 失败: {record.error_count}")
+    
+    def _split_existing_users(self, user_ids: List[int]) -> Tuple[List[int], List[str]]:
+        """一次查询区分存在与不存在的用户"""
+        existing_ids = list(User.objects.filter(id__in=user_ids).values_list('id', flat=True))
+        missing_ids = set(user_ids) - set(existing_ids)
+        errors = [f"用户不存在: {sorted(missing_ids)}"] if missing_ids else []
+        return existing_ids, errors
+    
+    def _assign_role_to_users(self, context: Dict[str, Any], user_ids: List[int]) -> ChunkResult:
+        """为用户分配角色 - 通过多对多中间表批量插入"""
+        existing_ids, errors = self._split_existing_users(user_ids)
+        OptimizedDatabaseOperations.bulk_assign_roles(existing_ids, [context['role_id']])
+        
+        return ChunkResult(
+            success_ids=existing_ids,
+            error_count=len(user_ids) - len(existing_ids),
+            errors=errors,
+            summary={'role_name': context['role_name'], 'action': 'assigned'}
+        )
+    
+    def _grant_permissions_to_users(self, context: Dict[str, Any], user_ids: List[int]) -> ChunkResult:
+        """为用户授予权限 - 通过多对多中间表批量插入"""
+        existing_ids, errors = self._split_existing_users(user_ids)
+        OptimizedDatabaseOperations.bulk_grant_permissions(existing_ids, context['permission_ids'])
+        
+        return ChunkResult(
+            success_ids=existing_ids,
+            error_count=len(user_ids) - len(existing_ids),
+            errors=errors,
+            summary={'permissions': context['permission_names'], 'action': 'granted'}
+        )
     
-    def _execute_generic_batch_operation(self, task: BatchSyncTask):
+    def _sync_menu_permissions_for_users(self, context: Dict[str, Any], user_ids: List[int]) -> ChunkResult:
+        """为用户同步菜单权限 - 使用 MenuValidity，按分块内的角色去重后批量写入"""
+        from .models import MenuModuleConfig, MenuValidity
+        
+        menu_permissions = context['menu_permissions']
+        user_roles = dict(User.objects.filter(id__in=user_ids).values_list('id', 'role'))
+        errors = []
+        missing_ids = set(user_ids) - set(user_roles)
+        if missing_ids:
+            errors.append(f"用户不存在: {sorted(missing_ids)}")
+        no_role_ids = [user_id for user_id, role in user_roles.items() if not role]
+        if no_role_ids:
+            errors.append(f"用户没有角色信息: {sorted(no_role_ids)}")
+        
+        roles = {role for role in user_roles.values() if role}
+        menus = {menu.key: menu for menu in MenuModuleConfig.objects.filter(key__in=list(menu_permissions))}
+        
+        existing = {
+            (validity.role, validity.menu_module_id): validity
+            for validity in MenuValidity.objects.filter(role__in=roles, menu_module__in=menus.values())
+        }
+        to_create, to_update = [], []
+        for role in roles:
+            for menu_key, is_valid in menu_permissions.items():
+                menu = menus.get(menu_key)
+                if not menu:
+                    continue
+                validity = existing.get((role, menu.id))
+                if validity is None:
+                    to_create.append(MenuValidity(role=role, menu_module=menu, is_valid=is_valid))
+                elif validity.is_valid != is_valid:
+                    validity.is_valid = is_valid
+                    validity.updated_at = timezone.now()
+                    to_update.append(validity)
+        
+        if to_create:
+            MenuValidity.objects.bulk_create(to_create, ignore_conflicts=True)
+        if to_update:
+            MenuValidity.objects.bulk_update(to_update, ['is_valid', 'updated_at'])
+        if to_create or to_update:
+            # 批量写入不触发信号，需手动使菜单产物失效
+            transaction.on_commit(MenuArtifactService.bump_version)
+        
+        success_ids = [user_id for user_id, role in user_roles.items() if role]
+        return ChunkResult(
+            success_ids=success_ids,
+            error_count=len(user_ids) - len(success_ids),
+            errors=errors,
+            summary={'menu_permissions': menu_permissions, 'action': 'menu_sync'}
+        )
+    
+    def _execute_generic_batch_operation(self, context: Dict[str, Any], user_ids: List[int]) -> ChunkResult:
         """执行通用批量操作"""
         # 这里可以实现其他类型的批量操作
-        pass
+        return ChunkResult(success_ids=[])
     
     def _chunk_list(self, lst: List, chunk_size: int) -> List[List]:
         """将列表分块"""
@@ -437,49 +525,54 @@ class BatchPermissionSyncManager:
     
     def get_task_status(self, task_id: str) -> Optional[BatchSyncTask]:
         """获取任务状态"""
-        with self.task_lock:
-            return self.tasks.get(task_id)
+        from .models_optimized import BatchSyncTaskRecord
+        
+        record = BatchSyncTaskRecord.objects.filter(task_id=task_id).prefetch_related('chunks').first()
+        if not record:
+            return None
+        return BatchSyncTask.from_record(record, record.chunks.all())
     
     def cancel_task(self, task_id: str) -> bool:
         """取消任务"""
-        with self.task_lock:
-            task = self.tasks.get(task_id)
-            if task and task.status == SyncStatus.PENDING:
-                task.status = SyncStatus.FAILED
-                task.errors.append("任务被取消")
-                return True
+        from .models_optimized import BatchSyncTaskRecord
+        
+        record = BatchSyncTaskRecord.objects.filter(task_id=task_id, status=SyncStatus.PENDING.value).first()
+        if not record:
             return False
+        
+        cancelled = BatchSyncTaskRecord.objects.filter(pk=record.pk, status=SyncStatus.PENDING.value).update(
+            status=SyncStatus.FAILED.value,
+            completed_at=timezone.now(),
+            errors=list(record.errors or []) + ["任务被取消"]
+        )
+        return bool(cancelled)
     
     def cleanup_completed_tasks(self, days_to_keep: int = 7):
         """清理已完成的任务"""
+        from .models_optimized import BatchSyncTaskRecord
+        
         cutoff_time = timezone.now() - timedelta(days=days_to_keep)
+        deleted, _ = BatchSyncTaskRecord.objects.filter(
+            status__in=[SyncStatus.COMPLETED.value, SyncStatus.FAILED.value, SyncStatus.PARTIAL.value],
+            completed_at__lt=cutoff_time
+        ).delete()
         
-        with self.task_lock:
-            tasks_to_remove = []
-            for task_id, task in self.tasks.items():
-                if (task.status in [SyncStatus.COMPLETED, SyncStatus.FAILED] and 
-                    task.completed_at and task.completed_at < cutoff_time):
-                    tasks_to_remove.append(task_id)
-            
-            for task_id in tasks_to_remove:
-                del self.tasks[task_id]
-            
-            logger.info(f"清理了 {len(tasks_to_remove)} 个已完成的任务")
+        logger.info(f"清理了 {deleted} 条已完成任务记录")
     
     def get_statistics(self) -> Dict:
         """获取统计信息"""
+        from .models_optimized import BatchSyncTaskRecord
+        
+        status_counts = dict(
+            BatchSyncTaskRecord.objects.values_list('status').annotate(count=Count('id')).values_list('status', 'count')
+        )
+        
         with self.task_lock:
-            active_tasks = sum(1 for task in self.tasks.values() 
-                             if task.status == SyncStatus.PROCESSING)
-            
-            pending_tasks = sum(1 for task in self.tasks.values() 
-                              if task.status == SyncStatus.PENDING)
-            
             return {
                 **self.stats,
-                'active_tasks': active_tasks,
-                'pending_tasks': pending_tasks,
-                'total_tasks_in_memory': len(self.tasks)
+                'active_tasks': status_counts.get(SyncStatus.PROCESSING.value, 0),
+                'pending_tasks': status_counts.get(SyncStatus.PENDING.value, 0),
+                'total_tasks_in_store': sum(status_counts.values())
             }
     
     # 高级批量操作方法
@@ -492,7 +585,7 @@ class BatchPermissionSyncManager:
         )
         
         # 异步执行任务
-        threading.Thread(target=self.execute_batch_task, args=(task.id,)).start()
+        self.execute_batch_task(task.id, wait=False)
         
         return task.id
     
@@ -505,7 +598,7 @@ class BatchPermissionSyncManager:
         )
         
         # 异步执行任务
-        threading.Thread(target=self.execute_batch_task, args=(task.id,)).start()
+        self.execute_batch_task(task.id, wait=False)
         
         return task.id
     
@@ -518,7 +611,7 @@ class BatchPermissionSyncManager:
         )
         
         # 异步执行任务
-        threading.Thread(target=self.execute_batch_task, args=(task.id,)).start()
+        self.execute_batch_task(task.id, wait=False)
         
         return task.id
     
@@ -601,7 +694,7 @@ def batch_operation(operation_type: SyncOperation):
                 )
                 
                 # 异步执行
-                threading.Thread(target=batch_sync_manager.execute_batch_task, args=(task.id,)).start()
+                batch_sync_manager.execute_batch_task(task.id, wait=False)
                 
                 return {'task_id': task.id, 'status': 'processing'}
             else:
@@ -618,42 +711,27 @@ class OptimizedDatabaseOperations:
     
     @staticmethod
     def bulk_assign_roles(user_ids: List[int], role_ids: List[int]):
-        """批量分配角色"""
-        from django.contrib.auth.models import User
-        
-        # 使用原生SQL进行批量插入
-        with connection.cursor() as cursor:
-            # 准备批量插入数据
-            values = []
-            for user_id in user_ids:
-                for role_id in role_ids:
-                    values.append(f"({user_id}, {role_id})")
-            
-            if values:
-                # 批量插入，忽略重复
-                sql = f"""
-                    INSERT IGNORE INTO auth_user_groups (user_id, group_id)
-                    VALUES {','.join(values)}
-                """
-                cursor.execute(sql)
+        """批量分配角色 - 直接写入多对多中间表，忽略已存在的关联"""
+        through = User.groups.through
+        rows = [
+            through(**{'%s_id' % User._meta.model_name: user_id, 'group_id': role_id})
+            for user_id in user_ids
+            for role_id in role_ids
+        ]
+        if rows:
+            through.objects.bulk_create(rows, ignore_conflicts=True)
     
     @staticmethod
     def bulk_grant_permissions(user_ids: List[int], permission_ids: List[int]):
-        """批量授予权限"""
-        with connection.cursor() as cursor:
-            # 准备批量插入数据
-            values = []
-            for user_id in user_ids:
-                for permission_id in permission_ids:
-                    values.append(f"({user_id}, {permission_id})")
-            
-            if values:
-                # 批量插入，忽略重复
-                sql = f"""
-                    INSERT IGNORE INTO auth_user_user_permissions (user_id, permission_id)
-                    VALUES {','.join(values)}
-                """
-                cursor.execute(sql)
+        """批量授予权限 - 直接写入多对多中间表，忽略已存在的关联"""
+        through = User.user_permissions.through
+        rows = [
+            through(**{'%s_id' % User._meta.model_name: user_id, 'permission_id': permission_id})
+            for user_id in user_ids
+            for permission_id in permission_ids
+        ]
+        if rows:
+            through.objects.bulk_create(rows, ignore_conflicts=True)
     
     @staticmethod
     def bulk_update_menu_permissions(role_menu_permissions: List[Dict]):
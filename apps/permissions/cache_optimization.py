@@ -212,6 +212,37 @@ class PermissionCacheManager:
         for pattern in patterns:
             self.invalidate_pattern(pattern)
     
+    def invalidate_users_cache(self, user_ids: List[int]):
+        """批量失效多个用户的缓存 - 单次扫描L1、单条语句删除L3"""
+        if not user_ids:
+            return
+        
+        patterns = [
+            f"{prefix}_{user_id}"
+            for user_id in user_ids
+            for prefix in ('user_permissions', 'user_roles', 'menu_permissions',
+                           'user_menu_access', 'user_role_permissions')
+        ]
+        
+        try:
+            with self.lock:
+                keys_to_delete = [k for k in self.l1_cache.keys() if any(p in k for p in patterns)]
+                for key in keys_to_delete:
+                    self.l1_cache.pop(key, None)
+                    self.access_times.pop(key, None)
+                    self.cache_priorities.pop(key, None)
+            
+            if hasattr(cache, 'delete_pattern'):
+                for pattern in patterns:
+                    cache.delete_pattern(f"*{pattern}*")
+            
+            self._delete_l3_patterns(patterns)
+            
+            logger.info(f"批量缓存失效完成: {len(user_ids)} 个用户")
+            
+        except Exception as e:
+            logger.error(f"批量缓存失效失败: {e}")
+    
     def invalidate_role_cache(self, role_id: int):
         """失效角色相关缓存"""
         patterns = [
@@ -387,6 +418,18 @@ class PermissionCacheManager:
         except Exception as e:
             logger.error(f"L3缓存模式删除失败 {pattern}: {e}")
     
+    def _delete_l3_patterns(self, patterns: List[str]):
+        """按多个模式一次性删除L3缓存"""
+        try:
+            from django.db.models import Q
+            from .models import PermissionCache
+            query = Q()
+            for pattern in patterns:
+                query |= Q(cache_key__contains=pattern)
+            PermissionCache.objects.filter(query).delete()
+        except Exception as e:
+            logger.error(f"L3缓存批量删除失败: {e}")
+    
     def _set_all_levels(self, key: str, value: Any, timeout: int = None, 
                        priority: int = 1):
         """设置所有级别缓存"""
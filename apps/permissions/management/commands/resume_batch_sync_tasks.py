@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from apps.permissions.batch_sync import batch_sync_manager
+
+
+class Command(BaseCommand):
+    help = '恢复因进程重启而中断的批量权限同步任务'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--cleanup-days',
+            type=int,
+            default=None,
+            help='同时清理超过指定天数的已完成任务记录',
+        )
+    
+    def handle(self, *args, **options):
+        self.stdout.write('=== 开始恢复批量同步任务 ===')
+        
+        task_ids = batch_sync_manager.resume_interrupted_tasks(wait=True)
+        for task_id in task_ids:
+            task = batch_sync_manager.get_task_status(task_id)
+            self.stdout.write(
+                f'🔄 {task_id}: {task.status.value}，成功 {task.success_count}，失败 {task.error_count}'
+            )
+        
+        if options['cleanup_days'] is not None:
+            batch_sync_manager.cleanup_completed_tasks(days_to_keep=options['cleanup_days'])
+        
+        self.stdout.write(
+            self.style.SUCCESS(f'✅ 共恢复 {len(task_ids)} 个任务')
+        )
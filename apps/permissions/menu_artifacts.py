@@ -0,0 +1,174 @@
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+from typing import Any, Callable, Dict, List, Optional
+import hashlib
+import json
+import logging
+
+from .models import MenuModuleConfig
+from .models_optimized import MenuArtifactVersion, PermissionSyncLog
+
+logger = logging.getLogger(__name__)
+
+
+class MenuArtifactService:
+    """菜单产物服务
+
+    预先编译每个角色的菜单列表及内容校验和并写入缓存。缓存键带有全局版本号，
+    菜单、菜单有效性或角色变更时由信号递增版本号，旧产物随之失效，无需逐键删除。
+    版本号保存在数据库中（MenuArtifactVersion），多进程部署时各进程的版本号和 ETag 一致。
+    菜单接口据此返回强 ETag，前端轮询命中 If-None-Match 时直接返回 304。
+    """
+
+    VERSION_CACHE_KEY = 'menu_artifact:version'
+    ARTIFACT_CACHE_PREFIX = 'menu_artifact'
+    ARTIFACT_TIMEOUT = 60 * 60 * 24
+    # 进程内缓存无法接收其他进程的递增，版本号只短暂缓存，过期后重新读取数据库
+    LOCAL_VERSION_TIMEOUT = 5
+    ALL_MENUS = '__all__'
+
+    @classmethod
+    def _version_timeout(cls) -> Optional[int]:
+        """共享缓存中的版本号由递增直接覆盖，长期有效；进程内缓存只短暂保存"""
+        return cls.LOCAL_VERSION_TIMEOUT if isinstance(caches[DEFAULT_CACHE_ALIAS], LocMemCache) else None
+
+    @classmethod
+    def get_version(cls) -> int:
+        """获取当前菜单版本号（以数据库中的版本号为准，所有进程一致）"""
+        version = cache.get(cls.VERSION_CACHE_KEY)
+        if version is None:
+            version = MenuArtifactVersion.current()
+            cache.set(cls.VERSION_CACHE_KEY, version, cls._version_timeout())
+        return version
+
+    @classmethod
+    def bump_version(cls) -> None:
+        """递增菜单版本号，使所有已编译的菜单产物失效"""
+        version = MenuArtifactVersion.bump()
+        cache.set(cls.VERSION_CACHE_KEY, version, cls._version_timeout())
+
+    @classmethod
+    def get_role_artifact(cls, role: Optional[str]) -> Dict[str, Any]:
+        """获取角色的菜单产物，role 为 None 时返回全部启用菜单（超级管理员）"""
+        role_key = role or cls.ALL_MENUS
+        version = cls.get_version()
+        cache_key = f'{cls.ARTIFACT_CACHE_PREFIX}:{version}:role:{role_key}'
+
+        artifact = cache.get(cache_key)
+        if artifact is None:
+            menus = cls._compile_role_menus(role)
+            artifact = {
+                'version': version,
+                'role': role_key,
+                'menus': menus,
+                'checksum': cls._checksum(menus),
+            }
+            cache.set(cache_key, artifact, cls.ARTIFACT_TIMEOUT)
+        return artifact
+
+    @classmethod
+    def get_version_artifact(cls) -> Dict[str, Any]:
+        """获取菜单版本信息产物（供 get_menu_version 轮询使用）"""
+        version = cls.get_version()
+        cache_key = f'{cls.ARTIFACT_CACHE_PREFIX}:{version}:version_info'
+
+        artifact = cache.get(cache_key)
+        if artifact is None:
+            last_updated = MenuModuleConfig.objects.aggregate(
+                max_updated=Max('updated_at')
+            )['max_updated'] or timezone.now()
+            all_menus = cls.get_role_artifact(None)
+
+            artifact = {
+                'version': version,
+                'timestamp': int(last_updated.timestamp()),
+                'checksum': all_menus['checksum'],
+                'changes': cls._recent_changes(),
+                'author': 'system',
+                'description': '菜单配置版本信息',
+            }
+            cache.set(cache_key, artifact, cls.ARTIFACT_TIMEOUT)
+        return artifact
+
+    @staticmethod
+    def _compile_role_menus(role: Optional[str]) -> List[Dict[str, Any]]:
+        """从数据库编译菜单列表（按排序号、名称排列）"""
+        if role is None:
+            menus = MenuModuleConfig.objects.filter(is_active=True)
+        else:
+            menus = MenuModuleConfig.objects.filter(
+                is_active=True,
+                menuvalidity__role=role,
+                menuvalidity__is_valid=True
+            )
+
+        return [
+            {
+                'id': menu.id,
+                'key': menu.key,
+                'name': menu.name,
+                'icon': menu.icon,
+                'url': menu.url,
+                'menu_level': menu.menu_level,
+                'sort_order': menu.sort_order,
+                'description': menu.description,
+            }
+            for menu in menus.order_by('sort_order', 'name').distinct()
+        ]
+
+    @staticmethod
+    def _recent_changes() -> List[Dict[str, Any]]:
+        """最近10条菜单相关同步日志"""
+        changes = []
+        try:
+            sync_logs = PermissionSyncLog.objects.filter(
+                target_type='menu'
+            ).select_related('created_by').order_by('-created_at')[:10]
+
+            for log in sync_logs:
+                changes.append({
+                    'type': log.operation,
+                    'target': 'menu',
+                    'targetId': log.target_id or 'unknown',
+                    'targetName': log.get_sync_type_display(),
+                    'timestamp': int(log.created_at.timestamp()),
+                    'author': log.created_by.username if log.created_by else 'system',
+                    'reason': log.result or '菜单配置更新'
+                })
+        except Exception as e:
+            logger.warning(f"获取变更记录失败: {str(e)}")
+        return changes
+
+    @staticmethod
+    def _checksum(data: Any) -> str:
+        """内容校验和，只与菜单内容有关，版本号递增但内容未变时保持不变"""
+        payload = json.dumps(data, sort_keys=True, default=str, ensure_ascii=False)
+        return hashlib.md5(payload.encode()).hexdigest()
+
+    @staticmethod
+    def build_etag(*parts: Any) -> str:
+        """由内容校验和及用户相关字段生成强 ETag"""
+        digest = hashlib.md5('|'.join(str(part) for part in parts).encode()).hexdigest()
+        return f'"{digest}"'
+
+    @staticmethod
+    def conditional_response(
+        request,
+        etag: str,
+        build_payload: Callable[[], Dict[str, Any]]
+    ) -> Response:
+        """If-None-Match 命中时返回 304，否则构建响应体并附带 ETag"""
+        headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match:
+            etags = parse_etags(if_none_match)
+            if '*' in etags or etag in etags:
+                return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        return Response(build_payload(), headers=headers)
@@ -0,0 +1,133 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("permissions", "0018_roleslotmenuconfigrule_roleslotmenuconfighistory"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BatchSyncTaskRecord",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "task_id",
+                    models.CharField(help_text="任务ID", max_length=100, unique=True),
+                ),
+                ("operation", models.CharField(help_text="操作类型", max_length=50)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "待执行"),
+                            ("processing", "执行中"),
+                            ("completed", "已完成"),
+                            ("failed", "失败"),
+                            ("partial", "部分成功"),
+                        ],
+                        default="pending",
+                        help_text="任务状态",
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "data",
+                    models.JSONField(blank=True, default=dict, help_text="任务参数"),
+                ),
+                ("total", models.IntegerField(default=0, help_text="用户总数")),
+                ("success_count", models.IntegerField(default=0, help_text="成功数")),
+                ("error_count", models.IntegerField(default=0, help_text="失败数")),
+                (
+                    "errors",
+                    models.JSONField(blank=True, default=list, help_text="错误信息"),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("started_at", models.DateTimeField(blank=True, null=True)),
+                ("completed_at", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "verbose_name": "批量同步任务",
+                "verbose_name_plural": "批量同步任务",
+                "db_table": "permission_batch_sync_task",
+                "ordering": ["-created_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["status", "created_at"],
+                        name="permission__status_1f9566_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="BatchSyncChunkRecord",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("chunk_index", models.IntegerField(help_text="分块序号")),
+                (
+                    "user_ids",
+                    models.JSONField(default=list, help_text="分块内的用户ID"),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "待执行"),
+                            ("processing", "执行中"),
+                            ("completed", "已完成"),
+                            ("failed", "失败"),
+                        ],
+                        default="pending",
+                        help_text="分块状态",
+                        max_length=20,
+                    ),
+                ),
+                ("attempts", models.IntegerField(default=0, help_text="已尝试次数")),
+                ("success_count", models.IntegerField(default=0, help_text="成功数")),
+                ("error_count", models.IntegerField(default=0, help_text="失败数")),
+                (
+                    "errors",
+                    models.JSONField(blank=True, default=list, help_text="错误信息"),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "task",
+                    models.ForeignKey(
+                        help_text="所属任务",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="chunks",
+                        to="permissions.batchsynctaskrecord",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "批量同步分块",
+                "verbose_name_plural": "批量同步分块",
+                "db_table": "permission_batch_sync_chunk",
+                "ordering": ["task", "chunk_index"],
+                "unique_together": {("task", "chunk_index")},
+                "indexes": [
+                    models.Index(
+                        fields=["task", "status"], name="permission__task_id_5034fe_idx"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("permissions", "0020_department_rolemanagement_tree_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MenuArtifactVersion",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("version", models.BigIntegerField(default=1, help_text="版本号")),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "菜单产物版本",
+                "verbose_name_plural": "菜单产物版本",
+                "db_table": "permission_menu_artifact_version",
+            },
+        ),
+    ]
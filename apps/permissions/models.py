@@ -4,6 +4,7 @@ from django.core.exceptions import ValidationError
 from django.utils import timezone
 from django.conf import settings
 from apps.accounts.models import UserRole
+from utils.tree_index import MaterializedPathModel
 from typing import TYPE_CHECKING
 import logging
 
@@ -725,7 +726,7 @@ class OperationLog(models.Model):
         return f'{self.creator} - {self.request_method} {self.request_path}'
 
 
-class Department(models.Model):
+class Department(MaterializedPathModel):
     """部门模型 - 支持层级结构的部门管理"""
     name = models.CharField('部门名称', max_length=100, help_text='部门名称')
     code = models.CharField('部门编码', max_length=50, unique=True, help_text='部门唯一编码')
@@ -782,20 +783,16 @@ class Department(models.Model):
     
     def get_full_name(self):
         """获取部门全名（包含上级部门）"""
-        names = []
-        current = self
-        while current:
-            names.append(str(current.name))
-            current = current.parent
-        return ' > '.join(reversed(names))
+        return self.tree_label_path or str(self.name)
     
     def get_descendants(self):
-        """递归获取所有下级部门"""
-        descendants = []
-        for child in self.children.filter(is_active=True):
-            descendants.append(child)
-            descendants.extend(child.get_descendants())
-        return descendants
+        """获取所有下级部门（停用部门及其下级不计入），单次查询"""
+        nodes = list(self.get_descendant_queryset().order_by('tree_path'))
+        inactive_paths = [node.tree_path for node in nodes if not node.is_active]
+        return [
+            node for node in nodes
+            if not any(node.tree_path.startswith(path) for path in inactive_paths)
+        ]
     
     def get_all_children_ids(self):
         """获取所有下级部门ID列表（包含自己）"""
@@ -841,7 +838,7 @@ class UserDepartment(models.Model):
         return f"{str(self.user.username)} - {str(self.department.name)}{primary_text}"
 
 
-class RoleManagement(models.Model):
+class RoleManagement(MaterializedPathModel):
     """角色管理 - 支持角色继承"""
     role = models.CharField('角色', max_length=50, unique=True, help_text='角色标识符，支持自定义角色名称')
     display_name = models.CharField('显示名称', max_length=50)
@@ -859,6 +856,8 @@ class RoleManagement(models.Model):
         verbose_name_plural = '角色管理'
         ordering = ['sort_order', 'role']
 
+    tree_label_field = 'display_name'
+
     def get_role_display(self) -> str:
         """获取角色显示名称"""
         # 首先尝试从预定义角色中获取显示名称
@@ -869,14 +868,9 @@ class RoleManagement(models.Model):
         return str(self.display_name or self.role)
 
     def get_all_permissions(self):
-        """获取所有权限（包括继承的权限）"""
-        permissions = set(self.permissions.all())
-        
-        # 递归获取父角色权限
-        if self.parent:
-            permissions.update(self.parent.get_all_permissions())
-        
-        return permissions
+        """获取所有权限（包括继承的权限），祖先链由树索引给出，单次查询"""
+        role_ids = self.get_ancestor_ids() + [self.pk]
+        return set(Permission.objects.filter(rolemanagement__in=role_ids).distinct())
 
     def get_children(self):
         """获取所有子角色"""
@@ -884,21 +878,11 @@ class RoleManagement(models.Model):
 
     def get_hierarchy_level(self):
         """获取角色层级深度"""
-        level = 0
-        current = self.parent
-        while current:
-            level += 1
-            current = current.parent
-        return level
+        return self.tree_depth
 
     def is_ancestor_of(self, role):
         """判断是否为指定角色的祖先"""
-        current = role.parent
-        while current:
-            if current == self:
-                return True
-            current = current.parent
-        return False
+        return self.is_tree_ancestor_of(role)
 
     def clean(self):
         """模型验证：防止循环继承"""
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import F
 from django.contrib.auth.models import Group, Permission
 from django.contrib.contenttypes.models import ContentType
 from django.utils import timezone
@@ -6,6 +7,8 @@ from django.core.exceptions import ValidationError
 from apps.accounts.models import CustomUser, UserRole
 import json
 import logging
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
@@ -384,9 +387,124 @@ class PermissionSyncLog(models.Model):
         return f"{self.get_sync_type_display_name()} - {self.get_operation_display_name()} - {status}"
 
 
+class BatchSyncTaskRecord(models.Model):
+    """批量权限同步任务 - 持久化存储，重启后可恢复，其他进程可见"""
+    
+    STATUS_CHOICES = [
+        ('pending', '待执行'),
+        ('processing', '执行中'),
+        ('completed', '已完成'),
+        ('failed', '失败'),
+        ('partial', '部分成功'),
+    ]
+    
+    task_id = models.CharField(max_length=100, unique=True, help_text="任务ID")
+    operation = models.CharField(max_length=50, help_text="操作类型")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', help_text="任务状态")
+    data = models.JSONField(default=dict, blank=True, help_text="任务参数")
+    
+    # 进度统计
+    total = models.IntegerField(default=0, help_text="用户总数")
+    success_count = models.IntegerField(default=0, help_text="成功数")
+    error_count = models.IntegerField(default=0, help_text="失败数")
+    errors = models.JSONField(default=list, blank=True, help_text="错误信息")
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'permission_batch_sync_task'
+        verbose_name = '批量同步任务'
+        verbose_name_plural = '批量同步任务'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+    
+    @property
+    def progress(self):
+        """任务进度百分比"""
+        if not self.total:
+            return 100 if self.status in ('completed', 'failed', 'partial') else 0
+        return min(100, int((self.success_count + self.error_count) / self.total * 100))
+    
+    def __str__(self):
+        return f"{self.task_id} - {self.get_status_display()}"
+
+
+class BatchSyncChunkRecord(models.Model):
+    """批量同步任务分块 - 每个分块在独立事务中执行并可单独重试"""
+    
+    STATUS_CHOICES = [
+        ('pending', '待执行'),
+        ('processing', '执行中'),
+        ('completed', '已完成'),
+        ('failed', '失败'),
+    ]
+    
+    task = models.ForeignKey(BatchSyncTaskRecord, on_delete=models.CASCADE, related_name='chunks', help_text="所属任务")
+    chunk_index = models.IntegerField(help_text="分块序号")
+    user_ids = models.JSONField(default=list, help_text="分块内的用户ID")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', help_text="分块状态")
+    attempts = models.IntegerField(default=0, help_text="已尝试次数")
+    success_count = models.IntegerField(default=0, help_text="成功数")
+    error_count = models.IntegerField(default=0, help_text="失败数")
+    errors = models.JSONField(default=list, blank=True, help_text="错误信息")
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'permission_batch_sync_chunk'
+        verbose_name = '批量同步分块'
+        verbose_name_plural = '批量同步分块'
+        ordering = ['task', 'chunk_index']
+        unique_together = ['task', 'chunk_index']
+        indexes = [
+            models.Index(fields=['task', 'status']),
+        ]
+    
+    def __str__(self):
+        return f"{self.task.task_id}#{self.chunk_index} - {self.get_status_display()}"
+
+
+class MenuArtifactVersion(models.Model):
+    """菜单产物版本号 - 单行记录，所有进程共享同一版本号（进程内缓存时不会各自起算）"""
+    
+    SINGLETON_ID = 1
+    
+    version = models.BigIntegerField(default=1, help_text="版本号")
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'permission_menu_artifact_version'
+        verbose_name = '菜单产物版本'
+        verbose_name_plural = '菜单产物版本'
+    
+    @classmethod
+    def current(cls) -> int:
+        """当前版本号，记录不存在时创建"""
+        record, _ = cls.objects.get_or_create(pk=cls.SINGLETON_ID)
+        return record.version
+    
+    @classmethod
+    def bump(cls) -> int:
+        """原子递增版本号，返回新版本号"""
+        if not cls.objects.filter(pk=cls.SINGLETON_ID).update(version=F('version') + 1):
+            cls.objects.get_or_create(pk=cls.SINGLETON_ID, defaults={'version': 2})
+        return cls.objects.values_list('version', flat=True).get(pk=cls.SINGLETON_ID)
+    
+    def __str__(self):
+        return f"menu artifact v{self.version}"
+
+
 class AutoSyncConfig(models.Model):
     """自动同步配置"""
     
+    # 进程内缓存：配置极少变更，但每次用户保存都会读取
+    CACHE_TTL_SECONDS = 60
+    _cache_lock = threading.Lock()
+    _cached_entry = None  # (config, loaded_at)
+    
     # 全局开关
     enable_auto_sync = models.BooleanField(default=True, help_text="是否启用自动同步")
     
@@ -437,6 +555,30 @@ class AutoSyncConfig(models.Model):
         
         return event_mapping.get(event_type, False)
     
+    @classmethod
+    def get_cached(cls):
+        """获取进程内缓存的同步配置，不存在时返回None
+
+        本进程内的保存/删除会通过信号立即失效缓存，其他进程的修改最多延迟 CACHE_TTL_SECONDS 生效。
+        """
+        entry = cls._cached_entry
+        if entry is not None and time.monotonic() - entry[1] < cls.CACHE_TTL_SECONDS:
+            return entry[0]
+        
+        with cls._cache_lock:
+            entry = cls._cached_entry
+            if entry is not None and time.monotonic() - entry[1] < cls.CACHE_TTL_SECONDS:
+                return entry[0]
+            config = cls.objects.first()
+            cls._cached_entry = (config, time.monotonic())
+            return config
+    
+    @classmethod
+    def invalidate_cache(cls):
+        """使进程内配置缓存失效"""
+        with cls._cache_lock:
+            cls._cached_entry = None
+    
     def __str__(self):
         status = "启用" if self.enable_auto_sync else "禁用"
         return f"自动同步配置 - {status}"
@@ -1,8 +1,10 @@
 from django.contrib.auth.models import Group, Permission
 from django.db import transaction
+from django.db.models import Q
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 from typing import List, Dict, Optional, Tuple, Any
+from collections import defaultdict
 import logging
 
 from apps.permissions.models import RoleManagement, RoleGroupMapping, GroupRoleIdentifier
@@ -17,6 +19,7 @@ class GroupConsistencyChecker:
     
     def __init__(self):
         self.issues = []
+        self._snapshot = None
         self.stats = {
             'total_groups': 0,
             'role_linked_groups': 0,
@@ -27,10 +30,15 @@ class GroupConsistencyChecker:
         }
     
     def check_all_consistency(self) -> Dict[str, Any]:
-        """执行完整的一致性检查"""
+        """执行完整的一致性检查
+
+        所有组、标识符、映射及其权限集合通过固定数量的查询一次性加载，
+        差异在内存中计算，检查过程中的标识符修正批量写回，查询数量与组数量无关。
+        """
         logger.info("开始执行Django组与角色映射一致性检查")
         
         self.issues = []
+        self._snapshot = self._load_snapshot()
         self._reset_stats()
         
         # 检查各种一致性问题
@@ -38,6 +46,7 @@ class GroupConsistencyChecker:
         self._check_missing_mappings()
         self._check_identifier_consistency()
         self._check_permission_sync()
+        self._flush_identifier_changes()
         
         # 生成检查报告
         report = {
@@ -50,10 +59,93 @@ class GroupConsistencyChecker:
         logger.info(f"一致性检查完成，发现 {len(self.issues)} 个问题")
         return report
     
+    def _load_snapshot(self) -> Dict[str, Any]:
+        """批量加载检查所需的全部数据"""
+        groups = dict(Group.objects.values_list('id', 'name'))
+        identifiers = {identifier.group_id: identifier for identifier in GroupRoleIdentifier.objects.all()}
+        mappings = list(RoleGroupMapping.objects.filter(is_active=True))
+        roles = {
+            role['role']: role
+            for role in RoleManagement.objects.values('id', 'role', 'display_name', 'is_active', 'parent_id')
+        }
+        
+        # 角色直接权限与组当前权限，均直接读取多对多中间表
+        role_permission_ids = defaultdict(set)
+        for role_id, permission_id in RoleManagement.permissions.through.objects.values_list(
+            'rolemanagement_id', 'permission_id'
+        ):
+            role_permission_ids[role_id].add(permission_id)
+        
+        group_permission_ids = defaultdict(set)
+        for group_id, permission_id in Group.permissions.through.objects.filter(
+            group_id__in=[mapping.group_id for mapping in mappings]
+        ).values_list('group_id', 'permission_id'):
+            group_permission_ids[group_id].add(permission_id)
+        
+        return {
+            'groups': groups,
+            'identifiers': identifiers,
+            'mappings': mappings,
+            'roles': roles,
+            'roles_by_id': {role['id']: role for role in roles.values()},
+            'role_permission_ids': role_permission_ids,
+            'group_permission_ids': group_permission_ids,
+            'created_identifiers': [],
+            'updated_identifiers': {},
+        }
+    
+    def _expected_permission_ids(self, role_code: str) -> set:
+        """计算角色应有的权限ID（包含继承自父角色的权限）"""
+        snapshot = self._snapshot
+        role = snapshot['roles'].get(role_code)
+        permission_ids = set()
+        visited = set()
+        while role and role['id'] not in visited:
+            visited.add(role['id'])
+            permission_ids |= snapshot['role_permission_ids'].get(role['id'], set())
+            role = snapshot['roles_by_id'].get(role['parent_id'])
+        return permission_ids
+    
+    def _create_identifier(self, group_id: int, **fields) -> GroupRoleIdentifier:
+        """登记待创建的组标识符"""
+        identifier = GroupRoleIdentifier(group_id=group_id, **fields)
+        self._snapshot['identifiers'][group_id] = identifier
+        self._snapshot['created_identifiers'].append(identifier)
+        return identifier
+    
+    def _update_identifier(self, identifier: GroupRoleIdentifier, **fields):
+        """登记待更新的组标识符"""
+        for name, value in fields.items():
+            setattr(identifier, name, value)
+        if identifier.pk:
+            self._snapshot['updated_identifiers'][identifier.pk] = identifier
+    
+    def _flush_identifier_changes(self):
+        """将检查过程中的标识符修正批量写回数据库"""
+        snapshot = self._snapshot
+        now = timezone.now()
+        
+        if snapshot['created_identifiers']:
+            for identifier in snapshot['created_identifiers']:
+                identifier.created_at = identifier.updated_at = now
+            GroupRoleIdentifier.objects.bulk_create(snapshot['created_identifiers'], ignore_conflicts=True)
+        
+        if snapshot['updated_identifiers']:
+            updated = list(snapshot['updated_identifiers'].values())
+            for identifier in updated:
+                identifier.updated_at = now
+            GroupRoleIdentifier.objects.bulk_update(
+                updated,
+                ['status', 'role_identifier', 'sync_status', 'last_sync_time', 'sync_error_message', 'updated_at']
+            )
+        
+        snapshot['created_identifiers'] = []
+        snapshot['updated_identifiers'] = {}
+    
     def _reset_stats(self):
         """重置统计信息"""
         self.stats = {
-            'total_groups': Group.objects.count(),
+            'total_groups': len(self._snapshot['groups']),
             'role_linked_groups': 0,
             'orphaned_groups': 0,
             'missing_mappings': 0,
@@ -64,45 +156,36 @@ class GroupConsistencyChecker:
     def _check_orphaned_groups(self) -> List[Dict[str, Any]]:
         """检查孤立的Django组（没有对应角色映射的组）"""
         orphaned_issues = []
+        snapshot = self._snapshot
         
         # 获取所有已映射的组ID
-        mapped_group_ids = set(
-            RoleGroupMapping.objects.filter(is_active=True)
-            .values_list('group_id', flat=True)
-        )
+        mapped_group_ids = {mapping.group_id for mapping in snapshot['mappings']}
         
         # 查找孤立组
-        all_groups = Group.objects.all()
-        for group in all_groups:
-            if group.id not in mapped_group_ids:
-                try:
-                    identifier = GroupRoleIdentifier.objects.get(group=group)
-                    if identifier.status != 'orphaned':
-                        # 标记为孤立状态
-                        identifier.mark_as_orphaned()
-                        orphaned_issues.append({
-                            'type': 'orphaned_group',
-                            'group_id': group.id,
-                            'group_name': group.name,
-                            'description': f'组 "{group.name}" 没有对应的角色映射',
-                            'auto_fixable': True
-                        })
-                        self.stats['orphaned_groups'] += 1
-                except GroupRoleIdentifier.DoesNotExist:
-                    # 创建标识符并标记为孤立
-                    identifier = GroupRoleIdentifier.objects.create(
-                        group=group,
-                        status='orphaned',
-                        sync_status='disabled'
-                    )
-                    orphaned_issues.append({
-                        'type': 'orphaned_group',
-                        'group_id': group.id,
-                        'group_name': group.name,
-                        'description': f'组 "{group.name}" 没有对应的角色映射和标识符',
-                        'auto_fixable': True
-                    })
-                    self.stats['orphaned_groups'] += 1
+        for group_id, group_name in snapshot['groups'].items():
+            if group_id in mapped_group_ids:
+                continue
+            
+            identifier = snapshot['identifiers'].get(group_id)
+            if identifier is None:
+                # 创建标识符并标记为孤立
+                self._create_identifier(group_id, status='orphaned', sync_status='disabled')
+                description = f'组 "{group_name}" 没有对应的角色映射和标识符'
+            elif identifier.status != 'orphaned':
+                # 标记为孤立状态
+                self._update_identifier(identifier, status='orphaned', role_identifier=None, sync_status='disabled')
+                description = f'组 "{group_name}" 没有对应的角色映射'
+            else:
+                continue
+            
+            orphaned_issues.append({
+                'type': 'orphaned_group',
+                'group_id': group_id,
+                'group_name': group_name,
+                'description': description,
+                'auto_fixable': True
+            })
+            self.stats['orphaned_groups'] += 1
         
         self.issues.extend(orphaned_issues)
         return orphaned_issues
@@ -110,35 +193,48 @@ class GroupConsistencyChecker:
     def _check_missing_mappings(self) -> List[Dict[str, Any]]:
         """检查缺失的角色映射"""
         missing_issues = []
+        snapshot = self._snapshot
+        mappings_by_role = {mapping.role: mapping for mapping in snapshot['mappings']}
+        now = timezone.now()
         
         # 检查所有角色是否都有对应的组映射
-        for role_mgmt in RoleManagement.objects.filter(is_active=True):
-            try:
-                mapping = RoleGroupMapping.objects.get(role=role_mgmt.role, is_active=True)
-                # 检查组标识符
-                try:
-                    identifier = GroupRoleIdentifier.objects.get(group=mapping.group)
-                    if identifier.role_identifier != role_mgmt.role:
-                        identifier.mark_as_role_linked(role_mgmt.role)
-                        self.stats['role_linked_groups'] += 1
-                except GroupRoleIdentifier.DoesNotExist:
-                    # 创建缺失的标识符
-                    GroupRoleIdentifier.objects.create(
-                        group=mapping.group,
-                        status='role_linked',
-                        role_identifier=role_mgmt.role,
-                        sync_status='synced'
-                    )
-                    self.stats['role_linked_groups'] += 1
-            except RoleGroupMapping.DoesNotExist:
+        for role in snapshot['roles'].values():
+            if not role['is_active']:
+                continue
+            
+            mapping = mappings_by_role.get(role['role'])
+            if mapping is None:
                 missing_issues.append({
                     'type': 'missing_mapping',
-                    'role': role_mgmt.role,
-                    'role_display': role_mgmt.display_name,
-                    'description': f'角色 "{role_mgmt.display_name}" 缺少组映射',
+                    'role': role['role'],
+                    'role_display': role['display_name'],
+                    'description': f'角色 "{role["display_name"]}" 缺少组映射',
                     'auto_fixable': True
                 })
                 self.stats['missing_mappings'] += 1
+                continue
+            
+            # 检查组标识符
+            identifier = snapshot['identifiers'].get(mapping.group_id)
+            if identifier is None:
+                # 创建缺失的标识符
+                self._create_identifier(
+                    mapping.group_id,
+                    status='role_linked',
+                    role_identifier=role['role'],
+                    sync_status='synced'
+                )
+                self.stats['role_linked_groups'] += 1
+            elif identifier.role_identifier != role['role']:
+                self._update_identifier(
+                    identifier,
+                    status='role_linked',
+                    role_identifier=role['role'],
+                    sync_status='synced',
+                    last_sync_time=now,
+                    sync_error_message=''
+                )
+                self.stats['role_linked_groups'] += 1
         
         self.issues.extend(missing_issues)
         return missing_issues
@@ -146,44 +242,46 @@ class GroupConsistencyChecker:
     def _check_identifier_consistency(self) -> List[Dict[str, Any]]:
         """检查组标识符一致性"""
         identifier_issues = []
+        snapshot = self._snapshot
         
-        for mapping in RoleGroupMapping.objects.filter(is_active=True):
-            try:
-                identifier = GroupRoleIdentifier.objects.get(group=mapping.group)
-                
-                # 检查角色标识符是否一致
-                if identifier.role_identifier != mapping.role:
-                    identifier_issues.append({
-                        'type': 'identifier_mismatch',
-                        'mapping_id': mapping.id,
-                        'group_name': mapping.group.name,
-                        'expected_role': mapping.role,
-                        'actual_role': identifier.role_identifier,
-                        'description': f'组 "{mapping.group.name}" 的角色标识符不一致',
-                        'auto_fixable': True
-                    })
-                    self.stats['identifier_issues'] += 1
-                
-                # 检查状态是否正确
-                if identifier.status != 'role_linked':
-                    identifier_issues.append({
-                        'type': 'status_mismatch',
-                        'mapping_id': mapping.id,
-                        'group_name': mapping.group.name,
-                        'expected_status': 'role_linked',
-                        'actual_status': identifier.status,
-                        'description': f'组 "{mapping.group.name}" 的状态标识不正确',
-                        'auto_fixable': True
-                    })
-                    self.stats['identifier_issues'] += 1
-                    
-            except GroupRoleIdentifier.DoesNotExist:
+        for mapping in snapshot['mappings']:
+            group_name = snapshot['groups'].get(mapping.group_id, '')
+            identifier = snapshot['identifiers'].get(mapping.group_id)
+            
+            if identifier is None:
                 identifier_issues.append({
                     'type': 'missing_identifier',
                     'mapping_id': mapping.id,
-                    'group_name': mapping.group.name,
+                    'group_name': group_name,
                     'role': mapping.role,
-                    'description': f'组 "{mapping.group.name}" 缺少角色标识符',
+                    'description': f'组 "{group_name}" 缺少角色标识符',
+                    'auto_fixable': True
+                })
+                self.stats['identifier_issues'] += 1
+                continue
+            
+            # 检查角色标识符是否一致
+            if identifier.role_identifier != mapping.role:
+                identifier_issues.append({
+                    'type': 'identifier_mismatch',
+                    'mapping_id': mapping.id,
+                    'group_name': group_name,
+                    'expected_role': mapping.role,
+                    'actual_role': identifier.role_identifier,
+                    'description': f'组 "{group_name}" 的角色标识符不一致',
+                    'auto_fixable': True
+                })
+                self.stats['identifier_issues'] += 1
+            
+            # 检查状态是否正确
+            if identifier.status != 'role_linked':
+                identifier_issues.append({
+                    'type': 'status_mismatch',
+                    'mapping_id': mapping.id,
+                    'group_name': group_name,
+                    'expected_status': 'role_linked',
+                    'actual_status': identifier.status,
+                    'description': f'组 "{group_name}" 的状态标识不正确',
                     'auto_fixable': True
                 })
                 self.stats['identifier_issues'] += 1
@@ -194,91 +292,110 @@ class GroupConsistencyChecker:
     def _check_permission_sync(self) -> List[Dict[str, Any]]:
         """检查权限同步状态"""
         permission_issues = []
+        snapshot = self._snapshot
+        diffs = []
         
-        for mapping in RoleGroupMapping.objects.filter(is_active=True):
-            try:
-                # 获取角色应有的权限
-                expected_permissions = set()
-                
-                # 从RoleManagement获取权限
-                try:
-                    role_mgmt = RoleManagement.objects.get(role=mapping.role)
-                    expected_permissions.update(role_mgmt.get_all_permissions())
-                except RoleManagement.DoesNotExist:
-                    # 如果是预定义角色，可能需要其他逻辑
-                    pass
-                
-                # 获取组当前权限
-                current_permissions = set(mapping.group.permissions.all())
-                
-                # 比较权限差异
-                missing_permissions = expected_permissions - current_permissions
-                extra_permissions = current_permissions - expected_permissions
-                
-                if missing_permissions or extra_permissions:
-                    permission_issues.append({
-                        'type': 'permission_mismatch',
-                        'mapping_id': mapping.id,
-                        'group_name': mapping.group.name,
-                        'role': mapping.role,
-                        'missing_permissions': [p.codename for p in missing_permissions],
-                        'extra_permissions': [p.codename for p in extra_permissions],
-                        'description': f'组 "{mapping.group.name}" 的权限与角色不同步',
-                        'auto_fixable': True
-                    })
-                    self.stats['permission_mismatches'] += 1
-                    
-            except Exception as e:
-                permission_issues.append({
-                    'type': 'permission_check_error',
-                    'mapping_id': mapping.id,
-                    'group_name': mapping.group.name,
-                    'error': str(e),
-                    'description': f'检查组 "{mapping.group.name}" 权限时发生错误',
-                    'auto_fixable': False
-                })
+        for mapping in snapshot['mappings']:
+            # 预定义角色没有RoleManagement记录，无从得知应有权限，不做比较
+            if mapping.role not in snapshot['roles']:
+                continue
+            
+            # 角色应有的权限与组当前权限
+            expected_ids = self._expected_permission_ids(mapping.role)
+            current_ids = snapshot['group_permission_ids'].get(mapping.group_id, set())
+            
+            missing_ids = expected_ids - current_ids
+            extra_ids = current_ids - expected_ids
+            if missing_ids or extra_ids:
+                diffs.append((mapping, missing_ids, extra_ids))
+        
+        # 仅为存在差异的权限加载codename
+        diff_ids = set()
+        for _, missing_ids, extra_ids in diffs:
+            diff_ids |= missing_ids | extra_ids
+        codenames = dict(Permission.objects.filter(id__in=diff_ids).values_list('id', 'codename')) if diff_ids else {}
+        
+        for mapping, missing_ids, extra_ids in diffs:
+            group_name = snapshot['groups'].get(mapping.group_id, '')
+            permission_issues.append({
+                'type': 'permission_mismatch',
+                'mapping_id': mapping.id,
+                'group_id': mapping.group_id,
+                'group_name': group_name,
+                'role': mapping.role,
+                'missing_permissions': [codenames.get(pid, str(pid)) for pid in sorted(missing_ids)],
+                'extra_permissions': [codenames.get(pid, str(pid)) for pid in sorted(extra_ids)],
+                'missing_permission_ids': sorted(missing_ids),
+                'extra_permission_ids': sorted(extra_ids),
+                'description': f'组 "{group_name}" 的权限与角色不同步',
+                'auto_fixable': True
+            })
+            self.stats['permission_mismatches'] += 1
         
         self.issues.extend(permission_issues)
         return permission_issues
     
     def auto_fix_issues(self, issue_types: Optional[List[str]] = None) -> Dict[str, Any]:
-        """自动修复检测到的问题"""
+        """自动修复检测到的问题
+
+        同类问题合并为一次批量操作执行，每类问题使用独立的保存点。
+        孤立组在检查时已标记为孤立状态，不再处理，结果中记为跳过。
+        """
         if issue_types is None:
             issue_types = ['orphaned_group', 'missing_mapping', 'identifier_mismatch', 
                           'status_mismatch', 'missing_identifier', 'permission_mismatch']
         
+        issues_by_type = defaultdict(list)
+        for issue in self.issues:
+            if issue['type'] in issue_types and issue.get('auto_fixable', False):
+                issues_by_type[issue['type']].append(issue)
+        
+        fixers = {
+            'missing_mapping': self._fix_missing_mappings,
+            'missing_identifier': self._fix_missing_identifiers,
+            'identifier_mismatch': self._fix_identifier_links,
+            'status_mismatch': self._fix_identifier_links,
+            'permission_mismatch': self._fix_permission_mismatches,
+        }
+        # 检查过程中已处理完毕的问题类型
+        handled_during_check = {'orphaned_group'}
+        
         fixed_count = 0
         failed_count = 0
+        skipped_count = 0
         fix_results = []
         
         with transaction.atomic():
-            for issue in self.issues:
-                if issue['type'] in issue_types and issue.get('auto_fixable', False):
+            for issue_type, issues in issues_by_type.items():
+                fixer = fixers.get(issue_type)
+                status, error = 'failed', None
+                if issue_type in handled_during_check:
+                    status = 'skipped'
+                elif fixer is not None:
                     try:
-                        success = self._fix_single_issue(issue)
-                        if success:
-                            fixed_count += 1
-                            fix_results.append({
-                                'issue_type': issue['type'],
-                                'description': issue['description'],
-                                'status': 'fixed'
-                            })
-                        else:
-                            failed_count += 1
-                            fix_results.append({
-                                'issue_type': issue['type'],
-                                'description': issue['description'],
-                                'status': 'failed'
-                            })
+                        with transaction.atomic():
+                            fixer(issues)
+                        status = 'fixed'
                     except Exception as e:
-                        failed_count += 1
-                        fix_results.append({
-                            'issue_type': issue['type'],
-                            'description': issue['description'],
-                            'status': 'error',
-                            'error': str(e)
-                        })
-                        logger.error(f"修复问题失败: {e}")
+                        status, error = 'error', str(e)
+                        logger.error(f"修复问题 {issue_type} 失败: {e}")
+                
+                for issue in issues:
+                    result = {
+                        'issue_type': issue['type'],
+                        'description': issue['description'],
+                        'status': status
+                    }
+                    if error:
+                        result['error'] = error
+                    fix_results.append(result)
+                
+                if status == 'fixed':
+                    fixed_count += len(issues)
+                elif status == 'skipped':
+                    skipped_count += len(issues)
+                else:
+                    failed_count += len(issues)
         
         # 记录修复日志
         PermissionSyncLog.objects.create(
@@ -286,98 +403,118 @@ class GroupConsistencyChecker:
             target_type='system',
             target_id='consistency_check',
             operation='sync',
-            result=f'自动修复完成: 成功 {fixed_count} 个，失败 {failed_count} 个',
+            result=f'自动修复完成: 成功 {fixed_count} 个，失败 {failed_count} 个，跳过 {skipped_count} 个',
             is_success=failed_count == 0
         )
         
         return {
             'fixed_count': fixed_count,
             'failed_count': failed_count,
+            'skipped_count': skipped_count,
             'results': fix_results
         }
     
-    def _fix_single_issue(self, issue: Dict[str, Any]) -> bool:
-        """修复单个问题"""
-        try:
-            if issue['type'] == 'missing_mapping':
-                return self._fix_missing_mapping(issue)
-            elif issue['type'] == 'missing_identifier':
-                return self._fix_missing_identifier(issue)
-            elif issue['type'] == 'identifier_mismatch':
-                return self._fix_identifier_mismatch(issue)
-            elif issue['type'] == 'status_mismatch':
-                return self._fix_status_mismatch(issue)
-            elif issue['type'] == 'permission_mismatch':
-                return self._fix_permission_mismatch(issue)
-            else:
-                return False
-        except Exception as e:
-            logger.error(f"修复问题 {issue['type']} 失败: {e}")
-            return False
+    def _link_identifiers(self, group_roles: Dict[int, str]):
+        """将指定组的标识符批量设置为已关联角色，缺失的直接创建"""
+        if not group_roles:
+            return
+        
+        now = timezone.now()
+        existing = {
+            identifier.group_id: identifier
+            for identifier in GroupRoleIdentifier.objects.filter(group_id__in=list(group_roles))
+        }
+        
+        to_update = []
+        for group_id, identifier in existing.items():
+            identifier.status = 'role_linked'
+            identifier.role_identifier = group_roles[group_id]
+            identifier.sync_status = 'synced'
+            identifier.last_sync_time = now
+            identifier.sync_error_message = ''
+            identifier.updated_at = now
+            to_update.append(identifier)
+        if to_update:
+            GroupRoleIdentifier.objects.bulk_update(
+                to_update,
+                ['status', 'role_identifier', 'sync_status', 'last_sync_time', 'sync_error_message', 'updated_at']
+            )
+        
+        to_create = [
+            GroupRoleIdentifier(
+                group_id=group_id,
+                status='role_linked',
+                role_identifier=role,
+                sync_status='synced',
+                last_sync_time=now,
+                is_auto_managed=True,
+                created_at=now,
+                updated_at=now
+            )
+            for group_id, role in group_roles.items()
+            if group_id not in existing
+        ]
+        if to_create:
+            GroupRoleIdentifier.objects.bulk_create(to_create, ignore_conflicts=True)
     
-    def _fix_missing_mapping(self, issue: Dict[str, Any]) -> bool:
-        """修复缺失的角色映射"""
-        role = issue['role']
-        group_name = f"role_{role}"
+    def _fix_missing_mappings(self, issues: List[Dict[str, Any]]):
+        """批量修复缺失的角色映射"""
+        group_names = {issue['role']: f"role_{issue['role']}" for issue in issues}
         
         # 创建或获取组
-        group, created = Group.objects.get_or_create(name=group_name)
-        
-        # 创建映射
-        mapping = RoleGroupMapping.objects.create(
-            role=role,
-            group=group,
-            is_active=True
+        existing_names = set(Group.objects.filter(name__in=group_names.values()).values_list('name', flat=True))
+        Group.objects.bulk_create(
+            [Group(name=name) for name in group_names.values() if name not in existing_names],
+            ignore_conflicts=True
         )
+        group_ids = dict(Group.objects.filter(name__in=group_names.values()).values_list('name', 'id'))
         
-        # 同步组标识符
-        mapping.sync_group_identifier()
-        
-        return True
+        # 创建映射并同步组标识符
+        now = timezone.now()
+        RoleGroupMapping.objects.bulk_create([
+            RoleGroupMapping(role=role, group_id=group_ids[name], is_active=True, created_at=now, updated_at=now)
+            for role, name in group_names.items()
+        ])
+        self._link_identifiers({group_ids[name]: role for role, name in group_names.items()})
     
-    def _fix_missing_identifier(self, issue: Dict[str, Any]) -> bool:
-        """修复缺失的组标识符"""
-        mapping = RoleGroupMapping.objects.get(id=issue['mapping_id'])
-        
-        GroupRoleIdentifier.objects.create(
-            group=mapping.group,
-            status='role_linked',
-            role_identifier=mapping.role,
-            sync_status='synced'
+    def _fix_missing_identifiers(self, issues: List[Dict[str, Any]]):
+        """批量修复缺失的组标识符"""
+        mapping_roles = dict(
+            RoleGroupMapping.objects.filter(id__in=[issue['mapping_id'] for issue in issues])
+            .values_list('group_id', 'role')
         )
-        
-        return True
+        self._link_identifiers(mapping_roles)
     
-    def _fix_identifier_mismatch(self, issue: Dict[str, Any]) -> bool:
-        """修复角色标识符不匹配"""
-        mapping = RoleGroupMapping.objects.get(id=issue['mapping_id'])
-        identifier = GroupRoleIdentifier.objects.get(group=mapping.group)
-        
-        identifier.mark_as_role_linked(mapping.role)
-        
-        return True
+    def _fix_identifier_links(self, issues: List[Dict[str, Any]]):
+        """批量修复角色标识符或状态不匹配"""
+        mapping_roles = dict(
+            RoleGroupMapping.objects.filter(id__in=[issue['mapping_id'] for issue in issues])
+            .values_list('group_id', 'role')
+        )
+        self._link_identifiers(mapping_roles)
     
-    def _fix_status_mismatch(self, issue: Dict[str, Any]) -> bool:
-        """修复状态不匹配"""
-        mapping = RoleGroupMapping.objects.get(id=issue['mapping_id'])
-        identifier = GroupRoleIdentifier.objects.get(group=mapping.group)
-        
-        identifier.status = 'role_linked'
-        identifier.save()
+    def _fix_permission_mismatches(self, issues: List[Dict[str, Any]]):
+        """批量修复权限不匹配 - 一条删除语句移除多余权限，一条插入语句补充缺失权限
+
+        没有RoleManagement记录的角色不做同步，避免清空预定义角色组的权限。
+        """
+        managed_roles = set(
+            RoleManagement.objects.filter(role__in={issue['role'] for issue in issues}).values_list('role', flat=True)
+        )
+        issues = [issue for issue in issues if issue['role'] in managed_roles]
+        through = Group.permissions.through
         
-        return True
-    
-    def _fix_permission_mismatch(self, issue: Dict[str, Any]) -> bool:
-        """修复权限不匹配"""
-        mapping = RoleGroupMapping.objects.get(id=issue['mapping_id'])
+        extra_filter = Q()
+        missing_rows = []
+        for issue in issues:
+            if issue['extra_permission_ids']:
+                extra_filter |= Q(group_id=issue['group_id'], permission_id__in=issue['extra_permission_ids'])
+            missing_rows.extend(
+                through(group_id=issue['group_id'], permission_id=permission_id)
+                for permission_id in issue['missing_permission_ids']
+            )
         
-        try:
-            role_mgmt = RoleManagement.objects.get(role=mapping.role)
-            expected_permissions = role_mgmt.get_all_permissions()
-            
-            # 同步权限
-            mapping.group.permissions.set(expected_permissions)
-            
-            return True
-        except RoleManagement.DoesNotExist:
-            return False
\ No newline at end of file
+        if extra_filter:
+            through.objects.filter(extra_filter).delete()
+        if missing_rows:
+            through.objects.bulk_create(missing_rows, ignore_conflicts=True)
@@ -1,3 +1,4 @@
+from django.contrib.auth.models import Group
 from django.utils import timezone
 from django.db.models import Q, Count
 from django.core.mail import send_mail
@@ -134,20 +135,23 @@ class SyncMonitor:
             sync_count__gt=frequent_threshold
         ).order_by('-sync_count')
         
+        frequent_logs = list(frequent_logs)
+        group_ids = [log_data['target_id'] for log_data in frequent_logs if str(log_data['target_id']).isdigit()]
+        group_names = dict(Group.objects.filter(id__in=group_ids).values_list('id', 'name')) if group_ids else {}
+        
         result = []
         for log_data in frequent_logs:
-            try:
-                from django.contrib.auth.models import Group
-                group = Group.objects.get(id=log_data['target_id'])
-                result.append({
-                    'group_id': getattr(group, 'id', None),
-                    'group_name': getattr(group, 'name', '未知组'),
-                    'sync_count': log_data.get('sync_count', 0),
-                    'time_period': '1小时'
-                })
-            except (Group.DoesNotExist, Exception) as e:
-                logger.warning(f"处理频繁同步组时出错: {str(e)}")
+            target_id = str(log_data['target_id'])
+            group_id = int(target_id) if target_id.isdigit() else None
+            if group_id not in group_names:
+                logger.warning(f"处理频繁同步组时出错: 组 {target_id} 不存在")
                 continue
+            result.append({
+                'group_id': group_id,
+                'group_name': group_names[group_id],
+                'sync_count': log_data.get('sync_count', 0),
+                'time_period': '1小时'
+            })
         
         return result
     
@@ -1,12 +1,13 @@
-from django.db.models.signals import post_save, post_delete, pre_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.contrib.auth.models import Group, Permission
 from django.contrib.contenttypes.models import ContentType
-from .models import RoleGroupMapping, RoleManagement
+from django.utils import timezone
+from .models import RoleGroupMapping, RoleManagement, MenuModuleConfig, MenuValidity
 from .models_optimized import PermissionSyncLog
 from .models_optimized import OptimizedRoleGroupMapping, AutoSyncConfig
+from .menu_artifacts import MenuArtifactService
 from apps.accounts.models import UserRole, RoleExtension, CustomUser
-from apps.accounts.services.role_service import RoleService
 import logging
 from typing import TYPE_CHECKING
 
@@ -289,89 +290,101 @@ def get_default_extensions_for_role(role):
 
 
 # 用户角色变更检测
-_user_role_cache = {}
+def _role_changed(instance, created, update_fields):
+    """基于字段跟踪判断本次保存是否写入了新的角色，无需重新查询数据库"""
+    if created:
+        return True
+    if update_fields is not None and 'role' not in update_fields:
+        return False
+    return instance.has_field_changed('role')
+
+
+def sync_user_role_groups(user):
+    """按角色组映射同步用户所属组，只应用差异部分，返回是否有变更"""
+    group_id = OptimizedRoleGroupMapping.objects.filter(role=user.role).values_list('group_id', flat=True).first()  # type: ignore
+    if group_id is None:
+        logger.warning(f"用户 {user.username} 的角色 {user.role} 没有对应的组映射")
+        return False
+    
+    current_group_ids = set(user.groups.values_list('id', flat=True))
+    stale_group_ids = current_group_ids - {group_id}
+    if stale_group_ids:
+        user.groups.remove(*stale_group_ids)
+    if group_id not in current_group_ids:
+        user.groups.add(group_id)
+    return bool(stale_group_ids) or group_id not in current_group_ids
 
 
 @receiver(post_save, sender=CustomUser)
-def auto_sync_user_permissions(sender, instance, created, **kwargs):
-    """用户保存时自动同步权限"""
+def auto_sync_user_permissions(sender, instance, created, update_fields=None, **kwargs):
+    """用户创建或角色变更时自动同步权限组"""
+    if not _role_changed(instance, created, update_fields):
+        return
+    
     try:
-        # 获取自动同步配置
-        config = AutoSyncConfig.objects.first()  # type: ignore
-        if not config or not config.sync_on_user_save:
-            return
-            
-        # 获取用户对象
-        try:
-            user = CustomUser.objects.get(id=instance.id)
-        except CustomUser.DoesNotExist:  # type: ignore
-            logger.warning(f"用户 {instance.id} 不存在，跳过权限同步")
+        config = AutoSyncConfig.get_cached()
+        if not config or not config.should_sync_on_event('user_create' if created else 'user_update'):
             return
         
-        # 获取自动同步配置
-        config = AutoSyncConfig.objects.first()  # type: ignore
-        if not config or not config.auto_sync_enabled:
-            return
-            
-        # 同步用户到对应的组
-        try:
-            mapping = OptimizedRoleGroupMapping.objects.get(role=user.role)  # type: ignore
-            user.groups.clear()
-            user.groups.add(mapping.group)
-        except OptimizedRoleGroupMapping.DoesNotExist:  # type: ignore
-            logger.warning(f"用户 {user.username} 的角色 {user.role} 没有对应的组映射")
-            
-        logger.info(f"用户 {user.username} 的权限已同步")
+        if sync_user_role_groups(instance):
+            logger.info(f"用户 {instance.username} 的权限已同步")
         
     except Exception as e:
         logger.error(f"同步用户权限失败: {e}")
 
 
-@receiver(pre_save, sender=CustomUser)
-def detect_role_change(sender, instance, **kwargs):
-    """检测用户角色变更"""
-    if instance.pk:
-        try:
-            old_instance = CustomUser.objects.get(pk=instance.pk)
-            _user_role_cache[instance.pk] = old_instance.role
-        except CustomUser.DoesNotExist:  # type: ignore
-            pass
-
-
 @receiver(post_save, sender=CustomUser)
-def handle_role_change_sync(sender, instance, created, **kwargs):
-    """处理用户角色变更后的权限同步"""
-    if not created and instance.pk in _user_role_cache:
-        old_role = _user_role_cache.pop(instance.pk)
-        if old_role != instance.role:
+def handle_role_change_sync(sender, instance, created, update_fields=None, **kwargs):
+    """处理用户角色变更后的通知"""
+    if created or not _role_changed(instance, created, update_fields):
+        return
+    
+    old_role = instance.get_loaded_value('role')
+    try:
+        config = AutoSyncConfig.get_cached()
+        if config and config.should_sync_on_event('role_change'):
+            logger.info(f"用户 {instance.username} 角色从 {old_role} 变更为 {instance.role}")
+            
+            # 发送WebSocket通知
             try:
-                # 获取自动同步配置
-                config = AutoSyncConfig.objects.first()  # type: ignore
-                if config and config.sync_on_role_change:
-                    # 使用角色服务进行权限同步
-                    role_service = RoleService()
-                    role_service.sync_user_permissions(instance)
-                    
-                    logger.info(f"用户 {instance.username} 角色从 {old_role} 变更为 {instance.role}，权限已同步")
-                    
-                    # 发送WebSocket通知
-                    try:
-                        from .websocket_service import notification_service
-                        notification_data = {
-                            'type': 'role_change',
-                            'user_id': instance.id,
-                            'old_role': old_role,
-                            'new_role': instance.role,
-                            'timestamp': str(timezone.now())
-                        }
-                        notification_service.notify_role_change(instance.id, notification_data)
-                    except ImportError:
-                        logger.warning("WebSocket通知服务不可用")
-                    except Exception as e:
-                        logger.error(f"发送角色变更通知失败: {e}")
-                        
+                from asgiref.sync import async_to_sync
+                from .websocket_service import notification_service
+                async_to_sync(notification_service.notify_role_update)(
+                    instance.id, old_role, instance.role, [],
+                    changedAt=str(timezone.now())
+                )
+            except ImportError:
+                logger.warning("WebSocket通知服务不可用")
             except Exception as e:
-                logger.error(f"处理用户角色变更失败: {e}")
+                logger.error(f"发送角色变更通知失败: {e}")
+                
+    except Exception as e:
+        logger.error(f"处理用户角色变更失败: {e}")
+
+
+@receiver(post_save, sender=AutoSyncConfig)
+@receiver(post_delete, sender=AutoSyncConfig)
+def invalidate_auto_sync_config_cache(sender, instance, **kwargs):
+    """同步配置变更时失效进程内缓存"""
+    AutoSyncConfig.invalidate_cache()
+
+
+@receiver(post_save, sender=MenuModuleConfig)
+@receiver(post_delete, sender=MenuModuleConfig)
+@receiver(post_save, sender=MenuValidity)
+@receiver(post_delete, sender=MenuValidity)
+@receiver(post_save, sender=RoleManagement)
+@receiver(post_delete, sender=RoleManagement)
+def bump_menu_artifact_version(sender, instance, **kwargs):
+    """菜单或角色变更时递增菜单版本号，使预编译的菜单产物失效"""
+    MenuArtifactService.bump_version()
+
+
+@receiver(post_save, sender=PermissionSyncLog)
+def bump_menu_artifact_version_on_menu_log(sender, instance, created, **kwargs):
+    """菜单同步日志写入后刷新版本信息中的变更记录"""
+    if created and instance.target_type == 'menu':
+        MenuArtifactService.bump_version()
 
 
 @receiver(post_save, sender=OptimizedRoleGroupMapping)
@@ -379,8 +392,8 @@ def auto_sync_role_group_mapping(sender, instance, created, **kwargs):
     """优化角色组映射变更时自动同步"""
     try:
         # 获取自动同步配置
-        config = AutoSyncConfig.objects.first()  # type: ignore
-        if not config or not config.auto_sync_enabled:
+        config = AutoSyncConfig.get_cached()
+        if not config or not config.should_sync_on_event('permission_change'):
             return
             
         # 确保组存在
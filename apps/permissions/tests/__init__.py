@@ -0,0 +1 @@
+# Permissions Tests package
@@ -0,0 +1,109 @@
+"""
+批量权限同步任务测试
+
+任务按分块持久化，每个分块独立事务执行并单独重试；中断的任务可由 resume_batch_sync_tasks 命令恢复。
+测试中 max_workers 设为 0，分块在调用线程内顺序执行。
+"""
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.management import call_command
+from django.test import TestCase
+
+from apps.permissions.batch_sync import BatchPermissionSyncManager, SyncOperation, SyncStatus, batch_sync_manager
+from apps.permissions.models_optimized import BatchSyncChunkRecord, BatchSyncTaskRecord
+
+User = get_user_model()
+
+
+class BatchSyncTaskTest(TestCase):
+    """分块执行、分块重试与中断恢复"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.group = Group.objects.create(name='batch_group')
+        cls.user_ids = [User.objects.create_user(username=f'batch_user{i}').id for i in range(45)]
+
+    def setUp(self):
+        self.manager = self.make_manager()
+        # 审计日志与任务执行无关，不写入
+        patcher = mock.patch('apps.permissions.batch_sync.audit_service')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @staticmethod
+    def make_manager():
+        manager = BatchPermissionSyncManager()
+        manager.max_workers = 0
+        manager.chunk_size = 20
+        manager.retry_delay = 0
+        return manager
+
+    def create_task(self, manager, user_ids):
+        return manager.create_batch_task(SyncOperation.BATCH_ROLE_ASSIGN, user_ids, {'role_id': self.group.id})
+
+    def test_task_is_persisted_in_chunks(self):
+        task = self.create_task(self.manager, self.user_ids + [999999])
+        chunks = BatchSyncChunkRecord.objects.filter(task__task_id=task.id).order_by('chunk_index')
+        self.assertEqual([len(chunk.user_ids) for chunk in chunks], [20, 20, 6])
+
+        task = self.manager.execute_batch_task(task.id)
+        self.assertEqual(task.status, SyncStatus.PARTIAL)
+        self.assertEqual((task.success_count, task.error_count, task.progress), (45, 1, 100))
+        self.assertEqual(self.group.user_set.count(), 45)
+        self.assertFalse(BatchSyncChunkRecord.objects.filter(task__task_id=task.id).exclude(status='completed'))
+
+    def test_failed_chunk_is_retried_alone(self):
+        handler = self.manager._assign_role_to_users
+        calls = []
+
+        def flaky(context, user_ids):
+            calls.append(user_ids[0])
+            # 第一个分块首次执行失败，重试后成功
+            if user_ids[0] == self.user_ids[0] and calls.count(user_ids[0]) == 1:
+                raise RuntimeError('数据库暂时不可用')
+            return handler(context, user_ids)
+
+        with mock.patch.object(self.manager, '_assign_role_to_users', side_effect=flaky):
+            task = self.manager.execute_batch_task(self.create_task(self.manager, self.user_ids).id)
+
+        attempts = dict(BatchSyncChunkRecord.objects.filter(task__task_id=task.id).values_list('chunk_index', 'attempts'))
+        self.assertEqual(attempts, {0: 2, 1: 1, 2: 1})
+        self.assertEqual(task.status, SyncStatus.COMPLETED)
+        self.assertEqual(self.group.user_set.count(), 45)
+
+    def test_exhausted_chunk_fails_without_affecting_others(self):
+        handler = self.manager._assign_role_to_users
+
+        def broken_second_chunk(context, user_ids):
+            if user_ids[0] == self.user_ids[20]:
+                raise RuntimeError('写入失败')
+            return handler(context, user_ids)
+
+        with mock.patch.object(self.manager, '_assign_role_to_users', side_effect=broken_second_chunk):
+            task = self.manager.execute_batch_task(self.create_task(self.manager, self.user_ids).id)
+
+        chunk = BatchSyncChunkRecord.objects.get(task__task_id=task.id, chunk_index=1)
+        self.assertEqual((chunk.status, chunk.attempts, chunk.error_count), ('failed', self.manager.max_retries, 20))
+        self.assertEqual(task.status, SyncStatus.PARTIAL)
+        self.assertEqual((task.success_count, task.error_count), (25, 20))
+        # 失败分块的事务已回滚，其余分块正常提交
+        self.assertEqual(self.group.user_set.count(), 25)
+
+    def test_resume_command_finishes_interrupted_task(self):
+        task = self.create_task(self.manager, self.user_ids)
+        # 模拟进程在执行第一个分块时退出
+        BatchSyncTaskRecord.objects.filter(task_id=task.id).update(status='processing')
+        BatchSyncChunkRecord.objects.filter(task__task_id=task.id, chunk_index=0).update(status='processing')
+
+        out = StringIO()
+        with mock.patch.object(batch_sync_manager, 'max_workers', 0):
+            call_command('resume_batch_sync_tasks', stdout=out)
+
+        task = self.manager.get_task_status(task.id)
+        self.assertEqual(task.status, SyncStatus.COMPLETED)
+        self.assertEqual(task.success_count, 45)
+        self.assertEqual(self.group.user_set.count(), 45)
+        self.assertIn('共恢复 1 个任务', out.getvalue())
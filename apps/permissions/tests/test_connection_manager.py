@@ -0,0 +1,43 @@
+"""
+WebSocket 连接管理测试
+
+默认空闲超时按到期堆弹出过期连接；指定更短的超时时按最近活动时间扫描，同样能找到过期连接。
+"""
+import time
+
+from django.test import SimpleTestCase
+
+from apps.permissions.websocket_service import WebSocketConnectionManager
+
+
+class PopExpiredConnectionsTest(SimpleTestCase):
+    """空闲连接清理"""
+
+    def setUp(self):
+        self.manager = WebSocketConnectionManager()
+        self.manager.add_connection('idle', 1, {})
+        self.manager.add_connection('active', 2, {})
+
+    def make_idle(self, channel_name, seconds):
+        self.manager.active_connections[channel_name]['last_activity_ts'] = time.monotonic() - seconds
+
+    def test_nothing_expires_before_idle_timeout(self):
+        self.make_idle('idle', 120)
+        self.assertEqual(self.manager.pop_expired_connections(), [])
+        self.assertEqual(len(self.manager.active_connections), 2)
+
+    def test_default_timeout_uses_expiry_heap(self):
+        self.make_idle('idle', self.manager.idle_timeout + 1)
+        self.make_idle('active', self.manager.idle_timeout + 1)
+        self.manager._expiry_heap = [(time.monotonic() - 1, name) for name in ('active', 'idle')]
+        self.manager.update_activity('active')
+
+        self.assertEqual(self.manager.pop_expired_connections(), ['idle'])
+        self.assertEqual(list(self.manager.active_connections), ['active'])
+        self.assertEqual(self.manager.get_connection_stats()['expired_connections'], 1)
+
+    def test_shorter_timeout_scans_by_last_activity(self):
+        self.make_idle('idle', 120)
+        self.assertEqual(self.manager.cleanup_inactive_connections(timeout_minutes=1), 1)
+        self.assertEqual(list(self.manager.active_connections), ['active'])
+        self.assertEqual(self.manager.get_user_connections(1), [])
@@ -0,0 +1,134 @@
+"""
+通知分发器测试
+
+窗口内的通知按组合并后发送，并发发送数受信号量限制；
+发送在消费者登记的事件循环上执行，进程内通道层的接收方能被及时唤醒。
+"""
+import asyncio
+import time
+
+from asgiref.sync import async_to_sync
+from channels.layers import InMemoryChannelLayer
+from django.test import SimpleTestCase
+
+from apps.permissions.websocket_service import NotificationDispatcher
+
+
+class RecordingLayer:
+    """记录 group_send 调用及同时进行中的发送数"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.sent = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def group_send(self, group, message):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            self.sent.append((group, message))
+        finally:
+            self.in_flight -= 1
+
+
+def cache_invalidation(user_id, key):
+    return f'user_{user_id}', {'type': 'cache_invalidation', 'data': {'userId': user_id, 'cacheKeys': [key]}}
+
+
+class NotificationDispatcherTest(SimpleTestCase):
+    """合并、并发上限与进程内通道层投递"""
+
+    async def wait_delivered(self, dispatcher, count, timeout=2):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            stats = dispatcher.get_stats()
+            if stats['delivered'] + stats['dropped'] >= count:
+                return
+            await asyncio.sleep(0.005)
+        self.fail(f'{timeout} 秒内未完成发送: {dispatcher.get_stats()}')
+
+    def test_window_coalesces_per_group(self):
+        layer = RecordingLayer()
+        dispatcher = NotificationDispatcher(lambda: layer, window_ms=20)
+        role_updated = ('user_1', {'type': 'role_updated', 'data': {'newRole': 'teacher'}})
+
+        async def run():
+            dispatcher.bind_loop(asyncio.get_running_loop())
+            for i in range(10):
+                await dispatcher.dispatch([cache_invalidation(1, f'k{i}'), cache_invalidation(2, f'k{i}')])
+            # 内容相同的通知只发送一次，内容不同的各自发送
+            await dispatcher.dispatch([role_updated, role_updated, role_updated])
+            await dispatcher.dispatch([('user_1', {'type': 'system_notification', 'data': {'message': 'a'}}),
+                                       ('user_1', {'type': 'system_notification', 'data': {'message': 'b'}})])
+            await self.wait_delivered(dispatcher, 5)
+
+        async_to_sync(run)()
+
+        sent = {}
+        for group, message in layer.sent:
+            sent.setdefault((group, message['type']), []).append(message)
+        self.assertEqual(len(layer.sent), 5)
+        self.assertEqual(len(sent[('user_1', 'cache_invalidation')]), 1)
+        self.assertEqual(len(sent[('user_2', 'cache_invalidation')]), 1)
+        merged = sent[('user_1', 'cache_invalidation')][0]['data']
+        self.assertEqual(merged['cacheKeys'], [f'k{i}' for i in range(10)])
+        self.assertEqual(merged['coalescedEvents'], 10)
+        self.assertEqual(sent[('user_1', 'role_updated')][0]['data']['coalescedEvents'], 3)
+        self.assertEqual(
+            sorted(message['data']['message'] for message in sent[('user_1', 'system_notification')]), ['a', 'b']
+        )
+
+        stats = dispatcher.get_stats()
+        self.assertEqual((stats['enqueued'], stats['coalesced'], stats['flushes']), (25, 20, 1))
+
+    def test_sync_callers_share_one_window(self):
+        layer = RecordingLayer()
+        dispatcher = NotificationDispatcher(lambda: layer, window_ms=50)
+
+        started = time.monotonic()
+        for i in range(5):
+            # 每次 async_to_sync 调用运行在新的事件循环上，调用方不等待窗口结束
+            async_to_sync(dispatcher.dispatch)([cache_invalidation(1, f'k{i}')])
+        self.assertLess(time.monotonic() - started, 0.05)
+
+        async_to_sync(self.wait_delivered)(dispatcher, 1)
+        self.assertEqual(len(layer.sent), 1)
+        self.assertEqual(layer.sent[0][1]['data']['coalescedEvents'], 5)
+
+    def test_concurrency_is_bounded(self):
+        layer = RecordingLayer(delay=0.02)
+        dispatcher = NotificationDispatcher(lambda: layer, window_ms=0, max_concurrency=3)
+
+        async def run():
+            dispatcher.bind_loop(asyncio.get_running_loop())
+            await dispatcher.dispatch([cache_invalidation(user_id, 'k') for user_id in range(20)])
+            await self.wait_delivered(dispatcher, 20)
+
+        async_to_sync(run)()
+        self.assertEqual(len(layer.sent), 20)
+        self.assertEqual(layer.max_in_flight, 3)
+
+    def test_in_memory_layer_wakes_receiver(self):
+        layer = InMemoryChannelLayer()
+        dispatcher = NotificationDispatcher(lambda: layer, window_ms=10)
+
+        async def run():
+            loop = asyncio.get_running_loop()
+            dispatcher.bind_loop(loop)
+            channel = await layer.new_channel()
+            await layer.group_add('user_1', channel)
+            receiver = asyncio.ensure_future(layer.receive(channel))
+
+            started = time.monotonic()
+            # 同步代码在其他线程中经 async_to_sync 提交通知
+            await loop.run_in_executor(
+                None, async_to_sync(dispatcher.dispatch), [('user_1', {'type': 'role_updated', 'data': {}})]
+            )
+            message = await asyncio.wait_for(receiver, 2)
+            return message, time.monotonic() - started
+
+        message, elapsed = async_to_sync(run)()
+        self.assertEqual(message['type'], 'role_updated')
+        self.assertLess(elapsed, 0.5)
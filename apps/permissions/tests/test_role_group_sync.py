@@ -0,0 +1,66 @@
+"""
+用户角色组同步测试
+
+用户创建或角色变更时按角色组映射只应用组成员差异；未写入角色的保存不触发同步，也不查询组成员。
+"""
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from apps.accounts.models import UserRole
+from apps.permissions.models_optimized import AutoSyncConfig, OptimizedRoleGroupMapping
+
+User = get_user_model()
+
+
+class RoleGroupSyncTest(TestCase):
+    """角色组差异同步"""
+
+    def setUp(self):
+        self.config = AutoSyncConfig.objects.create()
+        self.student_group = Group.objects.create(name='sync_student')
+        self.teacher_group = Group.objects.create(name='sync_teacher')
+        OptimizedRoleGroupMapping.objects.create(role=UserRole.STUDENT, group=self.student_group)
+        OptimizedRoleGroupMapping.objects.create(role=UserRole.TEACHER, group=self.teacher_group)
+        self.user = User.objects.create_user(username='sync_user', password='testpass123', role=UserRole.STUDENT)
+
+    def group_queries(self, context):
+        table = User.groups.through._meta.db_table
+        return [query['sql'] for query in context.captured_queries if table in query['sql']]
+
+    def test_created_user_joins_role_group(self):
+        self.assertEqual(list(self.user.groups.all()), [self.student_group])
+
+    def test_save_without_role_change_skips_sync(self):
+        user = User.objects.get(pk=self.user.pk)
+        user.real_name = '张三'
+        with CaptureQueriesContext(connection) as context:
+            user.save()
+        self.assertFalse(self.group_queries(context))
+
+        with CaptureQueriesContext(connection) as context:
+            user.save(update_fields=['real_name'])
+        self.assertFalse(self.group_queries(context))
+
+    def test_role_change_applies_group_diff(self):
+        user = User.objects.get(pk=self.user.pk)
+        user.role = UserRole.TEACHER
+        user.save()
+        self.assertEqual(list(user.groups.all()), [self.teacher_group])
+
+        # 角色未变化的再次保存不改动组成员
+        user.groups.add(self.student_group)
+        user.save()
+        self.assertEqual(set(user.groups.all()), {self.student_group, self.teacher_group})
+
+    def test_disabled_config_skips_sync(self):
+        self.config.enable_auto_sync = False
+        self.config.save()
+
+        user = User.objects.get(pk=self.user.pk)
+        user.role = UserRole.TEACHER
+        user.save()
+        # accounts 的内置角色组分配不受同步配置控制，这里只检查映射组没有被同步
+        self.assertNotIn(self.teacher_group, user.groups.all())
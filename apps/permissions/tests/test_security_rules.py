@@ -0,0 +1,41 @@
+"""
+安全规则验证测试
+
+规则引擎预先计算的权限集合通过独立参数传给规则，调用方上下文中的同名键不会与之冲突；
+未经引擎直接调用 validate_rule 时仍按用户实时权限验证。
+"""
+from types import SimpleNamespace
+
+from django.test import SimpleTestCase
+
+from apps.permissions.validators import CompiledSecurityRule, SecurityRule, SecurityRuleType
+
+
+class CompiledSecurityRuleTest(SimpleTestCase):
+    """权限类规则的验证"""
+
+    def setUp(self):
+        self.rule = SecurityRule(
+            name='需要导出权限',
+            rule_type=SecurityRuleType.PERMISSION_VALIDATION,
+            config={'required_permissions': ['reports.export'], 'forbidden_permissions': ['reports.banned']},
+        )
+        self.user = SimpleNamespace(role='teacher', get_all_permissions=lambda: {'reports.view'})
+
+    def test_uses_precomputed_permissions(self):
+        compiled = CompiledSecurityRule(self.rule)
+        self.assertTrue(compiled.needs_permissions)
+        is_valid, _, details = compiled.validate(self.user, 'report', 'export', {}, frozenset({'reports.export'}))
+        self.assertTrue(is_valid, details)
+
+    def test_context_key_does_not_clash_with_parameter(self):
+        compiled = CompiledSecurityRule(self.rule)
+        context = {'user_permissions': {'reports.export'}, 'ip_address': '127.0.0.1'}
+        is_valid, _, details = compiled.validate(self.user, 'report', 'export', context, frozenset({'reports.banned'}))
+        self.assertFalse(is_valid)
+        self.assertEqual(details, {'missing_permissions': ['reports.export']})
+
+    def test_validate_rule_falls_back_to_user_permissions(self):
+        is_valid, _, details = self.rule.validate_rule(self.user, 'report', 'export', user_permissions={'reports.export'})
+        self.assertFalse(is_valid)
+        self.assertEqual(details, {'missing_permissions': ['reports.export']})
@@ -11,7 +11,8 @@ from .api_views import (
     get_user_permissions, get_role_permissions_config,
     sync_frontend_menus, get_frontend_menu_config,
     get_available_roles, get_role_fields, get_menu_version,
-    get_frontend_menus_for_user, get_menu_by_position, check_menu_access
+    get_frontend_menus_for_user, get_menu_by_position, check_menu_access,
+    get_websocket_stats
 )
 # RoleMenuPermissionViewSet 已废弃，请使用 MenuValidity 和 RoleMenuAssignment 替代
 from .operation_log_views import OperationLogViewSet
@@ -70,6 +71,9 @@ urlpatterns = [
     # 菜单版本控制API
     path('api/menu/version/', get_menu_version, name='get_menu_version'),
     
+    # WebSocket运行统计API
+    path('api/websocket/stats/', get_websocket_stats, name='get_websocket_stats'),
+    
     # 角色相关API
     path('roles/available/', get_available_roles, name='get_available_roles'),
     path('roles/<str:role_id>/fields/', get_role_fields, name='get_role_fields'),
@@ -4,21 +4,29 @@
 提供权限验证、安全规则检查和一致性验证功能
 """
 
+import ipaddress
 import logging
+import random
+import threading
+import time
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple, Any, Union
 from enum import Enum
 
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Permission, Group
+from django.core.cache import cache
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 from django.db.models import Q, Count
+from django.db.models.signals import post_save, post_delete
 from django.conf import settings
 
+from apps.teaching.dashboard_cache import bump_stamp, get_stamp
+
 from .models import UserRole
-from .audit import audit_service, AuditActionType, AuditResult, AuditRiskLevel
+from .audit import audit_service, AuditActionType, AuditResult
 
 User = get_user_model()
 logger = logging.getLogger(__name__)
@@ -38,6 +46,57 @@ class SecurityRuleType(models.TextChoices):
     DEVICE_RESTRICTION = 'device_restriction', '设备限制'
 
 
+class IPPrefixSet:
+    """
+    IP/CIDR 前缀集合
+
+    把 IP 地址和 CIDR 网段预编译为按前缀长度分组的整数集合，
+    匹配时每种前缀长度只需一次集合查找，与条目数量无关。
+    """
+
+    def __init__(self, entries):
+        self._prefixes = {4: {}, 6: {}}
+        self.invalid_entries = []
+        for entry in entries or []:
+            try:
+                network = ipaddress.ip_network(str(entry).strip(), strict=False)
+            except ValueError:
+                self.invalid_entries.append(entry)
+                continue
+            shift = network.max_prefixlen - network.prefixlen
+            self._prefixes[network.version].setdefault(shift, set()).add(int(network.network_address) >> shift)
+
+        if self.invalid_entries:
+            logger.warning(f"忽略无效的IP规则条目: {self.invalid_entries}")
+
+    def __bool__(self):
+        return bool(self._prefixes[4] or self._prefixes[6])
+
+    def __contains__(self, ip_address):
+        try:
+            address = ipaddress.ip_address(str(ip_address).strip())
+        except ValueError:
+            return False
+        if address.version == 6 and address.ipv4_mapped:
+            address = address.ipv4_mapped
+
+        value = int(address)
+        return any((value >> shift) in networks for shift, networks in self._prefixes[address.version].items())
+
+
+def increment_rate_counter(scope: str, time_window: int) -> int:
+    """在缓存中按固定时间窗口计数，返回本次请求计入后的次数"""
+    window = int(time.time()) // time_window
+    key = f'security_rule:rate:{scope}:{window}'
+    cache.add(key, 0, time_window)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # 计数键在 add 与 incr 之间过期
+        cache.set(key, 1, time_window)
+        return 1
+
+
 class SecurityRule(models.Model):
     """安全规则模型"""
     
@@ -154,7 +213,7 @@ class SecurityRule(models.Model):
             # 根据规则类型执行验证
             validation_method = getattr(self, f'_validate_{self.rule_type}', None)
             if validation_method:
-                return validation_method(user, resource_type, action, **context)
+                return validation_method(user, resource_type, action, context)
             else:
                 logger.warning(f"未找到规则类型 {self.rule_type} 的验证方法")
                 return True, "未实现的规则类型", {}
@@ -163,7 +222,20 @@ class SecurityRule(models.Model):
             logger.error(f"规则验证失败: {self.name} - {str(e)}")
             return False, f"规则验证异常: {str(e)}", {'error': str(e)}
     
-    def _validate_access_control(self, user, resource_type, action, **context):
+    def ip_prefix_set(self) -> IPPrefixSet:
+        """预编译的 IP 前缀集合，随规则实例缓存"""
+        if getattr(self, '_ip_prefix_set', None) is None:
+            self._ip_prefix_set = IPPrefixSet(self.config.get('ip_addresses', []))
+        return self._ip_prefix_set
+
+    @staticmethod
+    def _user_permissions(user, user_permissions):
+        """优先使用规则引擎为本次验证预先计算的权限集合"""
+        if user_permissions is None:
+            user_permissions = set(user.get_all_permissions())
+        return user_permissions
+
+    def _validate_access_control(self, user, resource_type, action, context, user_permissions=None):
         """验证访问控制"""
         config = self.config
         allowed_actions = config.get('allowed_actions', [])
@@ -180,7 +252,7 @@ class SecurityRule(models.Model):
         
         # 检查必需权限
         if required_permissions:
-            user_permissions = set(user.get_all_permissions())
+            user_permissions = self._user_permissions(user, user_permissions)
             missing_permissions = set(required_permissions) - user_permissions
             if missing_permissions:
                 return False, f"缺少必需权限: {', '.join(missing_permissions)}", {
@@ -189,24 +261,16 @@ class SecurityRule(models.Model):
         
         return True, "访问控制验证通过", {}
     
-    def _validate_rate_limit(self, user, resource_type, action, **context):
+    def _validate_rate_limit(self, user, resource_type, action, context, user_permissions=None):
         """验证频率限制"""
         config = self.config
         max_requests = config.get('max_requests', 100)
         time_window = config.get('time_window', 3600)  # 秒
         
-        # 检查用户在时间窗口内的请求次数
-        since_time = timezone.now() - timedelta(seconds=time_window)
+        # 缓存计数器按固定时间窗口统计用户对该资源的请求次数（含本次）
+        request_count = increment_rate_counter(f'{self.pk}:{user.pk}:{resource_type}', time_window)
         
-        # 从审计日志中统计请求次数
-        from .audit import PermissionAuditLog
-        request_count = PermissionAuditLog.objects.filter(
-            user=user,
-            resource=resource_type,
-            timestamp__gte=since_time
-        ).count()
-        
-        if request_count >= max_requests:
+        if request_count > max_requests:
             return False, f"超过频率限制: {request_count}/{max_requests} 在 {time_window} 秒内", {
                 'current_count': request_count,
                 'max_requests': max_requests,
@@ -218,7 +282,7 @@ class SecurityRule(models.Model):
             'max_requests': max_requests
         }
     
-    def _validate_ip_whitelist(self, user, resource_type, action, **context):
+    def _validate_ip_whitelist(self, user, resource_type, action, context, user_permissions=None):
         """验证IP白名单"""
         config = self.config
         whitelist = config.get('ip_addresses', [])
@@ -227,7 +291,9 @@ class SecurityRule(models.Model):
         if not ip_address:
             return False, "无法获取IP地址", {}
         
-        if whitelist and ip_address not in whitelist:
+        # 支持单个地址和 CIDR 网段
+        prefix_set = self.ip_prefix_set()
+        if prefix_set and ip_address not in prefix_set:
             return False, f"IP地址 {ip_address} 不在白名单中", {
                 'ip_address': ip_address,
                 'whitelist': whitelist
@@ -235,7 +301,7 @@ class SecurityRule(models.Model):
         
         return True, "IP白名单验证通过", {'ip_address': ip_address}
     
-    def _validate_ip_blacklist(self, user, resource_type, action, **context):
+    def _validate_ip_blacklist(self, user, resource_type, action, context, user_permissions=None):
         """验证IP黑名单"""
         config = self.config
         blacklist = config.get('ip_addresses', [])
@@ -244,7 +310,7 @@ class SecurityRule(models.Model):
         if not ip_address:
             return True, "无法获取IP地址，跳过黑名单检查", {}
         
-        if blacklist and ip_address in blacklist:
+        if ip_address in self.ip_prefix_set():
             return False, f"IP地址 {ip_address} 在黑名单中", {
                 'ip_address': ip_address,
                 'blacklist': blacklist
@@ -252,7 +318,7 @@ class SecurityRule(models.Model):
         
         return True, "IP黑名单验证通过", {'ip_address': ip_address}
     
-    def _validate_time_restriction(self, user, resource_type, action, **context):
+    def _validate_time_restriction(self, user, resource_type, action, context, user_permissions=None):
         """验证时间限制"""
         config = self.config
         allowed_hours = config.get('allowed_hours', [])
@@ -281,7 +347,7 @@ class SecurityRule(models.Model):
             'current_day': current_day
         }
     
-    def _validate_role_restriction(self, user, resource_type, action, **context):
+    def _validate_role_restriction(self, user, resource_type, action, context, user_permissions=None):
         """验证角色限制"""
         config = self.config
         min_role_level = config.get('min_role_level')
@@ -329,14 +395,14 @@ class SecurityRule(models.Model):
         
         return True, "角色限制验证通过", {'user_level': user_level}
     
-    def _validate_permission_validation(self, user, resource_type, action, **context):
+    def _validate_permission_validation(self, user, resource_type, action, context, user_permissions=None):
         """验证权限"""
         config = self.config
         required_permissions = config.get('required_permissions', [])
         forbidden_permissions = config.get('forbidden_permissions', [])
         
         if required_permissions or forbidden_permissions:
-            user_permissions = set(user.get_all_permissions())
+            user_permissions = self._user_permissions(user, user_permissions)
             
             # 检查必需权限
             if required_permissions:
@@ -356,7 +422,7 @@ class SecurityRule(models.Model):
         
         return True, "权限验证通过", {}
     
-    def _validate_concurrent_session(self, user, resource_type, action, **context):
+    def _validate_concurrent_session(self, user, resource_type, action, context, user_permissions=None):
         """验证并发会话限制"""
         config = self.config
         max_sessions = config.get('max_sessions', 1)
@@ -366,11 +432,127 @@ class SecurityRule(models.Model):
         return True, "并发会话验证通过", {'max_sessions': max_sessions}
 
 
+class CompiledSecurityRule:
+    """预编译的安全规则：适用范围转为集合，IP 规则预编译前缀集合"""
+
+    PERMISSION_RULE_TYPES = (SecurityRuleType.ACCESS_CONTROL, SecurityRuleType.PERMISSION_VALIDATION)
+
+    def __init__(self, rule: SecurityRule):
+        self.rule = rule
+        self.name = rule.name
+        self.rule_type = rule.rule_type
+        self.violation_action = rule.violation_action
+        self.roles = frozenset(rule.target_roles or ())
+        self.resources = frozenset(rule.target_resources or ())
+        self.actions = frozenset(rule.target_actions or ())
+        self.needs_permissions = rule.rule_type in self.PERMISSION_RULE_TYPES and bool(
+            rule.config.get('required_permissions') or rule.config.get('forbidden_permissions')
+        )
+        self._validate = getattr(rule, f'_validate_{rule.rule_type}', None)
+
+        if rule.rule_type in (SecurityRuleType.IP_WHITELIST, SecurityRuleType.IP_BLACKLIST):
+            rule.ip_prefix_set()
+
+    def applies_to(self, role, resource_type, action) -> bool:
+        """与 SecurityRule.validate_rule 的范围判断一致"""
+        if self.roles and role not in self.roles:
+            return False
+        if self.resources and resource_type not in self.resources:
+            return False
+        if self.actions and action and action not in self.actions:
+            return False
+        return True
+
+    def validate(self, user, resource_type, action, context, user_permissions=None) -> Tuple[bool, str, Dict]:
+        if self._validate is None:
+            logger.warning(f"未找到规则类型 {self.rule_type} 的验证方法")
+            return True, "未实现的规则类型", {}
+        try:
+            return self._validate(user, resource_type, action, context, user_permissions)
+        except Exception as e:
+            logger.error(f"规则验证失败: {self.name} - {str(e)}")
+            return False, f"规则验证异常: {str(e)}", {'error': str(e)}
+
+
+class SecurityRuleEngine:
+    """
+    安全规则引擎
+
+    启用的规则加载一次后编译在内存中，按 (角色, 资源, 操作) 缓存适用的规则列表。
+    规则变更时递增缓存中的版本号，各进程最多每 SECURITY_RULES_VERSION_CHECK_SECONDS 秒检查一次版本并重新加载。
+    """
+
+    VERSION_CACHE_KEY = 'security_rules:version'
+    MAX_RESOLVED_KEYS = 4096
+
+    def __init__(self):
+        self.check_interval = getattr(settings, 'SECURITY_RULES_VERSION_CHECK_SECONDS', 5)
+        self._lock = threading.Lock()
+        self._checked_at = 0.0
+        # (版本号, 编译后的规则, {(角色, 资源, 操作): 适用规则})，整体替换保证读取一致
+        self._state = (None, (), {})
+
+    def get_version(self) -> int:
+        return get_stamp(self.VERSION_CACHE_KEY)
+
+    def invalidate(self):
+        """规则变更后递增版本号，本进程在下次验证时立即重新加载"""
+        bump_stamp(self.VERSION_CACHE_KEY)
+        self._checked_at = 0.0
+
+    def ensure_loaded(self):
+        now = time.monotonic()
+        if self._state[0] is not None and now - self._checked_at < self.check_interval:
+            return
+
+        version = self.get_version()
+        self._checked_at = now
+        if version == self._state[0]:
+            return
+
+        with self._lock:
+            if version == self._state[0]:
+                return
+            rules = SecurityRule.objects.filter(is_active=True).order_by('-priority', '-created_at')
+            compiled = tuple(CompiledSecurityRule(rule) for rule in rules)
+            self._state = (version, compiled, {})
+            logger.info(f"安全规则已加载: {len(compiled)} 条，版本 {version}")
+
+    def rules_for(self, role, resource_type, action) -> Tuple[CompiledSecurityRule, ...]:
+        """获取适用于 (角色, 资源, 操作) 的规则，按优先级排序"""
+        self.ensure_loaded()
+        _, compiled, resolved = self._state
+
+        key = (role, resource_type, action)
+        rules = resolved.get(key)
+        if rules is None:
+            rules = tuple(rule for rule in compiled if rule.applies_to(role, resource_type, action))
+            if len(resolved) >= self.MAX_RESOLVED_KEYS:
+                resolved.clear()
+            resolved[key] = rules
+        return rules
+
+
+security_rule_engine = SecurityRuleEngine()
+
+
+def invalidate_security_rules(sender, **kwargs):
+    """安全规则保存或删除后，事务提交时使编译结果失效"""
+    transaction.on_commit(security_rule_engine.invalidate)
+
+
+post_save.connect(invalidate_security_rules, sender=SecurityRule, dispatch_uid='invalidate_security_rules_on_save')
+post_delete.connect(invalidate_security_rules, sender=SecurityRule, dispatch_uid='invalidate_security_rules_on_delete')
+
+
 class PermissionValidator:
     """权限验证器"""
     
     def __init__(self):
         self.logger = logging.getLogger(f"{__name__}.{self.__class__.__name__}")
+        self.rule_engine = security_rule_engine
+        # 验证通过的记录按比例采样写入审计日志，违规始终记录
+        self.pass_sample_rate = getattr(settings, 'SECURITY_AUDIT_PASS_SAMPLE_RATE', 0.01)
     
     def validate_user_access(self, user, resource_type, action=None, request=None, **context) -> Tuple[bool, str, List[str], Dict]:
         """验证用户访问权限"""
@@ -383,18 +565,21 @@ class PermissionValidator:
                     'session_key': request.session.session_key if hasattr(request, 'session') else None
                 })
             
-            # 获取适用的安全规则
-            rules = SecurityRule.objects.filter(
-                is_active=True
-            ).order_by('-priority')
+            # 获取适用的安全规则（已编译并按角色、资源、操作索引）
+            rules = self.rule_engine.rules_for(getattr(user, 'role', None), resource_type, action)
+            
+            # 权限集合每次验证只计算一次，供所有权限类规则共用
+            user_permissions = None
+            if any(rule.needs_permissions for rule in rules):
+                user_permissions = frozenset(user.get_all_permissions())
             
             violations = []
             rule_results = {}
             
             # 逐一验证规则
             for rule in rules:
-                is_valid, message, details = rule.validate_rule(
-                    user, resource_type, action, **context
+                is_valid, message, details = rule.validate(
+                    user, resource_type, action, context, user_permissions
                 )
                 
                 rule_results[rule.name] = {
@@ -410,9 +595,9 @@ class PermissionValidator:
                     audit_service.log_security_violation(
                         user=user,
                         violation_type=rule.rule_type,
-                        severity=AuditRiskLevel.MEDIUM,
                         description=f"安全规则违规: {rule.name} - {message}",
                         details={
+                            'severity': 'medium',
                             'rule_name': rule.name,
                             'rule_type': rule.rule_type,
                             'resource_type': resource_type,
@@ -443,17 +628,20 @@ class PermissionValidator:
                 )
                 return False, "访问被拒绝", violations, rule_results
             
-            # 记录成功访问日志
-            audit_service.log_permission_check(
-                user=user,
-                resource=resource_type,
-                action=action or '',
-                has_permission=True,
-                request=request,
-                details={
-                    'rule_results': rule_results
-                }
-            )
+            # 按采样率记录成功访问日志
+            if random.random() < self.pass_sample_rate:
+                audit_service.log_permission_check(
+                    user=user,
+                    resource=resource_type,
+                    action=action or '',
+                    has_permission=True,
+                    request=request,
+                    details={
+                        'rule_results': rule_results,
+                        'sampled': True,
+                        'sample_rate': self.pass_sample_rate
+                    }
+                )
             
             return True, "访问允许", [], rule_results
             
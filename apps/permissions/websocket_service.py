@@ -7,9 +7,12 @@
 import json
 import logging
 import asyncio
-from typing import Dict, Set, List, Optional, Any
-from datetime import datetime, timedelta
-from collections import defaultdict
+import heapq
+import threading
+import time
+from typing import Dict, Set, List, Optional, Any, Tuple
+from datetime import datetime
+from collections import defaultdict, deque
 
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
@@ -68,6 +71,25 @@ class PermissionWebSocketConsumer(AsyncWebsocketConsumer):
                     self.user_id = 0  # 匿名用户ID设为0
                     logger.info("WebSocket匿名连接已允许")
             
+            # 记录连接到管理器，超过连接上限时拒绝
+            headers = dict(self.scope.get('headers', []))
+            user_agent = headers.get(b'user-agent', b'').decode('utf-8')
+            client_ip = self.scope.get('client', ['unknown', None])[0]
+            
+            if not connection_manager.add_connection(
+                self.channel_name, 
+                self.user_id, 
+                {
+                    'connected_at': datetime.now(),
+                    'user_agent': user_agent,
+                    'client_ip': client_ip
+                }
+            ):
+                await self.close(code=1013)
+                return
+            connection_manager.ensure_housekeeping()
+            notification_service.dispatcher.bind_loop(asyncio.get_running_loop())
+            
             # 设置用户组
             logger.info("即将调用setup_user_groups")
             await self.setup_user_groups()
@@ -83,23 +105,8 @@ class PermissionWebSocketConsumer(AsyncWebsocketConsumer):
             
             logger.info("WebSocket连接建立完成")
             
-            # 记录连接到管理器
-            headers = dict(self.scope.get('headers', []))
-            user_agent = headers.get(b'user-agent', b'').decode('utf-8')
-            client_ip = self.scope.get('client', ['unknown', None])[0]
-            
-            connection_manager.add_connection(
-                self.channel_name, 
-                self.user_id, 
-                {
-                    'connected_at': datetime.now(),
-                    'user_agent': user_agent,
-                    'client_ip': client_ip
-                }
-            )
-            
             # 记录连接日志
-            await self.log_connection('connected')
+            self.log_connection('connected')
             
         except Exception as e:
             logger.error(f"WebSocket连接失败: {str(e)}")
@@ -137,7 +144,7 @@ class PermissionWebSocketConsumer(AsyncWebsocketConsumer):
             connection_manager.remove_connection(self.channel_name)
             
             # 记录断开连接日志
-            await self.log_connection('disconnected', close_code)
+            self.log_connection('disconnected', close_code)
             
             logger.info(f"用户 {self.user_id} WebSocket连接已断开，代码: {close_code} ({close_reason})")
             
@@ -165,6 +172,8 @@ class PermissionWebSocketConsumer(AsyncWebsocketConsumer):
             
             # 更新心跳时间
             self.last_heartbeat = datetime.now()
+            connection_manager.update_activity(self.channel_name)
+            connection_manager.record_message('received')
             
             # 处理不同类型的消息
             if message_type == 'connect':
@@ -269,6 +278,16 @@ class PermissionWebSocketConsumer(AsyncWebsocketConsumer):
             'timestamp': datetime.now().isoformat()
         }))
     
+    async def send(self, text_data=None, bytes_data=None, close=False):
+        """发送消息并计入连接管理器的发送统计"""
+        if not close:
+            connection_manager.record_message('sent')
+        await super().send(text_data=text_data, bytes_data=bytes_data, close=close)
+    
+    async def connection_expired(self, event):
+        """连接空闲超时，由后台清理任务通知关闭"""
+        await self.close(code=4000)
+    
     # 权限变更通知处理方法
     async def permission_changed(self, event):
         """处理权限变更通知"""
@@ -459,9 +478,8 @@ class PermissionWebSocketConsumer(AsyncWebsocketConsumer):
             logger.error(f"权限检查失败: {e}")
             return False
     
-    @database_sync_to_async
     def log_connection(self, action, close_code=None):
-        """记录连接日志"""
+        """记录连接日志（进入连接管理器的缓冲区批量输出）"""
         try:
             log_data = {
                 'user_id': self.user_id,
@@ -473,22 +491,183 @@ class PermissionWebSocketConsumer(AsyncWebsocketConsumer):
             if close_code:
                 log_data['close_code'] = close_code
             
-            # 这里可以保存到数据库或日志文件
-            logger.info(f"WebSocket连接日志: {log_data}")
+            connection_manager.queue_log(log_data)
             
         except Exception as e:
             logger.error(f"记录连接日志失败: {e}")
 
 
+class NotificationDispatcher:
+    """
+    通知分发器
+    进程内所有调用方共用一个待发送队列，调用方（包括经 async_to_sync 调用的同步代码）只负责入队，
+    不等待窗口结束。窗口计时与发送在 WebSocket 消费者所在的事件循环上执行（消费者连接时通过
+    bind_loop 登记），进程内通道层（InMemoryChannelLayer）的队列只能由该循环唤醒接收方；
+    没有登记的循环时（例如管理命令进程）使用后台线程上的私有事件循环。
+    可合并的消息类型（缓存失效）在窗口内按 (组, 类型) 合并缓存键；其他消息按 (组, 消息内容) 去重，
+    内容不同的通知各自发送。窗口结束后通过 asyncio.gather 并发发送，并发数由信号量限制。
+    同时统计投递、合并、丢弃数量及入队到发送完成的延迟。
+    """
+    
+    # 重复发送无副作用、可在窗口内合并的消息类型
+    MERGEABLE_TYPES = frozenset({'cache_invalidation'})
+    
+    def __init__(self, channel_layer_getter, window_ms: Optional[int] = None,
+                 max_concurrency: Optional[int] = None):
+        self._get_channel_layer = channel_layer_getter
+        if window_ms is None:
+            window_ms = getattr(settings, 'PERMISSION_NOTIFY_COALESCE_WINDOW_MS', 20)
+        self.window = max(window_ms, 0) / 1000
+        self.max_concurrency = max_concurrency or getattr(settings, 'PERMISSION_NOTIFY_MAX_CONCURRENCY', 100)
+        
+        # 待发送消息：键 -> {'group', 'message', 'events', 'enqueued_at'}
+        self._pending: Dict[Any, Dict[str, Any]] = {}
+        self._pending_events = 0
+        self._flush_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._home_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+        self._stats = {
+            'enqueued': 0,
+            'coalesced': 0,
+            'delivered': 0,
+            'dropped': 0,
+            'flushes': 0,
+            'latency_total_ms': 0.0,
+            'latency_max_ms': 0.0,
+        }
+    
+    async def dispatch(self, items: List[Tuple[str, Dict[str, Any]]]):
+        """提交一组 (组名, 消息)，由后台发送循环在窗口结束后统一发送，调用方不等待发送完成"""
+        if not items:
+            return
+        
+        enqueued_at = time.monotonic()
+        with self._lock:
+            for group, message in items:
+                key = self._key(group, message)
+                previous = self._pending.get(key)
+                self._pending[key] = {
+                    'group': group,
+                    'message': self._merge(previous['message'], message) if previous else message,
+                    'events': previous['events'] + 1 if previous else 1,
+                    'enqueued_at': previous['enqueued_at'] if previous else enqueued_at,
+                }
+            self._pending_events += len(items)
+            self._stats['enqueued'] += len(items)
+            
+            # 已安排发送且所在循环仍在运行时只需入队
+            if self._flush_loop is not None and self._flush_loop.is_running():
+                return
+            loop = self._flush_loop = self._target_loop()
+        
+        loop.call_soon_threadsafe(self._schedule_flush, loop)
+    
+    def bind_loop(self, loop: asyncio.AbstractEventLoop):
+        """登记 WebSocket 消费者所在的事件循环，之后的发送在该循环上执行"""
+        with self._lock:
+            self._home_loop = loop
+    
+    def _key(self, group: str, message: Dict[str, Any]):
+        """合并键：可合并类型按 (组, 类型)，其他消息按 (组, 消息内容)"""
+        message_type = message.get('type')
+        if message_type in self.MERGEABLE_TYPES:
+            return group, message_type
+        return group, json.dumps(message, sort_keys=True, default=str)
+    
+    @staticmethod
+    def _merge(previous: Dict[str, Any], message: Dict[str, Any]) -> Dict[str, Any]:
+        """合并同组消息：缓存失效通知合并全部缓存键，内容相同的消息保留一条"""
+        if message.get('type') != 'cache_invalidation':
+            return message
+        
+        cache_keys = list(dict.fromkeys(
+            previous['data'].get('cacheKeys', []) + message['data'].get('cacheKeys', [])
+        ))
+        return {**message, 'data': {**message['data'], 'cacheKeys': cache_keys}}
+    
+    def _target_loop(self) -> asyncio.AbstractEventLoop:
+        """选择执行发送的事件循环（调用方需持有锁）"""
+        if self._home_loop is not None and self._home_loop.is_running():
+            return self._home_loop
+        return self._ensure_loop()
+    
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        """启动进程内唯一的后台发送循环（调用方需持有锁）"""
+        if self._loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=loop.run_forever, name='permission-notify', daemon=True
+            ).start()
+            self._loop = loop
+        return self._loop
+    
+    def _schedule_flush(self, loop: asyncio.AbstractEventLoop):
+        """在发送循环中安排窗口结束后的发送"""
+        loop.call_later(self.window, lambda: loop.create_task(self._flush()))
+    
+    async def _flush(self):
+        """发送窗口内合并后的消息"""
+        with self._lock:
+            entries = list(self._pending.values())
+            self._stats['coalesced'] += self._pending_events - len(entries)
+            self._stats['flushes'] += 1
+            self._pending = {}
+            self._pending_events = 0
+            self._flush_loop = None
+        
+        channel_layer = self._get_channel_layer()
+        if channel_layer is None:
+            self._record(dropped=len(entries))
+            return
+        
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        
+        async def send(entry):
+            message = entry['message']
+            if entry['events'] > 1 and isinstance(message.get('data'), dict):
+                message = {**message, 'data': {**message['data'], 'coalescedEvents': entry['events']}}
+            async with semaphore:
+                try:
+                    await channel_layer.group_send(entry['group'], message)
+                except Exception as e:
+                    logger.error(f"发送通知失败: {entry['group']}, 错误: {e}")
+                    self._record(dropped=1)
+                    return
+            self._record(delivered=1, latency_ms=(time.monotonic() - entry['enqueued_at']) * 1000)
+        
+        await asyncio.gather(*(send(entry) for entry in entries))
+    
+    def _record(self, delivered: int = 0, dropped: int = 0, latency_ms: Optional[float] = None):
+        """更新分发计数器"""
+        with self._lock:
+            self._stats['delivered'] += delivered
+            self._stats['dropped'] += dropped
+            if latency_ms is not None:
+                self._stats['latency_total_ms'] += latency_ms
+                self._stats['latency_max_ms'] = max(self._stats['latency_max_ms'], latency_ms)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """获取分发统计"""
+        with self._lock:
+            stats = dict(self._stats)
+        delivered = stats['delivered']
+        stats['latency_avg_ms'] = round(stats.pop('latency_total_ms') / delivered, 2) if delivered else 0.0
+        stats['latency_max_ms'] = round(stats['latency_max_ms'], 2)
+        stats['pending'] = len(self._pending)
+        return stats
+
+
 class PermissionNotificationService:
     """
     权限通知服务
-    负责发送各种权限相关的通知
+    负责发送各种权限相关的通知，所有消息经 NotificationDispatcher 合并后并发发送
     """
     
     def __init__(self):
         self.channel_layer = None
         self._setup_channel_layer()
+        self.dispatcher = NotificationDispatcher(lambda: self.channel_layer)
     
     def _setup_channel_layer(self):
         """设置Channel Layer"""
@@ -498,6 +677,10 @@ class PermissionNotificationService:
         except Exception as e:
             logger.error(f"设置Channel Layer失败: {e}")
     
+    def get_stats(self) -> Dict[str, Any]:
+        """获取通知分发统计"""
+        return self.dispatcher.get_stats()
+    
     async def notify_permission_change(self, user_id: int, permissions: List[str], 
                                      action: str, resource: str, **kwargs):
         """通知权限变更"""
@@ -505,24 +688,25 @@ class PermissionNotificationService:
             return
         
         try:
+            timestamp = datetime.now().isoformat()
             notification_data = {
                 'userId': user_id,
                 'permissions': permissions,
                 'action': action,
                 'resource': resource,
-                'timestamp': datetime.now().isoformat(),
+                'timestamp': timestamp,
                 **kwargs
             }
             
             # 发送给特定用户
-            await self.channel_layer.group_send(
+            await self.dispatcher.dispatch([(
                 f"user_{user_id}",
                 {
                     'type': 'permission_changed',
                     'data': notification_data,
-                    'timestamp': datetime.now().isoformat()
+                    'timestamp': timestamp
                 }
-            )
+            )])
             
             logger.info(f"权限变更通知已发送给用户 {user_id}: {action} {resource}")
             
@@ -536,23 +720,24 @@ class PermissionNotificationService:
             return
         
         try:
+            timestamp = datetime.now().isoformat()
             notification_data = {
                 'userId': user_id,
                 'oldRole': old_role,
                 'newRole': new_role,
                 'permissions': permissions,
-                'timestamp': datetime.now().isoformat(),
+                'timestamp': timestamp,
                 **kwargs
             }
             
-            await self.channel_layer.group_send(
+            await self.dispatcher.dispatch([(
                 f"user_{user_id}",
                 {
                     'type': 'role_updated',
                     'data': notification_data,
-                    'timestamp': datetime.now().isoformat()
+                    'timestamp': timestamp
                 }
-            )
+            )])
             
             logger.info(f"角色更新通知已发送给用户 {user_id}: {old_role} -> {new_role}")
             
@@ -565,21 +750,22 @@ class PermissionNotificationService:
             return
         
         try:
+            timestamp = datetime.now().isoformat()
             notification_data = {
                 'userId': user_id,
                 'menuChanges': menu_changes,
-                'timestamp': datetime.now().isoformat(),
+                'timestamp': timestamp,
                 **kwargs
             }
             
-            await self.channel_layer.group_send(
+            await self.dispatcher.dispatch([(
                 f"user_{user_id}",
                 {
                     'type': 'menu_access_changed',
                     'data': notification_data,
-                    'timestamp': datetime.now().isoformat()
+                    'timestamp': timestamp
                 }
-            )
+            )])
             
             logger.info(f"菜单访问变更通知已发送给用户 {user_id}")
             
@@ -593,16 +779,18 @@ class PermissionNotificationService:
             return
         
         try:
+            user_ids = list(dict.fromkeys(user_ids))
+            timestamp = datetime.now().isoformat()
             notification_data = {
                 'updateSummary': update_summary,
                 'affectedUsers': len(user_ids),
-                'timestamp': datetime.now().isoformat(),
+                'timestamp': timestamp,
                 **kwargs
             }
             
-            # 发送给所有受影响的用户
-            for user_id in user_ids:
-                await self.channel_layer.group_send(
+            # 发送给所有受影响的用户，由分发器并发发送
+            await self.dispatcher.dispatch([
+                (
                     f"user_{user_id}",
                     {
                         'type': 'system_notification',
@@ -611,9 +799,11 @@ class PermissionNotificationService:
                             'userId': user_id,
                             'type': 'batch_permission_update'
                         },
-                        'timestamp': datetime.now().isoformat()
+                        'timestamp': timestamp
                     }
                 )
+                for user_id in user_ids
+            ])
             
             logger.info(f"批量权限更新通知已发送给 {len(user_ids)} 个用户")
             
@@ -627,35 +817,28 @@ class PermissionNotificationService:
             return
         
         try:
+            timestamp = datetime.now().isoformat()
             notification_data = {
                 'type': 'maintenance',
                 'message': message,
                 'priority': priority,
-                'timestamp': datetime.now().isoformat(),
+                'timestamp': timestamp,
                 **kwargs
             }
+            event = {
+                'type': 'system_notification',
+                'data': notification_data,
+                'timestamp': timestamp
+            }
             
             if target_users:
                 # 发送给特定用户
-                for user_id in target_users:
-                    await self.channel_layer.group_send(
-                        f"user_{user_id}",
-                        {
-                            'type': 'system_notification',
-                            'data': notification_data,
-                            'timestamp': datetime.now().isoformat()
-                        }
-                    )
+                groups = [f"user_{user_id}" for user_id in dict.fromkeys(target_users)]
             else:
                 # 发送给所有在线用户
-                await self.channel_layer.group_send(
-                    "global_notifications",
-                    {
-                        'type': 'system_notification',
-                        'data': notification_data,
-                        'timestamp': datetime.now().isoformat()
-                    }
-                )
+                groups = ["global_notifications"]
+            
+            await self.dispatcher.dispatch([(group, event) for group in groups])
             
             logger.info(f"系统维护通知已发送: {message}")
             
@@ -668,21 +851,22 @@ class PermissionNotificationService:
             return
         
         try:
+            timestamp = datetime.now().isoformat()
             notification_data = {
                 'userId': user_id,
                 'cacheKeys': cache_keys,
-                'timestamp': datetime.now().isoformat(),
+                'timestamp': timestamp,
                 **kwargs
             }
             
-            await self.channel_layer.group_send(
+            await self.dispatcher.dispatch([(
                 f"user_{user_id}",
                 {
                     'type': 'cache_invalidation',
                     'data': notification_data,
-                    'timestamp': datetime.now().isoformat()
+                    'timestamp': timestamp
                 }
-            )
+            )])
             
             logger.info(f"缓存失效通知已发送给用户 {user_id}: {cache_keys}")
             
@@ -690,10 +874,42 @@ class PermissionNotificationService:
             logger.error(f"发送缓存失效通知失败: {e}")
 
 
+class _RateCounter:
+    """按秒分桶的滑动窗口计数器，用于统计最近一段时间的消息速率"""
+    
+    def __init__(self, window_seconds: int = 60):
+        self.window_seconds = window_seconds
+        self._buckets = [0] * window_seconds
+        self._bucket_seconds = [0] * window_seconds
+        self.total = 0
+    
+    def add(self, count: int = 1):
+        second = int(time.monotonic())
+        index = second % self.window_seconds
+        if self._bucket_seconds[index] != second:
+            self._bucket_seconds[index] = second
+            self._buckets[index] = 0
+        self._buckets[index] += count
+        self.total += count
+    
+    def rate_per_second(self) -> float:
+        now = int(time.monotonic())
+        recent = sum(
+            count for count, second in zip(self._buckets, self._bucket_seconds)
+            if now - second < self.window_seconds
+        )
+        return round(recent / self.window_seconds, 2)
+
+
 class WebSocketConnectionManager:
     """
     WebSocket连接管理器
     管理活跃连接、连接统计和健康检查
+    
+    连接按 channel_name 和用户双重索引，按用户查询连接为 O(1)；
+    空闲过期使用最小堆，心跳只更新时间戳，清理时仅弹出已到期的堆顶，
+    未真正过期的连接按最新活动时间重新入堆，无需遍历全部连接。
+    连接日志先进入内存缓冲区，由后台清理任务批量输出。
     """
     
     def __init__(self):
@@ -703,72 +919,181 @@ class WebSocketConnectionManager:
             'total_connections': 0,
             'active_connections': 0,
             'failed_connections': 0,
-            'disconnections': 0
-        }
-    
-    def add_connection(self, channel_name: str, user_id: int, connection_info: Dict):
-        """添加连接"""
-        self.active_connections[channel_name] = {
-            'user_id': user_id,
-            'connected_at': datetime.now(),
-            'last_activity': datetime.now(),
-            **connection_info
+            'rejected_connections': 0,
+            'disconnections': 0,
+            'expired_connections': 0
         }
+        self.max_connections = getattr(settings, 'WEBSOCKET_MAX_CONNECTIONS', 10000)
+        self.max_connections_per_user = getattr(settings, 'WEBSOCKET_MAX_CONNECTIONS_PER_USER', 20)
+        self.idle_timeout = getattr(settings, 'WEBSOCKET_IDLE_TIMEOUT_MINUTES', 30) * 60
+        self.log_batch_size = getattr(settings, 'WEBSOCKET_LOG_BATCH_SIZE', 200)
         
-        self.user_connections[user_id].add(channel_name)
-        self.connection_stats['total_connections'] += 1
-        self.connection_stats['active_connections'] += 1
+        self._expiry_heap: List[Tuple[float, str]] = []
+        self._pending_logs: deque = deque()
+        self._messages_received = _RateCounter()
+        self._messages_sent = _RateCounter()
+        self._housekeeping_loops: Set[Any] = set()
+        self._lock = threading.Lock()
+    
+    def add_connection(self, channel_name: str, user_id: int, connection_info: Dict) -> bool:
+        """添加连接，超过全局或单用户连接上限时拒绝并返回 False"""
+        with self._lock:
+            if len(self.active_connections) >= self.max_connections or (
+                self.max_connections_per_user
+                and user_id
+                and len(self.user_connections.get(user_id, ())) >= self.max_connections_per_user
+            ):
+                self.connection_stats['rejected_connections'] += 1
+                logger.warning(f"WebSocket连接数已达上限，拒绝连接: {channel_name}, 用户: {user_id}")
+                return False
+            
+            now = datetime.now()
+            self.active_connections[channel_name] = {
+                'user_id': user_id,
+                'connected_at': now,
+                'last_activity': now,
+                **connection_info,
+                'last_activity_ts': time.monotonic()
+            }
+            heapq.heappush(self._expiry_heap, (time.monotonic() + self.idle_timeout, channel_name))
+            
+            self.user_connections[user_id].add(channel_name)
+            self.connection_stats['total_connections'] += 1
+            self.connection_stats['active_connections'] += 1
         
         logger.info(f"新增WebSocket连接: {channel_name}, 用户: {user_id}")
+        return True
     
     def remove_connection(self, channel_name: str):
-        """移除连接"""
-        if channel_name in self.active_connections:
-            connection_info = self.active_connections[channel_name]
-            user_id = connection_info['user_id']
-            
-            del self.active_connections[channel_name]
-            self.user_connections[user_id].discard(channel_name)
+        """移除连接（堆中的过期条目在弹出时惰性丢弃）"""
+        with self._lock:
+            connection_info = self.active_connections.pop(channel_name, None)
+            if connection_info is None:
+                return
             
-            if not self.user_connections[user_id]:
-                del self.user_connections[user_id]
+            user_id = connection_info['user_id']
+            channels = self.user_connections.get(user_id)
+            if channels is not None:
+                channels.discard(channel_name)
+                if not channels:
+                    del self.user_connections[user_id]
             
             self.connection_stats['active_connections'] -= 1
             self.connection_stats['disconnections'] += 1
-            
-            logger.info(f"移除WebSocket连接: {channel_name}, 用户: {user_id}")
+        
+        logger.info(f"移除WebSocket连接: {channel_name}, 用户: {user_id}")
     
     def update_activity(self, channel_name: str):
-        """更新连接活动时间"""
-        if channel_name in self.active_connections:
-            self.active_connections[channel_name]['last_activity'] = datetime.now()
+        """更新连接活动时间，O(1)，不调整堆"""
+        connection_info = self.active_connections.get(channel_name)
+        if connection_info is not None:
+            connection_info['last_activity'] = datetime.now()
+            connection_info['last_activity_ts'] = time.monotonic()
+    
+    def record_message(self, direction: str, count: int = 1):
+        """记录收发消息数，direction 为 received 或 sent"""
+        counter = self._messages_received if direction == 'received' else self._messages_sent
+        with self._lock:
+            counter.add(count)
     
     def get_user_connections(self, user_id: int) -> List[str]:
         """获取用户的所有连接"""
-        return list(self.user_connections.get(user_id, set()))
+        return list(self.user_connections.get(user_id, ()))
     
     def get_connection_stats(self) -> Dict:
         """获取连接统计"""
-        return {
-            **self.connection_stats,
-            'current_active': len(self.active_connections),
-            'unique_users': len(self.user_connections)
-        }
+        with self._lock:
+            return {
+                **self.connection_stats,
+                'current_active': len(self.active_connections),
+                'unique_users': len(self.user_connections),
+                'max_connections': self.max_connections,
+                'messages_received': self._messages_received.total,
+                'messages_sent': self._messages_sent.total,
+                'received_per_second': self._messages_received.rate_per_second(),
+                'sent_per_second': self._messages_sent.rate_per_second(),
+                'pending_logs': len(self._pending_logs)
+            }
     
-    def cleanup_inactive_connections(self, timeout_minutes: int = 30):
-        """清理不活跃的连接"""
-        timeout_threshold = datetime.now() - timedelta(minutes=timeout_minutes)
-        inactive_connections = []
+    def pop_expired_connections(self, timeout_minutes: Optional[int] = None) -> List[str]:
+        """
+        弹出空闲超时的连接并从注册表移除
+        
+        只处理堆顶已到期的条目：已断开的连接直接丢弃，
+        期间有活动的连接按最新活动时间重新入堆。
+        堆按默认空闲超时排序，指定更短的超时时无法从堆顶判断，改为按最近活动时间扫描全部连接。
+        """
+        timeout = timeout_minutes * 60 if timeout_minutes is not None else self.idle_timeout
+        now = time.monotonic()
+        expired = []
         
-        for channel_name, connection_info in self.active_connections.items():
-            if connection_info['last_activity'] < timeout_threshold:
-                inactive_connections.append(channel_name)
+        with self._lock:
+            if timeout < self.idle_timeout:
+                expired = [
+                    channel_name for channel_name, connection_info in self.active_connections.items()
+                    if connection_info['last_activity_ts'] + timeout <= now
+                ]
+            else:
+                while self._expiry_heap and self._expiry_heap[0][0] <= now:
+                    _, channel_name = heapq.heappop(self._expiry_heap)
+                    connection_info = self.active_connections.get(channel_name)
+                    if connection_info is None:
+                        continue
+                    
+                    deadline = connection_info['last_activity_ts'] + timeout
+                    if deadline > now:
+                        heapq.heappush(self._expiry_heap, (deadline, channel_name))
+                    else:
+                        expired.append(channel_name)
+            
+            self.connection_stats['expired_connections'] += len(expired)
         
-        for channel_name in inactive_connections:
+        for channel_name in expired:
             self.remove_connection(channel_name)
             logger.info(f"清理不活跃连接: {channel_name}")
         
-        return len(inactive_connections)
+        return expired
+    
+    def cleanup_inactive_connections(self, timeout_minutes: Optional[int] = None):
+        """清理不活跃的连接"""
+        return len(self.pop_expired_connections(timeout_minutes))
+    
+    def queue_log(self, log_data: Dict):
+        """缓存连接日志，缓冲区满时立即批量输出"""
+        self._pending_logs.append(log_data)
+        if len(self._pending_logs) >= self.log_batch_size:
+            self.flush_logs()
+    
+    def flush_logs(self) -> int:
+        """批量输出缓存的连接日志"""
+        batch = []
+        while self._pending_logs:
+            try:
+                batch.append(self._pending_logs.popleft())
+            except IndexError:
+                break
+        
+        if batch:
+            actions = defaultdict(int)
+            for log_data in batch:
+                actions[log_data['action']] += 1
+            logger.info(f"WebSocket连接日志（{len(batch)} 条）: {dict(actions)}")
+            logger.debug(f"WebSocket连接日志明细: {batch}")
+        return len(batch)
+    
+    def ensure_housekeeping(self):
+        """在当前事件循环上启动一次后台清理任务（需在异步上下文中调用）"""
+        if not getattr(settings, 'WEBSOCKET_CLEANUP_ENABLED', True):
+            return
+        
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if loop in self._housekeeping_loops:
+                return
+            self._housekeeping_loops.add(loop)
+        
+        task = loop.create_task(cleanup_inactive_connections())
+        task.add_done_callback(lambda _: self._housekeeping_loops.discard(loop))
 
 
 # 全局实例
@@ -778,19 +1103,21 @@ connection_manager = WebSocketConnectionManager()
 
 # 定期清理任务
 async def cleanup_inactive_connections():
-    """定期清理不活跃的连接"""
+    """定期清理不活跃的连接，通知对应的消费者关闭连接，并批量输出连接日志"""
+    interval = getattr(settings, 'WEBSOCKET_CLEANUP_INTERVAL_SECONDS', 60)
     while True:
         try:
-            cleaned_count = connection_manager.cleanup_inactive_connections()
-            if cleaned_count > 0:
-                logger.info(f"清理了 {cleaned_count} 个不活跃的WebSocket连接")
+            expired = connection_manager.pop_expired_connections()
+            if expired:
+                channel_layer = notification_service.channel_layer
+                if channel_layer is not None:
+                    await asyncio.gather(*(
+                        channel_layer.send(channel_name, {'type': 'connection_expired'})
+                        for channel_name in expired
+                    ), return_exceptions=True)
+                logger.info(f"清理了 {len(expired)} 个不活跃的WebSocket连接")
+            connection_manager.flush_logs()
         except Exception as e:
             logger.error(f"清理不活跃连接失败: {e}")
         
-        # 每5分钟执行一次
-        await asyncio.sleep(300)
-
-
-# 启动清理任务
-if hasattr(settings, 'WEBSOCKET_CLEANUP_ENABLED') and settings.WEBSOCKET_CLEANUP_ENABLED:
-    asyncio.create_task(cleanup_inactive_connections())
\ No newline at end of file
+        await asyncio.sleep(interval)
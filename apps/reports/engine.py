@@ -0,0 +1,169 @@
+"""
+进度报告聚合与导出
+
+上传暂存的两列（类别编码、数值）一次读入 NumPy 数组：先把上传中的类别编码映射到报告类别的槽位，
+再用一次 np.add.at 在 int64 数组上得到全部报告类别的合计，完成/待处理等状态统计在类别合计上一次遍历得到。
+聚合结果按 upload_id 缓存（暂存写入后不再修改），导出文件按报告内容摘要复用，
+Excel 用 openpyxl 只写模式、CSV 用 csv 模块逐行写出，不再构建 DataFrame。
+未安装 NumPy 时按块遍历列文件聚合。
+"""
+import csv
+import hashlib
+import json
+import logging
+import os
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .ingestion import CODES_FILE, VALUES_FILE, ReportUploadStore
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# 报告类别及颜色（顺序即报告中的顺序）
+REPORT_CATEGORIES = [
+    ('掌握', '#4CAF50'),
+    ('遗忘', '#f44336'),
+    ('学习中', '#FFC107'),
+    ('测试', '#8BC34A'),
+    ('口音文本', '#4CAF50'),
+    ('口音文件', '#4CAF50'),
+    ('区域化任务', '#4CAF50'),
+    ('解决方案', '#4CAF50'),
+]
+DEFAULT_VALUES = {'掌握': 49, '学习中': 15}
+COMPLETED_CATEGORIES = ('掌握', '测试')
+PENDING_CATEGORIES = ('学习中', '口音文本')
+
+AGGREGATE_CACHE_PREFIX = 'reports:aggregate'
+EXPORT_DIR = 'reports'
+
+
+def build_report_data(values: Dict[str, int]) -> List[Dict]:
+    """按报告类别顺序生成报告数据，未出现的类别计 0"""
+    return [
+        {'label': label, 'value': int(values.get(label, 0)), 'color': color, 'category': label}
+        for label, color in REPORT_CATEGORIES
+    ]
+
+
+def default_report_data() -> List[Dict]:
+    return build_report_data(DEFAULT_VALUES)
+
+
+def calculate_stats(report_data: List[Dict]) -> Dict:
+    """一次遍历报告数据计算总数、完成数、待处理数和完成率"""
+    total_records = completed_items = pending_items = 0
+    for item in report_data:
+        total_records += item['value']
+        if item['category'] in COMPLETED_CATEGORIES:
+            completed_items += item['value']
+        elif item['category'] in PENDING_CATEGORIES:
+            pending_items += item['value']
+    completion_rate = round((completed_items / total_records * 100) if total_records > 0 else 0, 1)
+    return {
+        'total_records': total_records,
+        'completed_items': completed_items,
+        'pending_items': pending_items,
+        'completion_rate': completion_rate,
+    }
+
+
+def _column(store: ReportUploadStore, name: str, kind: str, itemsize: int):
+    order = '<' if store.meta['byteorder'] == 'little' else '>'
+    return np.fromfile(store.path / name, dtype=np.dtype(f'{order}{kind}{itemsize}'), count=store.rows)
+
+
+def report_totals(store: ReportUploadStore) -> Dict[str, int]:
+    """上传数据中各报告类别的数值合计"""
+    labels = [label for label, _ in REPORT_CATEGORIES]
+    if not NUMPY_AVAILABLE:
+        totals = store.category_totals()
+        return {label: totals.get(label, 0) for label in labels}
+
+    # 上传类别编码 -> 报告槽位，不属于报告类别的映射到最后一个槽位后丢弃
+    slots = {label: index for index, label in enumerate(labels)}
+    mapping = np.array([slots.get(category, len(labels)) for category in store.categories] or [len(labels)],
+                       dtype=np.intp)
+    codes = _column(store, CODES_FILE, 'u', 4)
+    values = _column(store, VALUES_FILE, 'i', 8)
+    # 在 int64 上累加（bincount 的 weights 按 float64 求和，超过 2**53 会丢失精度）
+    sums = np.zeros(len(labels) + 1, dtype=np.int64)
+    np.add.at(sums, mapping[codes], values)
+    return {label: int(sums[index]) for index, label in enumerate(labels)}
+
+
+def aggregate_upload(store: ReportUploadStore) -> Dict:
+    """上传数据的报告数据和统计，按 upload_id 缓存"""
+    key = f'{AGGREGATE_CACHE_PREFIX}:{store.upload_id}'
+    result = cache.get(key)
+    if result is None:
+        report_data = build_report_data(report_totals(store))
+        result = {'report_data': report_data, 'stats': calculate_stats(report_data)}
+        timeout = getattr(settings, 'REPORT_UPLOAD_MAX_AGE_HOURS', 24) * 3600
+        cache.set(key, result, timeout)
+    return result
+
+
+def _export_path(report_data: List[Dict], extension: str):
+    """导出文件按报告内容摘要命名，相同报告重复导出时直接复用"""
+    digest = hashlib.sha1(
+        json.dumps(report_data, ensure_ascii=False, sort_keys=True).encode('utf-8')
+    ).hexdigest()[:16]
+    filename = f'progress_report_{digest}.{extension}'
+    directory = Path(settings.MEDIA_ROOT) / EXPORT_DIR
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory / filename, f'{settings.MEDIA_URL}{EXPORT_DIR}/{filename}'
+
+
+def _temp_path(path: Path) -> Path:
+    """先写临时文件再改名，并发导出同一报告时不会读到写了一半的文件"""
+    return path.with_name(f'.{path.name}.{uuid.uuid4().hex}.tmp')
+
+
+def _export_rows(report_data: List[Dict]):
+    columns = list(report_data[0]) if report_data else ['label', 'value', 'color', 'category']
+    yield columns
+    for item in report_data:
+        yield [item.get(column) for column in columns]
+
+
+def export_excel(report_data: List[Dict]) -> Optional[str]:
+    """逐行写出 Excel（openpyxl 只写模式），返回文件URL"""
+    path, url = _export_path(report_data, 'xlsx')
+    if path.exists():
+        return url
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    for row in _export_rows(report_data):
+        sheet.append(row)
+    temp_path = _temp_path(path)
+    workbook.save(temp_path)
+    os.replace(temp_path, path)
+    return url
+
+
+def export_csv(report_data: List[Dict]) -> Optional[str]:
+    """逐行写出 CSV（带 BOM，Excel 可直接打开），返回文件URL"""
+    path, url = _export_path(report_data, 'csv')
+    if path.exists():
+        return url
+    temp_path = _temp_path(path)
+    with open(temp_path, 'w', encoding='utf-8-sig', newline='') as file:
+        writer = csv.writer(file)
+        for row in _export_rows(report_data):
+            writer.writerow(row)
+    os.replace(temp_path, path)
+    return url
@@ -0,0 +1,359 @@
+"""
+报告数据上传的流式解析和列式暂存
+
+上传文件逐行解析（CSV、JSON 数组 / JSON Lines、Excel），不整体读入内存：
+- 编码：探测 BOM，再用增量解码器按块校验 UTF-8、GB18030（GBK 的超集），不再把整个文件读入内存重试；
+- 暂存：每次上传一个目录 REPORT_UPLOAD_ROOT/<upload_id>/，按列写入二进制数组文件——
+  category.codes（uint32，类别字典编码）、value.i64（int64），类别字典和行数写入 meta.json；
+- 会话中只保存 upload_id，报告生成和导出时按块读取列文件聚合。
+"""
+import codecs
+import csv
+import io
+import json
+import logging
+import re
+import shutil
+import sys
+import time
+import uuid
+from array import array
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+CHUNK_ROWS = 10000
+SNIFF_BYTES = 64 * 1024
+ENCODINGS = ('utf-8', 'gb18030')
+CATEGORY_KEYS = ('category', 'label', 'type')
+CODES_FILE, VALUES_FILE, META_FILE = 'category.codes', 'value.i64', 'meta.json'
+CODE_TYPE, VALUE_TYPE = 'I', 'q'
+UPLOAD_ID_PATTERN = re.compile(r'[0-9a-f]{32}')
+VALUE_MIN, VALUE_MAX = -2 ** 63, 2 ** 63 - 1
+
+
+def upload_root() -> Path:
+    return Path(getattr(settings, 'REPORT_UPLOAD_ROOT', Path(settings.MEDIA_ROOT) / 'report_uploads'))
+
+
+def row_category(item: Dict) -> str:
+    """记录的类别：依次取 category、label、type"""
+    for key in CATEGORY_KEYS:
+        category = item.get(key)
+        if category:
+            return str(category)
+    return ''
+
+
+def row_value(item: Dict) -> int:
+    """记录的数值：value 或 count，缺失或无法解析时计 1，超出 int64 范围时截断到边界"""
+    value = item.get('value') or item.get('count') or 1
+    try:
+        value = int(value)
+    except (ValueError, TypeError, OverflowError):
+        return 1
+    return max(VALUE_MIN, min(VALUE_MAX, value))
+
+
+def _decodes_as(file, encoding: str) -> bool:
+    """用增量解码器按块校验整个文件（不保留解码结果，内存占用恒定）"""
+    decoder = codecs.getincrementaldecoder(encoding)()
+    file.seek(0)
+    try:
+        while True:
+            chunk = file.read(SNIFF_BYTES)
+            decoder.decode(chunk, final=not chunk)
+            if not chunk:
+                return True
+    except UnicodeDecodeError:
+        return False
+    finally:
+        file.seek(0)
+
+
+def sniff_encoding(file) -> str:
+    """探测文件编码：先看 BOM，再依次校验 UTF-8、GB18030"""
+    file.seek(0)
+    head = file.read(len(codecs.BOM_UTF8))
+    file.seek(0)
+    if head.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return 'utf-16'
+    for encoding in ENCODINGS:
+        if _decodes_as(file, encoding):
+            return encoding
+    raise ValueError('无法识别文件编码（支持 UTF-8、GBK/GB18030、UTF-16）')
+
+
+def _open_text(file) -> io.TextIOWrapper:
+    encoding = sniff_encoding(file)
+    return io.TextIOWrapper(getattr(file, 'file', file), encoding=encoding, newline='')
+
+
+def iter_csv_rows(file) -> Iterator[Dict]:
+    text = _open_text(file)
+    try:
+        yield from csv.DictReader(text)
+    finally:
+        text.detach()
+
+
+def iter_json_values(text, chunk_size: int = SNIFF_BYTES) -> Iterator:
+    """
+    逐个解析 JSON 值
+
+    顶层为数组时逐个产出数组元素，否则依次产出空白分隔的顶层值（兼容单个对象和 JSON Lines）。
+    数组元素之间必须恰好有一个逗号，首个元素前、结尾 ] 前的逗号和连续逗号都视为格式错误，
+    数组结束后只允许空白，与 json.load 的校验一致。
+    """
+    decoder = json.JSONDecoder()
+    buffer, pos, eof = '', 0, False
+    # start: 尚未读到内容；lines: 空白分隔的顶层值；
+    # array_first: 数组首个元素或 ]；array_value: 逗号之后的元素；array_separator: 逗号或 ]；closed: 数组已结束
+    state = 'start'
+
+    while True:
+        while pos < len(buffer) and buffer[pos].isspace():
+            pos += 1
+        if pos >= len(buffer):
+            if eof:
+                if state.startswith('array'):
+                    raise ValueError('JSON文件解析失败: 数组缺少结尾的 ]')
+                return
+            chunk = text.read(chunk_size)
+            buffer, pos, eof = buffer[pos:] + chunk, 0, not chunk
+            continue
+
+        char = buffer[pos]
+        if state == 'start':
+            state = 'array_first' if char == '[' else 'lines'
+            if state == 'array_first':
+                pos += 1
+            continue
+        if state == 'closed':
+            raise ValueError('JSON文件解析失败: 数组结束后存在多余内容')
+        if state == 'array_separator':
+            if char not in ',]':
+                raise ValueError('JSON文件解析失败: 数组元素之间缺少逗号')
+            state = 'array_value' if char == ',' else 'closed'
+            pos += 1
+            continue
+        if state == 'array_first' and char == ']':
+            state = 'closed'
+            pos += 1
+            continue
+        if state.startswith('array') and char in ',]':
+            raise ValueError('JSON文件解析失败: 数组中存在多余的逗号')
+
+        try:
+            value, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError as e:
+            if eof:
+                raise ValueError(f'JSON文件解析失败: {e}')
+            end = None
+        # 值恰好在缓冲区末尾结束时可能被截断（如数字），读入更多内容后重新解析
+        if end is None or (end == len(buffer) and not eof):
+            chunk = text.read(chunk_size)
+            buffer, pos, eof = buffer[pos:] + chunk, 0, not chunk
+            continue
+
+        yield value
+        pos = end
+        if state != 'lines':
+            state = 'array_separator'
+        if pos > chunk_size:
+            buffer, pos = buffer[pos:], 0
+
+
+def iter_json_rows(file) -> Iterator[Dict]:
+    text = _open_text(file)
+    try:
+        for value in iter_json_values(text):
+            if not isinstance(value, dict):
+                raise ValueError('JSON文件格式不正确：每条记录必须是对象')
+            yield value
+    finally:
+        text.detach()
+
+
+def iter_excel_rows(file, extension: str) -> Iterator[Dict]:
+    if extension == 'xlsx':
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(file, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                return
+            names = ['' if name is None else str(name) for name in header]
+            for values in rows:
+                # 跳过空行（如表格末尾格式化过的空白行）
+                if any(value is not None for value in values):
+                    yield dict(zip(names, values))
+        finally:
+            workbook.close()
+    else:
+        import pandas as pd
+
+        yield from pd.read_excel(file).to_dict('records')
+
+
+def iter_rows(file) -> Iterator[Dict]:
+    """按扩展名逐行解析上传文件"""
+    extension = file.name.rsplit('.', 1)[-1].lower()
+    if extension == 'csv':
+        return iter_csv_rows(file)
+    if extension in ('json', 'jsonl', 'ndjson'):
+        return iter_json_rows(file)
+    if extension in ('xlsx', 'xls'):
+        return iter_excel_rows(file, extension)
+    raise ValueError(f"不支持的文件格式: {extension}")
+
+
+class ReportUploadStore:
+    """一次上传的列式暂存"""
+
+    def __init__(self, upload_id: str, meta: Dict):
+        self.upload_id = upload_id
+        self.meta = meta
+
+    @staticmethod
+    def path_for(upload_id: str) -> Path:
+        return upload_root() / upload_id
+
+    @property
+    def path(self) -> Path:
+        return self.path_for(self.upload_id)
+
+    @property
+    def rows(self) -> int:
+        return self.meta['rows']
+
+    @property
+    def categories(self):
+        return self.meta['categories']
+
+    @classmethod
+    def open(cls, upload_id: Optional[str], user_id: int) -> Optional['ReportUploadStore']:
+        """打开用户自己的上传，不存在、已过期或不属于该用户时返回 None"""
+        if not upload_id or not UPLOAD_ID_PATTERN.fullmatch(str(upload_id)):
+            return None
+        try:
+            meta = json.loads((cls.path_for(upload_id) / META_FILE).read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return None
+        if meta.get('user_id') != user_id:
+            return None
+        return cls(upload_id, meta)
+
+    @classmethod
+    def discard(cls, upload_id: Optional[str], user_id: int):
+        store = cls.open(upload_id, user_id)
+        if store is not None:
+            shutil.rmtree(store.path, ignore_errors=True)
+
+    def iter_chunks(self) -> Iterator:
+        """按块读取 (类别编码, 数值) 两列"""
+        with open(self.path / CODES_FILE, 'rb') as codes_file, open(self.path / VALUES_FILE, 'rb') as values_file:
+            remaining = self.rows
+            while remaining > 0:
+                size = min(CHUNK_ROWS, remaining)
+                codes, values = array(CODE_TYPE), array(VALUE_TYPE)
+                codes.fromfile(codes_file, size)
+                values.fromfile(values_file, size)
+                if self.meta['byteorder'] != sys.byteorder:
+                    codes.byteswap()
+                    values.byteswap()
+                remaining -= size
+                yield codes, values
+
+    def category_totals(self) -> Dict[str, int]:
+        """各类别数值之和"""
+        sums = [0] * len(self.categories)
+        for codes, values in self.iter_chunks():
+            for code, value in zip(codes, values):
+                sums[code] += value
+        return dict(zip(self.categories, sums))
+
+
+class ReportUploadWriter:
+    """逐行写入上传数据，缓冲 CHUNK_ROWS 行后追加到列文件"""
+
+    def __init__(self, user_id: int):
+        self.user_id = user_id
+        self.upload_id = uuid.uuid4().hex
+        self.path = ReportUploadStore.path_for(self.upload_id)
+        self.path.mkdir(parents=True)
+        self._codes_file = open(self.path / CODES_FILE, 'wb')
+        self._values_file = open(self.path / VALUES_FILE, 'wb')
+        self._codes, self._values = array(CODE_TYPE), array(VALUE_TYPE)
+        self._category_codes: Dict[str, int] = {}
+        self.rows = 0
+        self.files = []
+
+    def append(self, item: Dict):
+        category = row_category(item)
+        code = self._category_codes.get(category)
+        if code is None:
+            code = self._category_codes[category] = len(self._category_codes)
+        self._codes.append(code)
+        self._values.append(row_value(item))
+        self.rows += 1
+        if len(self._codes) >= CHUNK_ROWS:
+            self._flush()
+
+    def add_file(self, file) -> int:
+        """解析并写入一个上传文件，返回记录数"""
+        before = self.rows
+        for item in iter_rows(file):
+            self.append(item)
+        self.files.append({'name': file.name, 'rows': self.rows - before})
+        return self.rows - before
+
+    def _flush(self):
+        self._codes.tofile(self._codes_file)
+        self._values.tofile(self._values_file)
+        self._codes, self._values = array(CODE_TYPE), array(VALUE_TYPE)
+
+    def finish(self) -> ReportUploadStore:
+        self._flush()
+        self._codes_file.close()
+        self._values_file.close()
+        meta = {
+            'upload_id': self.upload_id,
+            'user_id': self.user_id,
+            'created_at': time.time(),
+            'rows': self.rows,
+            'categories': list(self._category_codes),
+            'files': self.files,
+            'byteorder': sys.byteorder,
+        }
+        (self.path / META_FILE).write_text(json.dumps(meta, ensure_ascii=False), encoding='utf-8')
+        return ReportUploadStore(self.upload_id, meta)
+
+    def discard(self):
+        self._codes_file.close()
+        self._values_file.close()
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+def purge_expired_uploads(max_age_hours: Optional[int] = None) -> int:
+    """删除超过保留时长的上传暂存，返回删除数量"""
+    max_age_hours = max_age_hours or getattr(settings, 'REPORT_UPLOAD_MAX_AGE_HOURS', 24)
+    root = upload_root()
+    if not root.exists():
+        return 0
+    cutoff = time.time() - max_age_hours * 3600
+    removed = 0
+    for path in root.iterdir():
+        if path.is_dir() and UPLOAD_ID_PATTERN.fullmatch(path.name) and path.stat().st_mtime < cutoff:
+            shutil.rmtree(path, ignore_errors=True)
+            removed += 1
+    if removed:
+        logger.info(f"已清理 {removed} 个过期的报告上传暂存")
+    return removed
@@ -0,0 +1 @@
+# Reports Tests package
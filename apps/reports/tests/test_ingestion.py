@@ -0,0 +1,97 @@
+"""
+上传文件流式解析测试
+
+JSON 按块读取时，值可能在块边界处被截断，解析结果必须与整体 json.loads 一致；
+数组的逗号和结尾 ] 按 json.load 的规则校验；编码按 BOM、UTF-8、GB18030 依次探测。
+"""
+import codecs
+import io
+import json
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from apps.reports.ingestion import iter_csv_rows, iter_json_rows, iter_json_values, sniff_encoding
+
+ROWS = [
+    {'category': '水果', 'value': 1234567890123},
+    {'label': 'vegetable', 'count': -7, 'tags': ['a', 'b'], 'note': 'x, y ]'},
+    {'type': '其他', 'value': 1.5e3},
+]
+
+
+def parse(content, chunk_size):
+    return list(iter_json_values(io.StringIO(content), chunk_size=chunk_size))
+
+
+class IterJsonValuesTest(SimpleTestCase):
+    """按块解析 JSON 数组和 JSON Lines"""
+
+    def test_array_split_into_tiny_chunks(self):
+        content = json.dumps(ROWS, ensure_ascii=False, indent=2)
+        # 块大小小于一个数字或字符串，值在任意位置被截断
+        for chunk_size in (1, 2, 3, 7, 64):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(parse(content, chunk_size), ROWS)
+
+    def test_number_at_chunk_boundary_is_not_truncated(self):
+        self.assertEqual(parse('[123456789,2]', 4), [123456789, 2])
+        self.assertEqual(parse('123456789', 4), [123456789])
+
+    def test_json_lines(self):
+        content = ''.join(json.dumps(row, ensure_ascii=False) + '\n' for row in ROWS)
+        for chunk_size in (1, 5, 1024):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(parse(content, chunk_size), ROWS)
+
+    def test_empty_input_and_empty_array(self):
+        self.assertEqual(parse('', 4), [])
+        self.assertEqual(parse(' [ \n ] \n', 1), [])
+
+    def test_unterminated_array(self):
+        for content in ('[1, 2', '[{"a": 1}', '[', '[1,'):
+            with self.subTest(content=content), self.assertRaises(ValueError):
+                parse(content, 2)
+
+    def test_malformed_separators(self):
+        for content in ('[1 2]', '[,1]', '[1,,2]', '[1,]', '[,]', '[1] 2', '[1]]'):
+            with self.subTest(content=content):
+                with self.assertRaises(json.JSONDecodeError):
+                    json.loads(content)
+                for chunk_size in (1, 64):
+                    with self.assertRaises(ValueError):
+                        parse(content, chunk_size)
+
+
+class EncodingTest(SimpleTestCase):
+    """编码探测与按编码逐行解析"""
+
+    def test_gbk_csv(self):
+        content = '类别,数值\n水果,3\n蔬菜,5\n'.encode('gbk')
+        self.assertEqual(sniff_encoding(io.BytesIO(content)), 'gb18030')
+        rows = list(iter_csv_rows(io.BytesIO(content)))
+        self.assertEqual(rows, [{'类别': '水果', '数值': '3'}, {'类别': '蔬菜', '数值': '5'}])
+
+    def test_multibyte_character_split_across_sniff_chunks(self):
+        content = '类别,数值\n水果,3\n'.encode('utf-8')
+        # 校验块小于一个多字节字符时仍按 UTF-8 识别
+        with mock.patch('apps.reports.ingestion.SNIFF_BYTES', 1):
+            self.assertEqual(sniff_encoding(io.BytesIO(content)), 'utf-8')
+            self.assertEqual(sniff_encoding(io.BytesIO('水果'.encode('gbk'))), 'gb18030')
+
+    def test_utf16_with_bom(self):
+        text = json.dumps(ROWS, ensure_ascii=False)
+        for bom, encoding in ((codecs.BOM_UTF16_LE, 'utf-16-le'), (codecs.BOM_UTF16_BE, 'utf-16-be')):
+            with self.subTest(encoding=encoding):
+                content = bom + text.encode(encoding)
+                self.assertEqual(sniff_encoding(io.BytesIO(content)), 'utf-16')
+                self.assertEqual(list(iter_json_rows(io.BytesIO(content))), ROWS)
+
+    def test_utf8_with_bom(self):
+        content = codecs.BOM_UTF8 + '类别,数值\n水果,3\n'.encode('utf-8')
+        self.assertEqual(sniff_encoding(io.BytesIO(content)), 'utf-8-sig')
+        self.assertEqual(list(iter_csv_rows(io.BytesIO(content))), [{'类别': '水果', '数值': '3'}])
+
+    def test_unknown_encoding(self):
+        with self.assertRaises(ValueError):
+            sniff_encoding(io.BytesIO(b'abc\x81\x30\xff'))
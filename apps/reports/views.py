@@ -6,12 +6,12 @@ from django.contrib.auth.decorators import login_required
 from django.core.files.storage import default_storage
 from django.conf import settings
 import json
-import csv
-import io
-import pandas as pd
 from datetime import datetime
 import logging
 
+from .engine import aggregate_upload, calculate_stats, default_report_data, export_csv, export_excel
+from .ingestion import ReportUploadStore, ReportUploadWriter, purge_expired_uploads
+
 logger = logging.getLogger(__name__)
 
 
@@ -43,26 +43,35 @@ class ProgressReportView:
                 })
             
             uploaded_files = request.FILES.getlist('files')
-            processed_data = []
+            purge_expired_uploads()
+            writer = ReportUploadWriter(request.user.id)
             
-            for file in uploaded_files:
-                try:
-                    data = ProgressReportView._process_uploaded_file(file)
-                    processed_data.extend(data)
-                except Exception as e:
-                    logger.error(f"处理文件 {file.name} 时出错: {str(e)}")
-                    return JsonResponse({
-                        'success': False,
-                        'error': f'处理文件 {file.name} 时出错: {str(e)}'
-                    })
+            try:
+                for file in uploaded_files:
+                    try:
+                        writer.add_file(file)
+                    except Exception as e:
+                        logger.error(f"处理文件 {file.name} 时出错: {str(e)}")
+                        writer.discard()
+                        return JsonResponse({
+                            'success': False,
+                            'error': f'处理文件 {file.name} 时出错: {str(e)}'
+                        })
+                store = writer.finish()
+            except Exception:
+                writer.discard()
+                raise
             
-            # 保存处理后的数据到会话中
-            request.session['uploaded_data'] = processed_data
+            # 会话中只保存上传ID，数据在列式暂存中
+            ReportUploadStore.discard(request.session.get('report_upload_id'), request.user.id)
+            request.session['report_upload_id'] = store.upload_id
+            request.session.pop('uploaded_data', None)
             
             return JsonResponse({
                 'success': True,
-                'data_count': len(processed_data),
-                'message': f'成功处理 {len(uploaded_files)} 个文件，共 {len(processed_data)} 条记录'
+                'upload_id': store.upload_id,
+                'data_count': store.rows,
+                'message': f'成功处理 {len(uploaded_files)} 个文件，共 {store.rows} 条记录'
             })
             
         except Exception as e:
@@ -78,18 +87,18 @@ class ProgressReportView:
     def generate_report(request):
         """生成报告数据"""
         try:
-            # 从会话中获取上传的数据
-            uploaded_data = request.session.get('uploaded_data', [])
+            # 读取本次上传的暂存数据
+            data = json.loads(request.body) if request.content_type == 'application/json' and request.body else {}
+            store = ProgressReportView._get_upload_store(request, data)
             
-            if not uploaded_data:
+            if store is None:
                 # 如果没有上传数据，使用默认示例数据
                 report_data = ProgressReportView._get_default_progress_data()
+                stats = ProgressReportView._calculate_stats(report_data)
             else:
-                # 处理上传的数据
-                report_data = ProgressReportView._process_report_data(uploaded_data)
-            
-            # 计算统计信息
-            stats = ProgressReportView._calculate_stats(report_data)
+                # 聚合上传的数据（按 upload_id 缓存）
+                aggregate = aggregate_upload(store)
+                report_data, stats = aggregate['report_data'], aggregate['stats']
             
             return JsonResponse({
                 'success': True,
@@ -113,7 +122,15 @@ class ProgressReportView:
         try:
             data = json.loads(request.body)
             export_format = data.get('format', 'pdf')
-            report_data = data.get('report_data', [])
+            report_data = data.get('report_data')
+            
+            if not report_data:
+                # 未提交报告数据时从上传暂存聚合
+                store = ProgressReportView._get_upload_store(request, data)
+                report_data = (
+                    aggregate_upload(store)['report_data']
+                    if store is not None else ProgressReportView._get_default_progress_data()
+                )
             
             if export_format == 'pdf':
                 # PDF导出逻辑
@@ -121,6 +138,9 @@ class ProgressReportView:
             elif export_format == 'excel':
                 # Excel导出逻辑
                 file_url = ProgressReportView._export_to_excel(report_data)
+            elif export_format == 'csv':
+                # CSV导出逻辑
+                file_url = ProgressReportView._export_to_csv(report_data)
             elif export_format == 'image':
                 # 图片导出逻辑
                 file_url = ProgressReportView._export_to_image(report_data)
@@ -144,126 +164,20 @@ class ProgressReportView:
             })
     
     @staticmethod
-    def _process_uploaded_file(file):
-        """处理上传的文件"""
-        file_extension = file.name.split('.')[-1].lower()
-        
-        if file_extension == 'csv':
-            return ProgressReportView._process_csv_file(file)
-        elif file_extension in ['xlsx', 'xls']:
-            return ProgressReportView._process_excel_file(file)
-        elif file_extension == 'json':
-            return ProgressReportView._process_json_file(file)
-        else:
-            raise ValueError(f"不支持的文件格式: {file_extension}")
-    
-    @staticmethod
-    def _process_csv_file(file):
-        """处理CSV文件"""
-        try:
-            content = file.read().decode('utf-8')
-            csv_reader = csv.DictReader(io.StringIO(content))
-            return list(csv_reader)
-        except UnicodeDecodeError:
-            # 尝试使用GBK编码
-            file.seek(0)
-            content = file.read().decode('gbk')
-            csv_reader = csv.DictReader(io.StringIO(content))
-            return list(csv_reader)
-    
-    @staticmethod
-    def _process_excel_file(file):
-        """处理Excel文件"""
-        try:
-            df = pd.read_excel(file)
-            return df.to_dict('records')
-        except Exception as e:
-            raise ValueError(f"Excel文件处理失败: {str(e)}")
-    
-    @staticmethod
-    def _process_json_file(file):
-        """处理JSON文件"""
-        try:
-            content = file.read().decode('utf-8')
-            data = json.loads(content)
-            if isinstance(data, list):
-                return data
-            elif isinstance(data, dict):
-                return [data]
-            else:
-                raise ValueError("JSON文件格式不正确")
-        except json.JSONDecodeError as e:
-            raise ValueError(f"JSON文件解析失败: {str(e)}")
-    
-    @staticmethod
-    def _process_report_data(uploaded_data):
-        """处理报告数据"""
-        categories = {
-            '掌握': {'count': 0, 'color': '#4CAF50'},
-            '遗忘': {'count': 0, 'color': '#f44336'},
-            '学习中': {'count': 0, 'color': '#FFC107'},
-            '测试': {'count': 0, 'color': '#8BC34A'},
-            '口音文本': {'count': 0, 'color': '#4CAF50'},
-            '口音文件': {'count': 0, 'color': '#4CAF50'},
-            '区域化任务': {'count': 0, 'color': '#4CAF50'},
-            '解决方案': {'count': 0, 'color': '#4CAF50'}
-        }
-        
-        # 统计各类别数据
-        for item in uploaded_data:
-            category = item.get('category') or item.get('label') or item.get('type')
-            value = item.get('value') or item.get('count') or 1
-            
-            try:
-                value = int(value)
-            except (ValueError, TypeError):
-                value = 1
-            
-            if category in categories:
-                categories[category]['count'] += value
-        
-        # 转换为前端需要的格式
-        report_data = []
-        for label, data in categories.items():
-            report_data.append({
-                'label': label,
-                'value': data['count'],
-                'color': data['color'],
-                'category': label
-            })
-        
-        return report_data
+    def _get_upload_store(request, data):
+        """按请求中的 upload_id（缺省取会话中的）打开当前用户的上传暂存"""
+        upload_id = data.get('upload_id') or request.POST.get('upload_id') or request.session.get('report_upload_id')
+        return ReportUploadStore.open(upload_id, request.user.id)
     
     @staticmethod
     def _get_default_progress_data():
         """获取默认的进度数据"""
-        return [
-            {'label': '掌握', 'value': 49, 'color': '#4CAF50', 'category': '掌握'},
-            {'label': '遗忘', 'value': 0, 'color': '#f44336', 'category': '遗忘'},
-            {'label': '学习中', 'value': 15, 'color': '#FFC107', 'category': '学习中'},
-            {'label': '测试', 'value': 0, 'color': '#8BC34A', 'category': '测试'},
-            {'label': '口音文本', 'value': 0, 'color': '#4CAF50', 'category': '口音文本'},
-            {'label': '口音文件', 'value': 0, 'color': '#4CAF50', 'category': '口音文件'},
-            {'label': '区域化任务', 'value': 0, 'color': '#4CAF50', 'category': '区域化任务'},
-            {'label': '解决方案', 'value': 0, 'color': '#4CAF50', 'category': '解决方案'}
-        ]
+        return default_report_data()
     
     @staticmethod
     def _calculate_stats(report_data):
         """计算统计信息"""
-        total_records = sum(item['value'] for item in report_data)
-        completed_items = sum(item['value'] for item in report_data 
-                            if item['category'] in ['掌握', '测试'])
-        pending_items = sum(item['value'] for item in report_data 
-                          if item['category'] in ['学习中', '口音文本'])
-        completion_rate = round((completed_items / total_records * 100) if total_records > 0 else 0, 1)
-        
-        return {
-            'total_records': total_records,
-            'completed_items': completed_items,
-            'pending_items': pending_items,
-            'completion_rate': completion_rate
-        }
+        return calculate_stats(report_data)
     
     @staticmethod
     def _export_to_pdf(report_data):
@@ -277,19 +191,21 @@ class ProgressReportView:
     @staticmethod
     def _export_to_excel(report_data):
         """导出为Excel"""
-        # 使用pandas导出Excel
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f'progress_report_{timestamp}.xlsx'
-        
         try:
-            df = pd.DataFrame(report_data)
-            file_path = f'media/reports/{filename}'
-            df.to_excel(file_path, index=False)
-            return f'/{file_path}'
+            return export_excel(report_data)
         except Exception as e:
             logger.error(f"Excel导出失败: {str(e)}")
             return None
     
+    @staticmethod
+    def _export_to_csv(report_data):
+        """导出为CSV"""
+        try:
+            return export_csv(report_data)
+        except Exception as e:
+            logger.error(f"CSV导出失败: {str(e)}")
+            return None
+    
     @staticmethod
     def _export_to_image(report_data):
         """导出为图片"""
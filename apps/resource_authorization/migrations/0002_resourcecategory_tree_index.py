@@ -0,0 +1,51 @@
+from django.db import migrations, models
+
+from utils.tree_index import rebuild_tree_index
+
+
+def build_tree_index(apps, schema_editor):
+    rebuild_tree_index(apps.get_model("resource_authorization", "ResourceCategory"), label_field="name")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("resource_authorization", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="resourcecategory",
+            name="tree_depth",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                help_text="根节点为0，由系统自动维护",
+                verbose_name="层级深度",
+            ),
+        ),
+        migrations.AddField(
+            model_name="resourcecategory",
+            name="tree_label_path",
+            field=models.TextField(
+                blank=True,
+                default="",
+                editable=False,
+                help_text="包含所有上级名称的完整路径，由系统自动维护",
+                verbose_name="完整路径名称",
+            ),
+        ),
+        migrations.AddField(
+            model_name="resourcecategory",
+            name="tree_path",
+            field=models.CharField(
+                blank=True,
+                db_index=True,
+                default="",
+                editable=False,
+                help_text="祖先ID路径，由系统自动维护",
+                max_length=255,
+                verbose_name="树路径",
+            ),
+        ),
+        migrations.RunPython(build_tree_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-19 04:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resource_authorization', '0002_resourcecategory_tree_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='resourceusageanalytics',
+            index=models.Index(fields=['authorization', 'timestamp'], name='resource_au_authori_a12417_idx'),
+        ),
+    ]
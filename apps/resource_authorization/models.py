@@ -6,6 +6,8 @@ from django.utils.translation import gettext_lazy as _
 import json
 from datetime import timedelta
 
+from utils.tree_index import MaterializedPathModel
+
 User = get_user_model()
 
 
@@ -210,7 +212,7 @@ class ResourceShare(models.Model):
         return self.shared_with.filter(pk=user.pk).exists()
 
 
-class ResourceCategory(models.Model):
+class ResourceCategory(MaterializedPathModel):
     """资源分类模型 - 支持分层组织"""
     name = models.CharField('分类名称', max_length=100)
     description = models.TextField('分类描述', blank=True)
@@ -268,27 +270,19 @@ class ResourceCategory(models.Model):
     
     def get_full_path(self):
         """获取完整路径"""
-        path = [self.name]
-        current = self.parent
-        while current:
-            path.insert(0, current.name)
-            current = current.parent
-        return ' > '.join(path)
+        return self.tree_label_path or self.name
     
     def get_descendants(self):
         """获取所有子分类"""
-        descendants = []
-        for child in self.children.all():
-            descendants.append(child)
-            descendants.extend(child.get_descendants())
-        return descendants
+        return list(self.get_descendant_queryset().order_by('tree_path'))
     
     def get_resource_count(self):
-        """获取分类下的资源数量（包括子分类）"""
-        count = self.authorizations.count()
-        for child in self.children.all():
-            count += child.get_resource_count()
-        return count
+        """获取分类下的资源数量（包括子分类），单次查询"""
+        through = ResourceCategory.authorizations.through
+        if not self.tree_path:
+            # 尚未建立树索引时按子树ID统计，避免空前缀匹配整张表
+            return through.objects.filter(resourcecategory_id__in=self.get_descendant_ids(include_self=True)).count()
+        return through.objects.filter(resourcecategory__tree_path__startswith=self.tree_path).count()
 
 
 class ResourceUsageAnalytics(models.Model):
@@ -347,6 +341,7 @@ class ResourceUsageAnalytics(models.Model):
             models.Index(fields=['platform']),
             models.Index(fields=['user', 'timestamp']),
             models.Index(fields=['authorization', 'action']),
+            models.Index(fields=['authorization', 'timestamp']),
         ]
     
     def __str__(self):
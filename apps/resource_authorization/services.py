@@ -23,81 +23,160 @@ class ResourceAuthorizationService:
     @staticmethod
     def check_access(user: User, resource_type: str, resource_id: int) -> bool:
         """检查用户是否有权访问指定资源"""
-        try:
-            authorization = ResourceAuthorization.objects.get(
-                resource_type=resource_type,
-                resource_id=resource_id
+        return ResourceAuthorizationService.check_access_batch(
+            user, resource_type, [resource_id]
+        )[resource_id]
+    
+    @staticmethod
+    def check_access_batch(
+        user: User,
+        resource_type: str,
+        resource_ids: List[int]
+    ) -> Dict[int, bool]:
+        """
+        批量判定用户对一组资源的访问权限
+        
+        授权记录、用户订阅和匹配的分享各查询一次，查询次数与资源数量无关。
+        返回 {resource_id: 是否可访问}，没有授权记录的资源默认为免费访问。
+        """
+        resource_ids = list(dict.fromkeys(resource_ids))
+        decisions = {resource_id: True for resource_id in resource_ids}
+        if not resource_ids:
+            return decisions
+        
+        authorizations = ResourceAuthorization.objects.filter(
+            resource_type=resource_type,
+            resource_id__in=resource_ids
+        )
+        
+        # 先用不依赖用户关联数据的规则判定，剩余的再批量查询分享和订阅
+        pending = []
+        for authorization in authorizations:
+            decision = ResourceAuthorizationService._decide_without_lookup(user, authorization)
+            if decision is None:
+                pending.append(authorization)
+            else:
+                decisions[authorization.resource_id] = decision
+        
+        if not pending:
+            return decisions
+        
+        shared_ids = set(
+            ResourceAuthorizationService._shared_authorizations(user).filter(
+                authorization__in=pending
+            ).values_list('authorization_id', flat=True)
+        )
+        subscription = ResourceAuthorizationService._get_subscription(user)
+        
+        for authorization in pending:
+            decisions[authorization.resource_id] = ResourceAuthorizationService._decide_with_lookup(
+                authorization, subscription, shared_ids
             )
-            
-            # 检查授权是否有效
-            if not authorization.is_valid():
-                return False
-            
-            # 免费资源直接允许
-            if authorization.access_level == 'FREE':
-                return True
-            
-            # 公开资源允许访问
-            if authorization.is_public:
-                return True
-            
-            # 创建者总是有权限
-            if authorization.created_by == user:
-                return True
-            
-            # 检查分享权限
-            if ResourceAuthorizationService._check_share_access(user, authorization):
-                return True
-            
-            # 检查订阅权限
-            if authorization.requires_subscription:
-                return ResourceAuthorizationService._check_subscription_access(user, authorization)
-            
-            # 高级资源需要订阅
-            if authorization.access_level == 'PREMIUM':
-                return ResourceAuthorizationService._has_premium_subscription(user)
-            
+        
+        return decisions
+    
+    @staticmethod
+    def accessible_queryset(
+        user: User,
+        resource_type: Optional[str] = None,
+        queryset: Optional[models.QuerySet] = None
+    ) -> models.QuerySet:
+        """
+        用户可访问的授权记录查询集
+        
+        与 check_access 的判定规则一致，但全部在SQL中完成过滤，
+        列表接口可直接在其上排序、分页。
+        """
+        if queryset is None:
+            queryset = ResourceAuthorization.objects.all()
+        if resource_type:
+            queryset = queryset.filter(resource_type=resource_type)
+        
+        now = timezone.now()
+        queryset = queryset.filter(
+            models.Q(valid_until__isnull=True) | models.Q(valid_until__gte=now),
+            is_active=True,
+            valid_from__lte=now
+        )
+        
+        access = models.Q(access_level='FREE') | models.Q(is_public=True)
+        if getattr(user, 'pk', None) is not None:
+            access |= models.Q(created_by=user)
+            access |= models.Q(models.Exists(
+                ResourceAuthorizationService._shared_authorizations(user).filter(
+                    authorization=models.OuterRef('pk')
+                )
+            ))
+        
+        subscription = ResourceAuthorizationService._get_subscription(user)
+        if subscription and subscription.is_active():
+            access |= models.Q(requires_subscription=True)
+        if subscription and subscription.has_premium_access():
+            access |= models.Q(requires_subscription=False, access_level='PREMIUM')
+        
+        return queryset.filter(access)
+    
+    @staticmethod
+    def _decide_without_lookup(user: User, authorization: ResourceAuthorization) -> Optional[bool]:
+        """仅凭授权记录本身即可得出结论的规则，无法判定时返回 None"""
+        # 检查授权是否有效
+        if not authorization.is_valid():
             return False
-            
-        except ResourceAuthorization.DoesNotExist:
-            # 如果没有授权记录，默认为免费访问
+        
+        # 免费资源、公开资源直接允许
+        if authorization.access_level == 'FREE' or authorization.is_public:
             return True
+        
+        # 创建者总是有权限
+        if authorization.created_by_id is not None and authorization.created_by_id == getattr(user, 'pk', None):
+            return True
+        
+        return None
     
     @staticmethod
-    def _check_share_access(user: User, authorization: ResourceAuthorization) -> bool:
-        """检查分享访问权限"""
-        shares = ResourceShare.objects.filter(
-            authorization=authorization,
-            is_active=True
-        )
+    def _decide_with_lookup(
+        authorization: ResourceAuthorization,
+        subscription: Optional[UserSubscription],
+        shared_ids: set
+    ) -> bool:
+        """基于预取的分享和订阅数据判定"""
+        # 检查分享权限
+        if authorization.pk in shared_ids:
+            return True
+        
+        # 检查订阅权限
+        if authorization.requires_subscription:
+            return bool(subscription and subscription.is_active())
         
-        for share in shares:
-            if share.can_access(user):
-                return True
+        # 高级资源需要订阅
+        if authorization.access_level == 'PREMIUM':
+            return bool(subscription and subscription.has_premium_access())
         
         return False
     
     @staticmethod
-    def _check_subscription_access(user: User, authorization: ResourceAuthorization) -> bool:
-        """检查订阅访问权限"""
-        try:
-            subscription = getattr(user, 'subscription', None)
-            if subscription:
-                return subscription.is_active()
-            return False
-        except (UserSubscription.DoesNotExist, AttributeError):
-            return False
+    def _shared_authorizations(user: User) -> models.QuerySet:
+        """对用户生效的分享记录（与 ResourceShare.can_access 规则一致）"""
+        if getattr(user, 'pk', None) is None:
+            return ResourceShare.objects.none()
+        
+        return ResourceShare.objects.filter(
+            models.Q(expires_at__isnull=True) | models.Q(expires_at__gte=timezone.now()),
+            models.Q(shared_by=user) | models.Q(share_type='public_share') | models.Q(shared_with=user),
+            is_active=True
+        )
     
     @staticmethod
-    def _has_premium_subscription(user: User) -> bool:
-        """检查是否有高级订阅"""
-        try:
-            subscription = getattr(user, 'subscription', None)
-            if subscription:
-                return subscription.has_premium_access()
-            return False
-        except (UserSubscription.DoesNotExist, AttributeError):
-            return False
+    def _get_subscription(user: User) -> Optional[UserSubscription]:
+        """获取用户订阅，已加载到用户对象上的订阅不再重复查询"""
+        if getattr(user, 'pk', None) is None:
+            return None
+        
+        cached = user._state.fields_cache.get('subscription', False)
+        if cached is not False:
+            return cached
+        
+        return UserSubscription.objects.filter(user=user).first()
     
     @staticmethod
     def create_authorization(
@@ -145,25 +224,12 @@ class ResourceAuthorizationService:
     def get_user_accessible_resources(
         user: User,
         resource_type: str,
-        limit: int = 100
+        limit: int = 100,
+        offset: int = 0
     ) -> List[ResourceAuthorization]:
         """获取用户可访问的资源列表"""
-        # 基础查询：有效的授权
-        base_query = ResourceAuthorization.objects.filter(
-            resource_type=resource_type,
-            is_active=True
-        )
-        
-        accessible_resources = []
-        
-        for auth in base_query[:limit * 2]:  # 获取更多以便过滤
-            if ResourceAuthorizationService.check_access(user, auth.resource_type, auth.resource_id):
-                accessible_resources.append(auth)
-                
-                if len(accessible_resources) >= limit:
-                    break
-        
-        return accessible_resources
+        queryset = ResourceAuthorizationService.accessible_queryset(user, resource_type)
+        return list(queryset.order_by('id')[offset:offset + limit])
 
 
 class ResourceSharingService:
@@ -65,11 +65,41 @@ class ResourceAuthorizationViewSet(viewsets.ModelViewSet):
             'resource_id': resource_id
         })
     
+    @action(detail=False, methods=['post'])
+    def check_access_batch(self, request):
+        """批量检查资源访问权限"""
+        resource_type = request.data.get('resource_type')
+        resource_ids = request.data.get('resource_ids')
+        
+        if not resource_type or not isinstance(resource_ids, list):
+            return Response(
+                {'error': '缺少必要参数'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            resource_ids = [int(resource_id) for resource_id in resource_ids]
+        except (TypeError, ValueError):
+            return Response(
+                {'error': 'resource_ids必须为整数列表'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        decisions = ResourceAuthorizationService.check_access_batch(
+            request.user, resource_type, resource_ids
+        )
+        
+        return Response({
+            'resource_type': resource_type,
+            'results': {str(resource_id): allowed for resource_id, allowed in decisions.items()}
+        })
+    
     @action(detail=False, methods=['get'])
     def accessible_resources(self, request):
         """获取用户可访问的资源"""
         resource_type = request.query_params.get('resource_type')
         limit = int(request.query_params.get('limit', 50))
+        offset = int(request.query_params.get('offset', 0))
         
         if not resource_type:
             return Response(
@@ -78,7 +108,7 @@ class ResourceAuthorizationViewSet(viewsets.ModelViewSet):
             )
         
         resources = ResourceAuthorizationService.get_user_accessible_resources(
-            request.user, resource_type, limit
+            request.user, resource_type, limit, offset
         )
         
         # 简化序列化
@@ -15,6 +15,8 @@ from .models import (
     LearningPlan, GuidedPracticeSession, GuidedPracticeQuestion, GuidedPracticeAnswer
 )
 from apps.words.models import Word
+from .dashboard_cache import dashboard_snapshot_cache
+from .learning_events import learning_event_buffer
 from .serializers import (
     LearningGoalSerializer, GoalWordSerializer, LearningSessionSerializer,
     WordLearningRecordSerializer, LearningPlanSerializer,
@@ -22,8 +24,11 @@ from .serializers import (
     LearningStatisticsSerializer, BulkGoalWordSerializer,
     GuidedPracticeSessionSerializer, GuidedPracticeQuestionSerializer,
     GuidedPracticeAnswerSerializer, GuidedPracticeAnswerCreateSerializer,
-    GuidedPracticeSessionDetailSerializer
+    GuidedPracticeSessionDetailSerializer, LearningEventBatchSerializer,
+    GuidedPracticeBatchQuestionSerializer, GuidedPracticeGenerateSerializer,
+    GuidedPracticeAnswerBatchSerializer
 )
+from .practice_questions import PracticeQuestionGenerator, submit_answers
 
 
 class LearningGoalViewSet(viewsets.ModelViewSet):
@@ -275,16 +280,42 @@ class LearningSessionViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        # 先写入缓存中的答题事件，保证会话统计完整
+        learning_event_buffer.flush_session(session.pk)
+        session.refresh_from_db()
+        
         session.end_time = timezone.now()
         session.save()
         
         serializer = self.get_serializer(session)
         return Response(serializer.data)
     
+    @action(detail=True, methods=['post'])
+    def events(self, request, pk=None):
+        """批量提交答题事件（按会话缓存后批量写入，event_id 保证重试幂等）"""
+        session = self.get_object()
+        
+        if session.end_time:
+            return Response(
+                {'error': '该学习会话已经结束'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        serializer = LearningEventBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        result = learning_event_buffer.add_events(session, serializer.validated_data['events'])
+        if serializer.validated_data['flush']:
+            result['written'] += learning_event_buffer.flush_session(session.pk)
+        result['pending'] = learning_event_buffer.pending_count(session.pk)
+        
+        return Response(result, status=status.HTTP_202_ACCEPTED)
+    
     @action(detail=True, methods=['get'])
     def records(self, request, pk=None):
         """获取学习会话的记录"""
         session = self.get_object()
+        learning_event_buffer.flush_session(session.pk)
         records = session.records.all().order_by('-created_at')
         
         # 分页
@@ -307,7 +338,7 @@ class WordLearningRecordViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):  # type: ignore
         """获取当前用户的学习记录"""
-        return WordLearningRecord.objects.filter(session__user=self.request.user)
+        return WordLearningRecord.objects.filter(user=self.request.user)
     
     def get_serializer_class(self):  # type: ignore
         """根据动作选择序列化器"""
@@ -380,21 +411,31 @@ class TeachingStatisticsViewSet(viewsets.GenericViewSet):
     
     @action(detail=False, methods=['get'])
     def overview(self, request):
-        """获取教学统计概览"""
-        user = request.user
+        """获取教学统计概览（按用户数据版本缓存快照）"""
+        user_id = request.user.pk
+        data = dashboard_snapshot_cache.get_or_build(
+            'teaching_overview',
+            user_id,
+            lambda: TeachingStatisticsViewSet._build_overview_data(user_id)
+        )
+        return Response(data)
+    
+    @staticmethod
+    def _build_overview_data(user_id):
+        """计算教学统计概览（可能在后台线程中执行，只依赖用户ID，不持有请求对象）"""
         
         # 学习目标统计
-        goals = LearningGoal.objects.filter(user=user)
+        goals = LearningGoal.objects.filter(user_id=user_id)
         total_goals = goals.count()
         active_goals = goals.filter(is_active=True).count()
         
         # 学习会话统计
-        sessions = LearningSession.objects.filter(user=user)
+        sessions = LearningSession.objects.filter(user_id=user_id)
         total_sessions = sessions.count()
         completed_sessions = sessions.filter(end_time__isnull=False).count()
         
         # 学习记录统计
-        records = WordLearningRecord.objects.filter(session__user=user)
+        records = WordLearningRecord.objects.filter(user_id=user_id)
         total_records = records.count()
         correct_records = records.filter(is_correct=True).count()
         accuracy_rate = (correct_records / total_records * 100) if total_records > 0 else 0
@@ -408,7 +449,7 @@ class TeachingStatisticsViewSet(viewsets.GenericViewSet):
                 total_study_minutes += duration.total_seconds() / 60
         
         # 目标单词统计
-        total_goal_words = GoalWord.objects.filter(goal__user=user).count()
+        total_goal_words = GoalWord.objects.filter(goal__user_id=user_id).count()
         
         # 最近活动（最近7天）
         recent_activity = []
@@ -443,14 +484,15 @@ class TeachingStatisticsViewSet(viewsets.GenericViewSet):
             'total_records': total_records,
             'correct_records': correct_records,
             'accuracy_rate': round(accuracy_rate, 2),
+            'total_words_studied': records.values('word').distinct().count(),
+            'average_accuracy': round(accuracy_rate, 2),
             'total_study_time': round(total_study_minutes, 2),
             'total_goal_words': total_goal_words,
             'recent_activity': recent_activity,
             'goal_progress': goal_progress
         }
         
-        serializer = LearningStatisticsSerializer(data)
-        return Response(serializer.data)
+        return LearningStatisticsSerializer(data).data
     
     @action(detail=False, methods=['post'])
     def bulk_add_goal_words(self, request):
@@ -489,8 +531,8 @@ class GuidedPracticeSessionViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['goal', 'is_completed']
-    ordering_fields = ['created_at', 'completed_at']
-    ordering = ['-created_at']
+    ordering_fields = ['start_time', 'end_time']
+    ordering = ['-start_time']
     
     def get_queryset(self):  # type: ignore
         """获取当前用户的指导练习会话"""
@@ -561,6 +603,65 @@ class GuidedPracticeSessionViewSet(viewsets.ModelViewSet):
             GuidedPracticeQuestionSerializer(question).data,
             status=status.HTTP_201_CREATED
         )
+    
+    @action(detail=True, methods=['post'])
+    def generate_questions(self, request, pk=None):
+        """批量生成一批题目（选择题干扰项来自同词性、同年级的词条）"""
+        session = self.get_object()
+        
+        if session.is_completed:
+            return Response(
+                {'error': '无法向已完成的会话添加问题'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        serializer = GuidedPracticeGenerateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        questions = PracticeQuestionGenerator(session).generate(**serializer.validated_data)
+        
+        return Response({
+            'created': len(questions),
+            'total_questions': session.total_questions,
+            'questions': GuidedPracticeBatchQuestionSerializer(
+                GuidedPracticeQuestion.objects.filter(pk__in=[q.pk for q in questions]).select_related('word'),
+                many=True
+            ).data
+        }, status=status.HTTP_201_CREATED)
+    
+    @action(detail=True, methods=['get'])
+    def questions(self, request, pk=None):
+        """一次获取会话的全部题目及作答状态"""
+        session = self.get_object()
+        questions = session.questions.select_related('word').annotate(answer_count=Count('answers'))
+        
+        if request.query_params.get('unanswered'):
+            questions = questions.filter(answer_count=0)
+        
+        serializer = GuidedPracticeBatchQuestionSerializer(questions, many=True)
+        return Response({
+            'session': session.pk,
+            'total_questions': session.total_questions,
+            'correct_answers': session.correct_answers,
+            'is_completed': session.is_completed,
+            'questions': serializer.data
+        })
+    
+    @action(detail=True, methods=['post'])
+    def submit_answers(self, request, pk=None):
+        """批量提交答案"""
+        session = self.get_object()
+        
+        if session.is_completed:
+            return Response(
+                {'error': '该指导练习会话已经完成'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        serializer = GuidedPracticeAnswerBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        return Response(submit_answers(session, serializer.validated_data['answers']))
 
 
 class GuidedPracticeQuestionViewSet(viewsets.ModelViewSet):
@@ -0,0 +1,118 @@
+"""
+仪表盘快照缓存
+
+按 (快照名称, 用户, 请求参数) 缓存统计接口的响应数据，并为每个用户维护一个数据版本戳。
+学习会话、学习记录、目标单词等数据变更时由信号递增版本戳，快照随之过期。
+过期快照采用 stale-while-revalidate 策略：先返回旧快照，同时由后台线程重新计算，
+超过最大陈旧时间的快照才会在请求内同步重建。
+"""
+import hashlib
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+def get_stamp(key: str) -> int:
+    """获取版本戳，缓存丢失时以毫秒时间戳重新起算，保证不会回到旧值"""
+    stamp = cache.get(key)
+    if stamp is None:
+        stamp = int(time.time() * 1000)
+        if not cache.add(key, stamp, None):
+            stamp = cache.get(key, stamp)
+    return stamp
+
+
+def bump_stamp(key: str):
+    """递增版本戳，键不存在时以毫秒时间戳重新起算"""
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, int(time.time() * 1000), None)
+
+
+class DashboardSnapshotCache:
+    """仪表盘快照缓存"""
+
+    STAMP_KEY = 'dashboard:stamp:{user_id}'
+    SNAPSHOT_KEY = 'dashboard:snapshot:{name}:{user_id}:{variant}'
+    REFRESH_LOCK_KEY = 'dashboard:refresh:{name}:{user_id}:{variant}'
+
+    def __init__(self):
+        # 快照在该时间内且版本戳未变时视为新鲜
+        self.fresh_seconds = getattr(settings, 'DASHBOARD_SNAPSHOT_FRESH_SECONDS', 300)
+        # 超过该时间的快照不再返回，必须同步重建
+        self.max_stale_seconds = getattr(settings, 'DASHBOARD_SNAPSHOT_MAX_STALE_SECONDS', 3600)
+        self.refresh_lock_seconds = 60
+
+    def get_data_stamp(self, user_id: int) -> int:
+        """获取用户数据版本戳"""
+        return get_stamp(self.STAMP_KEY.format(user_id=user_id))
+
+    def bump_data_stamp(self, user_id: Optional[int]):
+        """递增用户数据版本戳"""
+        if user_id:
+            bump_stamp(self.STAMP_KEY.format(user_id=user_id))
+
+    def get_or_build(self, name: str, user_id: int, builder: Callable[[], Any],
+                     variant: Optional[Dict[str, Any]] = None) -> Any:
+        """
+        获取快照，不存在或陈旧时重建
+
+        variant 为影响结果的请求参数；当天日期自动并入，跨天后快照自然失效。
+        """
+        variant_key = self._variant_key(variant)
+        key = self.SNAPSHOT_KEY.format(name=name, user_id=user_id, variant=variant_key)
+        stamp = self.get_data_stamp(user_id)
+        now = time.time()
+
+        entry = cache.get(key)
+        if entry is not None:
+            age = now - entry['built_at']
+            if entry['stamp'] == stamp and age < self.fresh_seconds:
+                return entry['data']
+            if age < self.max_stale_seconds:
+                self._refresh_in_background(name, user_id, variant_key, key, builder)
+                return entry['data']
+
+        return self._build(key, stamp, builder)
+
+    def _build(self, key: str, stamp: int, builder: Callable[[], Any]) -> Any:
+        """计算快照并写入缓存（版本戳在计算前读取，计算期间的数据变更会在下次请求时触发刷新）"""
+        data = builder()
+        cache.set(key, {'stamp': stamp, 'built_at': time.time(), 'data': data}, self.max_stale_seconds)
+        return data
+
+    def _refresh_in_background(self, name: str, user_id: int, variant_key: str,
+                               key: str, builder: Callable[[], Any]):
+        """后台线程重建快照，同一快照同时只有一个刷新任务"""
+        lock_key = self.REFRESH_LOCK_KEY.format(name=name, user_id=user_id, variant=variant_key)
+        if not cache.add(lock_key, True, self.refresh_lock_seconds):
+            return
+
+        def refresh():
+            try:
+                self._build(key, self.get_data_stamp(user_id), builder)
+            except Exception as e:
+                logger.error(f"后台刷新仪表盘快照失败: {name}, 用户: {user_id}, 错误: {e}")
+            finally:
+                cache.delete(lock_key)
+                # 工作线程持有独立的数据库连接，执行完毕后释放
+                connection.close()
+
+        threading.Thread(target=refresh, name=f'dashboard-refresh-{name}-{user_id}', daemon=True).start()
+
+    @staticmethod
+    def _variant_key(variant: Optional[Dict[str, Any]]) -> str:
+        params = '&'.join(f'{name}={value}' for name, value in sorted((variant or {}).items()))
+        return f'{timezone.localdate():%Y%m%d}:{hashlib.md5(params.encode()).hexdigest()[:12]}'
+
+
+dashboard_snapshot_cache = DashboardSnapshotCache()
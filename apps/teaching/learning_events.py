@@ -0,0 +1,230 @@
+"""
+答题事件批量写入
+
+客户端按批提交答题事件，事件先按学习会话缓存在进程内，达到数量阈值或超过刷新间隔后
+一次性 bulk_create 学习记录，并用一条 F() 表达式 UPDATE 累加会话的答题统计。
+每个事件可携带客户端生成的 event_id 作为幂等键，重试提交时缓存和数据库两级去重，
+会话统计只按实际插入的记录累加。
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+
+from apps.words.models import Word
+from .dashboard_cache import dashboard_snapshot_cache
+from .models import LearningSession, WordLearningRecord
+
+logger = logging.getLogger(__name__)
+
+
+class LearningEventBuffer:
+    """按学习会话缓存答题事件并批量写入"""
+
+    def __init__(self):
+        self.flush_size = getattr(settings, 'LEARNING_EVENT_FLUSH_SIZE', 50)
+        self.flush_interval = getattr(settings, 'LEARNING_EVENT_FLUSH_INTERVAL_MS', 2000) / 1000
+
+        # session_id -> {'user_id', 'goal_id', 'events': OrderedDict(key -> event), 'first_at'}
+        self._buffers: Dict[int, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._flusher: Optional[threading.Thread] = None
+        self._anonymous_seq = 0
+
+    def add_events(self, session: LearningSession, events: List[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        缓存一批答题事件
+
+        events 中每项包含 word_id、user_answer、is_correct，可选 response_time、
+        is_forgotten、event_id。缓存达到阈值时在当前请求内写入，否则由后台线程按间隔写入。
+        """
+        accepted = duplicates = 0
+        with self._lock:
+            buffer = self._buffers.get(session.pk)
+            if buffer is None:
+                buffer = self._buffers[session.pk] = {
+                    'user_id': session.user_id,
+                    'goal_id': session.goal_id,
+                    'events': OrderedDict(),
+                    'first_at': time.monotonic(),
+                }
+
+            for event in events:
+                key = event.get('event_id')
+                if not key:
+                    self._anonymous_seq += 1
+                    key = ('anonymous', self._anonymous_seq)
+                if key in buffer['events']:
+                    duplicates += 1
+                    continue
+                buffer['events'][key] = event
+                accepted += 1
+
+            should_flush = len(buffer['events']) >= self.flush_size
+            self._ensure_flusher()
+
+        written = self.flush_session(session.pk) if should_flush else 0
+        return {'accepted': accepted, 'duplicates': duplicates, 'written': written}
+
+    def flush_session(self, session_id: int) -> int:
+        """写入单个会话的缓存事件，返回新增记录数"""
+        with self._lock:
+            buffer = self._buffers.pop(session_id, None)
+        if not buffer or not buffer['events']:
+            return 0
+
+        try:
+            return self._write(session_id, buffer)
+        except Exception as e:
+            logger.error(f"写入答题事件失败: 会话 {session_id}, 错误: {e}")
+            self._requeue(session_id, buffer)
+            raise
+
+    def flush_due(self, force: bool = False) -> int:
+        """写入所有超过刷新间隔（或 force 时全部）的会话缓存"""
+        now = time.monotonic()
+        with self._lock:
+            due = [
+                session_id for session_id, buffer in self._buffers.items()
+                if force or now - buffer['first_at'] >= self.flush_interval
+            ]
+
+        written = 0
+        for session_id in due:
+            try:
+                written += self.flush_session(session_id)
+            except Exception:
+                # 已记录日志并放回缓存，下一轮重试
+                pass
+        return written
+
+    def pending_count(self, session_id: Optional[int] = None) -> int:
+        """缓存中尚未写入的事件数"""
+        with self._lock:
+            if session_id is not None:
+                buffer = self._buffers.get(session_id)
+                return len(buffer['events']) if buffer else 0
+            return sum(len(buffer['events']) for buffer in self._buffers.values())
+
+    def _write(self, session_id: int, buffer: Dict[str, Any]) -> int:
+        """批量插入学习记录并聚合更新会话统计"""
+        events = list(buffer['events'].values())
+
+        with transaction.atomic():
+            # 锁定会话行，同一会话的多个写入（多进程、重试）依次执行，下面的去重查询能看到已提交的记录
+            LearningSession.objects.select_for_update().filter(pk=session_id).exists()
+
+            # 数据库级去重：之前批次已写入的事件
+            event_ids = [event['event_id'] for event in events if event.get('event_id')]
+            if event_ids:
+                existing = set(WordLearningRecord.objects.filter(
+                    session_id=session_id, event_id__in=event_ids
+                ).values_list('event_id', flat=True))
+                events = [event for event in events if event.get('event_id') not in existing]
+
+            word_ids = {event['word_id'] for event in events}
+            valid_word_ids = set(Word.objects.filter(id__in=word_ids).values_list('id', flat=True))
+            studied_word_ids = set(WordLearningRecord.objects.filter(
+                session_id=session_id, word_id__in=valid_word_ids
+            ).values_list('word_id', flat=True))
+
+            records = [
+                WordLearningRecord(
+                    session_id=session_id,
+                    user_id=buffer['user_id'],
+                    goal_id=buffer['goal_id'],
+                    word_id=event['word_id'],
+                    user_answer=event.get('user_answer', ''),
+                    is_correct=event['is_correct'],
+                    response_time=event.get('response_time') or 0.0,
+                    is_forgotten=event.get('is_forgotten', False),
+                    event_id=event.get('event_id') or None,
+                )
+                for event in events
+                if event['word_id'] in valid_word_ids
+            ]
+            if len(records) < len(events):
+                logger.warning(f"会话 {session_id} 丢弃 {len(events) - len(records)} 个单词不存在的答题事件")
+            if not records:
+                return 0
+
+            # 会话统计只按实际插入的记录累加，冲突跳过的事件不计数
+            records = self._insert_records(records)
+            if not records:
+                return 0
+
+            LearningSession.objects.filter(pk=session_id).update(
+                total_answers=F('total_answers') + len(records),
+                correct_answers=F('correct_answers') + sum(1 for record in records if record.is_correct),
+                words_studied=F('words_studied') + len({record.word_id for record in records} - studied_word_ids),
+            )
+
+            # 批量写入不触发信号，需手动使仪表盘快照过期
+            user_id = buffer['user_id']
+            transaction.on_commit(lambda: dashboard_snapshot_cache.bump_data_stamp(user_id))
+
+        return len(records)
+
+    @staticmethod
+    def _insert_records(records: List[WordLearningRecord]) -> List[WordLearningRecord]:
+        """
+        插入学习记录，返回实际插入的记录
+
+        先整批插入；与已有记录的 event_id 冲突时整批回滚到保存点，改为逐条插入并跳过冲突的记录。
+        """
+        try:
+            with transaction.atomic():
+                WordLearningRecord.objects.bulk_create(records)
+            return records
+        except IntegrityError:
+            logger.info(f"答题事件与已有记录冲突，逐条写入 {len(records)} 条记录")
+
+        inserted = []
+        for record in records:
+            try:
+                with transaction.atomic():
+                    WordLearningRecord.objects.bulk_create([record])
+            except IntegrityError:
+                continue
+            inserted.append(record)
+        return inserted
+
+    def _requeue(self, session_id: int, buffer: Dict[str, Any]):
+        """写入失败时把事件放回缓存，保留期间新到达的事件"""
+        with self._lock:
+            current = self._buffers.get(session_id)
+            if current is not None:
+                buffer['events'].update(current['events'])
+            self._buffers[session_id] = buffer
+
+    def _ensure_flusher(self):
+        """启动后台刷新线程（调用方持有锁）"""
+        if self._flusher is not None and self._flusher.is_alive():
+            return
+        self._flusher = threading.Thread(target=self._flush_loop, name='learning-event-flusher', daemon=True)
+        self._flusher.start()
+
+    def _flush_loop(self):
+        """按刷新间隔写入到期的缓存，缓存清空后线程退出"""
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush_due()
+            except Exception as e:
+                logger.error(f"后台写入答题事件失败: {e}")
+            finally:
+                # 工作线程持有独立的数据库连接，每轮结束后释放
+                connection.close()
+
+            with self._lock:
+                if not self._buffers:
+                    self._flusher = None
+                    return
+
+
+learning_event_buffer = LearningEventBuffer()
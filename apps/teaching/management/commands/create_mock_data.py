@@ -3,6 +3,7 @@ from django.contrib.auth import get_user_model
 from apps.teaching.models import LearningGoal, GoalWord, LearningSession, WordLearningRecord, LearningPlan
 from apps.accounts.models import LearningProfile
 from apps.words.models import Word
+from apps.words.sampling import sample
 from django.utils import timezone
 from datetime import datetime, timedelta
 import random
@@ -173,7 +174,7 @@ class Command(BaseCommand):
             goals.append(goal)
             
             # 为目标添加单词
-            words = Word.objects.order_by('?')[:goal.target_words_count]
+            words = sample(Word.objects.all(), goal.target_words_count)
             for word in words:
                 GoalWord.objects.create(goal=goal, word=word)
             
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.30 on 2026-10-19 04:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teaching', '0003_dailystudyrecord_alter_learninggoal_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='wordlearningrecord',
+            name='event_id',
+            field=models.CharField(blank=True, help_text='客户端生成的幂等键，重试提交同一答题事件时不会重复记录', max_length=64, null=True, verbose_name='事件ID'),
+        ),
+        migrations.AddConstraint(
+            model_name='wordlearningrecord',
+            constraint=models.UniqueConstraint(fields=('session', 'event_id'), name='unique_learning_record_event'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 4.2.30 on 2026-10-19 04:13
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_record_user(apps, schema_editor):
+    """用所属会话的用户回填学习记录的 user 字段"""
+    WordLearningRecord = apps.get_model('teaching', 'WordLearningRecord')
+    LearningSession = apps.get_model('teaching', 'LearningSession')
+    WordLearningRecord.objects.filter(user__isnull=True).update(
+        user_id=models.Subquery(
+            LearningSession.objects.filter(pk=models.OuterRef('session_id')).values('user_id')[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('teaching', '0004_wordlearningrecord_event_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='wordlearningrecord',
+            name='user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='word_learning_records', to=settings.AUTH_USER_MODEL, verbose_name='用户'),
+        ),
+        migrations.RunPython(backfill_record_user, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='learningsession',
+            index=models.Index(fields=['user', 'start_time'], name='teaching_le_user_id_1b76a4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='learningsession',
+            index=models.Index(fields=['user', 'end_time'], name='teaching_le_user_id_aa6868_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='wordlearningrecord',
+            index=models.Index(fields=['user', 'created_at'], name='teaching_wo_user_id_c39c93_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='wordlearningrecord',
+            index=models.Index(fields=['user', 'is_correct'], name='teaching_wo_user_id_1af6af_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='wordlearningrecord',
+            index=models.Index(fields=['goal', 'word'], name='teaching_wo_goal_id_1d4db2_idx'),
+        ),
+    ]
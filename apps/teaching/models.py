@@ -172,6 +172,10 @@ class LearningSession(models.Model):
         verbose_name = '学习会话'
         verbose_name_plural = '学习会话'
         ordering = ['-start_time']
+        indexes = [
+            models.Index(fields=['user', 'start_time']),
+            models.Index(fields=['user', 'end_time']),
+        ]
     
     def __str__(self):
         return f'{self.user.username} - {self.goal.name} - {self.start_time.strftime("%Y-%m-%d %H:%M")}'
@@ -199,22 +203,48 @@ class WordLearningRecord(models.Model):
         related_name='records',
         verbose_name='学习会话'
     )
+    # 冗余会话所属用户，按用户查询学习记录时无需关联会话表；保存时由会话自动填充
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='word_learning_records',
+        verbose_name='用户'
+    )
     goal = models.ForeignKey(LearningGoal, on_delete=models.CASCADE, verbose_name='学习目标')
     word = models.ForeignKey(Word, on_delete=models.CASCADE, verbose_name='单词')
     user_answer = models.CharField(max_length=200, verbose_name='用户答案')
     is_correct = models.BooleanField(verbose_name='是否正确')
     response_time = models.FloatField(verbose_name='响应时间（秒）')
     is_forgotten = models.BooleanField(default=False, verbose_name='是否遗忘')
+    event_id = models.CharField(
+        max_length=64, null=True, blank=True, verbose_name='事件ID',
+        help_text='客户端生成的幂等键，重试提交同一答题事件时不会重复记录'
+    )
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
     
     class Meta:
         verbose_name = '单词学习记录'
         verbose_name_plural = '单词学习记录'
         ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['session', 'event_id'], name='unique_learning_record_event'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'created_at']),
+            models.Index(fields=['user', 'is_correct']),
+            models.Index(fields=['goal', 'word']),
+        ]
     
     def __str__(self):
         return f'{self.word.word} - {"正确" if self.is_correct else "错误"}'
 
+    def save(self, *args, **kwargs):
+        if self.user_id is None and self.session_id:
+            self.user_id = self.session.user_id
+        super().save(*args, **kwargs)
+
 class LearningPlan(models.Model):
     """学习计划模型 - 整合了vocabulary_manager的功能"""
     PLAN_TYPE_CHOICES = [
@@ -0,0 +1,269 @@
+"""
+引导练习题目批量生成
+
+按学习会话一次生成整批题目（选择题、填空题、翻译题）并 bulk_create 写入，客户端一次取回整批题目、
+批量提交答案。选择题的干扰项来自按 (词性, 年级) 分桶的词条近邻索引，每个桶缓存一份候选列表，
+生成一批题目只需读取缓存和一次词条查询。
+"""
+import logging
+import random
+import re
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Max
+from django.utils import timezone
+
+from apps.words.models import WordEntry
+from apps.words.sampling import goal_word_pool
+from .models import GuidedPracticeAnswer, GuidedPracticeQuestion, GuidedPracticeSession
+
+logger = logging.getLogger(__name__)
+
+QUESTION_TYPES = ('multiple_choice', 'fill_blank', 'translation')
+DISTRACTOR_COUNT = 3
+BUCKET_SIZE = 200
+BUCKET_TIMEOUT = 3600
+MAX_BATCH_SIZE = 50
+ANSWER_MAX_LENGTH = 200
+BLANK = '____'
+
+
+def normalize_answer(answer: str) -> str:
+    return ' '.join((answer or '').split()).lower()
+
+
+class DistractorIndex:
+    """
+    干扰项近邻索引
+
+    词条按 (词性, 年级) 分桶，每桶缓存最多 BUCKET_SIZE 个 (单词ID, 单词, 释义)；
+    同桶候选不足时依次回退到同词性、同年级和全局桶。
+    """
+
+    CACHE_PREFIX = 'guided_practice:distractors'
+
+    def __init__(self, rng=None):
+        self.rng = rng or random
+        self._buckets: Dict[Tuple[str, str], List[Tuple[int, str, str]]] = {}
+
+    @classmethod
+    def cache_key(cls, part_of_speech: str, grade: str) -> str:
+        return f'{cls.CACHE_PREFIX}:{part_of_speech or "*"}:{grade or "*"}'
+
+    @staticmethod
+    def fallback_keys(part_of_speech: str, grade: str) -> List[Tuple[str, str]]:
+        keys = [(part_of_speech, grade), (part_of_speech, ''), ('', grade), ('', '')]
+        return list(dict.fromkeys(keys))
+
+    def load(self, entries: Iterable[Dict]):
+        """预取一批词条需要的全部分桶：先批量读缓存，缺失的桶再查询"""
+        keys = {key for entry in entries for key in self.fallback_keys(entry['part_of_speech'], entry['grade'])}
+        keys -= set(self._buckets)
+        if not keys:
+            return
+
+        cached = cache.get_many([self.cache_key(*key) for key in keys])
+        missing = {}
+        for key in keys:
+            bucket = cached.get(self.cache_key(*key))
+            if bucket is None:
+                missing[self.cache_key(*key)] = bucket = self._build_bucket(*key)
+            self._buckets[key] = bucket
+        if missing:
+            cache.set_many(missing, BUCKET_TIMEOUT)
+
+    @staticmethod
+    def _build_bucket(part_of_speech: str, grade: str) -> List[Tuple[int, str, str]]:
+        entries = WordEntry.objects.exclude(definition='')
+        if part_of_speech:
+            entries = entries.filter(part_of_speech=part_of_speech)
+        if grade:
+            entries = entries.filter(grade=grade)
+        rows = entries.order_by('word_id').values_list('word_id', 'word__word', 'definition')[:BUCKET_SIZE * 2]
+        # 同一单词的多个词条只保留一个
+        bucket = {word_id: (word_id, word, definition) for word_id, word, definition in rows}
+        return list(bucket.values())[:BUCKET_SIZE]
+
+    def distractors(self, entry: Dict, field: str, count: int = DISTRACTOR_COUNT) -> List[str]:
+        """为词条抽取 count 个干扰项；field 为 'definition' 或 'word'"""
+        position = 2 if field == 'definition' else 1
+        correct = normalize_answer(entry[field])
+        chosen, seen = [], {correct}
+        for key in self.fallback_keys(entry['part_of_speech'], entry['grade']):
+            candidates = self._buckets.get(key, [])
+            for candidate in self.rng.sample(candidates, min(len(candidates), count * 3)):
+                value = candidate[position][:ANSWER_MAX_LENGTH]
+                if candidate[0] == entry['word_id'] or normalize_answer(value) in seen:
+                    continue
+                seen.add(normalize_answer(value))
+                chosen.append(value)
+                if len(chosen) >= count:
+                    return chosen
+        return chosen
+
+    @classmethod
+    def invalidate(cls):
+        """清空分桶缓存（批量导入词条后使用）"""
+        keys = set()
+        for part_of_speech, grade in WordEntry.objects.values_list('part_of_speech', 'grade').distinct():
+            keys.update(cls.fallback_keys(part_of_speech, grade))
+        cache.delete_many([cls.cache_key(*key) for key in keys])
+
+
+class PracticeQuestionGenerator:
+    """为引导练习会话批量生成题目"""
+
+    def __init__(self, session: GuidedPracticeSession, rng=None):
+        self.session = session
+        self.rng = rng or random
+        self.index = DistractorIndex(self.rng)
+
+    def generate(self, count: int = 10, question_types: Optional[Sequence[str]] = None,
+                 word_ids: Optional[Sequence[int]] = None) -> List[GuidedPracticeQuestion]:
+        """
+        生成一批题目并写入
+
+        默认从会话学习目标的单词池中随机抽取本会话尚未出过题的单词；
+        题型按 question_types 轮换，缺少例句的单词填空题改为选择题。
+        """
+        question_types = [t for t in (question_types or QUESTION_TYPES) if t in QUESTION_TYPES] or list(QUESTION_TYPES)
+        count = max(1, min(count, MAX_BATCH_SIZE))
+
+        existing = self.session.questions.aggregate(last_order=Max('order'))
+        asked_word_ids = set(self.session.questions.values_list('word_id', flat=True))
+        if word_ids is None:
+            word_ids = goal_word_pool(self.session.goal_id).draw(count, exclude=asked_word_ids, rng=self.rng)
+        word_ids = list(word_ids)[:count]
+
+        entries = self._entries_for(word_ids)
+        self.index.load(entries.values())
+
+        order = (existing['last_order'] or 0) + 1
+        questions = []
+        for position, word_id in enumerate(word_ids):
+            entry = entries.get(word_id)
+            if entry is None:
+                continue
+            question = self._build_question(entry, question_types[position % len(question_types)])
+            if question is None:
+                continue
+            question.session = self.session
+            question.order = order
+            order += 1
+            questions.append(question)
+
+        with transaction.atomic():
+            questions = GuidedPracticeQuestion.objects.bulk_create(questions)
+            GuidedPracticeSession.objects.filter(pk=self.session.pk).update(
+                total_questions=F('total_questions') + len(questions)
+            )
+        self.session.total_questions += len(questions)
+        return questions
+
+    @staticmethod
+    def _entries_for(word_ids: Sequence[int]) -> Dict[int, Dict]:
+        """每个单词取一个有释义的词条，优先有例句的"""
+        entries = {}
+        rows = WordEntry.objects.filter(word_id__in=word_ids).exclude(definition='').values(
+            'word_id', 'word__word', 'definition', 'example', 'phonetic', 'part_of_speech', 'grade'
+        )
+        for row in rows:
+            row['word'] = row.pop('word__word')
+            current = entries.get(row['word_id'])
+            if current is None or (not current['example'] and row['example']):
+                entries[row['word_id']] = row
+        return entries
+
+    def _build_question(self, entry: Dict, question_type: str) -> Optional[GuidedPracticeQuestion]:
+        word, definition = entry['word'], entry['definition'][:ANSWER_MAX_LENGTH]
+
+        if question_type == 'fill_blank':
+            pattern = re.compile(rf'\b{re.escape(word)}\b', re.IGNORECASE)
+            if entry['example'] and pattern.search(entry['example']):
+                return GuidedPracticeQuestion(
+                    word_id=entry['word_id'],
+                    question_type='fill_blank',
+                    question_text=pattern.sub(BLANK, entry['example'], count=1),
+                    correct_answer=word,
+                    options=self._shuffled(word, self.index.distractors(entry, 'word')),
+                )
+            question_type = 'multiple_choice'
+
+        if question_type == 'translation':
+            return GuidedPracticeQuestion(
+                word_id=entry['word_id'],
+                question_type='translation',
+                question_text=f'请写出“{definition}”对应的英文单词',
+                correct_answer=word,
+                options=[],
+            )
+
+        distractors = self.index.distractors(entry, 'definition')
+        if not distractors:
+            logger.debug(f"单词 {word} 没有可用的干扰项，跳过选择题")
+            return None
+        return GuidedPracticeQuestion(
+            word_id=entry['word_id'],
+            question_type='multiple_choice',
+            question_text=f'“{word}”的意思是？',
+            correct_answer=definition,
+            options=self._shuffled(definition, distractors),
+        )
+
+    def _shuffled(self, correct: str, distractors: List[str]) -> List[str]:
+        options = [correct] + distractors
+        self.rng.shuffle(options)
+        return options
+
+
+def submit_answers(session: GuidedPracticeSession, answers: List[Dict]) -> Dict:
+    """
+    批量提交答案
+
+    answers 中每项包含 question（题目ID）、user_answer、response_time；
+    不属于该会话的题目、已作答过的题目以及同一次提交中重复的题目会被忽略，每题只记录一次答案。
+    答案一次 bulk_create，会话的正确数用 F() 累加，所有题目都已作答时标记会话完成。
+    """
+    records, results, correct = [], [], 0
+    with transaction.atomic():
+        # 锁定会话行，同一会话的并发提交依次执行，已作答判断不会被并发绕过
+        GuidedPracticeSession.objects.select_for_update().filter(pk=session.pk).exists()
+        question_ids = list(dict.fromkeys(answer['question'] for answer in answers))
+        questions = session.questions.filter(answers__isnull=True).in_bulk(question_ids)
+
+        for answer in answers:
+            question = questions.pop(answer['question'], None)
+            if question is None:
+                continue
+            is_correct = normalize_answer(answer['user_answer']) == normalize_answer(question.correct_answer)
+            correct += is_correct
+            records.append(GuidedPracticeAnswer(
+                question=question,
+                user_answer=answer['user_answer'][:ANSWER_MAX_LENGTH],
+                is_correct=is_correct,
+                response_time=answer.get('response_time', 0.0),
+            ))
+            results.append({
+                'question': question.pk,
+                'is_correct': is_correct,
+                'correct_answer': question.correct_answer,
+            })
+
+        GuidedPracticeAnswer.objects.bulk_create(records)
+        if correct:
+            GuidedPracticeSession.objects.filter(pk=session.pk).update(correct_answers=F('correct_answers') + correct)
+        unanswered = session.questions.filter(answers__isnull=True).exists()
+        if not unanswered and not session.is_completed:
+            GuidedPracticeSession.objects.filter(pk=session.pk).update(is_completed=True, end_time=timezone.now())
+
+    session.refresh_from_db(fields=['correct_answers', 'is_completed', 'end_time'])
+    return {
+        'results': results,
+        'accepted': len(records),
+        'ignored': len(answers) - len(records),
+        'correct': correct,
+        'session_correct_answers': session.correct_answers,
+        'is_completed': session.is_completed,
+    }
@@ -133,6 +133,30 @@ class WordLearningRecordCreateSerializer(serializers.ModelSerializer):
         return attrs
 
 
+class LearningEventSerializer(serializers.Serializer):
+    """答题事件序列化器"""
+    event_id = serializers.CharField(max_length=64, required=False, allow_blank=True,
+                                     help_text='客户端生成的幂等键')
+    word_id = serializers.IntegerField()
+    user_answer = serializers.CharField(max_length=200, required=False, allow_blank=True, default='')
+    is_correct = serializers.BooleanField()
+    response_time = serializers.FloatField(required=False, default=0.0, min_value=0)
+    is_forgotten = serializers.BooleanField(required=False, default=False)
+
+
+class LearningEventBatchSerializer(serializers.Serializer):
+    """答题事件批量提交序列化器"""
+    events = LearningEventSerializer(many=True, allow_empty=False)
+    flush = serializers.BooleanField(required=False, default=False,
+                                     help_text='是否立即写入数据库')
+    
+    def validate_events(self, value):
+        """限制单批事件数量"""
+        if len(value) > 500:
+            raise serializers.ValidationError('单次最多提交500个答题事件')
+        return value
+
+
 class LearningStatisticsSerializer(serializers.Serializer):
     """学习统计序列化器"""
     total_goals = serializers.IntegerField()
@@ -277,6 +301,55 @@ class GuidedPracticeAnswerCreateSerializer(serializers.ModelSerializer):
         return GuidedPracticeAnswer.objects.create(**validated_data)
 
 
+class GuidedPracticeBatchQuestionSerializer(serializers.ModelSerializer):
+    """引导练习批量题目序列化器（不包含正确答案）"""
+    word = serializers.CharField(source='word.word', read_only=True)
+    is_answered = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = GuidedPracticeQuestion
+        fields = ['id', 'order', 'question_type', 'question_text', 'options', 'word_id', 'word', 'is_answered']
+    
+    def get_is_answered(self, obj):
+        """是否已作答（需要视图注解 answer_count）"""
+        return getattr(obj, 'answer_count', 0) > 0
+
+
+class GuidedPracticeGenerateSerializer(serializers.Serializer):
+    """批量生成引导练习题目序列化器"""
+    count = serializers.IntegerField(required=False, default=10, min_value=1, max_value=50)
+    question_types = serializers.ListField(
+        child=serializers.ChoiceField(choices=['multiple_choice', 'fill_blank', 'translation']),
+        required=False,
+        allow_empty=False
+    )
+    word_ids = serializers.ListField(
+        child=serializers.IntegerField(),
+        required=False,
+        allow_empty=False,
+        max_length=50,
+        help_text='指定出题单词，默认从学习目标中随机抽取'
+    )
+
+
+class GuidedPracticeAnswerItemSerializer(serializers.Serializer):
+    """单个引导练习答案"""
+    question = serializers.IntegerField()
+    user_answer = serializers.CharField(max_length=200, allow_blank=True)
+    response_time = serializers.FloatField(required=False, default=0.0, min_value=0)
+
+
+class GuidedPracticeAnswerBatchSerializer(serializers.Serializer):
+    """引导练习答案批量提交序列化器"""
+    answers = GuidedPracticeAnswerItemSerializer(many=True, allow_empty=False)
+    
+    def validate_answers(self, value):
+        """限制单批答案数量"""
+        if len(value) > 100:
+            raise serializers.ValidationError('单次最多提交100个答案')
+        return value
+
+
 class GuidedPracticeSessionDetailSerializer(serializers.ModelSerializer):
     """指导练习会话详情序列化器"""
     teacher = UserSimpleSerializer(read_only=True)
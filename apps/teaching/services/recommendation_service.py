@@ -1,4 +1,4 @@
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Set, Tuple
 from datetime import datetime, timedelta
 from django.utils import timezone
 from django.db.models import Q, Count, Avg, Sum, F
@@ -14,6 +14,7 @@ from ..models import (
     WordLearningProgress, DailyStudyRecord
 )
 from apps.words.models import Word, WordSet, VocabularyList
+from apps.words.sampling import goal_word_pool
 from apps.analytics.utils import EngagementAnalyzer, PredictiveAnalyzer
 from .recommendation_config import recommendation_config, recommendation_strategies
 
@@ -27,6 +28,7 @@ class SmartWordRecommendationService:
         self.config = recommendation_config
         self.strategies = recommendation_strategies
         self.cache_timeout = 300  # 5分钟缓存
+        self.goal = None
     
     def get_personalized_recommendations(
         self, 
@@ -59,6 +61,7 @@ class SmartWordRecommendationService:
         goal = self._get_learning_goal(goal_id)
         if not goal:
             return {'words': [], 'reasons': [], 'strategy': 'no_goal'}
+        self.goal = goal
         
         # 分析用户学习模式
         user_profile = self._analyze_user_learning_profile()
@@ -168,7 +171,7 @@ class SmartWordRecommendationService:
         """分析用户学习档案"""
         # 获取最近30天的学习数据
         recent_records = WordLearningRecord.objects.filter(
-            session__user=self.user,
+            user=self.user,
             created_at__gte=self.current_time - timedelta(days=30)
         )
         
@@ -204,15 +207,19 @@ class SmartWordRecommendationService:
         goal_words = goal.get_words()
         
         # 排除已掌握的单词
-        mastered_words = WordLearningProgress.objects.filter(
-            user=self.user,
-            mastery_level='mastered'
-        ).values_list('word_id', flat=True)
-        
-        candidate_words = goal_words.exclude(id__in=mastered_words)
+        candidate_words = goal_words.exclude(id__in=self._mastered_word_ids())
         
         return list(candidate_words)
     
+    def _mastered_word_ids(self) -> Set[int]:
+        """已掌握的单词ID"""
+        if not hasattr(self, '_mastered_ids'):
+            self._mastered_ids = set(WordLearningProgress.objects.filter(
+                user=self.user,
+                mastery_level='mastered'
+            ).values_list('word_id', flat=True))
+        return self._mastered_ids
+    
     def _apply_recommendation_strategies(
         self, 
         candidates: List[Word], 
@@ -236,7 +243,8 @@ class SmartWordRecommendationService:
             strategy_count = int(count * weight)
             if strategy_count > 0:
                 strategy_words, strategy_reasons = self._apply_single_strategy(
-                    strategy, candidates, profile, strategy_count, difficulty_preference
+                    strategy, candidates, profile, strategy_count, difficulty_preference,
+                    exclude_ids={word.id for word in recommendations}
                 )
                 recommendations.extend(strategy_words)
                 reasons.extend(strategy_reasons)
@@ -268,7 +276,8 @@ class SmartWordRecommendationService:
         candidates: List[Word],
         profile: Dict[str, Any],
         count: int,
-        difficulty_preference: str
+        difficulty_preference: str,
+        exclude_ids: Optional[Set[int]] = None
     ) -> Tuple[List[Word], List[str]]:
         """应用单一推荐策略"""
         if strategy == 'frequency_based':
@@ -278,7 +287,7 @@ class SmartWordRecommendationService:
         elif strategy == 'progress_based':
             return self._progress_based_recommendation(candidates, profile, count)
         elif strategy == 'random_exploration':
-            return self._random_exploration_recommendation(candidates, count)
+            return self._random_exploration_recommendation(candidates, count, exclude_ids)
         else:
             return [], []
     
@@ -309,7 +318,7 @@ class SmartWordRecommendationService:
         """基于相似性的推荐"""
         # 获取用户最近学习的单词
         recent_words = list(WordLearningRecord.objects.filter(
-            session__user=self.user,
+            user=self.user,
             created_at__gte=self.current_time - timedelta(days=7)
         ).values_list('word_id', flat=True).distinct())
         
@@ -379,13 +388,21 @@ class SmartWordRecommendationService:
     def _random_exploration_recommendation(
         self, 
         candidates: List[Word], 
-        count: int
+        count: int,
+        exclude_ids: Optional[Set[int]] = None
     ) -> Tuple[List[Word], List[str]]:
         """随机探索推荐"""
-        selected_words = random.sample(
-            candidates, 
-            min(count, len(candidates))
-        )
+        exclude_ids = exclude_ids or set()
+        if self.goal is None:
+            pool = [word for word in candidates if word.id not in exclude_ids]
+            selected_words = random.sample(pool, min(count, len(pool)))
+        else:
+            # 从目标的缓存单词池按随机下标抽取，排除已掌握和本次已推荐的单词，只查询选中的单词
+            word_ids = goal_word_pool(self.goal.pk).draw(
+                count, exclude=self._mastered_word_ids() | exclude_ids
+            )
+            words = Word.objects.in_bulk(word_ids)
+            selected_words = [words[word_id] for word_id in word_ids if word_id in words]
         reasons = ['探索新词汇，拓展学习范围'] * len(selected_words)
         
         return selected_words, reasons
@@ -438,7 +455,7 @@ class SmartWordRecommendationService:
         """计算用户能力水平"""
         # 获取最近的学习记录
         recent_records = WordLearningRecord.objects.filter(
-            session__user=self.user,
+            user=self.user,
             created_at__gte=self.current_time - timedelta(days=14)
         )
         
@@ -531,7 +548,7 @@ class SmartWordRecommendationService:
         """分析学习弱点"""
         # 获取错误记录
         error_records = WordLearningRecord.objects.filter(
-            session__user=self.user,
+            user=self.user,
             is_correct=False,
             created_at__gte=self.current_time - timedelta(days=30)
         ).select_related('word')
@@ -629,7 +646,7 @@ class SmartWordRecommendationService:
     def _analyze_difficulty_preferences(self) -> Dict[str, Any]:
         """分析难度偏好"""
         records = WordLearningRecord.objects.filter(
-            session__user=self.user,
+            user=self.user,
             created_at__gte=self.current_time - timedelta(days=30)
         ).select_related('word')
         
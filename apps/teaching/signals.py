@@ -0,0 +1,48 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+import logging
+
+from .dashboard_cache import dashboard_snapshot_cache
+from .models import LearningGoal, GoalWord, LearningSession, WordLearningRecord
+
+logger = logging.getLogger(__name__)
+
+
+def bump_dashboard_stamp(user_id):
+    """事务提交后递增用户的仪表盘数据版本戳，避免后台刷新读到未提交的数据"""
+    if user_id:
+        transaction.on_commit(lambda: dashboard_snapshot_cache.bump_data_stamp(user_id))
+
+
+@receiver(post_save, sender=LearningSession)
+@receiver(post_delete, sender=LearningSession)
+@receiver(post_save, sender=LearningGoal)
+@receiver(post_delete, sender=LearningGoal)
+def invalidate_dashboard_on_user_data(sender, instance, **kwargs):
+    """学习会话、学习目标变更时使仪表盘快照过期"""
+    bump_dashboard_stamp(instance.user_id)
+
+
+@receiver(post_save, sender=WordLearningRecord)
+@receiver(post_delete, sender=WordLearningRecord)
+def invalidate_dashboard_on_learning_record(sender, instance, **kwargs):
+    """学习记录变更时使仪表盘快照过期（使用冗余的 user_id，不再查询会话）"""
+    if instance.user_id:
+        bump_dashboard_stamp(instance.user_id)
+        return
+    try:
+        bump_dashboard_stamp(instance.session.user_id)
+    except LearningSession.DoesNotExist:
+        # 级联删除会话时记录的会话已不存在，会话自身的信号会处理
+        pass
+
+
+@receiver(post_save, sender=GoalWord)
+@receiver(post_delete, sender=GoalWord)
+def invalidate_dashboard_on_goal_word(sender, instance, **kwargs):
+    """目标单词变更时使仪表盘快照过期"""
+    try:
+        bump_dashboard_stamp(instance.goal.user_id)
+    except LearningGoal.DoesNotExist:
+        pass
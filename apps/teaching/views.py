@@ -2,9 +2,8 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
 from django.contrib import messages
-from django.db.models import Q
 from .models import LearningGoal, GoalWord, LearningSession, WordLearningRecord, LearningPlan
-from apps.words.models import Word
+from apps.words.search import autocomplete_words, search_word_summaries
 from apps.accounts.models import CustomUser
 import json
 
@@ -69,9 +68,10 @@ def search_words(request):
     if not query:
         return JsonResponse({'words': []})
     
-    words = Word.objects.filter(
-        Q(word__icontains=query) | 
-        Q(definition__icontains=query)
-    ).values('id', 'word', 'definition', 'phonetic')[:20]
+    # 全文索引检索：词头、释义、例句和音标，最后一个词按前缀匹配；autocomplete=1 时只联想词头
+    if request.GET.get('autocomplete'):
+        return JsonResponse({'words': autocomplete_words(query, request.GET.get('limit', 10))})
     
-    return JsonResponse({'words': list(words)})
\ No newline at end of file
+    words = search_word_summaries(query, request.GET.get('limit', 20))
+    
+    return JsonResponse({'words': words})
\ No newline at end of file
@@ -0,0 +1,77 @@
+"""
+序列化器感知的查询集注解
+
+序列化器在 Meta.annotations 中声明计数等派生字段（属性名 -> 返回查询表达式的函数），
+视图集通过 AnnotatedQuerysetMixin 在 get_queryset 中一次性 annotate，序列化时直接读取属性，
+一页数据的查询数不再随行数增长。计数使用相关子查询而不是 JOIN + Count，多个计数之间不会相互放大。
+
+未经注解的实例（如 create/update 返回的对象、其他代码直接传入的实例）在序列化时补一次单行查询。
+"""
+from typing import Callable, Dict
+
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def subquery_count(queryset, outer_field: str, count_field: str = 'pk', distinct: bool = False):
+    """
+    相关子查询计数
+
+    queryset 为被计数的查询集，outer_field 为其中指向外层对象的字段，
+    例如 subquery_count(WordEntry.objects.all(), 'vocabulary_list')。
+    """
+    counts = (
+        queryset.filter(**{outer_field: OuterRef('pk')})
+        .order_by()
+        .values(outer_field)
+        .annotate(_count=Count(count_field, distinct=distinct))
+        .values('_count')
+    )
+    return Coalesce(Subquery(counts[:1], output_field=IntegerField()), 0)
+
+
+def subquery_first(queryset, outer_field: str, value_field: str, ordering=('-created_at', '-pk')):
+    """相关子查询取按 ordering 排序后第一行的 value_field"""
+    return Subquery(
+        queryset.filter(**{outer_field: OuterRef('pk')}).order_by(*ordering).values(value_field)[:1]
+    )
+
+
+class AnnotatedSerializerMixin:
+    """读取 Meta.annotations 声明的注解属性的序列化器"""
+
+    @classmethod
+    def get_annotations(cls) -> Dict[str, Callable]:
+        return getattr(cls.Meta, 'annotations', {})
+
+    @classmethod
+    def annotate_queryset(cls, queryset):
+        annotations = cls.get_annotations()
+        if not annotations:
+            return queryset
+        return queryset.annotate(**{name: expression() for name, expression in annotations.items()})
+
+    def to_representation(self, instance):
+        annotations = self.get_annotations()
+        missing = [name for name in annotations if not hasattr(instance, name)]
+        if missing:
+            values = (
+                type(instance)._default_manager.filter(pk=instance.pk)
+                .annotate(**{name: annotations[name]() for name in missing})
+                .values(*missing)
+                .first()
+            ) or {}
+            for name in missing:
+                setattr(instance, name, values.get(name))
+        return super().to_representation(instance)
+
+
+class AnnotatedQuerysetMixin:
+    """视图集 get_queryset 按当前序列化器声明的注解 annotate"""
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        serializer_class = self.get_serializer_class()
+        if issubclass(serializer_class, AnnotatedSerializerMixin):
+            queryset = serializer_class.annotate_queryset(queryset)
+        return queryset
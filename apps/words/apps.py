@@ -4,4 +4,11 @@ from django.apps import AppConfig
 class WordsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.words'
-    verbose_name = '单词管理'
\ No newline at end of file
+    verbose_name = '单词管理'
+
+    def ready(self):
+        """应用准备就绪时执行"""
+        # 注册全文检索索引、抽样单词池和统计缓存的同步信号
+        import apps.words.search  # noqa
+        import apps.words.sampling  # noqa
+        import apps.words.stats  # noqa
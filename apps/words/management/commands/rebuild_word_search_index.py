@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.words.search import get_search_backend, reset_search_backends, search_entries
+
+
+class Command(BaseCommand):
+    help = '重建单词全文检索索引（批量导入等绕过信号的写入后使用）'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database',
+            default=None,
+            help='数据库别名，默认使用 WordEntry 的读库'
+        )
+        parser.add_argument(
+            '--query',
+            help='重建后执行一次检索并输出结果和耗时'
+        )
+
+    def handle(self, *args, **options):
+        reset_search_backends()
+        backend = get_search_backend(options['database'])
+        self.stdout.write(f'🔎 检索后端: {type(backend).__name__}（数据库 {backend.alias}）')
+
+        started = time.perf_counter()
+        with transaction.atomic(using=backend.alias):
+            total = backend.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ 已索引 {total} 个词条（{time.perf_counter() - started:.1f}s）'
+        ))
+
+        if options['query']:
+            started = time.perf_counter()
+            hits = search_entries(options['query'])
+            elapsed = (time.perf_counter() - started) * 1000
+            self.stdout.write(f"📋 检索 “{options['query']}”: {len(hits)} 条结果（{elapsed:.2f}ms）")
+            for hit in hits[:10]:
+                self.stdout.write(f'   {hit.headword:<24} 词条 {hit.entry_id}  相关度 {hit.score:.3f}')
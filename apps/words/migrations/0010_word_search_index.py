@@ -0,0 +1,61 @@
+import logging
+
+from django.db import migrations
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = "words_wordentry_fts"
+
+
+def create_search_index(apps, schema_editor):
+    """SQLite 创建 FTS5 表并导入现有词条，PostgreSQL 创建 tsvector 和 trigram 索引"""
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            try:
+                cursor.execute(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                    "headword, definition, example, phonetic, word_id UNINDEXED, "
+                    "prefix='2 3', tokenize='unicode61 remove_diacritics 2')"
+                )
+            except Exception as e:
+                # SQLite 未编译 FTS5 时跳过，检索退化为 LIKE 查询
+                logger.warning(f"跳过单词全文索引: {e}")
+                return
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE}(rowid, headword, definition, example, phonetic, word_id) "
+                "SELECT e.id, w.word, coalesce(e.definition, ''), coalesce(e.example, ''), "
+                "coalesce(e.phonetic, ''), e.word_id "
+                "FROM words_wordentry e JOIN words_word w ON w.id = e.word_id"
+            )
+        elif connection.vendor == "postgresql":
+            cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS words_wordentry_search_gin ON words_wordentry USING gin ("
+                "to_tsvector('simple', coalesce(definition, '') || ' ' || "
+                "coalesce(example, '') || ' ' || coalesce(phonetic, '')))"
+            )
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS words_word_word_trgm ON words_word "
+                "USING gin (lower(word) gin_trgm_ops)"
+            )
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+        elif connection.vendor == "postgresql":
+            cursor.execute("DROP INDEX IF EXISTS words_wordentry_search_gin")
+            cursor.execute("DROP INDEX IF EXISTS words_word_word_trgm")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("words", "0009_remove_word_words_word_vocabul_1742cb_idx_and_more"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,192 @@
+"""
+随机抽样
+
+替代 order_by('?')（每次对整表随机排序），抽取 k 行的代价与 k 成正比：
+- sample_ids：在查询集的主键范围内随机取 ID 探测，存在且未被排除的 ID 即为样本（拒绝抽样，结果均匀），
+  主键稀疏导致命中率过低时退化为读取主键列表后抽样；
+- IdPool：按学习目标或词库列表缓存候选单词 ID 列表，按随机下标抽取，不访问数据库；
+- 排除集合：已掌握的单词（学习记录统计）和最近已展示的单词（保存在会话中）。
+"""
+import logging
+import random
+from typing import Callable, Iterable, List, Optional, Set
+
+from django.core.cache import cache
+from django.db.models import Count, Max, Min
+from django.db.models.signals import post_delete, post_save
+
+logger = logging.getLogger(__name__)
+
+# 每轮探测数量为缺口的倍数，以及单轮探测上限（IN 列表长度）
+OVERSAMPLE = 2
+MAX_PROBES = 500
+MAX_ROUNDS = 4
+# 主键命中率低于该值时不再探测，直接读取主键列表
+MIN_DENSITY = 0.05
+
+POOL_TIMEOUT = 600
+SHOWN_HISTORY_SIZE = 200
+# 答对次数达到该值视为已掌握（与掌握分布中“掌握”档一致）
+MASTERED_CORRECT_COUNT = 6
+
+
+def _pick(ids: List[int], k: int, exclude: Set[int], rng) -> List[int]:
+    """从 ID 列表按随机下标抽取 k 个未排除的 ID，排除项占多数时整体筛选后抽样"""
+    total = len(ids)
+    picked, tried = [], set()
+    for _ in range(MAX_ROUNDS):
+        need = k - len(picked)
+        if need <= 0 or len(tried) >= total:
+            break
+        for index in rng.sample(range(total), min(total, need * OVERSAMPLE)):
+            if index in tried:
+                continue
+            tried.add(index)
+            if ids[index] not in exclude:
+                picked.append(ids[index])
+                if len(picked) >= k:
+                    break
+
+    if len(picked) < k and len(tried) < total:
+        rest = [pk for index, pk in enumerate(ids) if index not in tried and pk not in exclude]
+        picked += rng.sample(rest, min(k - len(picked), len(rest)))
+    return picked
+
+
+def sample_ids(queryset, k: int, exclude: Optional[Iterable[int]] = None, rng=None) -> List[int]:
+    """
+    从查询集中随机抽取 k 个主键
+
+    在 [最小主键, 最大主键] 内随机探测，每轮一次 pk__in 查询；
+    查询集过滤条件使命中率低于 MIN_DENSITY 时退化为读取全部主键（不排序）后抽样。
+    """
+    rng = rng or random
+    exclude = set(exclude or ())
+    if k <= 0:
+        return []
+
+    bounds = queryset.order_by().aggregate(low=Min('pk'), high=Max('pk'))
+    low, high = bounds['low'], bounds['high']
+    if low is None:
+        return []
+
+    span = high - low + 1
+    picked, probed = [], set()
+    density = 1.0
+    for _ in range(MAX_ROUNDS):
+        need = k - len(picked)
+        if need <= 0 or len(probed) >= span or density < MIN_DENSITY:
+            break
+
+        size = min(MAX_PROBES, span - len(probed), int(need * OVERSAMPLE / density) + 1)
+        probes = set()
+        while len(probes) < size:
+            pk = rng.randint(low, high)
+            if pk not in probed:
+                probes.add(pk)
+        probed |= probes
+
+        found = list(queryset.filter(pk__in=probes).values_list('pk', flat=True))
+        accepted = [pk for pk in found if pk not in exclude]
+        density = len(accepted) / len(probes)
+        rng.shuffle(accepted)
+        for pk in accepted[:need]:
+            picked.append(pk)
+            exclude.add(pk)
+
+    if len(picked) < k:
+        logger.debug(f"主键探测命中率过低（{density:.2%}），读取主键列表抽样")
+        remaining = list(queryset.exclude(pk__in=probed).order_by().values_list('pk', flat=True))
+        picked += _pick(remaining, k - len(picked), exclude, rng)
+    return picked
+
+
+def sample(queryset, k: int, exclude: Optional[Iterable[int]] = None, rng=None) -> list:
+    """随机抽取 k 个对象，顺序与抽样顺序一致"""
+    ids = sample_ids(queryset, k, exclude, rng)
+    objects = queryset.in_bulk(ids)
+    return [objects[pk] for pk in ids if pk in objects]
+
+
+class IdPool:
+    """缓存的候选 ID 列表，抽样不访问数据库；候选变更时由信号失效，或在 POOL_TIMEOUT 后过期"""
+
+    def __init__(self, name: str, loader: Callable[[], Iterable[int]], timeout: int = POOL_TIMEOUT):
+        self.cache_key = f'sampling:pool:{name}'
+        self.loader = loader
+        self.timeout = timeout
+
+    def ids(self) -> List[int]:
+        ids = cache.get(self.cache_key)
+        if ids is None:
+            ids = list(dict.fromkeys(self.loader()))
+            cache.set(self.cache_key, ids, self.timeout)
+        return ids
+
+    def draw(self, k: int, exclude: Optional[Iterable[int]] = None, rng=None) -> List[int]:
+        if k <= 0:
+            return []
+        return _pick(self.ids(), k, set(exclude or ()), rng or random)
+
+    def invalidate(self):
+        cache.delete(self.cache_key)
+
+
+def goal_word_pool(goal_id: int) -> IdPool:
+    """学习目标的单词池"""
+    from apps.teaching.models import GoalWord
+
+    return IdPool(
+        f'goal:{goal_id}',
+        lambda: GoalWord.objects.filter(goal_id=goal_id).values_list('word_id', flat=True),
+    )
+
+
+def vocabulary_list_pool(vocabulary_list_id: int) -> IdPool:
+    """词库列表的单词池"""
+    from .models import WordEntry
+
+    return IdPool(
+        f'vocabulary_list:{vocabulary_list_id}',
+        lambda: WordEntry.objects.filter(vocabulary_list_id=vocabulary_list_id).values_list('word_id', flat=True),
+    )
+
+
+def mastered_word_ids(user, min_correct: int = MASTERED_CORRECT_COUNT) -> Set[int]:
+    """用户已掌握的单词ID（答对次数达到 min_correct）"""
+    from apps.teaching.models import WordLearningRecord
+
+    return set(
+        WordLearningRecord.objects.filter(user=user, is_correct=True)
+        .values('word_id')
+        .annotate(correct=Count('id'))
+        .filter(correct__gte=min_correct)
+        .values_list('word_id', flat=True)
+    )
+
+
+def recently_shown_ids(session, key: str) -> Set[int]:
+    """会话中最近已展示的ID"""
+    return set(session.get(f'sampling_shown:{key}', []))
+
+
+def remember_shown(session, key: str, ids: Iterable[int], limit: int = SHOWN_HISTORY_SIZE):
+    """记录本次展示的ID，只保留最近 limit 个"""
+    session_key = f'sampling_shown:{key}'
+    history = session.get(session_key, []) + list(ids)
+    session[session_key] = history[-limit:]
+
+
+def invalidate_goal_word_pool(sender, instance, **kwargs):
+    goal_word_pool(instance.goal_id).invalidate()
+
+
+def invalidate_vocabulary_list_pool(sender, instance, **kwargs):
+    if instance.vocabulary_list_id:
+        vocabulary_list_pool(instance.vocabulary_list_id).invalidate()
+
+
+post_save.connect(invalidate_goal_word_pool, sender='teaching.GoalWord', dispatch_uid='sampling_goal_word_saved')
+post_delete.connect(invalidate_goal_word_pool, sender='teaching.GoalWord', dispatch_uid='sampling_goal_word_deleted')
+post_save.connect(invalidate_vocabulary_list_pool, sender='words.WordEntry', dispatch_uid='sampling_entry_saved')
+post_delete.connect(invalidate_vocabulary_list_pool, sender='words.WordEntry', dispatch_uid='sampling_entry_deleted')
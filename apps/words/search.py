@@ -0,0 +1,406 @@
+"""
+单词全文检索
+
+按数据库选择检索后端，统一提供 search / autocomplete 接口，返回按相关度排序的词条命中：
+- SQLite：FTS5 虚拟表 words_wordentry_fts，索引词头、释义、例句和音标，带 2/3 字符前缀索引，
+  bm25 排序（词头权重最高，词头完全匹配优先）；
+- PostgreSQL：词条释义、例句、音标的 tsvector 表达式 GIN 索引 + 词头 pg_trgm 索引；
+- 其他数据库或 FTS5 不可用时退化为 LIKE 查询。
+
+索引通过本模块的信号处理器与 WordEntry / Word 同步（词条保存、删除，词头修改），
+批量写入等绕过信号的场景使用 rebuild_word_search_index 命令重建。
+"""
+import logging
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+from django.db import connections, router
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework import filters
+
+from .models import Word, WordEntry
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = 'words_wordentry_fts'
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 200
+REBUILD_BATCH_SIZE = 2000
+# 短于该长度的英文前缀只匹配词头（释义、例句中的短前缀命中过多，对联想没有意义）；
+# 中文释义按连续汉字切词，两个字已是完整的词，不受此限制
+MIN_PREFIX_LENGTH = 3
+
+TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+
+@dataclass(frozen=True)
+class SearchHit:
+    """一条检索命中：词条、所属单词和相关度（越大越相关）"""
+    entry_id: int
+    word_id: int
+    headword: str
+    score: float
+
+
+def tokenize(query: str) -> List[str]:
+    """把用户输入拆成检索词，去掉运算符和标点"""
+    return TOKEN_PATTERN.findall((query or '').lower())[:8]
+
+
+def is_short_prefix(token: str) -> bool:
+    return token.isascii() and len(token) < MIN_PREFIX_LENGTH
+
+
+class SearchBackend:
+    """检索后端基类"""
+
+    vendor = None
+
+    def __init__(self, alias: str):
+        self.alias = alias
+
+    @property
+    def connection(self):
+        return connections[self.alias]
+
+    def search(self, query: str, limit: int = DEFAULT_LIMIT, prefix: bool = True) -> List[SearchHit]:
+        raise NotImplementedError
+
+    def autocomplete(self, prefix: str, limit: int = DEFAULT_LIMIT) -> List[SearchHit]:
+        raise NotImplementedError
+
+    def index_entries(self, entry_ids: Iterable[int]):
+        """索引由数据库表达式维护的后端无需同步"""
+
+    def remove_entries(self, entry_ids: Iterable[int]):
+        pass
+
+    def rebuild(self) -> int:
+        return WordEntry.objects.using(self.alias).count()
+
+
+class SQLiteFTSBackend(SearchBackend):
+    """SQLite FTS5 后端"""
+
+    vendor = 'sqlite'
+    # bm25 列权重：headword, definition, example, phonetic, word_id(不参与检索)
+    BM25_WEIGHTS = '10.0, 4.0, 1.0, 2.0, 0.0'
+
+    @staticmethod
+    def match_expression(tokens: List[str], prefix: bool, column: Optional[str] = None) -> str:
+        """构造 FTS5 MATCH 表达式：检索词加引号转义，prefix 时最后一个词按前缀匹配"""
+        terms = []
+        for index, token in enumerate(tokens):
+            term = '"%s"' % token.replace('"', '""')
+            term_column = column
+            if prefix and index == len(tokens) - 1:
+                term += '*'
+                if is_short_prefix(token):
+                    term_column = 'headword'
+            terms.append(f'{term_column} : {term}' if term_column else term)
+        return ' AND '.join(terms)
+
+    def _query(self, tokens: List[str], prefix: bool, limit: int, column: Optional[str] = None) -> List[SearchHit]:
+        expression = self.match_expression(tokens, prefix, column)
+        if prefix and len(tokens[-1]) == 1 and tokens[-1].isascii():
+            # 单字符前缀不在前缀索引中，命中行数多，按 rowid 顺序（最新词条优先）取前几条，避免全量排序
+            sql = (
+                f'SELECT rowid, word_id, headword, 0.0 FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s ORDER BY rowid DESC LIMIT %s'
+            )
+            params = [expression, limit]
+        else:
+            sql = (
+                f'SELECT rowid, word_id, headword, bm25({FTS_TABLE}, {self.BM25_WEIGHTS}) AS score '
+                f'FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+                f'ORDER BY (lower(headword) = %s) DESC, score, length(headword) LIMIT %s'
+            )
+            params = [expression, ' '.join(tokens), limit]
+        with self.connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+        # bm25 越小越相关，取反后与其他后端一致
+        return [SearchHit(row[0], row[1], row[2], -row[3]) for row in rows]
+
+    def search(self, query, limit=DEFAULT_LIMIT, prefix=True):
+        tokens = tokenize(query)
+        return self._query(tokens, prefix, limit) if tokens else []
+
+    def autocomplete(self, prefix, limit=DEFAULT_LIMIT):
+        tokens = tokenize(prefix)
+        return self._query(tokens, True, limit, 'headword') if tokens else []
+
+    def index_entries(self, entry_ids):
+        entry_ids = list(entry_ids)
+        if not entry_ids:
+            return
+        self.remove_entries(entry_ids)
+        rows = (
+            WordEntry.objects.using(self.alias)
+            .filter(pk__in=entry_ids)
+            .values_list('pk', 'word__word', 'definition', 'example', 'phonetic', 'word_id')
+        )
+        self._insert(rows)
+
+    def remove_entries(self, entry_ids):
+        entry_ids = list(entry_ids)
+        if not entry_ids:
+            return
+        placeholders = ', '.join(['%s'] * len(entry_ids))
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})', entry_ids)
+
+    def rebuild(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+
+        total = 0
+        rows = (
+            WordEntry.objects.using(self.alias)
+            .order_by()
+            .values_list('pk', 'word__word', 'definition', 'example', 'phonetic', 'word_id')
+        )
+        batch = []
+        for row in rows.iterator(chunk_size=REBUILD_BATCH_SIZE):
+            batch.append(row)
+            if len(batch) >= REBUILD_BATCH_SIZE:
+                total += self._insert(batch)
+                batch = []
+        total += self._insert(batch)
+
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+        return total
+
+    def _insert(self, rows) -> int:
+        rows = [
+            (pk, headword or '', definition or '', example or '', phonetic or '', word_id)
+            for pk, headword, definition, example, phonetic, word_id in rows
+        ]
+        if rows:
+            with self.connection.cursor() as cursor:
+                cursor.executemany(
+                    f'INSERT INTO {FTS_TABLE}(rowid, headword, definition, example, phonetic, word_id) '
+                    f'VALUES (%s, %s, %s, %s, %s, %s)',
+                    rows,
+                )
+        return len(rows)
+
+
+class PostgresSearchBackend(SearchBackend):
+    """
+    PostgreSQL 后端
+
+    释义、例句、音标使用与迁移中 GIN 索引完全相同的 tsvector 表达式，词头前缀走 pg_trgm 索引。
+    """
+
+    vendor = 'postgresql'
+    VECTOR_SQL = (
+        "to_tsvector('simple', coalesce(e.definition, '') || ' ' || "
+        "coalesce(e.example, '') || ' ' || coalesce(e.phonetic, ''))"
+    )
+
+    @staticmethod
+    def tsquery(tokens: List[str], prefix: bool) -> str:
+        terms = [token.replace("'", "''") for token in tokens]
+        if prefix:
+            terms[-1] += ':*'
+        return ' & '.join(terms)
+
+    @staticmethod
+    def like_prefix(text: str) -> str:
+        return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+    def _query(self, tokens: List[str], prefix: bool, limit: int, headword_only: bool) -> List[SearchHit]:
+        phrase = ' '.join(tokens)
+        headword_sql = (
+            'SELECT e.id, e.word_id, w.word, '
+            'CASE WHEN lower(w.word) = %s THEN 2.0 ELSE 1.0 END AS score '
+            'FROM words_wordentry e JOIN words_word w ON w.id = e.word_id '
+            'WHERE lower(w.word) LIKE %s'
+        )
+        params = [phrase, self.like_prefix(phrase)]
+        if not headword_only:
+            headword_sql += (
+                f' UNION ALL SELECT e.id, e.word_id, w.word, ts_rank({self.VECTOR_SQL}, q) AS score '
+                f"FROM words_wordentry e JOIN words_word w ON w.id = e.word_id, to_tsquery('simple', %s) q "
+                f'WHERE {self.VECTOR_SQL} @@ q'
+            )
+            params.append(self.tsquery(tokens, prefix))
+
+        sql = (
+            f'SELECT id, word_id, word, SUM(score) AS score FROM ({headword_sql}) hits '
+            f'GROUP BY id, word_id, word ORDER BY score DESC, length(word) LIMIT %s'
+        )
+        with self.connection.cursor() as cursor:
+            cursor.execute(sql, params + [limit])
+            return [SearchHit(*row) for row in cursor.fetchall()]
+
+    def search(self, query, limit=DEFAULT_LIMIT, prefix=True):
+        tokens = tokenize(query)
+        return self._query(tokens, prefix, limit, False) if tokens else []
+
+    def autocomplete(self, prefix, limit=DEFAULT_LIMIT):
+        tokens = tokenize(prefix)
+        return self._query(tokens, True, limit, True) if tokens else []
+
+
+class LikeSearchBackend(SearchBackend):
+    """无全文索引时的退化实现：词头前缀优先，其次释义、例句、音标包含匹配"""
+
+    vendor = None
+
+    def _hits(self, queryset, limit) -> List[SearchHit]:
+        rows = queryset.values_list('pk', 'word_id', 'word__word')[:limit]
+        return [SearchHit(pk, word_id, headword, 0.0) for pk, word_id, headword in rows]
+
+    def search(self, query, limit=DEFAULT_LIMIT, prefix=True):
+        phrase = ' '.join(tokenize(query))
+        if not phrase:
+            return []
+        entries = WordEntry.objects.using(self.alias).order_by('word__word')
+        hits = self._hits(entries.filter(word__word__istartswith=phrase), limit)
+        if len(hits) < limit:
+            seen = {hit.entry_id for hit in hits}
+            others = entries.filter(
+                Q(definition__icontains=phrase) | Q(example__icontains=phrase) | Q(phonetic__icontains=phrase)
+            ).exclude(pk__in=seen)
+            hits += self._hits(others, limit - len(hits))
+        return hits
+
+    def autocomplete(self, prefix, limit=DEFAULT_LIMIT):
+        phrase = ' '.join(tokenize(prefix))
+        if not phrase:
+            return []
+        entries = WordEntry.objects.using(self.alias).filter(word__word__istartswith=phrase).order_by('word__word')
+        return self._hits(entries, limit)
+
+
+_backends: Dict[str, SearchBackend] = {}
+
+
+def fts_table_exists(connection) -> bool:
+    return FTS_TABLE in connection.introspection.table_names()
+
+
+def get_search_backend(alias: Optional[str] = None) -> SearchBackend:
+    """获取数据库对应的检索后端，SQLite 未创建 FTS5 表时退化为 LIKE 查询"""
+    alias = alias or router.db_for_read(WordEntry)
+    backend = _backends.get(alias)
+    if backend is None:
+        connection = connections[alias]
+        if connection.vendor == 'sqlite' and fts_table_exists(connection):
+            backend = SQLiteFTSBackend(alias)
+        elif connection.vendor == 'postgresql':
+            backend = PostgresSearchBackend(alias)
+        else:
+            logger.warning(f"数据库 {alias} 没有可用的全文索引，单词检索退化为 LIKE 查询")
+            backend = LikeSearchBackend(alias)
+        _backends[alias] = backend
+    return backend
+
+
+def reset_search_backends():
+    """迁移创建或删除索引表后重新选择后端"""
+    _backends.clear()
+
+
+def clamp_limit(limit) -> int:
+    try:
+        return max(1, min(int(limit), MAX_LIMIT))
+    except (TypeError, ValueError):
+        return DEFAULT_LIMIT
+
+
+def search_entries(query: str, limit: int = DEFAULT_LIMIT, prefix: bool = True) -> List[SearchHit]:
+    """检索词条，按相关度排序"""
+    return get_search_backend().search(query, clamp_limit(limit), prefix)
+
+
+def search_word_ids(query: str, limit: int = DEFAULT_LIMIT, prefix: bool = True) -> List[int]:
+    """检索单词ID，按最相关词条的顺序去重"""
+    # 一个单词可能有多个版本的词条，多取一些命中再去重
+    hits = search_entries(query, clamp_limit(limit) * 3, prefix)
+    return list(dict.fromkeys(hit.word_id for hit in hits))[:clamp_limit(limit)]
+
+
+def autocomplete_words(prefix: str, limit: int = 10) -> List[Dict]:
+    """词头联想：返回去重后的单词ID和拼写"""
+    hits = get_search_backend().autocomplete(prefix, clamp_limit(limit) * 3)
+    words = {}
+    for hit in hits:
+        words.setdefault(hit.word_id, {'id': hit.word_id, 'word': hit.headword})
+    return list(words.values())[:clamp_limit(limit)]
+
+
+def _write_backend(alias: Optional[str]) -> Optional[SearchBackend]:
+    """写入所用数据库的检索后端；出错时只记录日志，不影响词条保存"""
+    try:
+        return get_search_backend(alias or router.db_for_write(WordEntry))
+    except Exception as e:
+        logger.error(f"获取单词检索后端失败: {e}")
+        return None
+
+
+@receiver(post_save, sender=WordEntry, dispatch_uid='word_search_index_entry_saved')
+def index_word_entry(sender, instance, raw=False, using=None, **kwargs):
+    """词条保存后更新索引"""
+    backend = _write_backend(using)
+    if backend and not raw:
+        backend.index_entries([instance.pk])
+
+
+@receiver(post_delete, sender=WordEntry, dispatch_uid='word_search_index_entry_deleted')
+def remove_word_entry(sender, instance, using=None, **kwargs):
+    """词条删除后移出索引"""
+    backend = _write_backend(using)
+    if backend:
+        backend.remove_entries([instance.pk])
+
+
+@receiver(post_save, sender=Word, dispatch_uid='word_search_index_headword_changed')
+def reindex_word_entries(sender, instance, created, raw=False, using=None, update_fields=None, **kwargs):
+    """词头修改后重新索引该单词的全部词条"""
+    if created or raw or (update_fields is not None and 'word' not in update_fields):
+        return
+    backend = _write_backend(using)
+    if backend:
+        entry_ids = WordEntry.objects.using(backend.alias).filter(word=instance).values_list('pk', flat=True)
+        backend.index_entries(list(entry_ids))
+
+
+def search_word_summaries(query: str, limit: int = DEFAULT_LIMIT) -> List[Dict]:
+    """检索单词并附带最相关词条的释义和音标，按相关度排序"""
+    best_entries = {}
+    for hit in search_entries(query, clamp_limit(limit) * 3):
+        best_entries.setdefault(hit.word_id, hit.entry_id)
+    entry_ids = list(best_entries.values())[:clamp_limit(limit)]
+
+    entries = {
+        entry['id']: entry
+        for entry in WordEntry.objects.filter(pk__in=entry_ids).values(
+            'id', 'word_id', 'word__word', 'definition', 'phonetic'
+        )
+    }
+    return [
+        {
+            'id': entries[entry_id]['word_id'],
+            'word': entries[entry_id]['word__word'],
+            'definition': entries[entry_id]['definition'],
+            'phonetic': entries[entry_id]['phonetic'],
+        }
+        for entry_id in entry_ids if entry_id in entries
+    ]
+
+
+class WordIndexSearchFilter(filters.SearchFilter):
+    """DRF 搜索过滤器：?search= 走全文索引，结果限制在前 MAX_LIMIT 个相关单词内"""
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+        return queryset.filter(pk__in=search_word_ids(' '.join(terms), MAX_LIMIT))
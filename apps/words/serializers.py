@@ -4,6 +4,7 @@ from .models import (
     Word, WordEntry, WordResource, VocabularySource, VocabularyList, ImportRecord
 )
 from apps.teaching.models import LearningSession as StudySession
+from .annotations import AnnotatedSerializerMixin, subquery_count, subquery_first
 
 User = get_user_model()
 
@@ -88,10 +89,10 @@ class WordSerializer(serializers.ModelSerializer):
         return word
 
 
-class WordListSerializer(serializers.ModelSerializer):
+class WordListSerializer(AnnotatedSerializerMixin, serializers.ModelSerializer):
     """单词列表序列化器（简化版）"""
     user_username = serializers.CharField(source='user.username', read_only=True)
-    resource_count = serializers.SerializerMethodField()
+    resource_count = serializers.IntegerField(read_only=True, help_text='资源数量')
     
     class Meta:
         model = Word
@@ -100,31 +101,29 @@ class WordListSerializer(serializers.ModelSerializer):
             'part_of_speech', 'is_learned', 'mastery_level',
             'difficulty_level', 'resource_count', 'created_at'
         ]
-    
-    def get_resource_count(self, obj):
-        """获取资源数量"""
-        return obj.resources.count()
+        annotations = {
+            'resource_count': lambda: subquery_count(Word.resources.through.objects.all(), 'word'),
+        }
 
 
-class VocabularySourceSerializer(serializers.ModelSerializer):
+class VocabularySourceSerializer(AnnotatedSerializerMixin, serializers.ModelSerializer):
     """词库来源序列化器"""
-    list_count = serializers.SerializerMethodField()
+    list_count = serializers.IntegerField(read_only=True, help_text='词库列表数量')
     
     class Meta:
         model = VocabularySource
         fields = ['id', 'name', 'description', 'list_count', 'created_at']
         read_only_fields = ['created_at']
-    
-    def get_list_count(self, obj):
-        """获取词库列表数量"""
-        return obj.vocabulary_lists.count()
+        annotations = {
+            'list_count': lambda: subquery_count(VocabularyList.objects.all(), 'source'),
+        }
 
 
-class WordEntrySerializer(serializers.ModelSerializer):
+class WordEntrySerializer(AnnotatedSerializerMixin, serializers.ModelSerializer):
     """词条序列化器"""
     word_text = serializers.CharField(source='word.word', read_only=True)
     vocabulary_list_name = serializers.CharField(source='vocabulary_list.name', read_only=True)
-    import_records_count = serializers.SerializerMethodField()
+    import_records_count = serializers.IntegerField(read_only=True, help_text='导入记录数量')
     
     class Meta:
         model = WordEntry
@@ -135,10 +134,9 @@ class WordEntrySerializer(serializers.ModelSerializer):
             'import_records_count', 'created_at', 'updated_at'
         ]
         read_only_fields = ['created_at', 'updated_at']
-    
-    def get_import_records_count(self, obj):
-        """获取导入记录数量"""
-        return obj.import_records.count()
+        annotations = {
+            'import_records_count': lambda: subquery_count(ImportRecord.objects.all(), 'word_entry'),
+        }
 
 
 class ImportRecordSerializer(serializers.ModelSerializer):
@@ -169,12 +167,12 @@ class ImportRecordSerializer(serializers.ModelSerializer):
         return None
 
 
-class VocabularyListSerializer(serializers.ModelSerializer):
+class VocabularyListSerializer(AnnotatedSerializerMixin, serializers.ModelSerializer):
     """词库列表序列化器"""
     source_name = serializers.CharField(source='source.name', read_only=True)
-    word_entries_count = serializers.SerializerMethodField()
-    unique_words_count = serializers.SerializerMethodField()
-    import_records_count = serializers.SerializerMethodField()
+    word_entries_count = serializers.IntegerField(read_only=True, help_text='词条数量')
+    unique_words_count = serializers.IntegerField(read_only=True, help_text='唯一单词数量')
+    import_records_count = serializers.IntegerField(read_only=True, help_text='导入记录数量')
     latest_import_batch = serializers.SerializerMethodField()
     
     class Meta:
@@ -185,34 +183,34 @@ class VocabularyListSerializer(serializers.ModelSerializer):
             'import_records_count', 'latest_import_batch', 'created_at'
         ]
         read_only_fields = ['word_count', 'created_at']
-    
-    def get_word_entries_count(self, obj):
-        """获取词条数量"""
-        return obj.word_entries.count()
-    
-    def get_unique_words_count(self, obj):
-        """获取唯一单词数量"""
-        return obj.word_entries.values('word').distinct().count()
-    
-    def get_import_records_count(self, obj):
-        """获取导入记录数量"""
-        return ImportRecord.objects.filter(
-            word_entry__vocabulary_list=obj
-        ).count()
+        annotations = {
+            'word_entries_count': lambda: subquery_count(WordEntry.objects.all(), 'vocabulary_list'),
+            'unique_words_count': lambda: subquery_count(
+                WordEntry.objects.all(), 'vocabulary_list', count_field='word', distinct=True
+            ),
+            'import_records_count': lambda: subquery_count(
+                ImportRecord.objects.all(), 'word_entry__vocabulary_list'
+            ),
+            'latest_import_batch_id': lambda: subquery_first(
+                ImportRecord.objects.all(), 'word_entry__vocabulary_list', 'import_batch_id'
+            ),
+            'latest_import_time': lambda: subquery_first(
+                ImportRecord.objects.all(), 'word_entry__vocabulary_list', 'created_at'
+            ),
+            'latest_import_source_name': lambda: subquery_first(
+                ImportRecord.objects.all(), 'word_entry__vocabulary_list', 'import_source__name'
+            ),
+        }
     
     def get_latest_import_batch(self, obj):
         """获取最新导入批次信息"""
-        latest_record = ImportRecord.objects.filter(
-            word_entry__vocabulary_list=obj
-        ).order_by('-created_at').first()
-        
-        if latest_record:
-            return {
-                'batch_id': latest_record.import_batch_id,
-                'import_time': latest_record.created_at,
-                'source_name': latest_record.import_source.name if latest_record.import_source else None
-            }
-        return None
+        if obj.latest_import_time is None:
+            return None
+        return {
+            'batch_id': obj.latest_import_batch_id,
+            'import_time': obj.latest_import_time,
+            'source_name': obj.latest_import_source_name
+        }
 
 
 # ImportedVocabularySerializer已合并到WordSerializer中
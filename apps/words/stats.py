@@ -0,0 +1,225 @@
+"""
+统计接口的聚合查询
+
+StatsQuery 把各统计桶写成条件聚合（Count/Sum/Avg 的 filter=Q(...)），整组统计一条 aggregate 查询完成；
+最近 N 天的按日统计用一条 TruncDate 分组查询，缺失的日期补 0，不再逐天、逐桶各发一次 count()。
+
+统计结果通过仪表盘快照缓存（apps.teaching.dashboard_cache）按用户缓存：
+学习会话、学习记录、目标单词的变更已由 teaching 的信号递增用户版本戳；单词、词条、导入记录不属于单个用户，
+变更时递增单词数据版本戳，并作为快照参数参与缓存键，版本变化后快照随之失效。
+"""
+from datetime import timedelta
+from typing import Dict, List
+
+from django.db import transaction
+from django.db.models import Avg, Case, Count, F, FloatField, Q, Sum, Value, When
+from django.db.models.functions import Cast, Least, TruncDate
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+
+from apps.teaching.dashboard_cache import bump_stamp, get_stamp
+
+from .sampling import MASTERED_CORRECT_COUNT
+
+WORDS_STAMP_KEY = 'words:stats:stamp'
+# 难度等级的正确率分界（由高到低）：正确率 ≥0.8 为 1 级（最容易），<0.2 为 5 级（最难）
+DIFFICULTY_ACCURACY_BOUNDS = [0.8, 0.6, 0.4, 0.2]
+
+
+class StatsQuery:
+    """条件聚合统计构建器：每个统计项一个聚合表达式，aggregate() 一次查询得到全部结果"""
+
+    def __init__(self, queryset):
+        self.queryset = queryset.order_by()
+        self.aggregates = {}
+
+    def count(self, name: str, *conditions: Q, **lookups) -> 'StatsQuery':
+        self.aggregates[name] = Count('pk', filter=self._filter(conditions, lookups))
+        return self
+
+    def sum(self, name: str, field, *conditions: Q, **lookups) -> 'StatsQuery':
+        self.aggregates[name] = Sum(field, filter=self._filter(conditions, lookups))
+        return self
+
+    def avg(self, name: str, field, *conditions: Q, **lookups) -> 'StatsQuery':
+        self.aggregates[name] = Avg(field, filter=self._filter(conditions, lookups))
+        return self
+
+    def buckets(self, prefix: str, field: str, values) -> 'StatsQuery':
+        """按字段取值分桶计数，统计项名为 prefix + 取值"""
+        for value in values:
+            self.count(f'{prefix}{value}', **{field: value})
+        return self
+
+    def aggregate(self) -> Dict:
+        return self.queryset.aggregate(**self.aggregates)
+
+    @staticmethod
+    def _filter(conditions, lookups):
+        condition = Q(*conditions, **lookups)
+        return condition if condition else None
+
+
+def daily_series(queryset, date_field: str, days: int, **aggregates) -> List[Dict]:
+    """
+    最近 days 天（含今天，从今天开始倒序）的按日统计
+
+    一条 TruncDate 分组查询，按当前时区取日期（与 __date 查询一致），没有数据的日期各统计项为 0。
+    """
+    today = timezone.localdate()
+    start = today - timedelta(days=days - 1)
+    rows = (
+        queryset.order_by()
+        .filter(**{f'{date_field}__date__gte': start, f'{date_field}__date__lte': today})
+        .annotate(_day=TruncDate(date_field))
+        .values('_day')
+        .annotate(**aggregates)
+    )
+    by_day = {row.pop('_day'): row for row in rows}
+    series = []
+    for offset in range(days):
+        day = today - timedelta(days=offset)
+        values = by_day.get(day, {})
+        series.append({'date': day.strftime('%Y-%m-%d'), **{name: values.get(name) or 0 for name in aggregates}})
+    return series
+
+
+def group_counts(queryset, field: str, count_field: str = 'pk', distinct: bool = False,
+                 empty_label: str = '未分类') -> Dict:
+    """按字段取值分组计数"""
+    counts = {}
+    for row in queryset.order_by().values(field).annotate(_count=Count(count_field, distinct=distinct)):
+        label = row[field] or empty_label
+        counts[label] = counts.get(label, 0) + row['_count']
+    return counts
+
+
+def word_statistics(user_id: int) -> Dict:
+    """
+    单词统计：用户学习目标中的单词及其学习记录
+
+    每个单词先按该用户的学习记录注解答对次数和正确率，再在一条条件聚合查询中得到
+    总数、已掌握数（答对次数达到 MASTERED_CORRECT_COUNT）、平均掌握度（答对次数占掌握线的百分比，
+    封顶 100）和难度分桶（按正确率由高到低分为 1~5 级，未作答的单词不计入）；
+    词性分组（按词条词性统计单词数）、最近7天（每天作答过的单词数）各一条查询。
+    """
+    from apps.teaching.models import GoalWord, WordLearningRecord
+    from .models import Word, WordEntry
+
+    word_ids = GoalWord.objects.filter(goal__user_id=user_id).values('word_id')
+    user_records = Q(wordlearningrecord__user_id=user_id)
+    words = (
+        Word.objects.filter(pk__in=word_ids)
+        .annotate(
+            answers=Count('wordlearningrecord', filter=user_records),
+            correct=Count('wordlearningrecord', filter=user_records & Q(wordlearningrecord__is_correct=True)),
+        )
+        .annotate(
+            mastery=Least(Cast(F('correct'), FloatField()) * 100 / MASTERED_CORRECT_COUNT, Value(100.0)),
+            accuracy=Case(
+                When(answers__gt=0, then=Cast(F('correct'), FloatField()) / F('answers')),
+                default=None, output_field=FloatField(),
+            ),
+        )
+    )
+    stats = (
+        StatsQuery(words)
+        .count('total')
+        .count('learned', correct__gte=MASTERED_CORRECT_COUNT)
+        .avg('avg_mastery', 'mastery')
+    )
+    bounds = [None, *DIFFICULTY_ACCURACY_BOUNDS, None]
+    for level in range(1, 6):
+        upper, lower = bounds[level - 1], bounds[level]
+        lookups = {'accuracy__isnull': False}
+        if upper is not None:
+            lookups['accuracy__lt'] = upper
+        if lower is not None:
+            lookups['accuracy__gte'] = lower
+        stats.count(f'level_{level}', **lookups)
+    totals = stats.aggregate()
+
+    total_words = totals['total']
+    learned_words = totals['learned']
+    learning_rate = (learned_words / total_words * 100) if total_words > 0 else 0
+    records = WordLearningRecord.objects.filter(user_id=user_id, word_id__in=word_ids)
+    return {
+        'total_words': total_words,
+        'learned_words': learned_words,
+        'unlearned_words': total_words - learned_words,
+        'learning_rate': round(learning_rate, 2),
+        'average_mastery': round(totals['avg_mastery'] or 0, 2),
+        'words_by_difficulty': {f'level_{level}': totals[f'level_{level}'] for level in range(1, 6)},
+        'words_by_part_of_speech': group_counts(
+            WordEntry.objects.filter(word_id__in=word_ids), 'part_of_speech', 'word', distinct=True
+        ),
+        'recent_activity': daily_series(records, 'created_at', 7, count=Count('word', distinct=True)),
+    }
+
+
+def import_type_counts(queryset) -> StatsQuery:
+    """导入类型分桶计数"""
+    return StatsQuery(queryset).count('total').buckets('', 'import_type', ('new', 'version', 'duplicate'))
+
+
+def import_record_statistics(queryset) -> Dict:
+    """导入记录统计：类型分桶、总数、最近30天一条查询"""
+    totals = (
+        import_type_counts(queryset)
+        .count('recent_30_days', created_at__gte=timezone.now() - timedelta(days=30))
+        .aggregate()
+    )
+    return {
+        'type_statistics': {name: totals[name] for name in ('new', 'version', 'duplicate')},
+        'total_records': totals['total'],
+        'recent_30_days': totals['recent_30_days'],
+    }
+
+
+def study_session_statistics(queryset) -> Dict:
+    """
+    学习会话统计：总数/已完成/学习单词数/平均正确率一条查询，最近7天一条查询
+
+    会话结束（end_time 非空）即为完成；正确率为有答题的会话 correct_answers / total_answers 的平均值。
+    """
+    accuracy = Cast(F('correct_answers'), FloatField()) / F('total_answers')
+    totals = (
+        StatsQuery(queryset)
+        .count('total')
+        .count('completed', end_time__isnull=False)
+        .sum('words', 'words_studied')
+        .avg('avg_accuracy', accuracy, total_answers__gt=0)
+        .aggregate()
+    )
+    avg_accuracy = totals['avg_accuracy']
+    return {
+        'total_sessions': totals['total'],
+        'completed_sessions': totals['completed'],
+        'total_words_studied': totals['words'] or 0,
+        'average_accuracy': round(avg_accuracy * 100, 2) if avg_accuracy else 0,
+        'recent_sessions': daily_series(
+            queryset, 'start_time', 7, sessions_count=Count('pk'), words_count=Sum('words_studied')
+        ),
+    }
+
+
+def words_data_stamp() -> int:
+    """单词数据版本戳"""
+    return get_stamp(WORDS_STAMP_KEY)
+
+
+def bump_words_data_stamp():
+    """事务提交后递增单词数据版本戳"""
+    transaction.on_commit(lambda: bump_stamp(WORDS_STAMP_KEY))
+
+
+def invalidate_words_stats(sender, instance, **kwargs):
+    bump_words_data_stamp()
+
+
+post_save.connect(invalidate_words_stats, sender='words.Word', dispatch_uid='stats_word_saved')
+post_delete.connect(invalidate_words_stats, sender='words.Word', dispatch_uid='stats_word_deleted')
+post_save.connect(invalidate_words_stats, sender='words.WordEntry', dispatch_uid='stats_entry_saved')
+post_delete.connect(invalidate_words_stats, sender='words.WordEntry', dispatch_uid='stats_entry_deleted')
+post_save.connect(invalidate_words_stats, sender='words.ImportRecord', dispatch_uid='stats_import_record_saved')
+post_delete.connect(invalidate_words_stats, sender='words.ImportRecord', dispatch_uid='stats_import_record_deleted')
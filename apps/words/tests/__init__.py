@@ -0,0 +1 @@
+# Words Tests package
@@ -0,0 +1,93 @@
+"""
+单词 API 列表接口的查询数测试
+
+序列化器的计数字段由视图集一次性注解，一页数据的查询数不随行数变化。
+"""
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from apps.words.models import ImportRecord, VocabularyList, VocabularySource, Word, WordEntry
+from apps.words.serializers import VocabularyListSerializer
+
+User = get_user_model()
+
+
+@override_settings(ROOT_URLCONF='apps.words.tests.urls')
+class SerializerQueryCountTest(TestCase):
+    """列表接口查询数与行数无关"""
+
+    def setUp(self):
+        self.user = User.objects.create_superuser(
+            username='admin_words',
+            email='admin_words@example.com',
+            password='testpass123'
+        )
+        self.client.force_login(self.user)
+        self.words = [Word.objects.create(word=f'word{i}') for i in range(4)]
+
+    def create_lists(self, count):
+        """创建 count 个来源，每个来源一个词库列表，每个列表 4 个词条、2 条导入记录"""
+        start = VocabularyList.objects.count()
+        for i in range(start, start + count):
+            source = VocabularySource.objects.create(name=f'来源{i}')
+            vocabulary_list = VocabularyList.objects.create(source=source, name=f'列表{i}')
+            for word in self.words:
+                entry = WordEntry.objects.create(word=word, vocabulary_list=vocabulary_list, definition=f'释义{i}')
+            for batch in range(2):
+                ImportRecord.objects.create(word_entry=entry, import_source=source, import_batch_id=f'batch{i}-{batch}')
+
+    def count_queries(self, url):
+        # 先请求一次，排除会话、权限缓存等首次请求的查询
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def assert_constant_queries(self, url):
+        self.create_lists(2)
+        small = self.count_queries(url)
+        self.create_lists(12)
+        large = self.count_queries(url)
+        self.assertEqual(small, large, f'{url} 的查询数随行数增长: {small} -> {large}')
+
+    def test_vocabulary_lists(self):
+        self.assert_constant_queries(reverse('words:vocabularylist-list'))
+
+    def test_vocabulary_sources(self):
+        self.assert_constant_queries(reverse('words:vocabularysource-list'))
+
+    def test_word_entries(self):
+        self.assert_constant_queries(reverse('words:wordentry-list'))
+
+    def test_vocabulary_list_entries(self):
+        self.create_lists(1)
+        vocabulary_list = VocabularyList.objects.get()
+        url = reverse('words:vocabularylist-entries', args=[vocabulary_list.pk])
+        small = self.count_queries(url)
+        for i in range(10):
+            WordEntry.objects.create(
+                word=Word.objects.create(word=f'extra{i}'), vocabulary_list=vocabulary_list, definition='释义'
+            )
+        self.assertEqual(small, self.count_queries(url))
+
+    def test_annotated_values(self):
+        self.create_lists(1)
+        response = self.client.get(reverse('words:vocabularylist-list'))
+        row = response.json()['results'][0]
+        self.assertEqual(row['word_entries_count'], 4)
+        self.assertEqual(row['unique_words_count'], 4)
+        self.assertEqual(row['import_records_count'], 2)
+        self.assertEqual(row['latest_import_batch']['batch_id'], 'batch0-1')
+        self.assertEqual(row['latest_import_batch']['source_name'], '来源0')
+
+    def test_unannotated_instance(self):
+        """未注解的实例序列化时补查一次"""
+        self.create_lists(1)
+        vocabulary_list = VocabularyList.objects.get()
+        data = VocabularyListSerializer(vocabulary_list).data
+        self.assertEqual(data['word_entries_count'], 4)
+        self.assertEqual(data['import_records_count'], 2)
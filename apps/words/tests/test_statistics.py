@@ -0,0 +1,143 @@
+"""
+统计接口测试
+
+各统计项由一条条件聚合查询得到，按日统计一条分组查询；结果按用户缓存，数据变更后失效。
+"""
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.teaching.models import GoalWord, LearningGoal, LearningSession, WordLearningRecord
+from apps.words.models import ImportRecord, VocabularyList, VocabularySource, Word, WordEntry
+
+User = get_user_model()
+
+
+@override_settings(ROOT_URLCONF='apps.words.tests.urls')
+class StatisticsTest(TestCase):
+    """统计接口的结果、查询数和缓存失效"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_superuser(
+            username='admin_stats',
+            email='admin_stats@example.com',
+            password='testpass123'
+        )
+        self.client.force_login(self.user)
+        source = VocabularySource.objects.create(name='来源')
+        vocabulary_list = VocabularyList.objects.create(source=source, name='列表')
+        self.words = []
+        for i, (import_type, part_of_speech) in enumerate(
+            [('new', '名词'), ('new', '名词'), ('version', '动词'), ('duplicate', '')]
+        ):
+            word = Word.objects.create(word=f'word{i}')
+            entry = WordEntry.objects.create(
+                word=word, vocabulary_list=vocabulary_list, definition='释义', part_of_speech=part_of_speech
+            )
+            ImportRecord.objects.create(word_entry=entry, import_type=import_type, import_batch_id='batch')
+            self.words.append(word)
+        self.entry = entry
+
+        today = timezone.localdate()
+        self.goal = LearningGoal.objects.create(user=self.user, name='目标', start_date=today, end_date=today)
+        for word in self.words:
+            GoalWord.objects.create(goal=self.goal, word=word)
+        for i in range(4):
+            session = LearningSession.objects.create(
+                user=self.user, goal=self.goal, words_studied=i + 1, correct_answers=i, total_answers=4,
+                end_time=timezone.now() if i % 2 else None,
+            )
+            LearningSession.objects.filter(pk=session.pk).update(start_time=timezone.now() - timedelta(days=i % 2))
+
+    def get_statistics(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        queries = [query['sql'] for query in context.captured_queries]
+        return response.json(), queries
+
+    def test_import_record_statistics(self):
+        url = reverse('words:importrecord-statistics')
+        data, queries = self.get_statistics(url)
+        self.assertEqual(data['type_statistics'], {'new': 2, 'version': 1, 'duplicate': 1})
+        self.assertEqual(data['total_records'], 4)
+        self.assertEqual(data['recent_30_days'], 4)
+        self.assertEqual(len([sql for sql in queries if 'words_importrecord' in sql]), 1)
+
+        # 命中缓存时不再查询导入记录
+        _, queries = self.get_statistics(url)
+        self.assertFalse([sql for sql in queries if 'words_importrecord' in sql])
+
+        # 新增导入记录后缓存失效
+        with self.captureOnCommitCallbacks(execute=True):
+            ImportRecord.objects.create(word_entry=self.entry, import_type='version')
+        data, _ = self.get_statistics(url)
+        self.assertEqual(data['type_statistics']['version'], 2)
+        self.assertEqual(data['total_records'], 5)
+
+    def test_import_batch_statistics(self):
+        response = self.client.get(reverse('words:importrecord-by-batch'), {'batch_id': 'batch'})
+        self.assertEqual(response.json()['statistics'], {'total': 4, 'new': 2, 'version': 1, 'duplicate': 1})
+
+    def test_study_session_statistics(self):
+        data, queries = self.get_statistics(reverse('words:studysession-statistics'))
+        self.assertEqual(data['total_sessions'], 4)
+        self.assertEqual(data['completed_sessions'], 2)
+        self.assertEqual(data['total_words_studied'], 10)
+        self.assertEqual(data['average_accuracy'], 37.5)
+        self.assertEqual(len([sql for sql in queries if 'teaching_learningsession' in sql]), 2)
+
+        recent = data['recent_sessions']
+        self.assertEqual(len(recent), 7)
+        self.assertEqual(recent[0]['date'], timezone.localdate().strftime('%Y-%m-%d'))
+        self.assertEqual((recent[0]['sessions_count'], recent[0]['words_count']), (2, 4))
+        self.assertEqual((recent[1]['sessions_count'], recent[1]['words_count']), (2, 6))
+        self.assertEqual(recent[2]['sessions_count'], 0)
+
+    def add_records(self, user, goal, word, *results):
+        session = LearningSession.objects.create(user=user, goal=goal)
+        for is_correct in results:
+            WordLearningRecord.objects.create(
+                session=session, goal=goal, word=word, user_answer='', is_correct=is_correct, response_time=1.0
+            )
+
+    def test_word_statistics(self):
+        # word0 答对 6 次（已掌握，1 级）；word1 一对一错（3 级）；word2 答错（5 级）；word3 未作答
+        self.add_records(self.user, self.goal, self.words[0], *[True] * 6)
+        self.add_records(self.user, self.goal, self.words[1], True, False)
+        self.add_records(self.user, self.goal, self.words[2], False)
+        # 其他用户的学习记录不计入
+        other = User.objects.create_user(username='other_stats', password='testpass123')
+        today = timezone.localdate()
+        other_goal = LearningGoal.objects.create(user=other, name='目标', start_date=today, end_date=today)
+        self.add_records(other, other_goal, self.words[3], True)
+
+        data, queries = self.get_statistics(reverse('words:word-statistics'))
+        self.assertEqual(data['total_words'], 4)
+        self.assertEqual(data['learned_words'], 1)
+        self.assertEqual(data['unlearned_words'], 3)
+        self.assertEqual(data['learning_rate'], 25.0)
+        self.assertEqual(data['average_mastery'], round((100 + 100 / 6) / 4, 2))
+        self.assertEqual(
+            data['words_by_difficulty'], {'level_1': 1, 'level_2': 0, 'level_3': 1, 'level_4': 0, 'level_5': 1}
+        )
+        self.assertEqual(data['words_by_part_of_speech'], {'名词': 2, '动词': 1, '未分类': 1})
+        self.assertEqual(data['recent_activity'][0], {'date': today.strftime('%Y-%m-%d'), 'count': 3})
+        self.assertEqual(len(data['recent_activity']), 7)
+        self.assertEqual(len([sql for sql in queries if 'teaching_goalword' in sql]), 3)
+
+        # 词条变更后缓存失效
+        with self.captureOnCommitCallbacks(execute=True):
+            WordEntry.objects.create(
+                word=self.words[3], vocabulary_list=VocabularyList.objects.create(name='列表2'),
+                definition='释义', part_of_speech='名词'
+            )
+        data, _ = self.get_statistics(reverse('words:word-statistics'))
+        self.assertEqual(data['words_by_part_of_speech'], {'名词': 3, '动词': 1, '未分类': 1})
@@ -0,0 +1,10 @@
+"""
+单词测试使用的 URL 配置
+
+只挂载 apps.words 的路由，不依赖项目 URL 配置中其他应用的模块能否完整导入。
+"""
+from django.urls import include, path
+
+urlpatterns = [
+    path('api/words/', include('apps.words.urls')),
+]
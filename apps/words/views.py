@@ -4,9 +4,8 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 from django.db import models
-from django.db.models import Q, Count, Avg, Sum, QuerySet
+from django.db.models import QuerySet
 from django.utils import timezone
-from datetime import timedelta
 from typing import Type, Union
 
 from .models import (
@@ -19,6 +18,13 @@ from .serializers import (
     StudySessionSerializer, WordStatisticsSerializer,
     BulkWordOperationSerializer, WordEntrySerializer, ImportRecordSerializer
 )
+from .search import WordIndexSearchFilter
+from .annotations import AnnotatedQuerysetMixin
+from .stats import (
+    import_record_statistics, import_type_counts,
+    study_session_statistics, word_statistics, words_data_stamp,
+)
+from apps.teaching.dashboard_cache import dashboard_snapshot_cache
 
 
 class WordResourceViewSet(viewsets.ModelViewSet):
@@ -33,13 +39,14 @@ class WordResourceViewSet(viewsets.ModelViewSet):
     ordering = ['-created_at']
 
 
-class WordViewSet(viewsets.ModelViewSet):
+class WordViewSet(AnnotatedQuerysetMixin, viewsets.ModelViewSet):
     """单词视图集"""
     serializer_class = WordSerializer
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, WordIndexSearchFilter, filters.OrderingFilter]
     filterset_fields = ['is_learned', 'difficulty_level', 'part_of_speech']
-    search_fields = ['word', 'definition', 'example', 'tags']
+    # 搜索走全文索引，覆盖词条的词头、释义、例句和音标
+    search_fields = ['word', 'entries__definition', 'entries__example', 'entries__phonetic']
     ordering_fields = ['created_at', 'word', 'mastery_level', 'difficulty_level']
     ordering = ['-created_at']
     
@@ -59,55 +66,12 @@ class WordViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def statistics(self, request):
-        """获取单词统计信息"""
-        queryset = self.get_queryset()
-        
-        # 基础统计
-        total_words = queryset.count()
-        learned_words = queryset.filter(is_learned=True).count()
-        unlearned_words = total_words - learned_words
-        learning_rate = (learned_words / total_words * 100) if total_words > 0 else 0
-        
-        # 平均掌握程度
-        mastery_result = queryset.aggregate(avg=Avg('mastery_level'))
-        avg_mastery = mastery_result['avg'] or 0
-        
-        # 按难度分组
-        words_by_difficulty = {}
-        for i in range(1, 6):
-            count = queryset.filter(difficulty_level=i).count()
-            words_by_difficulty[f'level_{i}'] = count
-        
-        # 按词性分组
-        words_by_part_of_speech = {}
-        pos_stats = queryset.values('part_of_speech').annotate(count=Count('id'))
-        for stat in pos_stats:
-            pos = stat['part_of_speech'] or '未分类'
-            words_by_part_of_speech[pos] = stat['count']
-        
-        # 最近活动（最近7天的学习情况）
-        recent_activity = []
-        for i in range(7):
-            date = timezone.now().date() - timedelta(days=i)
-            count = queryset.filter(
-                learned_at__date=date,
-                is_learned=True
-            ).count()
-            recent_activity.append({
-                'date': date.strftime('%Y-%m-%d'),
-                'count': count
-            })
-        
-        data = {
-            'total_words': total_words,
-            'learned_words': learned_words,
-            'unlearned_words': unlearned_words,
-            'learning_rate': round(learning_rate, 2),
-            'average_mastery': round(avg_mastery, 2),
-            'words_by_difficulty': words_by_difficulty,
-            'words_by_part_of_speech': words_by_part_of_speech,
-            'recent_activity': recent_activity
-        }
+        """获取单词统计信息（用户学习目标中的单词，按用户缓存，学习记录或单词变更后失效）"""
+        user_id = request.user.pk
+        data = dashboard_snapshot_cache.get_or_build(
+            'word_statistics', user_id, lambda: word_statistics(user_id),
+            variant={'words': words_data_stamp()},
+        )
         
         serializer = WordStatisticsSerializer(data)
         return Response(serializer.data)
@@ -193,7 +157,7 @@ class WordViewSet(viewsets.ModelViewSet):
         return Response({'message': f'掌握程度已更新为 {mastery_level}'})
 
 
-class VocabularySourceViewSet(viewsets.ModelViewSet):
+class VocabularySourceViewSet(AnnotatedQuerysetMixin, viewsets.ModelViewSet):
     """词库来源视图集"""
     queryset = VocabularySource.objects.all()
     serializer_class = VocabularySourceSerializer
@@ -204,7 +168,7 @@ class VocabularySourceViewSet(viewsets.ModelViewSet):
     ordering = ['name']
 
 
-class WordEntryViewSet(viewsets.ModelViewSet):
+class WordEntryViewSet(AnnotatedQuerysetMixin, viewsets.ModelViewSet):
     """词条视图集"""
     queryset = WordEntry.objects.select_related('word', 'vocabulary_list').all()
     serializer_class = WordEntrySerializer
@@ -264,12 +228,7 @@ class ImportRecordViewSet(viewsets.ReadOnlyModelViewSet):
         serializer = self.get_serializer(records, many=True)
         
         # 统计信息
-        stats = {
-            'total': records.count(),
-            'new': records.filter(import_type='new').count(),
-            'version': records.filter(import_type='version').count(),
-            'duplicate': records.filter(import_type='duplicate').count(),
-        }
+        stats = import_type_counts(records).aggregate()
         
         return Response({
             'batch_id': batch_id,
@@ -279,29 +238,16 @@ class ImportRecordViewSet(viewsets.ReadOnlyModelViewSet):
     
     @action(detail=False, methods=['get'])
     def statistics(self, request):
-        """获取导入统计信息"""
-        queryset = self.get_queryset()
-        
-        # 按导入类型统计
-        type_stats = {
-            'new': queryset.filter(import_type='new').count(),
-            'version': queryset.filter(import_type='version').count(),
-            'duplicate': queryset.filter(import_type='duplicate').count(),
-        }
-        
-        # 按日期统计（最近30天）
-        from datetime import datetime, timedelta
-        thirty_days_ago = datetime.now() - timedelta(days=30)
-        recent_stats = queryset.filter(created_at__gte=thirty_days_ago).count()
-        
-        return Response({
-            'type_statistics': type_stats,
-            'total_records': queryset.count(),
-            'recent_30_days': recent_stats
-        })
+        """获取导入统计信息（按用户缓存，导入记录变更后失效）"""
+        queryset = ImportRecord.objects.all()
+        data = dashboard_snapshot_cache.get_or_build(
+            'import_record_statistics', request.user.pk, lambda: import_record_statistics(queryset),
+            variant={'words': words_data_stamp()},
+        )
+        return Response(data)
 
 
-class VocabularyListViewSet(viewsets.ModelViewSet):
+class VocabularyListViewSet(AnnotatedQuerysetMixin, viewsets.ModelViewSet):
     """词库列表视图集"""
     queryset = VocabularyList.objects.select_related('source')
     serializer_class = VocabularyListSerializer
@@ -326,7 +272,9 @@ class VocabularyListViewSet(viewsets.ModelViewSet):
     def entries(self, request, pk=None):
         """获取词汇表的所有词条"""
         vocabulary_list = self.get_object()
-        entries = vocabulary_list.word_entries.select_related('word').all()
+        entries = WordEntrySerializer.annotate_queryset(
+            vocabulary_list.word_entries.select_related('word', 'vocabulary_list')
+        )
         
         # 分页
         page = self.paginate_queryset(entries)
@@ -343,7 +291,7 @@ class VocabularyListViewSet(viewsets.ModelViewSet):
         vocabulary_list = self.get_object()
         records = ImportRecord.objects.filter(
             word_entry__vocabulary_list=vocabulary_list
-        ).select_related('import_source').order_by('-created_at')
+        ).select_related('word_entry__word', 'import_source').order_by('-created_at')
         
         # 分页
         page = self.paginate_queryset(records)
@@ -411,44 +359,13 @@ class StudySessionViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def statistics(self, request):
-        """获取学习会话统计"""
-        queryset = self.get_queryset()
-        
-        # 基础统计
-        total_sessions = queryset.count()
-        completed_sessions = queryset.filter(completed_at__isnull=False).count()
-        total_words_studied = queryset.aggregate(
-            total=Sum('words_count')
-        )['total'] or 0
-        
-        # 平均正确率
-        avg_accuracy = queryset.filter(
-            accuracy_rate__isnull=False
-        ).aggregate(avg=Avg('accuracy_rate'))['avg'] or 0
-        
-        # 最近7天的学习情况
-        recent_sessions = []
-        for i in range(7):
-            date = timezone.now().date() - timedelta(days=i)
-            count = queryset.filter(created_at__date=date).count()
-            words_count = queryset.filter(
-                created_at__date=date
-            ).aggregate(total=Sum('words_count'))['total'] or 0
-            
-            recent_sessions.append({
-                'date': date.strftime('%Y-%m-%d'),
-                'sessions_count': count,
-                'words_count': words_count
-            })
-        
-        data = {
-            'total_sessions': total_sessions,
-            'completed_sessions': completed_sessions,
-            'total_words_studied': total_words_studied,
-            'average_accuracy': round(avg_accuracy * 100, 2) if avg_accuracy else 0,
-            'recent_sessions': recent_sessions
-        }
-        
+        """获取学习会话统计（按用户缓存，学习会话变更后失效）"""
+        # 快照可能在后台线程中重建，只捕获用户ID，不持有请求对象
+        user_id = request.user.pk
+        data = dashboard_snapshot_cache.get_or_build(
+            'study_session_statistics', user_id,
+            lambda: study_session_statistics(StudySession.objects.filter(user_id=user_id))
+        )
         return Response(data)
 
 
@@ -456,18 +373,25 @@ def word_challenge_view(request):
     """单词斩页面视图"""
     from django.shortcuts import render
     from .models import Word
+    from .sampling import mastered_word_ids, recently_shown_ids, remember_shown, sample
     
     # 获取所有单词（因为Word模型没有user字段，我们获取所有单词）
     all_words = Word.objects.all()
     
-    # 获取未掌握的单词（基于mastery_level判断）
-    unlearned_words = all_words.filter(
-        mastery_level__lt=50  # 掌握度低于50%的单词
-    ).order_by('?')[:10]  # 随机选择10个单词
+    # 排除已掌握（学习记录统计）和本会话最近展示过的单词
+    mastered_ids = mastered_word_ids(request.user) if request.user.is_authenticated else set()
+    shown_ids = recently_shown_ids(request.session, 'word_challenge')
+    
+    # 随机选择10个单词（按主键抽样，不对整表随机排序）
+    unlearned_words = sample(all_words, 10, exclude=mastered_ids | shown_ids)
+    if len(unlearned_words) < 10 and shown_ids:
+        # 未掌握的单词都已展示过，重新开始一轮
+        unlearned_words = sample(all_words, 10, exclude=mastered_ids)
+    remember_shown(request.session, 'word_challenge', [word.pk for word in unlearned_words])
     
     # 获取学习统计
     total_words = all_words.count()
-    learned_words = all_words.filter(mastery_level__gte=80).count()  # 掌握度80%以上算已掌握
+    learned_words = len(mastered_ids)
     learning_progress = (learned_words / total_words * 100) if total_words > 0 else 0
     
     context = {
@@ -485,33 +409,34 @@ def word_examples_view(request):
     """单词例句页面视图"""
     from django.shortcuts import render
     from django.core.paginator import Paginator
-    from django.db.models import Q
-    from .models import Word
+    from django.db.models import Case, IntegerField, Value, When
+    from .search import MAX_LIMIT, search_entries
     
     # 获取搜索参数
     search_query = request.GET.get('search', '') if request.GET else ''
     grade_filter = request.GET.get('grade', '') if request.GET else ''
     
-    # 构建查询条件
-    words = Word.objects.filter(
+    # 构建查询条件（例句、释义在词条上）
+    words = WordEntry.objects.select_related('word').filter(
         example__isnull=False,
         example__gt=''
-    ).exclude(example='')
-    
-    # 应用搜索过滤
-    if search_query:
-        words = words.filter(
-            Q(word__icontains=search_query) |
-            Q(definition__icontains=search_query) |
-            Q(example__icontains=search_query)
-        )
+    )
     
     # 应用年级过滤
     if grade_filter:
         words = words.filter(grade=grade_filter)
     
-    # 排序
-    words = words.order_by('word')
+    # 应用搜索过滤：全文索引检索，按相关度排序
+    if search_query:
+        entry_ids = [hit.entry_id for hit in search_entries(search_query, MAX_LIMIT)]
+        words = words.filter(pk__in=entry_ids).order_by(
+            Case(
+                *[When(pk=entry_id, then=Value(rank)) for rank, entry_id in enumerate(entry_ids)],
+                output_field=IntegerField()
+            )
+        )
+    else:
+        words = words.order_by('word__word')
     
     # 分页
     paginator = Paginator(words, 20)  # 每页显示20个单词
@@ -0,0 +1,175 @@
+"""
+缓存与会话配置
+
+根据环境变量选择缓存后端，多进程部署时共享 Redis，本地开发回退到进程内缓存：
+
+- CACHE_BACKEND: redis 或 locmem；未设置时配置了 REDIS_URL / REDIS_HOST 即使用 redis
+- REDIS_URL: 完整连接地址，如 redis://:password@redis:6379/1
+- REDIS_HOST / REDIS_PORT / REDIS_PASSWORD / REDIS_DB: 未提供 REDIS_URL 时拼接连接地址
+- CACHE_KEY_PREFIX / CACHE_TIMEOUT: 键前缀与默认过期秒数
+- SESSION_ENGINE: 会话后端，默认 cached_db（读走缓存，写入数据库兜底）
+
+两种后端都记录 get 命中/未命中次数，供系统配置接口展示。
+"""
+import logging
+import os
+import threading
+from urllib.parse import quote
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.redis import RedisCache
+
+from .db import env_int
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class CacheMetrics:
+    """进程内的缓存命中统计，按缓存位置区分"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+
+    def record(self, location, hits=0, misses=0):
+        with self._lock:
+            counter = self._counters.setdefault(location, {'hits': 0, 'misses': 0})
+            counter['hits'] += hits
+            counter['misses'] += misses
+
+    def snapshot(self, location):
+        with self._lock:
+            counter = dict(self._counters.get(location, {'hits': 0, 'misses': 0}))
+        total = counter['hits'] + counter['misses']
+        counter['hit_rate'] = round(counter['hits'] / total, 4) if total else None
+        return counter
+
+    def reset(self, location=None):
+        with self._lock:
+            if location is None:
+                self._counters.clear()
+            else:
+                self._counters.pop(location, None)
+
+
+cache_metrics = CacheMetrics()
+
+
+class CacheMetricsMixin:
+    """为缓存后端统计 get 命中/未命中"""
+
+    def _metrics_location(self):
+        return f'{type(self).__name__}:{self._metrics_name}'
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _MISSING, version)
+        if value is _MISSING:
+            cache_metrics.record(self._metrics_location(), misses=1)
+            return default
+        cache_metrics.record(self._metrics_location(), hits=1)
+        return value
+
+    def get_metrics(self):
+        """本进程的命中统计"""
+        return cache_metrics.snapshot(self._metrics_location())
+
+    def get_server_stats(self):
+        """缓存服务端统计，进程内缓存没有服务端"""
+        return None
+
+
+class InstrumentedLocMemCache(CacheMetricsMixin, LocMemCache):
+    """带命中统计的进程内缓存"""
+
+    def __init__(self, name, params):
+        super().__init__(name, params)
+        self._metrics_name = name
+
+    # get_many 由 BaseCache 逐键调用 get，已计入统计
+
+
+class InstrumentedRedisCache(CacheMetricsMixin, RedisCache):
+    """带命中统计的 Redis 缓存"""
+
+    def __init__(self, server, params):
+        super().__init__(server, params)
+        self._metrics_name = server
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        result = super().get_many(keys, version)
+        cache_metrics.record(self._metrics_location(), hits=len(result), misses=len(keys) - len(result))
+        return result
+
+    def get_server_stats(self):
+        """Redis 服务端统计（所有客户端共享）"""
+        info = self._cache.get_client(write=False).info()
+        hits = info.get('keyspace_hits', 0)
+        misses = info.get('keyspace_misses', 0)
+        return {
+            'keyspace_hits': hits,
+            'keyspace_misses': misses,
+            'hit_rate': round(hits / (hits + misses), 4) if hits + misses else None,
+            'used_memory': info.get('used_memory_human'),
+            'connected_clients': info.get('connected_clients'),
+            'evicted_keys': info.get('evicted_keys', 0),
+        }
+
+
+def redis_url():
+    """从环境变量读取 Redis 连接地址，未配置时返回 None"""
+    url = os.environ.get('REDIS_URL')
+    if url:
+        return url
+    host = os.environ.get('REDIS_HOST')
+    if not host:
+        return None
+    password = os.environ.get('REDIS_PASSWORD')
+    auth = f':{quote(password, safe="")}@' if password else ''
+    port = os.environ.get('REDIS_PORT', '6379')
+    db = os.environ.get('REDIS_DB', '0')
+    return f'redis://{auth}{host}:{port}/{db}'
+
+
+def build_caches():
+    """生成 CACHES 配置"""
+    url = redis_url()
+    backend = os.environ.get('CACHE_BACKEND', 'redis' if url else 'locmem').lower()
+    timeout = env_int('CACHE_TIMEOUT', 300)
+    key_prefix = os.environ.get('CACHE_KEY_PREFIX', 'natural_english')
+
+    if backend == 'redis':
+        if not url:
+            logger.warning("CACHE_BACKEND=redis 但未配置 REDIS_URL/REDIS_HOST，回退到进程内缓存")
+        else:
+            return {
+                'default': {
+                    'BACKEND': 'english_learning_platform.cache.InstrumentedRedisCache',
+                    'LOCATION': url,
+                    'TIMEOUT': timeout,
+                    'KEY_PREFIX': key_prefix,
+                    'OPTIONS': {
+                        'socket_connect_timeout': env_int('REDIS_CONNECT_TIMEOUT', 2),
+                        'socket_timeout': env_int('REDIS_SOCKET_TIMEOUT', 2),
+                    },
+                }
+            }
+
+    return {
+        'default': {
+            'BACKEND': 'english_learning_platform.cache.InstrumentedLocMemCache',
+            'LOCATION': 'default-cache',
+            'TIMEOUT': timeout,
+            'KEY_PREFIX': key_prefix,
+        }
+    }
+
+
+def session_engine():
+    """会话后端，支持 db / cache / cached_db 简写或完整模块路径"""
+    engine = os.environ.get('SESSION_ENGINE', 'cached_db')
+    if '.' not in engine:
+        engine = f'django.contrib.sessions.backends.{engine}'
+    return engine
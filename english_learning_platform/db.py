@@ -0,0 +1,158 @@
+"""
+数据库配置
+
+根据环境变量生成 DATABASES 配置，同一套代码本地使用调优后的 SQLite，生产环境使用带持久连接的 PostgreSQL：
+
+- DB_ENGINE: sqlite（默认）或 postgresql
+- DB_NAME / DB_USER / DB_PASSWORD / DB_HOST / DB_PORT: 数据库连接参数
+- DB_CONN_MAX_AGE: 持久连接保持秒数，0 表示每个请求结束后关闭
+- DB_SQLITE_JOURNAL_MODE / DB_SQLITE_SYNCHRONOUS / DB_SQLITE_BUSY_TIMEOUT_MS / DB_SQLITE_MMAP_SIZE:
+  SQLite 连接建立时设置的 PRAGMA
+- DB_REPLICA_HOST（PostgreSQL）或 DB_REPLICA_NAME（SQLite）: 配置后启用只读副本 replica，
+  DB_REPLICA_APPS 中列出的应用（默认 analytics、reports）的读操作路由到副本
+"""
+import logging
+import os
+
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+REPLICA_ALIAS = 'replica'
+
+
+def env_bool(name, default=False):
+    """读取布尔型环境变量"""
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def env_int(name, default):
+    """读取整型环境变量"""
+    value = os.environ.get(name)
+    return int(value) if value not in (None, '') else default
+
+
+def env_list(name, default):
+    """读取逗号分隔的环境变量"""
+    value = os.environ.get(name)
+    if value is None:
+        return list(default)
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+def build_databases(base_dir):
+    """生成 DATABASES 配置"""
+    engine = os.environ.get('DB_ENGINE', 'sqlite').lower()
+
+    if engine in ('postgres', 'postgresql'):
+        default = {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DB_NAME', 'natural_english'),
+            'USER': os.environ.get('DB_USER', 'postgres'),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', 'localhost'),
+            'PORT': os.environ.get('DB_PORT', '5432'),
+            'CONN_MAX_AGE': env_int('DB_CONN_MAX_AGE', 600),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'connect_timeout': env_int('DB_CONNECT_TIMEOUT', 10),
+            },
+        }
+        replica_overrides = {
+            'HOST': os.environ.get('DB_REPLICA_HOST'),
+            'PORT': os.environ.get('DB_REPLICA_PORT', default['PORT']),
+        }
+        has_replica = bool(replica_overrides['HOST'])
+    else:
+        default = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DB_NAME') or base_dir / 'db.sqlite3',
+            'CONN_MAX_AGE': env_int('DB_CONN_MAX_AGE', 60),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                # sqlite3 驱动层的锁等待时间（秒），与 busy_timeout PRAGMA 保持一致
+                'timeout': env_int('DB_SQLITE_BUSY_TIMEOUT_MS', 5000) / 1000,
+            },
+        }
+        replica_overrides = {
+            'NAME': os.environ.get('DB_REPLICA_NAME'),
+        }
+        has_replica = bool(replica_overrides['NAME'])
+
+    databases = {'default': default}
+    if has_replica:
+        databases[REPLICA_ALIAS] = {
+            **default,
+            **replica_overrides,
+            'TEST': {'MIRROR': 'default'},
+        }
+    return databases
+
+
+def build_database_routers(databases):
+    """配置了只读副本时启用读写分离路由"""
+    if REPLICA_ALIAS in databases:
+        return ['english_learning_platform.db.ReadReplicaRouter']
+    return []
+
+
+def sqlite_pragmas():
+    """SQLite 连接建立时执行的 PRAGMA"""
+    return {
+        'journal_mode': os.environ.get('DB_SQLITE_JOURNAL_MODE', 'WAL'),
+        'synchronous': os.environ.get('DB_SQLITE_SYNCHRONOUS', 'NORMAL'),
+        'busy_timeout': env_int('DB_SQLITE_BUSY_TIMEOUT_MS', 5000),
+        'mmap_size': env_int('DB_SQLITE_MMAP_SIZE', 256 * 1024 * 1024),
+    }
+
+
+def configure_sqlite_connection(sender, connection, **kwargs):
+    """新建 SQLite 连接时设置 WAL、同步级别、忙等待和内存映射"""
+    if connection.vendor != 'sqlite':
+        return
+
+    from django.conf import settings
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', None) or {}
+    if not pragmas:
+        return
+
+    # 内存数据库（测试）不支持 WAL
+    if connection.is_in_memory_db():
+        pragmas = {name: value for name, value in pragmas.items() if name != 'journal_mode'}
+
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+connection_created.connect(configure_sqlite_connection, dispatch_uid='configure_sqlite_connection')
+
+
+class ReadReplicaRouter:
+    """
+    读写分离路由
+
+    REPLICA_READ_APPS 中应用的读操作走只读副本，其余读操作及全部写操作、迁移走 default。
+    """
+
+    def _replica_apps(self):
+        from django.conf import settings
+        return set(getattr(settings, 'REPLICA_READ_APPS', ()))
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in self._replica_apps():
+            return REPLICA_ALIAS
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # 副本与主库数据一致，跨别名的关联视为同一数据库
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
@@ -1,6 +1,9 @@
 import os
 from pathlib import Path
 
+from .db import build_databases, build_database_routers, sqlite_pragmas, env_bool, env_list, env_int
+from .cache import build_caches, session_engine
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -54,9 +57,12 @@ LOCAL_APPS = [
 INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
 
 MIDDLEWARE = [
+    # 放在最外层，统计包括其他中间件在内的全部查询
+    'utils.query_profiling.QueryProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'apps.accounts.middleware.SessionRefreshMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -94,12 +100,15 @@ ASGI_APPLICATION = 'english_learning_platform.asgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
-}
+# 数据库连接由环境变量决定，详见 english_learning_platform/db.py
+DATABASES = build_databases(BASE_DIR)
+DATABASE_ROUTERS = build_database_routers(DATABASES)
+
+# SQLite 连接建立时执行的 PRAGMA（WAL、synchronous=NORMAL、忙等待、内存映射）
+SQLITE_PRAGMAS = sqlite_pragmas()
+
+# 配置只读副本时，这些应用的读操作路由到副本
+REPLICA_READ_APPS = env_list('DB_REPLICA_APPS', ['analytics', 'reports'])
 
 # Custom User Model
 AUTH_USER_MODEL = 'accounts.CustomUser'
@@ -153,6 +162,10 @@ STATICFILES_DIRS = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# 报告上传数据的列式暂存目录和保留时长（小时）
+REPORT_UPLOAD_ROOT = MEDIA_ROOT / 'report_uploads'
+REPORT_UPLOAD_MAX_AGE_HOURS = env_int('REPORT_UPLOAD_MAX_AGE_HOURS', 24)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -165,7 +178,9 @@ LOGOUT_REDIRECT_URL = '/accounts/login/'
 
 # Session settings
 SESSION_COOKIE_AGE = 86400  # 24小时
-SESSION_SAVE_EVERY_REQUEST = True
+# 不在每个请求写入会话；会话被修改或剩余有效期不足时才保存（见 SessionRefreshMiddleware）
+SESSION_SAVE_EVERY_REQUEST = False
+SESSION_REFRESH_THRESHOLD = env_int('SESSION_REFRESH_THRESHOLD', SESSION_COOKIE_AGE // 4)
 SESSION_EXPIRE_AT_BROWSER_CLOSE = False
 
 # Message tags for Bootstrap
@@ -233,14 +248,9 @@ os.makedirs(BASE_DIR / 'logs', exist_ok=True)
 # Email settings (for development)
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 
-# Cache settings - Simplified for development
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'default-cache',
-        'TIMEOUT': 300,
-    }
-}
+# Cache settings
+# 配置 REDIS_URL / REDIS_HOST 时使用共享的 Redis 缓存，否则回退到进程内缓存
+CACHES = build_caches()
 
 # Security settings for production
 if not DEBUG:
@@ -301,8 +311,41 @@ ARTICLE_FACTORY_CONFIG = {
     'CACHE_TIMEOUT': 3600,  # 缓存超时时间（秒）
 }
 
-# WebSocket configuration - Disabled for simplicity
-# WebSocket features are disabled to reduce complexity
+# 请求查询剖析：记录每个请求的查询次数、数据库耗时和重复查询，采样写入日志
+QUERY_PROFILING = {
+    'ENABLED': env_bool('QUERY_PROFILING_ENABLED', DEBUG),
+    'SAMPLE_RATE': float(os.environ.get('QUERY_PROFILING_SAMPLE_RATE', '1.0' if DEBUG else '0.05')),
+    'LOG_FILE': BASE_DIR / 'logs' / 'query_profile.log',
+    'BUDGET_MODE': os.environ.get('QUERY_BUDGET_MODE', 'warn'),  # warn 或 raise（测试中使用）
+    'SLOW_REQUEST_MS': env_int('QUERY_PROFILING_SLOW_MS', 1000),
+    'RESPONSE_HEADERS': DEBUG,
+}
+
+# 各端点的查询次数预算（键为视图名称，支持通配符，精确名称优先）
+QUERY_BUDGETS = {
+    'teaching:teachingstatistics-*': 40,
+    'teaching:learninggoal-*': 20,
+    'teaching:learningsession-*': 20,
+    'analytics:analytics-*': 40,
+    'api_permissions:*': 30,
+    'menu_version': 5,
+}
+
+# WebSocket configuration
+# 本地开发使用进程内 Channel Layer，生产环境可替换为 channels_redis
+CHANNEL_LAYERS = {
+    'default': {
+        'BACKEND': 'channels.layers.InMemoryChannelLayer',
+    },
+}
+
+# 权限通知合并窗口（毫秒，0 表示立即发送）和单次分发的最大并发数
+PERMISSION_NOTIFY_COALESCE_WINDOW_MS = 20
+PERMISSION_NOTIFY_MAX_CONCURRENCY = 100
+
+# 安全规则引擎：规则版本检查间隔（秒），验证通过记录写入审计日志的采样率（违规始终记录）
+SECURITY_RULES_VERSION_CHECK_SECONDS = env_int('SECURITY_RULES_VERSION_CHECK_SECONDS', 5)
+SECURITY_AUDIT_PASS_SAMPLE_RATE = float(os.environ.get('SECURITY_AUDIT_PASS_SAMPLE_RATE', '0.01'))
 
 # Permission system configuration - Simplified
 PERMISSION_SYSTEM_CONFIG = {
@@ -313,5 +356,6 @@ PERMISSION_SYSTEM_CONFIG = {
     'ENABLE_WEBSOCKET_NOTIFICATIONS': False,  # Disabled for simplicity
 }
 
-# Session configuration - Use database for simplicity
-SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+# Session configuration
+# 默认 cached_db：读取优先走缓存，数据库保证缓存失效后会话不丢失
+SESSION_ENGINE = session_engine()
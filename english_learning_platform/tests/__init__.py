@@ -0,0 +1 @@
+# Project Tests package
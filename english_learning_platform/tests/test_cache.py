@@ -0,0 +1,101 @@
+"""
+缓存配置与命中统计测试
+
+build_caches() 按环境变量选择 Redis 或进程内缓存；两种后端都按缓存位置统计 get 命中/未命中。
+Redis 后端的测试使用 fakeredis 替代真实服务，未安装 redis / fakeredis 时跳过。
+"""
+import os
+from unittest import mock, skipUnless
+
+from django.test import SimpleTestCase
+
+from english_learning_platform.cache import (
+    InstrumentedLocMemCache, build_caches, cache_metrics, redis_url, session_engine,
+)
+
+try:
+    import fakeredis
+    from english_learning_platform.cache import InstrumentedRedisCache
+    FAKEREDIS_AVAILABLE = True
+except ImportError:
+    FAKEREDIS_AVAILABLE = False
+
+CACHE_ENV = ('CACHE_BACKEND', 'REDIS_URL', 'REDIS_HOST', 'REDIS_PORT', 'REDIS_PASSWORD', 'REDIS_DB',
+             'CACHE_TIMEOUT', 'CACHE_KEY_PREFIX', 'SESSION_ENGINE')
+
+
+def clean_env(**values):
+    """只保留给定缓存环境变量的 os.environ 补丁"""
+    env = {name: value for name, value in os.environ.items() if name not in CACHE_ENV}
+    env.update(values)
+    return mock.patch.dict(os.environ, env, clear=True)
+
+
+class BuildCachesTest(SimpleTestCase):
+    """环境变量到 CACHES / SESSION_ENGINE 的映射"""
+
+    def test_defaults_to_local_cache(self):
+        with clean_env():
+            caches = build_caches()
+        self.assertEqual(caches['default']['BACKEND'], 'english_learning_platform.cache.InstrumentedLocMemCache')
+        self.assertEqual(caches['default']['TIMEOUT'], 300)
+
+    def test_redis_url_selects_redis(self):
+        with clean_env(REDIS_URL='redis://redis:6379/1', CACHE_TIMEOUT='60'):
+            caches = build_caches()
+        self.assertEqual(caches['default']['BACKEND'], 'english_learning_platform.cache.InstrumentedRedisCache')
+        self.assertEqual(caches['default']['LOCATION'], 'redis://redis:6379/1')
+        self.assertEqual(caches['default']['TIMEOUT'], 60)
+
+    def test_redis_host_builds_url(self):
+        with clean_env(REDIS_HOST='redis', REDIS_PASSWORD='p@ss:word', REDIS_DB='2'):
+            self.assertEqual(redis_url(), 'redis://:p%40ss%3Aword@redis:6379/2')
+
+    def test_explicit_backend_overrides_redis_settings(self):
+        with clean_env(REDIS_URL='redis://redis:6379/1', CACHE_BACKEND='locmem'):
+            self.assertIn('LocMem', build_caches()['default']['BACKEND'])
+        # 要求 redis 但没有连接地址时回退到进程内缓存
+        with clean_env(CACHE_BACKEND='redis'):
+            self.assertIn('LocMem', build_caches()['default']['BACKEND'])
+
+    def test_session_engine_shorthand(self):
+        with clean_env():
+            self.assertEqual(session_engine(), 'django.contrib.sessions.backends.cached_db')
+        with clean_env(SESSION_ENGINE='cache'):
+            self.assertEqual(session_engine(), 'django.contrib.sessions.backends.cache')
+        with clean_env(SESSION_ENGINE='myproject.sessions'):
+            self.assertEqual(session_engine(), 'myproject.sessions')
+
+
+class CacheMetricsTest(SimpleTestCase):
+    """get / get_many 的命中统计"""
+
+    def assert_metrics(self, backend, hits, misses):
+        metrics = backend.get_metrics()
+        self.assertEqual((metrics['hits'], metrics['misses']), (hits, misses))
+        self.assertEqual(metrics['hit_rate'], round(hits / (hits + misses), 4))
+
+    def exercise(self, backend):
+        backend.set('present', 0)
+        # 值为假的键也是命中
+        self.assertEqual(backend.get('present', 'default'), 0)
+        self.assertEqual(backend.get('absent', 'default'), 'default')
+        self.assertEqual(backend.get_many(['present', 'absent', 'other']), {'present': 0})
+
+    def test_local_cache_metrics(self):
+        backend = InstrumentedLocMemCache('metrics-test', {})
+        cache_metrics.reset(backend._metrics_location())
+        self.exercise(backend)
+        self.assert_metrics(backend, hits=2, misses=3)
+        self.assertIsNone(backend.get_server_stats())
+
+    @skipUnless(FAKEREDIS_AVAILABLE, '未安装 redis / fakeredis')
+    def test_redis_cache_metrics(self):
+        backend = InstrumentedRedisCache('redis://metrics-test:6379/0', {
+            'OPTIONS': {'connection_class': fakeredis.FakeConnection},
+        })
+        backend.clear()
+        cache_metrics.reset(backend._metrics_location())
+        self.exercise(backend)
+        # get_many 一次往返，按返回的键数计入命中
+        self.assert_metrics(backend, hits=2, misses=3)
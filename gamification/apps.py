@@ -5,3 +5,8 @@ class GamificationConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'gamification'
     verbose_name = '游戏化系统'
+
+    def ready(self):
+        """应用准备就绪时执行"""
+        # 注册排行榜快照的同步信号
+        import gamification.leaderboards  # noqa
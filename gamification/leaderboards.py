@@ -0,0 +1,308 @@
+"""
+排行榜引擎
+
+每个排行榜按周期（每日/每周/每月/不重置）维护一张快照表 LeaderboardEntry：
+- 增量更新：积分、连击、学习时长变化时只更新相关用户的快照行；
+- 周期重建：由 refresh_leaderboards 命令在重置边界从源数据重建当前周期；
+- 排名查询：按 (排行榜, 周期, 得分) 索引统计得分更高的人数，不对全表排序；
+- 前 N 名：缓存前 TOP_CACHE_SIZE 名，只有更新后的得分进入缓存范围时才失效。
+
+得分分两类：累加型（周期内获得的积分）和取值型（总积分、当前连击、成就数量，以及按用户重新统计的周期学习时长）。
+"""
+import logging
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import DurationField, ExpressionWrapper, F, Sum
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+
+from .models import Leaderboard, LeaderboardEntry, PointTransaction, UserGameProfile
+
+logger = logging.getLogger(__name__)
+
+# 不重置的排行榜使用固定周期
+ALL_TIME = date(1970, 1, 1)
+TOP_CACHE_SIZE = 100
+TOP_CACHE_TIMEOUT = 300
+BOARDS_CACHE_KEY = 'leaderboard:boards'
+BOARDS_CACHE_TIMEOUT = 3600
+REBUILD_BATCH_SIZE = 1000
+
+# 周榜、月榜的周期由类型决定，其余类型使用 reset_frequency
+TYPE_FREQUENCIES = {'weekly': 'weekly', 'monthly': 'monthly'}
+# 取值型排行榜对应的档案字段
+PROFILE_FIELDS = {'streak': 'current_streak', 'achievements': 'achievements_count'}
+
+
+def period_start(frequency: str, day: Optional[date] = None) -> date:
+    """周期开始日期"""
+    day = day or timezone.localdate()
+    if frequency == 'daily':
+        return day
+    if frequency == 'weekly':
+        return day - timedelta(days=day.weekday())
+    if frequency == 'monthly':
+        return day.replace(day=1)
+    return ALL_TIME
+
+
+def period_start_datetime(period: date) -> datetime:
+    return timezone.make_aware(datetime.combine(period, time.min))
+
+
+class Board:
+    """排行榜配置的缓存副本"""
+
+    def __init__(self, pk: int, leaderboard_type: str, reset_frequency: str):
+        self.pk = pk
+        self.leaderboard_type = leaderboard_type
+        self.frequency = TYPE_FREQUENCIES.get(leaderboard_type, reset_frequency)
+
+    @classmethod
+    def from_leaderboard(cls, leaderboard: Leaderboard) -> 'Board':
+        return cls(leaderboard.pk, leaderboard.leaderboard_type, leaderboard.reset_frequency)
+
+    @property
+    def period(self) -> date:
+        return period_start(self.frequency)
+
+    @property
+    def is_points(self) -> bool:
+        return self.leaderboard_type in ('points', 'weekly', 'monthly')
+
+    @property
+    def is_additive(self) -> bool:
+        """累加型：周期内获得的积分"""
+        return self.is_points and self.frequency != 'never'
+
+    def top_cache_key(self, period: date) -> str:
+        return f'leaderboard:{self.pk}:{period.isoformat()}:top'
+
+
+class LeaderboardEngine:
+    """排行榜快照的增量维护、重建和查询"""
+
+    def boards(self, types: Optional[Iterable[str]] = None) -> List[Board]:
+        rows = cache.get(BOARDS_CACHE_KEY)
+        if rows is None:
+            rows = list(Leaderboard.objects.filter(is_active=True).values_list('pk', 'leaderboard_type', 'reset_frequency'))
+            cache.set(BOARDS_CACHE_KEY, rows, BOARDS_CACHE_TIMEOUT)
+        boards = [Board(*row) for row in rows]
+        if types is not None:
+            types = set(types)
+            boards = [board for board in boards if board.leaderboard_type in types]
+        return boards
+
+    # ---- 增量更新 ----
+
+    def record_points(self, deltas: Dict[int, int]):
+        """用户获得积分后更新积分类排行榜"""
+        deltas = {user_id: points for user_id, points in deltas.items() if points > 0}
+        boards = [board for board in self.boards() if board.is_points]
+        if not deltas or not boards:
+            return
+
+        totals = None
+        for board in boards:
+            if board.is_additive:
+                self._upsert(board, deltas, additive=True)
+                continue
+            if totals is None:
+                totals = dict(UserGameProfile.objects.filter(user_id__in=deltas).values_list('user_id', 'total_points'))
+            self._upsert(board, totals, additive=False)
+
+    def record_profile(self, user_ids: Iterable[int], types: Iterable[str] = ('streak', 'achievements')):
+        """连击、成就数量变化后按档案当前值更新取值型排行榜"""
+        boards = self.boards(types)
+        if not boards:
+            return
+        fields = {PROFILE_FIELDS[board.leaderboard_type] for board in boards}
+        profiles = {
+            row['user_id']: row
+            for row in UserGameProfile.objects.filter(user_id__in=list(user_ids)).values('user_id', *fields)
+        }
+        for board in boards:
+            field = PROFILE_FIELDS[board.leaderboard_type]
+            self._upsert(board, {user_id: row[field] for user_id, row in profiles.items()}, additive=False)
+
+    def record_learning_time(self, user_id: int):
+        """学习会话结束后重新统计该用户当前周期的学习时长（幂等，会话重复保存不会重复累加）"""
+        for board in self.boards(['learning_time']):
+            minutes = self._learning_minutes(board.period, user_id=user_id).get(user_id, 0)
+            self._upsert(board, {user_id: minutes}, additive=False)
+
+    def _upsert(self, board: Board, scores: Dict[int, int], additive: bool):
+        """
+        写入快照行
+
+        缺失的行先以 ignore_conflicts 插入（累加型插入 0 分），再逐个用户 UPDATE，
+        并发插入同一用户时不会丢失增量。
+        """
+        if not scores:
+            return
+        period = board.period
+        entries = LeaderboardEntry.objects.filter(leaderboard_id=board.pk, period_start=period)
+        known = set(entries.filter(user_id__in=list(scores)).values_list('user_id', flat=True))
+        missing = [
+            LeaderboardEntry(leaderboard_id=board.pk, period_start=period, user_id=user_id,
+                             score=0 if additive else score)
+            for user_id, score in scores.items() if user_id not in known
+        ]
+        now = timezone.now()
+        with transaction.atomic():
+            if missing:
+                LeaderboardEntry.objects.bulk_create(missing, ignore_conflicts=True)
+            for user_id, score in scores.items():
+                if additive:
+                    entries.filter(user_id=user_id).update(score=F('score') + score, updated_at=now)
+                elif user_id in known:
+                    entries.filter(user_id=user_id).update(score=score, updated_at=now)
+
+        self._invalidate_top(board, period, list(scores), None if additive else scores)
+
+    def _invalidate_top(self, board: Board, period: date, user_ids: List[int], scores: Optional[Dict[int, int]]):
+        """只有被更新的用户已在缓存的前 N 名中，或新得分达到缓存的最低分时才失效"""
+        key = board.top_cache_key(period)
+        cached = cache.get(key)
+        if cached is None:
+            return
+        if scores is None:
+            scores = dict(
+                LeaderboardEntry.objects.filter(leaderboard_id=board.pk, period_start=period, user_id__in=user_ids)
+                .values_list('user_id', 'score')
+            )
+        listed = {entry['user_id'] for entry in cached['entries']}
+        cutoff = cached['cutoff']
+        if any(user_id in listed or cutoff is None or score >= cutoff for user_id, score in scores.items()):
+            cache.delete(key)
+
+    # ---- 周期重建 ----
+
+    def needs_rebuild(self, leaderboard: Leaderboard) -> bool:
+        """已跨过重置边界（或从未重建）时需要重建当前周期"""
+        board = Board.from_leaderboard(leaderboard)
+        if leaderboard.last_reset is None:
+            return True
+        last_period = period_start(board.frequency, timezone.localdate(leaderboard.last_reset))
+        # 连击会因中断而失效，连击榜每次都重建
+        return last_period < board.period or board.leaderboard_type == 'streak'
+
+    def rebuild(self, leaderboard: Leaderboard) -> int:
+        """从源数据重建排行榜当前周期的快照，返回条目数"""
+        board = Board.from_leaderboard(leaderboard)
+        period = board.period
+        scores = {user_id: score for user_id, score in self._source_scores(board, period).items() if score > 0}
+        entries = [
+            LeaderboardEntry(leaderboard_id=board.pk, period_start=period, user_id=user_id, score=score)
+            for user_id, score in scores.items()
+        ]
+        with transaction.atomic():
+            LeaderboardEntry.objects.filter(leaderboard_id=board.pk, period_start=period).delete()
+            LeaderboardEntry.objects.bulk_create(entries, batch_size=REBUILD_BATCH_SIZE)
+            Leaderboard.objects.filter(pk=board.pk).update(last_reset=timezone.now())
+        cache.delete(board.top_cache_key(period))
+        return len(entries)
+
+    def _source_scores(self, board: Board, period: date) -> Dict[int, int]:
+        profiles = UserGameProfile.objects.all()
+        if board.is_additive:
+            return dict(
+                PointTransaction.objects.filter(created_at__gte=period_start_datetime(period))
+                .exclude(transaction_type='spend')
+                .values('user_id').annotate(score=Sum('points'))
+                .values_list('user_id', 'score')
+            )
+        if board.is_points:
+            return dict(profiles.values_list('user_id', 'total_points'))
+        if board.leaderboard_type == 'streak':
+            # 昨天之前中断的连击已失效
+            yesterday = timezone.localdate() - timedelta(days=1)
+            profiles = profiles.filter(last_activity_date__gte=yesterday)
+            return dict(profiles.values_list('user_id', 'current_streak'))
+        if board.leaderboard_type == 'achievements':
+            return dict(profiles.values_list('user_id', 'achievements_count'))
+        if board.leaderboard_type == 'learning_time':
+            return self._learning_minutes(period)
+        return {}
+
+    @staticmethod
+    def _learning_minutes(period: date, user_id: Optional[int] = None) -> Dict[int, int]:
+        """周期内已结束学习会话的总时长（分钟）"""
+        from apps.teaching.models import LearningSession
+
+        sessions = LearningSession.objects.filter(start_time__gte=period_start_datetime(period), end_time__isnull=False)
+        if user_id is not None:
+            sessions = sessions.filter(user_id=user_id)
+        rows = sessions.values('user_id').annotate(
+            total=Sum(ExpressionWrapper(F('end_time') - F('start_time'), output_field=DurationField()))
+        ).values_list('user_id', 'total')
+        return {uid: int(total.total_seconds() // 60) for uid, total in rows if total}
+
+    # ---- 查询 ----
+
+    def top(self, leaderboard: Leaderboard, limit: int = 50) -> List[Dict]:
+        """前 limit 名，limit 不超过 TOP_CACHE_SIZE 时读缓存；并列得分名次相同"""
+        board = Board.from_leaderboard(leaderboard)
+        period = board.period
+        if limit > TOP_CACHE_SIZE:
+            return self._query_top(board, period, limit)
+
+        key = board.top_cache_key(period)
+        cached = cache.get(key)
+        if cached is None:
+            entries = self._query_top(board, period, TOP_CACHE_SIZE)
+            cutoff = entries[-1]['score'] if len(entries) >= TOP_CACHE_SIZE else None
+            cached = {'entries': entries, 'cutoff': cutoff}
+            cache.set(key, cached, TOP_CACHE_TIMEOUT)
+        return cached['entries'][:limit]
+
+    @staticmethod
+    def _query_top(board: Board, period: date, limit: int) -> List[Dict]:
+        rows = (
+            LeaderboardEntry.objects.filter(leaderboard_id=board.pk, period_start=period, score__gt=0)
+            .order_by('-score', 'user_id')
+            .values('user_id', 'score', 'user__username', 'user__real_name')[:limit]
+        )
+        entries, rank, previous = [], 0, None
+        for position, row in enumerate(rows, start=1):
+            if row['score'] != previous:
+                rank, previous = position, row['score']
+            entries.append({
+                'rank': rank,
+                'user_id': row['user_id'],
+                'username': row['user__username'],
+                'real_name': row['user__real_name'] or row['user__username'],
+                'score': row['score'],
+            })
+        return entries
+
+    def rank_of(self, leaderboard: Leaderboard, user_id: int) -> Dict:
+        """用户当前周期的名次：按得分索引统计得分更高的人数"""
+        board = Board.from_leaderboard(leaderboard)
+        period = board.period
+        entries = LeaderboardEntry.objects.filter(leaderboard_id=board.pk, period_start=period)
+        score = entries.filter(user_id=user_id).values_list('score', flat=True).first()
+        rank = None
+        if score:
+            rank = entries.filter(score__gt=score).count() + 1
+        return {'period_start': period, 'score': score or 0, 'rank': rank}
+
+
+leaderboard_engine = LeaderboardEngine()
+
+
+def invalidate_boards(sender, **kwargs):
+    cache.delete(BOARDS_CACHE_KEY)
+
+
+def update_learning_time(sender, instance, **kwargs):
+    if instance.end_time:
+        transaction.on_commit(lambda: leaderboard_engine.record_learning_time(instance.user_id))
+
+
+post_save.connect(invalidate_boards, sender=Leaderboard, dispatch_uid='leaderboard_config_saved')
+post_delete.connect(invalidate_boards, sender=Leaderboard, dispatch_uid='leaderboard_config_deleted')
+post_save.connect(update_learning_time, sender='teaching.LearningSession', dispatch_uid='leaderboard_learning_session_saved')
@@ -0,0 +1,172 @@
+"""
+积分账本
+
+积分和连击的变更都用单条 UPDATE 完成，不再读取-修改-保存整行：
+- 获得积分：total_points / available_points 用 F() 累加；
+- 消费积分：UPDATE ... WHERE available_points >= n，按影响行数判断是否扣减成功，余额不会被并发请求扣成负数；
+- 连击：按 last_activity_date 是否为昨天分两条条件 UPDATE，同一天重复调用不会重复累加。
+
+事务提交后把获得的积分和连击变化同步到排行榜快照（见 gamification.leaderboards）。
+
+在 ledger.batch() 中，同一用户的多次获得积分合并为一条 UPDATE，积分交易记录在退出时一次 bulk_create。
+"""
+import logging
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .leaderboards import leaderboard_engine
+from .models import PointTransaction, UserGameProfile
+
+logger = logging.getLogger(__name__)
+
+
+class LedgerBatch:
+    """批处理中暂存的积分增量和交易记录"""
+
+    def __init__(self):
+        self.deltas: Dict[int, int] = defaultdict(int)
+        self.transactions: List[PointTransaction] = []
+
+
+class PointLedger:
+    """积分与连击的原子更新"""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    @property
+    def _batch(self) -> Optional[LedgerBatch]:
+        return getattr(self._local, 'batch', None)
+
+    @contextmanager
+    def batch(self):
+        """合并积分增量并批量写入交易记录，可嵌套（内层并入外层）"""
+        if self._batch is not None:
+            yield self._batch
+            return
+
+        self._local.batch = batch = LedgerBatch()
+        try:
+            yield batch
+            self._flush(batch)
+        finally:
+            self._local.batch = None
+
+    def earn(self, user_id: int, points: int, reason: str = '', transaction_type: str = 'earn'):
+        """增加积分（批处理中延迟到退出时写入）"""
+        if points <= 0:
+            return
+        record = PointTransaction(user_id=user_id, points=points, transaction_type=transaction_type, reason=reason)
+        batch = self._batch
+        if batch is not None:
+            batch.deltas[user_id] += points
+            batch.transactions.append(record)
+            return
+
+        with transaction.atomic():
+            self._apply_delta(user_id, points)
+            record.save()
+            transaction.on_commit(lambda: _notify(leaderboard_engine.record_points, {user_id: points}))
+
+    def spend(self, user_id: int, points: int, reason: str = '') -> bool:
+        """扣减可用积分，余额不足时返回 False"""
+        if points <= 0:
+            return False
+        batch = self._batch
+        record = PointTransaction(user_id=user_id, points=-points, transaction_type='spend', reason=reason)
+
+        with transaction.atomic():
+            if batch is not None and batch.deltas.get(user_id):
+                # 先写入该用户暂存的获得积分，保证余额判断准确
+                self._apply_delta(user_id, batch.deltas.pop(user_id))
+
+            updated = UserGameProfile.objects.filter(
+                user_id=user_id, available_points__gte=points
+            ).update(available_points=F('available_points') - points, updated_at=timezone.now())
+            if not updated:
+                return False
+
+            if batch is not None:
+                batch.transactions.append(record)
+            else:
+                record.save()
+        return True
+
+    def record_activity(self, user_id: int, today: Optional[date] = None) -> bool:
+        """
+        记录当天活动并更新连击
+
+        昨天有活动则连击 +1，否则重置为 1；当天已记录过时不做任何修改。返回是否有更新。
+        """
+        today = today or timezone.now().date()
+        yesterday = today - timedelta(days=1)
+        profiles = UserGameProfile.objects.filter(user_id=user_id)
+        now = timezone.now()
+
+        updated = profiles.filter(last_activity_date=yesterday).update(
+            current_streak=F('current_streak') + 1,
+            max_streak=Greatest(F('max_streak'), F('current_streak') + 1),
+            last_activity_date=today,
+            updated_at=now,
+        )
+        if updated:
+            transaction.on_commit(lambda: _notify(leaderboard_engine.record_profile, [user_id], ['streak']))
+            return True
+
+        updated = profiles.filter(
+            Q(last_activity_date__isnull=True) | Q(last_activity_date__lt=yesterday)
+        ).update(
+            current_streak=1,
+            max_streak=Greatest(F('max_streak'), 1),
+            last_activity_date=today,
+            updated_at=now,
+        )
+        if not updated and not profiles.exists():
+            UserGameProfile.objects.get_or_create(user_id=user_id)
+            return self.record_activity(user_id, today)
+        if updated:
+            transaction.on_commit(lambda: _notify(leaderboard_engine.record_profile, [user_id], ['streak']))
+        return bool(updated)
+
+    def _apply_delta(self, user_id: int, points: int):
+        values = dict(
+            total_points=F('total_points') + points,
+            available_points=F('available_points') + points,
+            updated_at=timezone.now(),
+        )
+        if not UserGameProfile.objects.filter(user_id=user_id).update(**values):
+            UserGameProfile.objects.get_or_create(user_id=user_id)
+            UserGameProfile.objects.filter(user_id=user_id).update(**values)
+
+    def _flush(self, batch: LedgerBatch):
+        if not batch.deltas and not batch.transactions:
+            return
+        with transaction.atomic():
+            for user_id, points in batch.deltas.items():
+                self._apply_delta(user_id, points)
+            PointTransaction.objects.bulk_create(batch.transactions)
+            earned = defaultdict(int)
+            for record in batch.transactions:
+                if record.transaction_type != 'spend':
+                    earned[record.user_id] += record.points
+            transaction.on_commit(lambda: _notify(leaderboard_engine.record_points, dict(earned)))
+        logger.debug(f"积分批量写入: {len(batch.deltas)} 个用户，{len(batch.transactions)} 条交易记录")
+
+
+def _notify(handler, *args):
+    """排行榜更新失败不影响积分变更"""
+    try:
+        handler(*args)
+    except Exception as e:
+        logger.warning(f"排行榜更新失败: {e}")
+
+
+point_ledger = PointLedger()
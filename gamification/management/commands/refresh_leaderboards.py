@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from gamification.leaderboards import leaderboard_engine
+from gamification.models import Leaderboard
+
+
+class Command(BaseCommand):
+    help = '在重置边界重建排行榜当前周期的快照（建议每日零点后定时执行）'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='重建全部启用的排行榜，不论是否跨过重置边界'
+        )
+        parser.add_argument(
+            '--leaderboard',
+            type=int,
+            action='append',
+            help='只处理指定ID的排行榜，可重复'
+        )
+
+    def handle(self, *args, **options):
+        leaderboards = Leaderboard.objects.filter(is_active=True).order_by('id')
+        if options['leaderboard']:
+            leaderboards = leaderboards.filter(id__in=options['leaderboard'])
+
+        rebuilt = 0
+        for leaderboard in leaderboards:
+            if not options['all'] and not options['leaderboard'] and not leaderboard_engine.needs_rebuild(leaderboard):
+                continue
+            started = time.perf_counter()
+            total = leaderboard_engine.rebuild(leaderboard)
+            rebuilt += 1
+            self.stdout.write(
+                f'🏆 {leaderboard.name}: {total} 个条目（{time.perf_counter() - started:.2f}s）'
+            )
+
+        self.stdout.write(self.style.SUCCESS(f'✅ 已重建 {rebuilt} 个排行榜'))
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-19 04:37
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('gamification', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period_start', models.DateField(verbose_name='周期开始日期')),
+                ('score', models.IntegerField(default=0, verbose_name='得分')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+                ('leaderboard', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='gamification.leaderboard', verbose_name='排行榜')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entries', to=settings.AUTH_USER_MODEL, verbose_name='用户')),
+            ],
+            options={
+                'verbose_name': '排行榜条目',
+                'verbose_name_plural': '排行榜条目',
+                'indexes': [models.Index(fields=['leaderboard', 'period_start', '-score', 'user'], name='gamificatio_leaderb_e9f926_idx')],
+                'unique_together': {('leaderboard', 'period_start', 'user')},
+            },
+        ),
+    ]
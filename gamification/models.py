@@ -1,8 +1,6 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator, MaxValueValidator
-from django.utils import timezone
-from datetime import timedelta
 from decimal import Decimal
 import json
 
@@ -31,53 +29,27 @@ class UserGameProfile(models.Model):
         return f"{self.user.username} - Level {self.current_level}"
     
     def add_points(self, points, reason=''):
-        """添加积分"""
-        self.total_points += points
-        self.available_points += points
-        self.save()
-        
-        # 记录积分交易
-        PointTransaction.objects.create(
-            user=self.user,
-            points=points,
-            transaction_type='earn',
-            reason=reason
-        )
+        """添加积分（F() 原子累加，见 gamification.ledger）"""
+        from .ledger import point_ledger
+
+        point_ledger.earn(self.user_id, points, reason)
+        self.refresh_from_db(fields=['total_points', 'available_points', 'updated_at'])
     
     def spend_points(self, points, reason=''):
-        """消费积分"""
-        if self.available_points >= points:
-            self.available_points -= points
-            self.save()
-            
-            # 记录积分交易
-            PointTransaction.objects.create(
-                user=self.user,
-                points=-points,
-                transaction_type='spend',
-                reason=reason
-            )
-            return True
-        return False
+        """消费积分，余额不足时返回 False"""
+        from .ledger import point_ledger
+
+        spent = point_ledger.spend(self.user_id, points, reason)
+        if spent:
+            self.refresh_from_db(fields=['available_points', 'updated_at'])
+        return spent
     
     def update_streak(self):
         """更新连击"""
-        today = timezone.now().date()
-        if self.last_activity_date:
-            if self.last_activity_date == today:
-                return  # 今天已经更新过
-            elif self.last_activity_date == today - timedelta(days=1):
-                self.current_streak += 1
-            else:
-                self.current_streak = 1
-        else:
-            self.current_streak = 1
-        
-        if self.current_streak > self.max_streak:
-            self.max_streak = self.current_streak
-        
-        self.last_activity_date = today
-        self.save()
+        from .ledger import point_ledger
+
+        if point_ledger.record_activity(self.user_id):
+            self.refresh_from_db(fields=['current_streak', 'max_streak', 'last_activity_date', 'updated_at'])
 
 
 class PointTransaction(models.Model):
@@ -198,6 +170,26 @@ class Leaderboard(models.Model):
         return self.name
 
 
+class LeaderboardEntry(models.Model):
+    """排行榜快照条目（每个排行榜每个周期每个用户一行）"""
+    leaderboard = models.ForeignKey(Leaderboard, on_delete=models.CASCADE, verbose_name='排行榜', related_name='entries')
+    period_start = models.DateField('周期开始日期')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name='用户', related_name='leaderboard_entries')
+    score = models.IntegerField('得分', default=0)
+    updated_at = models.DateTimeField('更新时间', auto_now=True)
+
+    class Meta:
+        verbose_name = '排行榜条目'
+        verbose_name_plural = '排行榜条目'
+        unique_together = ['leaderboard', 'period_start', 'user']
+        indexes = [
+            models.Index(fields=['leaderboard', 'period_start', '-score', 'user']),
+        ]
+
+    def __str__(self):
+        return f"{self.leaderboard.name} {self.period_start} - {self.user.username}: {self.score}"
+
+
 class Competition(models.Model):
     """竞赛活动"""
     COMPETITION_STATUS = [
@@ -14,10 +14,13 @@ from .serializers import (
     LeaderboardEntrySerializer, CompetitionSerializer, CompetitionParticipantSerializer,
     GameStatsSerializer
 )
+from .leaderboards import leaderboard_engine
 from datetime import timedelta
 
 User = get_user_model()
 
+MAX_RANKINGS_LIMIT = 500
+
 
 class UserGameProfileViewSet(viewsets.ModelViewSet):
     """用户游戏档案视图集"""
@@ -162,42 +165,22 @@ class LeaderboardViewSet(viewsets.ReadOnlyModelViewSet):
     
     @action(detail=True, methods=['get'])
     def rankings(self, request, pk=None):
-        """获取排行榜排名"""
+        """获取排行榜当前周期的前 N 名（读取快照，前 100 名走缓存）"""
         leaderboard = self.get_object()
-        limit = int(request.query_params.get('limit', 50))
-        
-        if leaderboard.leaderboard_type == 'points':
-            profiles = UserGameProfile.objects.select_related('user').order_by('-total_points')[:limit]
-            entries = [{
-                'rank': idx + 1,
-                'username': profile.user.username,
-                'real_name': profile.user.real_name or profile.user.username,
-                'score': profile.total_points
-            } for idx, profile in enumerate(profiles)]
-        
-        elif leaderboard.leaderboard_type == 'streak':
-            profiles = UserGameProfile.objects.select_related('user').order_by('-current_streak')[:limit]
-            entries = [{
-                'rank': idx + 1,
-                'username': profile.user.username,
-                'real_name': profile.user.real_name or profile.user.username,
-                'score': profile.current_streak
-            } for idx, profile in enumerate(profiles)]
-        
-        elif leaderboard.leaderboard_type == 'achievements':
-            profiles = UserGameProfile.objects.select_related('user').order_by('-achievements_count')[:limit]
-            entries = [{
-                'rank': idx + 1,
-                'username': profile.user.username,
-                'real_name': profile.user.real_name or profile.user.username,
-                'score': profile.achievements_count
-            } for idx, profile in enumerate(profiles)]
-        
-        else:
-            entries = []
-        
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', 50)), MAX_RANKINGS_LIMIT))
+        except ValueError:
+            return Response({'error': 'limit 必须是整数'}, status=status.HTTP_400_BAD_REQUEST)
+
+        entries = leaderboard_engine.top(leaderboard, limit)
         serializer = LeaderboardEntrySerializer(entries, many=True)
         return Response(serializer.data)
+    
+    @action(detail=True, methods=['get'])
+    def my_rank(self, request, pk=None):
+        """获取当前用户在排行榜当前周期的名次"""
+        leaderboard = self.get_object()
+        return Response(leaderboard_engine.rank_of(leaderboard, request.user.id))
 
 
 class CompetitionViewSet(viewsets.ReadOnlyModelViewSet):
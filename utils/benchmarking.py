@@ -0,0 +1,207 @@
+"""
+接口基准测试框架
+
+用 @benchmark 装饰器登记基准用例，用例接收 BenchmarkContext，通过 Django 测试客户端请求接口。
+BenchmarkRunner 逐个执行用例，记录每次迭代的耗时和查询次数，汇总为 p50/p95 延迟和查询数，
+结果保存为 JSON 基线，compare_results 对比两份基线找出性能回退。
+"""
+import json
+import statistics
+import subprocess
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import Client, override_settings
+from django.utils import timezone
+
+from utils.query_profiling import QueryProfiler
+
+
+@dataclass
+class BenchmarkContext:
+    """用例执行上下文：测试客户端、数据集中的用户和对象ID"""
+    client: Client
+    users: List[Any]
+    data: Dict[str, Any] = field(default_factory=dict)
+    user: Any = None
+
+    def prepare_iteration(self, iteration: int):
+        """每次迭代轮换登录用户，登录本身不计入耗时"""
+        user = self.users[iteration % len(self.users)]
+        if user is not self.user:
+            self.client.force_login(user)
+            self.user = user
+
+
+@dataclass
+class Benchmark:
+    """登记的基准用例"""
+    name: str
+    func: Callable[[BenchmarkContext], Any]
+    description: str = ''
+    skip: str = ''  # 非空时不执行，记录为跳过并给出原因
+
+
+BENCHMARKS: Dict[str, Benchmark] = {}
+
+
+def benchmark(name: str, description: str = '', skip: str = ''):
+    """登记基准用例的装饰器，skip 为当前无法运行的用例说明原因"""
+    def decorator(func):
+        BENCHMARKS[name] = Benchmark(name=name, func=func, description=description, skip=skip)
+        return func
+    return decorator
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """线性插值百分位数"""
+    ordered = sorted(values)
+    if len(ordered) == 1:
+        return ordered[0]
+    position = (len(ordered) - 1) * pct / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+class BenchmarkRunner:
+    """执行基准用例并汇总延迟和查询次数"""
+
+    def __init__(self, iterations: int = 20, warmup: int = 2, cold_cache: bool = False):
+        self.iterations = iterations
+        self.warmup = warmup
+        self.cold_cache = cold_cache
+
+    def run(self, bench: Benchmark, context: BenchmarkContext) -> Dict[str, Any]:
+        if bench.skip:
+            return {'name': bench.name, 'status': 'skipped', 'reason': bench.skip}
+
+        timings, query_counts = [], []
+        # 关闭请求剖析中间件，避免写日志影响测量
+        with override_settings(QUERY_PROFILING={'ENABLED': False}):
+            try:
+                for iteration in range(self.warmup + self.iterations):
+                    context.prepare_iteration(iteration)
+                    if self.cold_cache:
+                        cache.clear()
+
+                    profiler = QueryProfiler()
+                    start = time.perf_counter()
+                    with profiler.profile():
+                        response = bench.func(context)
+                    elapsed = (time.perf_counter() - start) * 1000
+
+                    status_code = getattr(response, 'status_code', 200)
+                    if status_code >= 400:
+                        raise RuntimeError(f'HTTP {status_code}: {self._response_excerpt(response)}')
+
+                    if iteration >= self.warmup:
+                        timings.append(elapsed)
+                        query_counts.append(profiler.query_count)
+            except Exception as e:
+                return {'name': bench.name, 'status': 'error', 'error': str(e)[:500]}
+
+        return {
+            'name': bench.name,
+            'status': 'ok',
+            'iterations': len(timings),
+            'p50_ms': round(percentile(timings, 50), 3),
+            'p95_ms': round(percentile(timings, 95), 3),
+            'mean_ms': round(statistics.mean(timings), 3),
+            'max_ms': round(max(timings), 3),
+            'queries_p50': int(percentile(query_counts, 50)),
+            'queries_max': max(query_counts),
+        }
+
+    def run_all(self, context: BenchmarkContext, names: Optional[List[str]] = None,
+                on_result: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Dict[str, Any]]:
+        results = {}
+        for name, bench in BENCHMARKS.items():
+            if names and name not in names:
+                continue
+            results[name] = self.run(bench, context)
+            if on_result:
+                on_result(results[name])
+        return results
+
+    @staticmethod
+    def _response_excerpt(response) -> str:
+        content = getattr(response, 'content', b'')
+        return content[:200].decode('utf-8', errors='replace')
+
+
+def git_revision() -> Optional[str]:
+    """当前提交号，非 git 环境返回 None"""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, timeout=5, check=True,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def build_baseline(results: Dict[str, Dict[str, Any]], meta: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'meta': {
+            'created_at': timezone.now().isoformat(),
+            'git_revision': git_revision(),
+            'database': settings.DATABASES['default']['ENGINE'].split('.')[-1],
+            **meta,
+        },
+        'results': results,
+    }
+
+
+def save_baseline(path, baseline: Dict[str, Any]):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(baseline, f, ensure_ascii=False, indent=2)
+
+
+def load_baseline(path) -> Dict[str, Any]:
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def compare_results(baseline: Dict[str, Any], current: Dict[str, Any],
+                    threshold: float = 0.2, min_delta_ms: float = 2.0) -> List[Dict[str, Any]]:
+    """
+    对比两份基线，返回每个用例的变化
+
+    p95 延迟增幅超过 threshold（比例）且绝对增量超过 min_delta_ms，或查询次数增加时标记为回退；
+    绝对增量下限用于过滤毫秒级接口的测量抖动。
+    """
+    changes = []
+    old_results = baseline.get('results', {})
+    for name, new in current.get('results', {}).items():
+        old = old_results.get(name)
+        if not old or old.get('status') != 'ok' or new.get('status') != 'ok':
+            if not old:
+                status = 'missing'
+            elif 'skipped' in (old.get('status'), new.get('status')):
+                status = 'skipped'
+            else:
+                status = 'error'
+            changes.append({'name': name, 'status': status, 'regression': False})
+            continue
+
+        p95_change = (new['p95_ms'] - old['p95_ms']) / old['p95_ms'] if old['p95_ms'] else 0.0
+        query_change = new['queries_max'] - old['queries_max']
+        changes.append({
+            'name': name,
+            'status': 'ok',
+            'p95_before': old['p95_ms'],
+            'p95_after': new['p95_ms'],
+            'p95_change': round(p95_change, 4),
+            'queries_before': old['queries_max'],
+            'queries_after': new['queries_max'],
+            'queries_change': query_change,
+            'regression': (
+                (p95_change > threshold and new['p95_ms'] - old['p95_ms'] > min_delta_ms)
+                or query_change > 0
+            ),
+        })
+    return changes
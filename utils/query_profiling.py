@@ -0,0 +1,182 @@
+"""
+请求级查询剖析
+
+QueryProfilingMiddleware 通过 connection.execute_wrapper 记录每个请求的查询次数、数据库耗时、
+重复查询指纹和总耗时，并按解析后的视图名称检查 settings.QUERY_BUDGETS 中声明的查询预算：
+
+    QUERY_BUDGETS = {
+        'teaching:teachingstatistics-overview': 15,
+        'api_permissions:*': 25,   # 支持通配符，精确名称优先
+    }
+
+超出预算时按 QUERY_PROFILING['BUDGET_MODE'] 记录警告（warn）或抛出 QueryBudgetExceeded（raise，用于测试）。
+采样的请求以 JSON 行写入 QUERY_PROFILING['LOG_FILE']，由 query_profile_report 命令汇总。
+"""
+import json
+import logging
+import random
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+from fnmatch import fnmatchcase
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIG = {
+    'ENABLED': False,
+    'SAMPLE_RATE': 1.0,
+    'LOG_FILE': None,
+    'BUDGET_MODE': 'warn',
+    'DEFAULT_BUDGET': None,
+    'SLOW_REQUEST_MS': 1000,
+    'RESPONSE_HEADERS': False,
+    'TOP_DUPLICATES': 5,
+}
+
+_IN_LIST = re.compile(r'\((?:\s*%s\s*,)+\s*%s\s*\)')
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r'\s+')
+
+
+class QueryBudgetExceeded(AssertionError):
+    """请求的查询次数超过预算"""
+
+
+def get_config() -> Dict[str, Any]:
+    return {**DEFAULT_CONFIG, **getattr(settings, 'QUERY_PROFILING', {})}
+
+
+def fingerprint(sql: str) -> str:
+    """SQL 指纹：参数、字面量和 IN 列表长度归一化，相同形状的查询得到相同指纹"""
+    sql = _IN_LIST.sub('(...)', sql)
+    sql = _LITERAL.sub('?', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+def budget_for(endpoint: str) -> Optional[int]:
+    """查找端点的查询预算，精确名称优先于通配符"""
+    budgets = getattr(settings, 'QUERY_BUDGETS', {})
+    if endpoint in budgets:
+        return budgets[endpoint]
+    for pattern, budget in budgets.items():
+        if fnmatchcase(endpoint, pattern):
+            return budget
+    return get_config()['DEFAULT_BUDGET']
+
+
+class QueryProfiler:
+    """通过 execute_wrapper 收集查询统计"""
+
+    def __init__(self):
+        self.query_count = 0
+        self.db_time = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.query_count += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    def profile(self):
+        """在所有数据库连接上安装 wrapper 的上下文管理器"""
+        stack = ExitStack()
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(self))
+        return stack
+
+    def duplicates(self, limit: int):
+        return [
+            {'fingerprint': sql[:300], 'count': count}
+            for sql, count in self.fingerprints.most_common(limit)
+            if count > 1
+        ]
+
+
+class ProfileLogWriter:
+    """把采样记录以 JSON 行追加到日志文件"""
+
+    _lock = threading.Lock()
+
+    @classmethod
+    def write(cls, path, record: Dict[str, Any]):
+        line = json.dumps(record, ensure_ascii=False)
+        with cls._lock:
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+
+
+class QueryProfilingMiddleware:
+    """记录每个请求的查询次数、数据库耗时和重复查询，并检查查询预算"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        config = get_config()
+        if not config['ENABLED']:
+            return self.get_response(request)
+
+        profiler = QueryProfiler()
+        start = time.perf_counter()
+        with profiler.profile():
+            response = self.get_response(request)
+        wall_time = time.perf_counter() - start
+
+        endpoint = self._endpoint(request)
+        budget = budget_for(endpoint)
+        over_budget = budget is not None and profiler.query_count > budget
+        wall_ms = round(wall_time * 1000, 2)
+        db_ms = round(profiler.db_time * 1000, 2)
+
+        if config['RESPONSE_HEADERS']:
+            response['X-Query-Count'] = str(profiler.query_count)
+            response['X-DB-Time-Ms'] = str(db_ms)
+
+        record = {
+            'ts': round(time.time(), 3),
+            'endpoint': endpoint,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': profiler.query_count,
+            'db_ms': db_ms,
+            'wall_ms': wall_ms,
+            'budget': budget,
+            'over_budget': over_budget,
+            'duplicates': profiler.duplicates(config['TOP_DUPLICATES']),
+        }
+
+        slow = wall_ms >= config['SLOW_REQUEST_MS']
+        if config['LOG_FILE'] and (over_budget or slow or random.random() < config['SAMPLE_RATE']):
+            try:
+                ProfileLogWriter.write(config['LOG_FILE'], record)
+            except OSError as e:
+                logger.error(f"写入查询剖析日志失败: {e}")
+
+        if over_budget:
+            message = f"查询次数超出预算: {endpoint} 执行 {profiler.query_count} 次查询，预算 {budget}"
+            if config['BUDGET_MODE'] == 'raise':
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        elif slow:
+            logger.warning(f"慢请求: {endpoint} 耗时 {wall_ms}ms，{profiler.query_count} 次查询，数据库 {db_ms}ms")
+
+        return response
+
+    @staticmethod
+    def _endpoint(request) -> str:
+        """按解析后的视图命名端点，未命名的路由使用视图函数路径"""
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return 'unresolved'
+        return match.view_name or match._func_path
@@ -0,0 +1,169 @@
+from collections import defaultdict
+
+from django.core.exceptions import ValidationError
+from django.db import models
+from django.db.models import F, Value
+from django.db.models.functions import Concat, Substr
+
+
+class MaterializedPathModel(models.Model):
+    """
+    物化路径树索引
+
+    为带有 parent 自关联外键的模型维护祖先路径（如 "1/5/9/"）、层级深度和完整名称路径，
+    保存时自动更新自身及整棵子树。子孙查询、祖先链、深度和子树计数均可在单条查询内完成，
+    无需逐层递归访问 parent/children。
+    """
+    tree_path = models.CharField('树路径', max_length=255, blank=True, default='', db_index=True,
+                                 editable=False, help_text='祖先ID路径，由系统自动维护')
+    tree_depth = models.PositiveIntegerField('层级深度', default=0, editable=False,
+                                             help_text='根节点为0，由系统自动维护')
+    tree_label_path = models.TextField('完整路径名称', blank=True, default='', editable=False,
+                                       help_text='包含所有上级名称的完整路径，由系统自动维护')
+
+    tree_parent_field = 'parent'
+    tree_label_field = 'name'
+    tree_label_separator = ' > '
+
+    class Meta:
+        abstract = True
+
+    def _compute_tree_index(self):
+        """根据父节点计算 (tree_path, tree_depth, tree_label_path)"""
+        parent = getattr(self, self.tree_parent_field)
+        label = str(getattr(self, self.tree_label_field))
+        if parent is None:
+            return f'{self.pk}/', 0, label
+
+        if parent.pk == self.pk or (self.tree_path and parent.tree_path.startswith(self.tree_path)):
+            raise ValidationError('不能创建循环的层级关系')
+        if not parent.tree_path:
+            # 父节点尚未建立索引（历史数据），先补建父节点索引
+            parent.save(update_fields=['tree_path', 'tree_depth', 'tree_label_path'])
+
+        return (
+            f'{parent.tree_path}{self.pk}/',
+            parent.tree_depth + 1,
+            f'{parent.tree_label_path}{self.tree_label_separator}{label}',
+        )
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        tree_fields = {'tree_path', 'tree_depth', 'tree_label_path'}
+        if update_fields is not None and not (
+            set(update_fields) & {self.tree_parent_field, f'{self.tree_parent_field}_id', self.tree_label_field, *tree_fields}
+        ):
+            return super().save(*args, **kwargs)
+
+        old_index = (self.tree_path, self.tree_depth, self.tree_label_path)
+
+        if self._state.adding or self.pk is None:
+            super().save(*args, **kwargs)
+            new_index = self._compute_tree_index()
+            type(self)._base_manager.filter(pk=self.pk).update(
+                tree_path=new_index[0], tree_depth=new_index[1], tree_label_path=new_index[2]
+            )
+            self.tree_path, self.tree_depth, self.tree_label_path = new_index
+            return
+
+        new_index = self._compute_tree_index()
+        self.tree_path, self.tree_depth, self.tree_label_path = new_index
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | tree_fields
+        super().save(*args, **kwargs)
+
+        if old_index[0] and old_index != new_index:
+            self._reindex_subtree(old_index, new_index)
+
+    def _reindex_subtree(self, old_index, new_index):
+        """节点移动或改名后，用一条UPDATE重写整棵子树的路径"""
+        old_path, old_depth, old_label = old_index
+        new_path, new_depth, new_label = new_index
+        type(self)._base_manager.filter(tree_path__startswith=old_path).exclude(pk=self.pk).update(
+            tree_path=Concat(
+                Value(new_path), Substr('tree_path', len(old_path) + 1),
+                output_field=models.CharField()
+            ),
+            tree_depth=F('tree_depth') + (new_depth - old_depth),
+            tree_label_path=Concat(
+                Value(new_label), Substr('tree_label_path', len(old_label) + 1),
+                output_field=models.TextField()
+            ),
+        )
+
+    def get_ancestor_ids(self):
+        """祖先ID列表（由根到父），直接解析路径，无需查询"""
+        return [int(pk) for pk in self.tree_path.split('/')[:-2]] if self.tree_path else []
+
+    def get_ancestors(self):
+        """祖先节点查询集（由根到父）"""
+        return type(self)._default_manager.filter(pk__in=self.get_ancestor_ids()).order_by('tree_depth')
+
+    def get_descendant_queryset(self, include_self=False):
+        """子树查询集"""
+        manager = type(self)._default_manager
+        if self.tree_path:
+            queryset = manager.filter(tree_path__startswith=self.tree_path)
+        else:
+            # 尚未建立索引的节点（如 bulk_create 的数据）：空前缀会匹配整张表，改为沿 parent 外键逐层查找
+            queryset = manager.filter(pk__in=self._walk_descendant_ids())
+        if not include_self:
+            queryset = queryset.exclude(pk=self.pk)
+        return queryset
+
+    def _walk_descendant_ids(self):
+        """沿 parent 外键逐层查找子树节点ID（含自身），每层一次查询"""
+        ids = {self.pk}
+        frontier = [self.pk]
+        while frontier:
+            frontier = [
+                pk for pk in type(self)._base_manager.filter(
+                    **{f'{self.tree_parent_field}_id__in': frontier}
+                ).values_list('pk', flat=True)
+                if pk not in ids
+            ]
+            ids.update(frontier)
+        return ids
+
+    def get_descendant_ids(self, include_self=False):
+        """子树节点ID列表"""
+        return list(self.get_descendant_queryset(include_self).values_list('pk', flat=True))
+
+    def get_subtree_count(self, include_self=False):
+        """子树节点数量"""
+        return self.get_descendant_queryset(include_self).count()
+
+    def is_tree_ancestor_of(self, node):
+        """判断是否为指定节点的祖先，直接比较路径，无需查询"""
+        return bool(self.tree_path) and node.pk != self.pk and node.tree_path.startswith(self.tree_path)
+
+    @classmethod
+    def rebuild_tree_index(cls):
+        """重建整张表的树索引"""
+        rebuild_tree_index(cls, cls.tree_parent_field, cls.tree_label_field, cls.tree_label_separator)
+
+
+def rebuild_tree_index(model, parent_field='parent', label_field='name', separator=' > '):
+    """
+    一次读取整张表并在内存中重建物化路径，批量写回。
+
+    只依赖字段名，可在数据迁移中配合历史模型使用；存在环的节点不会被写入。
+    """
+    rows = list(model._base_manager.values_list('pk', f'{parent_field}_id', label_field))
+    known_ids = {pk for pk, _, _ in rows}
+    children = defaultdict(list)
+    for pk, parent_id, label in rows:
+        children[parent_id if parent_id in known_ids else None].append((pk, label))
+
+    updated = []
+    stack = [(pk, label, '', -1, None) for pk, label in children[None]]
+    while stack:
+        pk, label, parent_path, parent_depth, parent_label = stack.pop()
+        path = f'{parent_path}{pk}/'
+        label_path = str(label) if parent_label is None else f'{parent_label}{separator}{label}'
+        updated.append(model(pk=pk, tree_path=path, tree_depth=parent_depth + 1, tree_label_path=label_path))
+        stack.extend((child_pk, child_label, path, parent_depth + 1, label_path)
+                     for child_pk, child_label in children[pk])
+
+    model._base_manager.bulk_update(updated, ['tree_path', 'tree_depth', 'tree_label_path'], batch_size=500)
+    return len(updated)